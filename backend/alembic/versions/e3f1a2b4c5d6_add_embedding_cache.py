@@ -0,0 +1,41 @@
+"""Add embedding cache
+
+Revision ID: e3f1a2b4c5d6
+Revises: 3879338f8ba1
+Create Date: 2024-05-20 10:12:41.503217
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "e3f1a2b4c5d6"
+down_revision = "3879338f8ba1"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "embedding_cache",
+        sa.Column("key", sa.String(), nullable=False),
+        sa.Column("embedding", sa.LargeBinary(), nullable=False),
+        sa.Column(
+            "last_used",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("key"),
+    )
+    op.create_index(
+        op.f("ix_embedding_cache_last_used"),
+        "embedding_cache",
+        ["last_used"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_embedding_cache_last_used"), table_name="embedding_cache")
+    op.drop_table("embedding_cache")
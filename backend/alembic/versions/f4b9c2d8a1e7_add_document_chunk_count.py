@@ -0,0 +1,25 @@
+"""Add document chunk count
+
+Revision ID: f4b9c2d8a1e7
+Revises: e3f1a2b4c5d6
+Create Date: 2024-05-27 14:03:18.271645
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "f4b9c2d8a1e7"
+down_revision = "e3f1a2b4c5d6"
+branch_labels: None = None
+depends_on: None = None
+
+
+def upgrade() -> None:
+    # Counts of already indexed documents are backfilled from Vespa once the API server is up,
+    # see danswer/utils/chunk_counts.py
+    op.add_column("document", sa.Column("chunk_count", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("document", "chunk_count")
@@ -27,6 +27,7 @@ from danswer.db.tasks import get_latest_task
 from danswer.document_index.document_index_utils import get_both_index_names
 from danswer.document_index.factory import get_default_document_index
 from danswer.document_index.interfaces import UpdateRequest
+from danswer.search.search_result_cache import bump_index_generation
 from danswer.utils.logger import setup_logger
 
 logger = setup_logger()
@@ -162,6 +163,8 @@ def sync_document_set_task(document_set_id: int) -> None:
                 )
                 logger.info(f"Document set sync for '{document_set_id}' complete!")
 
+            bump_index_generation()
+
         except Exception:
             logger.exception("Failed to sync document set %s", document_set_id)
             raise
@@ -33,6 +33,7 @@ from danswer.db.index_attempt import delete_index_attempts
 from danswer.db.models import ConnectorCredentialPair
 from danswer.document_index.interfaces import DocumentIndex
 from danswer.document_index.interfaces import UpdateRequest
+from danswer.search.search_result_cache import bump_index_generation
 from danswer.server.documents.models import ConnectorCredentialPairIdentifier
 from danswer.utils.logger import setup_logger
 
@@ -107,6 +108,8 @@ def _delete_connector_credential_pair_batch(
             )
             db_session.commit()
 
+    bump_index_generation()
+
 
 def cleanup_synced_entities(
     cc_pair: ConnectorCredentialPair, db_session: Session
@@ -111,7 +111,11 @@ class SimpleJobClient:
         job_id = self.job_id_counter
         self.job_id_counter += 1
 
-        process = Process(target=_initializer(func=func, args=args), daemon=True)
+        # Not daemonic so that jobs can start processes of their own (see ChunkingStage),
+        # `SimpleJob.release` terminates the job if it has to stop early
+        process = Process(
+            target=_initializer, kwargs={"func": func, "args": args}, daemon=False
+        )
         job = SimpleJob(id=job_id, process=process)
         process.start()
 
@@ -1,5 +1,6 @@
 import time
 import traceback
+from contextlib import closing
 from datetime import datetime
 from datetime import timedelta
 from datetime import timezone
@@ -11,6 +12,7 @@ from danswer.background.connector_deletion import (
 )
 from danswer.background.indexing.checkpointing import get_time_windows_for_index_attempt
 from danswer.configs.app_configs import DISABLE_DOCUMENT_CLEANUP
+from danswer.configs.app_configs import NUM_CHUNKING_PROCESSES
 from danswer.configs.app_configs import POLL_CONNECTOR_OFFSET
 from danswer.connectors.factory import instantiate_connector
 from danswer.connectors.interfaces import GenerateDocumentsOutput
@@ -33,10 +35,15 @@ from danswer.db.models import IndexAttempt
 from danswer.db.models import IndexingStatus
 from danswer.db.models import IndexModelStatus
 from danswer.document_index.factory import get_default_document_index
+from danswer.indexing.chunker import DefaultChunker
+from danswer.indexing.chunking_stage import ChunkingStage
 from danswer.indexing.embedder import DefaultIndexingEmbedder
-from danswer.indexing.indexing_pipeline import build_indexing_pipeline
+from danswer.indexing.indexing_pipeline import build_staged_indexing_pipeline
+from danswer.indexing.indexing_pipeline import IndexingBatch
 from danswer.utils.logger import IndexAttemptSingleton
 from danswer.utils.logger import setup_logger
+from danswer.utils.metrics import get_latency_snapshots
+from danswer.utils.threadpool_concurrency import get_executor_stats
 
 logger = setup_logger()
 
@@ -100,6 +107,7 @@ def _get_document_generator(
 def _run_indexing(
     db_session: Session,
     index_attempt: IndexAttempt,
+    chunking_stage: ChunkingStage,
 ) -> None:
     """
     1. Get documents which are either new or updated from specified application
@@ -127,16 +135,12 @@ def _run_indexing(
         passage_prefix=db_embedding_model.passage_prefix,
     )
 
-    indexing_pipeline = build_indexing_pipeline(
-        embedder=embedding_model,
-        document_index=document_index,
-        ignore_time_skip=index_attempt.from_beginning
-        or (db_embedding_model.status == IndexModelStatus.FUTURE),
-        db_session=db_session,
-    )
-
     db_connector = index_attempt.connector
     db_credential = index_attempt.credential
+    index_attempt_metadata = IndexAttemptMetadata(
+        connector_id=db_connector.id,
+        credential_id=db_credential.id,
+    )
     last_successful_index_time = (
         0.0
         if index_attempt.from_beginning
@@ -174,55 +178,69 @@ def _run_indexing(
 
         try:
             all_connector_doc_ids: set[str] = set()
-            for doc_batch in doc_batch_generator:
-                # Check if connector is disabled mid run and stop if so unless it's the secondary
-                # index being built. We want to populate it even for paused connectors
-                # Often paused connectors are sources that aren't updated frequently but the
-                # contents still need to be initially pulled.
-                db_session.refresh(db_connector)
-                if (
-                    db_connector.disabled
-                    and db_embedding_model.status != IndexModelStatus.FUTURE
-                ):
-                    # let the `except` block handle this
-                    raise RuntimeError("Connector was disabled mid run")
-
-                db_session.refresh(index_attempt)
-                if index_attempt.status != IndexingStatus.IN_PROGRESS:
-                    # Likely due to user manually disabling it or model swap
-                    raise RuntimeError("Index Attempt was canceled")
-
-                logger.debug(
-                    f"Indexing batch of documents: {[doc.to_short_descriptor() for doc in doc_batch]}"
+            # Batches are fetched, chunked, embedded and written concurrently, this loop only
+            # sees them once they are in the index
+            indexing_pipeline = build_staged_indexing_pipeline(
+                embedder=embedding_model,
+                document_index=document_index,
+                chunking_stage=chunking_stage,
+                index_attempt_metadata=index_attempt_metadata,
+                ignore_time_skip=index_attempt.from_beginning
+                or (db_embedding_model.status == IndexModelStatus.FUTURE),
+                record_chunk_counts=is_primary,
+            )
+            with closing(
+                indexing_pipeline.run(
+                    IndexingBatch(documents=doc_batch)
+                    for doc_batch in doc_batch_generator
                 )
+            ) as indexed_batches:
+                for indexed_batch in indexed_batches:
+                    doc_batch = indexed_batch.documents
+                    logger.debug(
+                        f"Indexed batch of documents: {[doc.to_short_descriptor() for doc in doc_batch]}"
+                    )
+                    net_doc_change += indexed_batch.new_docs
+                    chunk_count += indexed_batch.num_chunks
+                    document_count += len(doc_batch)
+                    all_connector_doc_ids.update(doc.id for doc in doc_batch)
+
+                    # commit transaction so that the `update` below begins
+                    # with a brand new transaction. Postgres uses the start
+                    # of the transactions when computing `NOW()`, so if we have
+                    # a long running transaction, the `time_updated` field will
+                    # be inaccurate
+                    db_session.commit()
+
+                    # This new value is updated every batch, so UI can refresh per batch update
+                    update_docs_indexed(
+                        db_session=db_session,
+                        index_attempt=index_attempt,
+                        total_docs_indexed=document_count,
+                        new_docs_indexed=net_doc_change,
+                        docs_removed_from_index=0,
+                    )
 
-                new_docs, total_batch_chunks = indexing_pipeline(
-                    documents=doc_batch,
-                    index_attempt_metadata=IndexAttemptMetadata(
-                        connector_id=db_connector.id,
-                        credential_id=db_credential.id,
-                    ),
-                )
-                net_doc_change += new_docs
-                chunk_count += total_batch_chunks
-                document_count += len(doc_batch)
-                all_connector_doc_ids.update(doc.id for doc in doc_batch)
-
-                # commit transaction so that the `update` below begins
-                # with a brand new transaction. Postgres uses the start
-                # of the transactions when computing `NOW()`, so if we have
-                # a long running transaction, the `time_updated` field will
-                # be inaccurate
-                db_session.commit()
-
-                # This new value is updated every batch, so UI can refresh per batch update
-                update_docs_indexed(
-                    db_session=db_session,
-                    index_attempt=index_attempt,
-                    total_docs_indexed=document_count,
-                    new_docs_indexed=net_doc_change,
-                    docs_removed_from_index=0,
-                )
+                    # Check if connector is disabled mid run and stop if so unless it's the
+                    # secondary index being built. We want to populate it even for paused
+                    # connectors. Often paused connectors are sources that aren't updated
+                    # frequently but the contents still need to be initially pulled.
+                    # Batches already past the fetch stage are dropped when the pipeline stops.
+                    db_session.refresh(db_connector)
+                    if (
+                        db_connector.disabled
+                        and db_embedding_model.status != IndexModelStatus.FUTURE
+                    ):
+                        # let the `except` block handle this
+                        raise RuntimeError("Connector was disabled mid run")
+
+                    db_session.refresh(index_attempt)
+                    if index_attempt.status != IndexingStatus.IN_PROGRESS:
+                        # Likely due to user manually disabling it or model swap
+                        raise RuntimeError("Index Attempt was canceled")
+
+            for stage_name, stage_stats in indexing_pipeline.stats_summary().items():
+                logger.info(f"Indexing stage {stage_name} throughput: {stage_stats}")
 
             if is_listing_complete and not DISABLE_DOCUMENT_CLEANUP:
                 # clean up all documents from the index that have not been returned from the connector
@@ -316,6 +334,16 @@ def _run_indexing(
     logger.info(
         f"Indexed or refreshed {document_count} total documents for a total of {chunk_count} indexed chunks"
     )
+    if embedding_model.embedding_cache is not None:
+        embedding_cache = embedding_model.embedding_cache
+        logger.info(
+            f"Embedding cache hits: {embedding_cache.hits}, misses: {embedding_cache.misses}, "
+            f"hit rate: {embedding_cache.hit_rate:.2%}"
+        )
+    for endpoint, latency in get_latency_snapshots(prefix="model_server").items():
+        logger.info(f"Latency for {endpoint} (seconds): {latency}")
+    for executor_name, executor_stats in get_executor_stats().items():
+        logger.info(f"Executor {executor_name} stats: {executor_stats}")
     logger.info(
         f"Connector successfully finished, elapsed time: {time.time() - start_time} seconds"
     )
@@ -377,7 +405,10 @@ def run_indexing_entrypoint(index_attempt_id: int) -> None:
                 f"with credentials: '{attempt.credential_id}'"
             )
 
-            _run_indexing(db_session, attempt)
+            with ChunkingStage(
+                DefaultChunker(), num_processes=NUM_CHUNKING_PROCESSES
+            ) as chunking_stage:
+                _run_indexing(db_session, attempt, chunking_stage)
 
             logger.info(
                 f"Completed indexing attempt for connector: '{attempt.connector.name}', "
@@ -8,6 +8,7 @@ from danswer.configs.constants import DocumentSource
 from danswer.search.enums import QueryFlow
 from danswer.search.enums import SearchType
 from danswer.search.models import RetrievalDocs
+from danswer.search.models import SearchDoc
 from danswer.search.models import SearchResponse
 
 
@@ -42,6 +43,13 @@ class QADocsResponse(RetrievalDocs):
         return initial_dict
 
 
+# Sent ahead of QADocsResponse when the documents are reranked, in retrieval order. They are
+# not saved yet, the QADocsResponse that follows has them in their final order. Only for API
+# clients for now, the web frontend does not consume this packet yet
+class ProvisionalQADocsResponse(BaseModel):
+    provisional_documents: list[SearchDoc]
+
+
 # Second chunk of info for streaming QA
 class LLMRelevanceFilterResponse(BaseModel):
     relevant_chunk_indices: list[int]
@@ -11,6 +11,7 @@ from danswer.chat.models import DanswerAnswerPiece
 from danswer.chat.models import ImageGenerationDisplay
 from danswer.chat.models import LlmDoc
 from danswer.chat.models import LLMRelevanceFilterResponse
+from danswer.chat.models import ProvisionalQADocsResponse
 from danswer.chat.models import QADocsResponse
 from danswer.chat.models import StreamingError
 from danswer.configs.chat_configs import CHAT_TARGET_CHUNK_PERCENTAGE
@@ -45,6 +46,7 @@ from danswer.llm.exceptions import GenAIDisabledException
 from danswer.llm.factory import get_llm_for_persona
 from danswer.llm.utils import get_default_llm_tokenizer
 from danswer.search.enums import OptionalSearchSetting
+from danswer.search.models import InferenceChunk
 from danswer.search.retrieval.search_runner import inference_documents_from_ids
 from danswer.search.utils import chunks_or_sections_to_search_docs
 from danswer.server.query_and_chat.models import ChatMessageDetail
@@ -55,6 +57,7 @@ from danswer.tools.force import ForceUseTool
 from danswer.tools.images.image_generation_tool import IMAGE_GENERATION_RESPONSE_ID
 from danswer.tools.images.image_generation_tool import ImageGenerationResponse
 from danswer.tools.images.image_generation_tool import ImageGenerationTool
+from danswer.tools.search.search_tool import SEARCH_PROVISIONAL_RESULTS_ID
 from danswer.tools.search.search_tool import SEARCH_RESPONSE_SUMMARY_ID
 from danswer.tools.search.search_tool import SearchResponseSummary
 from danswer.tools.search.search_tool import SearchTool
@@ -153,6 +156,7 @@ def _check_should_force_search(
 
 ChatPacket = (
     StreamingError
+    | ProvisionalQADocsResponse
     | QADocsResponse
     | LLMRelevanceFilterResponse
     | ChatMessageDetail
@@ -178,6 +182,7 @@ def stream_chat_message_objects(
     use_existing_user_message: bool = False,
 ) -> ChatPacketStream:
     """Streams in order:
+    0. [conditional] Retrieved documents before reranking, if provisional results are enabled
     1. [conditional] Retrieved documents if a search needs to be run
     2. [conditional] LLM selected chunk indices if LLM chunk filtering is turned on
     3. [always] A set of streamed LLM tokens or an error anywhere along the line if something fails
@@ -441,7 +446,13 @@ def stream_chat_message_objects(
         ai_message_files = None  # any files to associate with the AI message e.g. dall-e generated images
         for packet in answer.processed_streamed_output:
             if isinstance(packet, ToolResponse):
-                if packet.id == SEARCH_RESPONSE_SUMMARY_ID:
+                if packet.id == SEARCH_PROVISIONAL_RESULTS_ID:
+                    yield ProvisionalQADocsResponse(
+                        provisional_documents=chunks_or_sections_to_search_docs(
+                            cast(list[InferenceChunk], packet.response)
+                        )
+                    )
+                elif packet.id == SEARCH_RESPONSE_SUMMARY_ID:
                     (
                         qa_docs_response,
                         reference_db_search_docs,
@@ -110,6 +110,19 @@ VESPA_TENANT_PORT = os.environ.get("VESPA_TENANT_PORT") or "19071"
 VESPA_DEPLOYMENT_ZIP = (
     os.environ.get("VESPA_DEPLOYMENT_ZIP") or "/app/danswer/vespa-app.zip"
 )
+# Write chunks to Vespa with a sliding window of requests in flight over HTTP/2 instead of in fixed
+# waves of requests. The window starts at the initial size, grows while Vespa keeps up and shrinks
+# when it answers 429/503, always staying within the min/max bounds
+VESPA_STREAMING_FEED = os.environ.get("VESPA_STREAMING_FEED", "").lower() == "true"
+VESPA_FEED_INITIAL_IN_FLIGHT = int(os.environ.get("VESPA_FEED_INITIAL_IN_FLIGHT") or 64)
+VESPA_FEED_MIN_IN_FLIGHT = int(os.environ.get("VESPA_FEED_MIN_IN_FLIGHT") or 4)
+VESPA_FEED_MAX_IN_FLIGHT = int(os.environ.get("VESPA_FEED_MAX_IN_FLIGHT") or 512)
+# Deadline in seconds of a Vespa search, passed to Vespa as the query timeout. Retries of
+# a failed search only happen within it
+VESPA_QUERY_TIMEOUT = float(os.environ.get("VESPA_QUERY_TIMEOUT") or 3)
+# Send a second copy of a search that takes longer than the p95 of recent searches, trades
+# some extra load on Vespa for a tighter tail latency
+VESPA_QUERY_HEDGING = os.environ.get("VESPA_QUERY_HEDGING", "").lower() == "true"
 # Number of documents in a batch during indexing (further batching done by chunks before passing to bi-encoder)
 try:
     INDEX_BATCH_SIZE = int(os.environ.get("INDEX_BATCH_SIZE", 16))
@@ -215,6 +228,21 @@ DISABLE_INDEX_UPDATE_ON_SWAP = (
 # fairly large amount of memory in order to increase substantially, since
 # each worker loads the embedding models into memory.
 NUM_INDEXING_WORKERS = int(os.environ.get("NUM_INDEXING_WORKERS") or 1)
+# Processes per indexing job that chunk documents while other batches are being embedded, each
+# loads its own tokenizer. 0 chunks in the indexing job process itself. Dask workers are daemonic
+# and cannot start processes, so with DASK_JOB_CLIENT_ENABLED chunking always happens in process
+NUM_CHUNKING_PROCESSES = int(os.environ.get("NUM_CHUNKING_PROCESSES") or 0)
+# Indexing jobs fetch, chunk, embed and write different batches of documents at the same time.
+# Threads per stage and how many batches may wait between two stages
+INDEXING_CHUNK_WORKERS = int(os.environ.get("INDEXING_CHUNK_WORKERS") or 1)
+INDEXING_EMBED_WORKERS = int(os.environ.get("INDEXING_EMBED_WORKERS") or 1)
+INDEXING_WRITE_WORKERS = int(os.environ.get("INDEXING_WRITE_WORKERS") or 1)
+INDEXING_STAGE_QUEUE_SIZE = int(os.environ.get("INDEXING_STAGE_QUEUE_SIZE") or 2)
+# Re-embed and rewrite only the chunks of re-indexed documents whose text changed, the others
+# keep their embeddings in the document index and only get their metadata updated
+ENABLE_CHUNK_DIFF_INDEXING = (
+    os.environ.get("ENABLE_CHUNK_DIFF_INDEXING", "").lower() == "true"
+)
 CHUNK_OVERLAP = 0
 # More accurate results at the expense of indexing speed and index size (stores additional 4 MINI_CHUNK vectors)
 ENABLE_MINI_CHUNK = os.environ.get("ENABLE_MINI_CHUNK", "").lower() == "true"
@@ -222,6 +250,33 @@ ENABLE_MINI_CHUNK = os.environ.get("ENABLE_MINI_CHUNK", "").lower() == "true"
 # Slightly larger since the sentence aware split is a max cutoff so most minichunks will be under MINI_CHUNK_SIZE
 # tokens. But we need it to be at least as big as 1/4th chunk size to avoid having a tiny mini-chunk at the end
 MINI_CHUNK_SIZE = 150
+# Persistent cache of passage embeddings so that re-indexing unchanged text skips the model server.
+# Options are "postgres" or "sqlite" (local to the indexing container), leave empty to disable
+EMBEDDING_CACHE_TYPE = os.environ.get("EMBEDDING_CACHE_TYPE", "").lower()
+# Least recently used embeddings are evicted past this many entries, ~3KB each for 768 dim models
+EMBEDDING_CACHE_MAX_ENTRIES = int(
+    os.environ.get("EMBEDDING_CACHE_MAX_ENTRIES") or 1_000_000
+)
+EMBEDDING_CACHE_SQLITE_PATH = (
+    os.environ.get("EMBEDDING_CACHE_SQLITE_PATH") or "/home/storage/embedding_cache.db"
+)
+# In process LRU of query embeddings, so repeated questions, retries and rephrases skip the
+# model server. Entries expire after the TTL in seconds, a size or TTL of 0 disables it
+QUERY_EMBEDDING_CACHE_SIZE = int(os.environ.get("QUERY_EMBEDDING_CACHE_SIZE") or 10_000)
+QUERY_EMBEDDING_CACHE_TTL = int(
+    os.environ.get("QUERY_EMBEDDING_CACHE_TTL") or 24 * 60 * 60
+)
+# Also share query embeddings between processes through the EMBEDDING_CACHE_TYPE cache, where
+# they expire after the same TTL
+QUERY_EMBEDDING_SHARED_CACHE = (
+    os.environ.get("QUERY_EMBEDDING_SHARED_CACHE", "").lower() == "true"
+)
+# In process LRU of retrieved and reranked chunks, keyed by the search request, persona and
+# the user's ACL. Any write to the index invalidates it. Results may be stale for documents
+# whose permissions change at the source until they are synced, so it is opt in: a TTL in
+# seconds above 0 enables it
+SEARCH_RESULT_CACHE_TTL = int(os.environ.get("SEARCH_RESULT_CACHE_TTL") or 0)
+SEARCH_RESULT_CACHE_SIZE = int(os.environ.get("SEARCH_RESULT_CACHE_SIZE") or 1_000)
 # Timeout to wait for job's last update before killing it, in hours
 CLEANUP_INDEXING_JOBS_TIMEOUT = int(os.environ.get("CLEANUP_INDEXING_JOBS_TIMEOUT", 3))
 # If set to true, then will not clean up documents that "no longer exist" when running Load connectors
@@ -237,6 +292,13 @@ DISABLE_DOCUMENT_CLEANUP = (
 DYNAMIC_CONFIG_STORE = "PostgresBackedDynamicConfigStore"
 
 JOB_TIMEOUT = 60 * 60 * 6  # 6 hours default
+# Sizes of the process wide thread pools, one per kind of blocking work
+QUERY_EXECUTOR_THREADS = int(os.environ.get("QUERY_EXECUTOR_THREADS") or 32)
+# Vespa doesn't allow batching of inserts / updates, so these are done one request per thread
+VESPA_IO_EXECUTOR_THREADS = int(os.environ.get("VESPA_IO_EXECUTOR_THREADS") or 32)
+LLM_EXECUTOR_THREADS = int(os.environ.get("LLM_EXECUTOR_THREADS") or 16)
+# Past this many tasks waiting for a worker, new tasks run in the submitting thread instead
+EXECUTOR_MAX_QUEUE_SIZE = int(os.environ.get("EXECUTOR_MAX_QUEUE_SIZE") or 256)
 # used to allow the background indexing jobs to use a different embedding
 # model server than the API server
 CURRENT_PROCESS_IS_AN_INDEXING_JOB = (
@@ -40,6 +40,12 @@ DISABLE_LLM_CHOOSE_SEARCH = (
 DISABLE_LLM_QUERY_REPHRASE = (
     os.environ.get("DISABLE_LLM_QUERY_REPHRASE", "").lower() == "true"
 )
+# Whether to stream the retrieved documents before they are reranked, so they can be shown
+# without waiting on the reranking models. Needs a client that handles the extra packet, the
+# web frontend does not consume it yet
+STREAM_PROVISIONAL_SEARCH_RESULTS = (
+    os.environ.get("STREAM_PROVISIONAL_SEARCH_RESULTS", "").lower() == "true"
+)
 # 1 edit per 20 characters, currently unused due to fuzzy match being too slow
 QUOTE_ALLOWED_ERROR_PERCENT = 0.05
 QA_TIMEOUT = int(os.environ.get("QA_TIMEOUT") or "60")  # 60 seconds
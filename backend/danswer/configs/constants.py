@@ -35,6 +35,10 @@ PRIMARY_OWNERS = "primary_owners"
 SECONDARY_OWNERS = "secondary_owners"
 RECENCY_BIAS = "recency_bias"
 HIDDEN = "hidden"
+# Hashes of the embedded text of a chunk and of all of its other fields, used to only rewrite
+# the parts of a document that changed when it is re-indexed
+CONTENT_HASH = "content_hash"
+METADATA_HASH = "metadata_hash"
 SCORE = "score"
 ID_SEPARATOR = ":;:"
 DEFAULT_BOOST = 0
@@ -38,6 +38,23 @@ ASYM_QUERY_PREFIX = os.environ.get("ASYM_QUERY_PREFIX", "query: ")
 ASYM_PASSAGE_PREFIX = os.environ.get("ASYM_PASSAGE_PREFIX", "passage: ")
 # Purely an optimization, memory limitation consideration
 BATCH_SIZE_ENCODE_CHUNKS = 8
+# During indexing, texts are sorted by token length and batched so that the padded size of each
+# batch (longest text * number of texts) stays under this budget. This keeps short texts such as
+# titles and mini-chunks from being padded to the length of full chunks. Set to 0 to fall back to
+# fixed batches of BATCH_SIZE_ENCODE_CHUNKS texts in arrival order
+EMBEDDING_BATCH_TOKEN_BUDGET = int(
+    os.environ.get("EMBEDDING_BATCH_TOKEN_BUDGET")
+    or BATCH_SIZE_ENCODE_CHUNKS * DOC_EMBEDDING_CONTEXT_SIZE
+)
+# All calls to the model servers share a pooled keep-alive client, in seconds
+MODEL_SERVER_CONNECT_TIMEOUT = float(
+    os.environ.get("MODEL_SERVER_CONNECT_TIMEOUT") or 5
+)
+# Large indexing batches on CPU can take a while
+MODEL_SERVER_READ_TIMEOUT = float(os.environ.get("MODEL_SERVER_READ_TIMEOUT") or 300)
+# Retries on connection errors (including connect timeouts, never read timeouts) and
+# 502/503/504, with jittered exponential backoff
+MODEL_SERVER_MAX_RETRIES = int(os.environ.get("MODEL_SERVER_MAX_RETRIES") or 2)
 # For score display purposes, only way is to know the expected ranges
 CROSS_ENCODER_RANGE_MAX = 12
 CROSS_ENCODER_RANGE_MIN = -12
@@ -6,10 +6,12 @@ from datetime import datetime
 from uuid import UUID
 
 from sqlalchemy import and_
+from sqlalchemy import case
 from sqlalchemy import delete
 from sqlalchemy import func
 from sqlalchemy import or_
 from sqlalchemy import select
+from sqlalchemy import update
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.engine.util import TransactionalContext
 from sqlalchemy.exc import OperationalError
@@ -235,6 +237,62 @@ def update_docs_updated_at(
     db_session.commit()
 
 
+def update_docs_chunk_count__no_commit(
+    ids_to_chunk_count: dict[str, int],
+    db_session: Session,
+) -> None:
+    documents_to_update = (
+        db_session.query(DbDocument)
+        .filter(DbDocument.id.in_(list(ids_to_chunk_count.keys())))
+        .all()
+    )
+    for document in documents_to_update:
+        document.chunk_count = ids_to_chunk_count[document.id]
+
+
+def backfill_docs_chunk_count(
+    ids_to_chunk_count: dict[str, int],
+    db_session: Session,
+) -> None:
+    """Only documents without a count are set, a count recorded by indexing is newer than
+    whatever the backfill read from the index"""
+    if not ids_to_chunk_count:
+        return
+    db_session.execute(
+        update(DbDocument)
+        .where(
+            DbDocument.id.in_(list(ids_to_chunk_count.keys())),
+            DbDocument.chunk_count.is_(None),
+        )
+        .values(chunk_count=case(ids_to_chunk_count, value=DbDocument.id))
+        .execution_options(synchronize_session=False)
+    )
+    db_session.commit()
+
+
+def clear_docs_chunk_count__no_commit(db_session: Session) -> None:
+    """The counts are those of the current index, they no longer apply once it is swapped out"""
+    db_session.execute(
+        update(DbDocument)
+        .where(DbDocument.chunk_count.is_not(None))
+        .values(chunk_count=None)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def get_document_chunk_counts(
+    document_ids: list[str], db_session: Session
+) -> dict[str, int]:
+    """Chunk counts of the documents, documents without a known count are left out"""
+    stmt = select(DbDocument.id, DbDocument.chunk_count).where(
+        DbDocument.id.in_(document_ids), DbDocument.chunk_count.is_not(None)
+    )
+    return {
+        document_id: chunk_count
+        for document_id, chunk_count in db_session.execute(stmt).all()
+    }
+
+
 def upsert_documents_complete(
     db_session: Session,
     document_metadata_batch: list[DocumentMetadata],
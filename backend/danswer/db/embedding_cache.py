@@ -0,0 +1,73 @@
+from sqlalchemy import delete
+from sqlalchemy import func
+from sqlalchemy import select
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from danswer.db.models import EmbeddingCacheEntry
+
+
+def fetch_cached_embeddings(keys: list[str], db_session: Session) -> dict[str, bytes]:
+    """Returns the serialized embeddings for the keys that are cached and marks them as
+    recently used"""
+    if not keys:
+        return {}
+
+    rows = db_session.execute(
+        select(EmbeddingCacheEntry.key, EmbeddingCacheEntry.embedding).where(
+            EmbeddingCacheEntry.key.in_(keys)
+        )
+    ).all()
+    found = {key: embedding for key, embedding in rows}
+
+    if found:
+        db_session.execute(
+            update(EmbeddingCacheEntry)
+            .where(EmbeddingCacheEntry.key.in_(list(found.keys())))
+            .values(last_used=func.now())
+        )
+        db_session.commit()
+
+    return found
+
+
+def upsert_cached_embeddings(entries: dict[str, bytes], db_session: Session) -> None:
+    """NOTE: this function is Postgres specific. Not all DBs support the ON CONFLICT clause."""
+    if not entries:
+        return
+
+    insert_stmt = insert(EmbeddingCacheEntry).values(
+        [{"key": key, "embedding": embedding} for key, embedding in entries.items()]
+    )
+    on_conflict_stmt = insert_stmt.on_conflict_do_update(
+        index_elements=[EmbeddingCacheEntry.key],
+        set_={
+            "embedding": insert_stmt.excluded.embedding,
+            "last_used": func.now(),
+        },
+    )
+    db_session.execute(on_conflict_stmt)
+    db_session.commit()
+
+
+def evict_least_recently_used_embeddings(max_entries: int, db_session: Session) -> int:
+    """Trims the cache down to `max_entries`, returns the number of evicted entries"""
+    num_entries = db_session.scalar(
+        select(func.count()).select_from(EmbeddingCacheEntry)
+    )
+    num_to_evict = (num_entries or 0) - max_entries
+    if num_to_evict <= 0:
+        return 0
+
+    stale_keys = (
+        select(EmbeddingCacheEntry.key)
+        .order_by(EmbeddingCacheEntry.last_used.asc())
+        .limit(num_to_evict)
+        .scalar_subquery()
+    )
+    db_session.execute(
+        delete(EmbeddingCacheEntry).where(EmbeddingCacheEntry.key.in_(stale_keys))
+    )
+    db_session.commit()
+    return num_to_evict
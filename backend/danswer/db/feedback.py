@@ -14,6 +14,7 @@ from danswer.db.models import Document as DbDocument
 from danswer.db.models import DocumentRetrievalFeedback
 from danswer.document_index.interfaces import DocumentIndex
 from danswer.document_index.interfaces import UpdateRequest
+from danswer.search.search_result_cache import bump_index_generation
 
 
 def fetch_db_doc_by_id(doc_id: str, db_session: Session) -> DbDocument:
@@ -60,6 +61,7 @@ def update_document_boost(
     document_index.update(update_requests=[update])
 
     db_session.commit()
+    bump_index_generation()
 
 
 def update_document_hidden(
@@ -80,6 +82,7 @@ def update_document_hidden(
     document_index.update(update_requests=[update])
 
     db_session.commit()
+    bump_index_generation()
 
 
 def create_doc_retrieval_feedback(
@@ -127,6 +130,8 @@ def create_doc_retrieval_feedback(
 
     db_session.add(retrieval_feedback)
     db_session.commit()
+    if feedback is not None:
+        bump_index_generation()
 
 
 def delete_document_feedback_for_documents__no_commit(
@@ -323,6 +323,11 @@ class Document(Base):
     secondary_owners: Mapped[list[str] | None] = mapped_column(
         postgresql.ARRAY(String), nullable=True
     )
+    # Number of chunks the document was last indexed with in the current index. Vespa chunk ids
+    # are derived from (document id, chunk id) so this is enough to address every chunk without
+    # a visit. None until the document is indexed or backfilled, see `backfill_chunk_counts`.
+    # Indexing into a future index does not touch it, the counts are reset when it is swapped in
+    chunk_count: Mapped[int | None] = mapped_column(Integer, nullable=True)
     # TODO if more sensitive data is added here for display, make sure to add user/group permission
 
     retrieval_feedbacks: Mapped[list["DocumentRetrievalFeedback"]] = relationship(
@@ -1075,6 +1080,20 @@ class PGFileStore(Base):
     lobj_oid = mapped_column(Integer, nullable=False)
 
 
+class EmbeddingCacheEntry(Base):
+    """Passage embeddings keyed by a hash of the model settings and the text, lets
+    re-indexing skip the model server for text that has not changed"""
+
+    __tablename__ = "embedding_cache"
+
+    key: Mapped[str] = mapped_column(String, primary_key=True)
+    # float32 values, see danswer.indexing.embedding_cache
+    embedding: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    last_used: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), index=True
+    )
+
+
 """
 ************************************************************************
 Enterprise Edition Models
@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 
 from danswer.db.connector_credential_pair import get_connector_credential_pairs
 from danswer.db.connector_credential_pair import resync_cc_pair
+from danswer.db.document import clear_docs_chunk_count__no_commit
 from danswer.db.embedding_model import get_current_db_embedding_model
 from danswer.db.embedding_model import get_secondary_db_embedding_model
 from danswer.db.embedding_model import update_embedding_model_status
@@ -10,6 +11,7 @@ from danswer.db.index_attempt import cancel_indexing_attempts_past_model
 from danswer.db.index_attempt import (
     count_unique_cc_pairs_with_successful_index_attempts,
 )
+from danswer.utils.chunk_counts import backfill_chunk_counts_nonblocking
 from danswer.utils.logger import setup_logger
 
 logger = setup_logger()
@@ -45,11 +47,15 @@ def check_index_swap(db_session: Session) -> None:
             db_session=db_session,
         )
 
+        # Recorded for the index that is swapped out, commits along with the swap
+        clear_docs_chunk_count__no_commit(db_session)
         update_embedding_model_status(
             embedding_model=embedding_model,
             new_status=IndexModelStatus.PRESENT,
             db_session=db_session,
         )
+        # The swapped in index has all the documents, read their counts back from it
+        backfill_chunk_counts_nonblocking()
 
         if cc_pair_count > 0:
             # Expire jobs for the now past index/embedding model
@@ -5,7 +5,7 @@ from sqlalchemy.orm import Session
 
 from danswer.db.embedding_model import get_current_db_embedding_model
 from danswer.db.embedding_model import get_secondary_db_embedding_model
-from danswer.indexing.models import IndexChunk
+from danswer.indexing.models import DocAwareChunk
 from danswer.search.models import InferenceChunk
 
 
@@ -37,17 +37,22 @@ def translate_boost_count_to_multiplier(boost: int) -> float:
 
 
 def get_uuid_from_chunk(
-    chunk: IndexChunk | InferenceChunk, mini_chunk_ind: int = 0
+    chunk: DocAwareChunk | InferenceChunk, mini_chunk_ind: int = 0
 ) -> uuid.UUID:
     doc_str = (
         chunk.document_id
         if isinstance(chunk, InferenceChunk)
         else chunk.source_document.id
     )
+    return get_uuid_from_chunk_info(doc_str, chunk.chunk_id, mini_chunk_ind)
+
+
+def get_uuid_from_chunk_info(
+    document_id: str, chunk_id: int, mini_chunk_ind: int = 0
+) -> uuid.UUID:
+    doc_str = document_id
     # Web parsing URL duplicate catching
     if doc_str and doc_str[-1] == "/":
         doc_str = doc_str[:-1]
-    unique_identifier_string = "_".join(
-        [doc_str, str(chunk.chunk_id), str(mini_chunk_ind)]
-    )
+    unique_identifier_string = "_".join([doc_str, str(chunk_id), str(mini_chunk_ind)])
     return uuid.uuid5(uuid.NAMESPACE_X500, unique_identifier_string)
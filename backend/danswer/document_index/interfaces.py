@@ -1,9 +1,11 @@
 import abc
+import asyncio
 from dataclasses import dataclass
 from datetime import datetime
 from typing import Any
 
 from danswer.access.models import DocumentAccess
+from danswer.indexing.models import DocMetadataAwareChunk
 from danswer.indexing.models import DocMetadataAwareIndexChunk
 from danswer.search.models import IndexFilters
 from danswer.search.models import InferenceChunk
@@ -15,6 +17,26 @@ class DocumentInsertionRecord:
     already_existed: bool
 
 
+@dataclass(frozen=True)
+class ChunkHashes:
+    """Hashes stored with a chunk in the document index, see `DocAwareChunk.content_hash`.
+    None for chunks indexed before hashes were stored."""
+
+    content_hash: str | None
+    metadata_hash: str | None
+
+
+@dataclass(frozen=True)
+class ChunkWindow:
+    """Chunks `min_chunk_ind` to `max_chunk_ind` of a document, both inclusive, None for the
+    start / end of the document. `chunk_count` if known, see `id_based_retrieval`"""
+
+    document_id: str
+    min_chunk_ind: int | None
+    max_chunk_ind: int | None
+    chunk_count: int | None = None
+
+
 @dataclass
 class DocumentMetadata:
     """
@@ -130,6 +152,40 @@ class Indexable(abc.ABC):
         """
         raise NotImplementedError
 
+    def get_chunk_hashes(
+        self, document_ids: list[str]
+    ) -> dict[str, dict[int, ChunkHashes]] | None:
+        """
+        Hashes of the chunks currently in the PRIMARY index, by document id then chunk id.
+        Documents that are not in the index are left out.
+
+        Returns None if the document index does not store chunk hashes, all chunks are then
+        embedded and written with `index`.
+        """
+        return None
+
+    def index_chunk_diff(
+        self,
+        chunks: list[DocMetadataAwareIndexChunk],
+        unchanged_chunks: list[DocMetadataAwareChunk],
+        existing_hashes: dict[str, dict[int, ChunkHashes]],
+    ) -> set[DocumentInsertionRecord]:
+        """
+        Counterpart of `index` for documents that may already be in the index. Only rewrites
+        what changed compared to `existing_hashes`, as returned by `get_chunk_hashes`.
+
+        Parameters:
+        - chunks: chunks whose content hash changed or that are new, written in full
+        - unchanged_chunks: chunks with the same content hash as in the index, only their
+                other fields are updated and only if their metadata hash changed
+        - existing_hashes: chunks of the documents in the index before this call, the ones past
+                the new last chunk of a document are deleted
+
+        Returns:
+            Same as `index`
+        """
+        raise NotImplementedError
+
 
 class Deletable(abc.ABC):
     """
@@ -186,6 +242,7 @@ class IdRetrievalCapable(abc.ABC):
         min_chunk_ind: int | None,
         max_chunk_ind: int | None,
         user_access_control_list: list[str] | None = None,
+        chunk_count: int | None = None,
     ) -> list[InferenceChunk]:
         """
         Fetch chunk(s) based on document id
@@ -201,6 +258,8 @@ class IdRetrievalCapable(abc.ABC):
         - max_chunk_ind:
         - filters: standard filters object, in this case only the access filter is applied as a
                 permission check
+        - chunk_count: number of chunks of the document if known, lets the chunks be fetched
+                directly by id instead of searched for
 
         Returns:
             list of chunks for the document id or the specific chunk by the specified chunk index
@@ -208,6 +267,98 @@ class IdRetrievalCapable(abc.ABC):
         """
         raise NotImplementedError
 
+    async def async_id_based_retrieval(
+        self,
+        document_id: str,
+        min_chunk_ind: int | None,
+        max_chunk_ind: int | None,
+        user_access_control_list: list[str] | None = None,
+        chunk_count: int | None = None,
+    ) -> list[InferenceChunk]:
+        """
+        Awaitable version of `id_based_retrieval`. Defaults to running the blocking version in
+        a worker thread, implementations with a native async client should override this.
+        """
+        return await asyncio.to_thread(
+            self.id_based_retrieval,
+            document_id,
+            min_chunk_ind,
+            max_chunk_ind,
+            user_access_control_list,
+            chunk_count,
+        )
+
+    def id_based_content_retrieval(
+        self,
+        document_id: str,
+        min_chunk_ind: int | None,
+        max_chunk_ind: int | None,
+        user_access_control_list: list[str] | None = None,
+        chunk_count: int | None = None,
+    ) -> list[str]:
+        """
+        Contents of the same chunks as `id_based_retrieval`, in chunk order. Used to expand a
+        chunk into the section around it, implementations should avoid fetching anything else.
+        """
+        return [
+            chunk.content
+            for chunk in self.id_based_retrieval(
+                document_id,
+                min_chunk_ind,
+                max_chunk_ind,
+                user_access_control_list,
+                chunk_count,
+            )
+        ]
+
+    async def async_id_based_content_retrieval(
+        self,
+        document_id: str,
+        min_chunk_ind: int | None,
+        max_chunk_ind: int | None,
+        user_access_control_list: list[str] | None = None,
+        chunk_count: int | None = None,
+    ) -> list[str]:
+        """
+        Awaitable version of `id_based_content_retrieval`
+        """
+        return await asyncio.to_thread(
+            self.id_based_content_retrieval,
+            document_id,
+            min_chunk_ind,
+            max_chunk_ind,
+            user_access_control_list,
+            chunk_count,
+        )
+
+    def chunk_windows_content_retrieval(
+        self, windows: list[ChunkWindow]
+    ) -> list[list[str]]:
+        """
+        `id_based_content_retrieval` for many windows at once, without any access filtering.
+        Implementations should fetch them in as few requests as possible.
+
+        Returns:
+            the contents of the chunks of each window, in the order of `windows`
+        """
+        return [
+            self.id_based_content_retrieval(
+                document_id=window.document_id,
+                min_chunk_ind=window.min_chunk_ind,
+                max_chunk_ind=window.max_chunk_ind,
+                chunk_count=window.chunk_count,
+            )
+            for window in windows
+        ]
+
+    async def async_chunk_windows_content_retrieval(
+        self, windows: list[ChunkWindow]
+    ) -> list[list[str]]:
+        """
+        Awaitable version of `chunk_windows_content_retrieval`
+        """
+        return await asyncio.to_thread(self.chunk_windows_content_retrieval, windows)
+
 
 class KeywordCapable(abc.ABC):
     """
@@ -247,6 +398,27 @@ class KeywordCapable(abc.ABC):
         """
         raise NotImplementedError
 
+    async def async_keyword_retrieval(
+        self,
+        query: str,
+        filters: IndexFilters,
+        time_decay_multiplier: float,
+        num_to_retrieve: int,
+        offset: int = 0,
+    ) -> list[InferenceChunk]:
+        """
+        Awaitable version of `keyword_retrieval`, runs the blocking version in a worker thread
+        unless overridden
+        """
+        return await asyncio.to_thread(
+            self.keyword_retrieval,
+            query,
+            filters,
+            time_decay_multiplier,
+            num_to_retrieve,
+            offset,
+        )
+
 
 class VectorCapable(abc.ABC):
     """
@@ -282,6 +454,29 @@ class VectorCapable(abc.ABC):
         """
         raise NotImplementedError
 
+    async def async_semantic_retrieval(
+        self,
+        query: str,
+        query_embedding: list[float],
+        filters: IndexFilters,
+        time_decay_multiplier: float,
+        num_to_retrieve: int,
+        offset: int = 0,
+    ) -> list[InferenceChunk]:
+        """
+        Awaitable version of `semantic_retrieval`, runs the blocking version in a worker thread
+        unless overridden
+        """
+        return await asyncio.to_thread(
+            self.semantic_retrieval,
+            query,
+            query_embedding,
+            filters,
+            time_decay_multiplier,
+            num_to_retrieve,
+            offset,
+        )
+
 
 class HybridCapable(abc.ABC):
     """
@@ -327,6 +522,31 @@ class HybridCapable(abc.ABC):
         """
         raise NotImplementedError
 
+    async def async_hybrid_retrieval(
+        self,
+        query: str,
+        query_embedding: list[float],
+        filters: IndexFilters,
+        time_decay_multiplier: float,
+        num_to_retrieve: int,
+        offset: int = 0,
+        hybrid_alpha: float | None = None,
+    ) -> list[InferenceChunk]:
+        """
+        Awaitable version of `hybrid_retrieval`, runs the blocking version in a worker thread
+        unless overridden
+        """
+        return await asyncio.to_thread(
+            self.hybrid_retrieval,
+            query,
+            query_embedding,
+            filters,
+            time_decay_multiplier,
+            num_to_retrieve,
+            offset,
+            hybrid_alpha,
+        )
+
 
 class AdminCapable(abc.ABC):
     """
@@ -363,6 +583,21 @@ class AdminCapable(abc.ABC):
         """
         raise NotImplementedError
 
+    async def async_admin_retrieval(
+        self,
+        query: str,
+        filters: IndexFilters,
+        num_to_retrieve: int,
+        offset: int = 0,
+    ) -> list[InferenceChunk]:
+        """
+        Awaitable version of `admin_retrieval`, runs the blocking version in a worker thread
+        unless overridden
+        """
+        return await asyncio.to_thread(
+            self.admin_retrieval, query, filters, num_to_retrieve, offset
+        )
+
 
 class BaseIndex(
     Verifiable,
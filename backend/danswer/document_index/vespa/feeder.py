@@ -0,0 +1,197 @@
+import asyncio
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import Any
+from urllib.parse import urlparse
+
+import httpx
+
+from danswer.configs.app_configs import VESPA_FEED_INITIAL_IN_FLIGHT
+from danswer.configs.app_configs import VESPA_FEED_MAX_IN_FLIGHT
+from danswer.configs.app_configs import VESPA_FEED_MIN_IN_FLIGHT
+from danswer.utils.http_client import full_jitter_backoff
+from danswer.utils.logger import setup_logger
+from danswer.utils.metrics import get_latency_histogram
+
+logger = setup_logger()
+
+# Vespa answers these when it cannot take more operations right now
+_THROTTLED_STATUS_CODES = {429, 503}
+_RETRYABLE_STATUS_CODES = _THROTTLED_STATUS_CODES | {502, 504}
+# HTTP/2 multiplexes the in flight operations, only a few connections are needed
+_FEED_MAX_CONNECTIONS = 8
+
+
+@dataclass
+class VespaFeedOperation:
+    document_id: str
+    url: str
+    fields: dict[str, Any]
+
+
+class AdaptiveConcurrencyLimit:
+    """Additive increase, multiplicative decrease of the number of operations in flight,
+    as in TCP congestion control. The limit grows by one after each full window of
+    successful operations and shrinks by `decrease_factor` when Vespa reports that it is
+    overloaded."""
+
+    def __init__(
+        self,
+        initial: int,
+        min_limit: int,
+        max_limit: int,
+        decrease_factor: float = 0.5,
+    ) -> None:
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self._limit = float(min(max(initial, min_limit), max_limit))
+        self._last_decrease = 0.0
+
+    @property
+    def current(self) -> int:
+        return int(self._limit)
+
+    def on_success(self) -> None:
+        self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+
+    def on_throttled(self, sent_at: float) -> None:
+        # Operations sent before the last decrease were throttled because of the old, larger
+        # window, they must not shrink the window again
+        if sent_at < self._last_decrease:
+            return
+        self._limit = max(self.min_limit, self._limit * self.decrease_factor)
+        self._last_decrease = time.monotonic()
+
+
+class VespaFeeder:
+    """Streams operations to the Vespa /document/v1 API while keeping a sliding window of
+    requests in flight over HTTP/2. A new operation is sent as soon as any other one
+    completes, so the feed rate is bound by what Vespa can take rather than by its slowest
+    request. The window adapts to 429/503 responses, which are retried along with
+    transport errors."""
+
+    def __init__(
+        self,
+        initial_in_flight: int = VESPA_FEED_INITIAL_IN_FLIGHT,
+        min_in_flight: int = VESPA_FEED_MIN_IN_FLIGHT,
+        max_in_flight: int = VESPA_FEED_MAX_IN_FLIGHT,
+        max_retries: int = 10,
+        backoff_base: float = 0.25,
+        backoff_max: float = 8.0,
+        timeout: float = 60.0,
+        metric_prefix: str = "vespa_feed",
+    ) -> None:
+        self.initial_in_flight = initial_in_flight
+        self.min_in_flight = min_in_flight
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.metric_prefix = metric_prefix
+
+    async def _send(
+        self,
+        client: httpx.AsyncClient,
+        operation: VespaFeedOperation,
+        limit: AdaptiveConcurrencyLimit,
+    ) -> int:
+        """Returns the number of throttled responses before the operation went through"""
+        histogram = get_latency_histogram(
+            f"{self.metric_prefix}:{urlparse(operation.url).path.rsplit('/', 1)[0]}"
+        )
+        num_throttled = 0
+        attempt = 0
+        while True:
+            sent_at = time.monotonic()
+            try:
+                response = await client.post(
+                    operation.url, json={"fields": operation.fields}
+                )
+            except httpx.TransportError as e:
+                histogram.record(time.monotonic() - sent_at)
+                if attempt >= self.max_retries:
+                    raise
+                logger.warning(
+                    f"Feeding document '{operation.document_id}' failed, retrying: {e}"
+                )
+            else:
+                histogram.record(time.monotonic() - sent_at)
+                if response.is_success:
+                    limit.on_success()
+                    return num_throttled
+                if response.status_code in _THROTTLED_STATUS_CODES:
+                    num_throttled += 1
+                    limit.on_throttled(sent_at)
+                if (
+                    response.status_code not in _RETRYABLE_STATUS_CODES
+                    or attempt >= self.max_retries
+                ):
+                    logger.error(
+                        f"Failed to index document: '{operation.document_id}'. "
+                        f"Got response: '{response.text}'"
+                    )
+                    response.raise_for_status()
+
+            await asyncio.sleep(
+                full_jitter_backoff(attempt, self.backoff_base, self.backoff_max)
+            )
+            attempt += 1
+
+    async def async_feed(self, operations: Iterable[VespaFeedOperation]) -> None:
+        """Raises the first error of an operation that could not be fed, the operations still
+        in flight at that point are cancelled. `operations` is consumed lazily."""
+        limit = AdaptiveConcurrencyLimit(
+            initial=self.initial_in_flight,
+            min_limit=self.min_in_flight,
+            max_limit=self.max_in_flight,
+        )
+        operations_iter = iter(operations)
+        in_flight: set[asyncio.Task[int]] = set()
+        num_operations = 0
+        num_throttled = 0
+        start = time.monotonic()
+
+        async with httpx.AsyncClient(
+            http2=True,
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=_FEED_MAX_CONNECTIONS,
+                max_keepalive_connections=_FEED_MAX_CONNECTIONS,
+            ),
+        ) as client:
+            try:
+                exhausted = False
+                while True:
+                    while not exhausted and len(in_flight) < limit.current:
+                        operation = next(operations_iter, None)
+                        if operation is None:
+                            exhausted = True
+                            break
+                        in_flight.add(
+                            asyncio.create_task(self._send(client, operation, limit))
+                        )
+                        num_operations += 1
+
+                    if not in_flight:
+                        break
+                    done, in_flight = await asyncio.wait(
+                        in_flight, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    for task in done:
+                        num_throttled += task.result()
+            finally:
+                for task in in_flight:
+                    task.cancel()
+                await asyncio.gather(*in_flight, return_exceptions=True)
+
+        logger.info(
+            f"Fed {num_operations} operations to Vespa in {time.monotonic() - start:.2f}s, "
+            f"throttled {num_throttled} times, final window of {limit.current} operations"
+        )
+
+    def feed(self, operations: Iterable[VespaFeedOperation]) -> None:
+        """Blocking version of `async_feed`, must not be called from a running event loop"""
+        asyncio.run(self.async_feed(operations))
@@ -1,10 +1,15 @@
-import concurrent.futures
+import asyncio
+import hashlib
 import io
 import json
 import os
 import string
 import time
 import zipfile
+from collections.abc import AsyncIterator
+from collections.abc import Callable
+from collections.abc import Iterable
+from collections.abc import Iterator
 from collections.abc import Mapping
 from dataclasses import dataclass
 from datetime import datetime
@@ -13,8 +18,10 @@ from datetime import timezone
 from typing import Any
 from typing import BinaryIO
 from typing import cast
+from urllib.parse import urlparse
 
 import httpx
+import orjson
 import requests
 from retry import retry
 
@@ -22,6 +29,9 @@ from danswer.configs.app_configs import LOG_VESPA_TIMING_INFORMATION
 from danswer.configs.app_configs import VESPA_CONFIG_SERVER_HOST
 from danswer.configs.app_configs import VESPA_HOST
 from danswer.configs.app_configs import VESPA_PORT
+from danswer.configs.app_configs import VESPA_QUERY_HEDGING
+from danswer.configs.app_configs import VESPA_QUERY_TIMEOUT
+from danswer.configs.app_configs import VESPA_STREAMING_FEED
 from danswer.configs.app_configs import VESPA_TENANT_PORT
 from danswer.configs.chat_configs import DOC_TIME_DECAY
 from danswer.configs.chat_configs import EDIT_KEYWORD_QUERY
@@ -33,13 +43,16 @@ from danswer.configs.constants import BLURB
 from danswer.configs.constants import BOOST
 from danswer.configs.constants import CHUNK_ID
 from danswer.configs.constants import CONTENT
+from danswer.configs.constants import CONTENT_HASH
 from danswer.configs.constants import DOC_UPDATED_AT
 from danswer.configs.constants import DOCUMENT_ID
 from danswer.configs.constants import DOCUMENT_SETS
+from danswer.configs.constants import DocumentSource
 from danswer.configs.constants import EMBEDDINGS
 from danswer.configs.constants import HIDDEN
 from danswer.configs.constants import INDEX_SEPARATOR
 from danswer.configs.constants import METADATA
+from danswer.configs.constants import METADATA_HASH
 from danswer.configs.constants import METADATA_LIST
 from danswer.configs.constants import PRIMARY_OWNERS
 from danswer.configs.constants import RECENCY_BIAS
@@ -57,17 +70,30 @@ from danswer.connectors.cross_connector_utils.miscellaneous_utils import (
     get_experts_stores_representations,
 )
 from danswer.document_index.document_index_utils import get_uuid_from_chunk
+from danswer.document_index.document_index_utils import get_uuid_from_chunk_info
+from danswer.document_index.interfaces import ChunkHashes
+from danswer.document_index.interfaces import ChunkWindow
 from danswer.document_index.interfaces import DocumentIndex
 from danswer.document_index.interfaces import DocumentInsertionRecord
 from danswer.document_index.interfaces import UpdateRequest
+from danswer.document_index.vespa.feeder import VespaFeeder
+from danswer.document_index.vespa.feeder import VespaFeedOperation
+from danswer.document_index.vespa.utils import build_chunk_window_filter
+from danswer.document_index.vespa.utils import build_document_ids_selection
 from danswer.document_index.vespa.utils import remove_invalid_unicode_chars
+from danswer.indexing.models import DocMetadataAwareChunk
 from danswer.indexing.models import DocMetadataAwareIndexChunk
 from danswer.search.models import IndexFilters
 from danswer.search.models import InferenceChunk
 from danswer.search.retrieval.search_runner import query_processing
 from danswer.search.retrieval.search_runner import remove_stop_words_and_punctuation
 from danswer.utils.batching import batch_generator
+from danswer.utils.http_client import AsyncPooledHttpClient
+from danswer.utils.http_client import CircuitBreaker
+from danswer.utils.http_client import PooledHttpClient
 from danswer.utils.logger import setup_logger
+from danswer.utils.threadpool_concurrency import run_functions_tuples_in_parallel
+from danswer.utils.threadpool_concurrency import VESPA_IO_EXECUTOR
 
 logger = setup_logger()
 
@@ -87,17 +113,47 @@ DOCUMENT_ID_ENDPOINT = (
     f"{VESPA_APP_CONTAINER_URL}/document/v1/default/{{index_name}}/docid"
 )
 SEARCH_ENDPOINT = f"{VESPA_APP_CONTAINER_URL}/search/"
+# Content cluster id from vespa/app_configs/services.xml, needed for selection based deletes
+VESPA_CONTENT_CLUSTER = "danswer_index"
 
 _BATCH_SIZE = 128  # Specific to Vespa
-_NUM_THREADS = (
-    32  # since Vespa doesn't allow batching of inserts / updates, we use threads
-)
-# up from 500ms for now, since we've seen quite a few timeouts
-# in the long term, we are looking to improve the performance of Vespa
-# so that we can bring this back to default
-_VESPA_TIMEOUT = "3s"
+# Document ids per selection based delete / update, keeps the request URL within Vespa's limits
+_SELECTION_BATCH_SIZE = 128
+# How long Vespa visits before answering with a continuation, the client waits a bit longer
+_VESPA_SELECTION_TIME_CHUNK = "30s"
+_SELECTION_TIMEOUT = 60
+# Client side timeouts of the document API and other long running requests
+_VESPA_CONNECT_TIMEOUT = 5
+_VESPA_READ_TIMEOUT = 30
+# Searches use VESPA_QUERY_TIMEOUT as their deadline, the client waits a bit longer than
+# Vespa for the connection and the transfer of the hits
+_VESPA_QUERY_CONNECT_TIMEOUT = 1
+_VESPA_QUERY_TIMEOUT_MARGIN = 1.0
+_VESPA_QUERY_HEDGE_PERCENTILE = 95
 # Specific to Vespa, needed for highlighting matching keywords / section
 CONTENT_SUMMARY = "content_summary"
+# Fields read by `_vespa_hit_to_inference_chunk`, fetching chunks by id skips the embeddings
+# and the duplicated content summary
+_INFERENCE_CHUNK_FIELDS = [
+    DOCUMENT_ID,
+    CHUNK_ID,
+    BLURB,
+    CONTENT,
+    SOURCE_LINKS,
+    SECTION_CONTINUATION,
+    SOURCE_TYPE,
+    SEMANTIC_IDENTIFIER,
+    BOOST,
+    HIDDEN,
+    PRIMARY_OWNERS,
+    SECONDARY_OWNERS,
+    METADATA,
+    DOC_UPDATED_AT,
+]
+# All that is needed to expand a chunk into the section around it
+_CHUNK_CONTENT_FIELDS = [CHUNK_ID, CONTENT]
+# Vespa's default limit on the number of hits of a query
+_MAX_CHUNK_WINDOW_HITS = 400
 
 
 @dataclass
@@ -107,29 +163,6 @@ class _VespaUpdateRequest:
     update_request: dict[str, dict]
 
 
-@retry(tries=3, delay=1, backoff=2)
-def _does_document_exist(
-    doc_chunk_id: str,
-    index_name: str,
-    http_client: httpx.Client,
-) -> bool:
-    """Returns whether the document already exists and the users/group whitelists
-    Specifically in this case, document refers to a vespa document which is equivalent to a Danswer
-    chunk. This checks for whether the chunk exists already in the index"""
-    doc_url = f"{DOCUMENT_ID_ENDPOINT.format(index_name=index_name)}/{doc_chunk_id}"
-    doc_fetch_response = http_client.get(doc_url)
-    if doc_fetch_response.status_code == 404:
-        return False
-
-    if doc_fetch_response.status_code != 200:
-        logger.debug(f"Failed to check for document with URL {doc_url}")
-        raise RuntimeError(
-            f"Unexpected fetch document by ID value from Vespa "
-            f"with error {doc_fetch_response.status_code}"
-        )
-    return True
-
-
 def _vespa_get_updated_at_attribute(t: datetime | None) -> int | None:
     if not t:
         return None
@@ -140,32 +173,34 @@ def _vespa_get_updated_at_attribute(t: datetime | None) -> int | None:
     return int(t.timestamp())
 
 
-def _get_vespa_chunks_by_document_id(
+def _build_vespa_field_set(
+    index_name: str,
+    field_names: list[str] | None,
+    user_access_control_list: list[str] | None = None,
+) -> str | None:
+    """None to get all the fields, the ACL is always included when results are filtered on it"""
+    if not field_names:
+        return None
+    field_set_list = [f"{index_name}:{field_name}" for field_name in field_names]
+    acl_fieldset_entry = f"{index_name}:{ACCESS_CONTROL_LIST}"
+    if user_access_control_list and acl_fieldset_entry not in field_set_list:
+        field_set_list.append(acl_fieldset_entry)
+    return ",".join(field_set_list)
+
+
+def _build_vespa_visit_params(
     document_id: str,
     index_name: str,
     user_access_control_list: list[str] | None = None,
     min_chunk_ind: int | None = None,
     max_chunk_ind: int | None = None,
     field_names: list[str] | None = None,
-) -> list[dict]:
-    # Constructing the URL for the Visit API
-    # NOTE: visit API uses the same URL as the document API, but with different params
-    url = DOCUMENT_ID_ENDPOINT.format(index_name=index_name)
-
-    # build the list of fields to retrieve
-    field_set_list = (
-        None
-        if not field_names
-        else [f"{index_name}:{field_name}" for field_name in field_names]
+) -> dict[str, Any]:
+    field_set = _build_vespa_field_set(
+        index_name=index_name,
+        field_names=field_names,
+        user_access_control_list=user_access_control_list,
     )
-    acl_fieldset_entry = f"{index_name}:{ACCESS_CONTROL_LIST}"
-    if (
-        field_set_list
-        and user_access_control_list
-        and acl_fieldset_entry not in field_set_list
-    ):
-        field_set_list.append(acl_fieldset_entry)
-    field_set = ",".join(field_set_list) if field_set_list else None
 
     # build filters
     selection = f"{index_name}.document_id=='{document_id}'"
@@ -175,7 +210,7 @@ def _get_vespa_chunks_by_document_id(
         selection += f" and {index_name}.chunk_id<={max_chunk_ind}"
 
     # Setting up the selection criteria in the query parameters
-    params = {
+    return {
         # NOTE: Document Selector Language doesn't allow `contains`, so we can't check
         # for the ACL in the selection. Instead, we have to check as a postfilter
         "selection": selection,
@@ -184,36 +219,79 @@ def _get_vespa_chunks_by_document_id(
         "fieldSet": field_set,
     }
 
+
+def _filter_visited_documents(
+    response_data: dict[str, Any], user_access_control_list: list[str] | None
+) -> list[dict]:
     document_chunks: list[dict] = []
+    for document in response_data.get("documents", []):
+        if user_access_control_list:
+            document_acl = document["fields"].get(ACCESS_CONTROL_LIST)
+            if not document_acl or not any(
+                user_acl_entry in document_acl
+                for user_acl_entry in user_access_control_list
+            ):
+                continue
+        document_chunks.append(document)
+    return document_chunks
+
+
+def _log_visit_error(
+    document_id: str,
+    params: dict[str, Any],
+    response: requests.Response | httpx.Response,
+    e: Exception,
+) -> str:
+    request_info = f"Headers: {response.request.headers}\nPayload: {params}"
+    response_info = (
+        f"Status Code: {response.status_code}\nResponse Content: {response.text}"
+    )
+    error_base = f"Error occurred getting chunk by Document ID {document_id}"
+    logger.error(
+        f"{error_base}:\n" f"{request_info}\n" f"{response_info}\n" f"Exception: {e}"
+    )
+    return error_base
+
+
+def _iter_vespa_chunks_by_document_id(
+    document_id: str,
+    index_name: str,
+    user_access_control_list: list[str] | None = None,
+    min_chunk_ind: int | None = None,
+    max_chunk_ind: int | None = None,
+    field_names: list[str] | None = None,
+) -> Iterator[dict]:
+    """Yields the chunks one page of the visit at a time, so that callers that only keep part
+    of each chunk never hold all of a large document"""
+    # Constructing the URL for the Visit API
+    # NOTE: visit API uses the same URL as the document API, but with different params
+    url = DOCUMENT_ID_ENDPOINT.format(index_name=index_name)
+    params = _build_vespa_visit_params(
+        document_id=document_id,
+        index_name=index_name,
+        user_access_control_list=user_access_control_list,
+        min_chunk_ind=min_chunk_ind,
+        max_chunk_ind=max_chunk_ind,
+        field_names=field_names,
+    )
+
+    seen_ids: set[str] = set()
     while True:
-        response = requests.get(url, params=params)
+        response = get_vespa_client().get(url, params=params)
         try:
             response.raise_for_status()
         except requests.HTTPError as e:
-            request_info = f"Headers: {response.request.headers}\nPayload: {params}"
-            response_info = f"Status Code: {response.status_code}\nResponse Content: {response.text}"
-            error_base = f"Error occurred getting chunk by Document ID {document_id}"
-            logger.error(
-                f"{error_base}:\n"
-                f"{request_info}\n"
-                f"{response_info}\n"
-                f"Exception: {e}"
-            )
+            error_base = _log_visit_error(document_id, params, response, e)
             raise requests.HTTPError(error_base) from e
 
-        # Check if the response contains any documents
-        response_data = response.json()
-        if "documents" in response_data:
-            for document in response_data["documents"]:
-                if user_access_control_list:
-                    document_acl = document["fields"].get(ACCESS_CONTROL_LIST)
-                    if not document_acl or not any(
-                        user_acl_entry in document_acl
-                        for user_acl_entry in user_access_control_list
-                    ):
-                        continue
-                document_chunks.append(document)
-            document_chunks.extend(response_data["documents"])
+        response_data = orjson.loads(response.content)
+        for document in _filter_visited_documents(
+            response_data, user_access_control_list
+        ):
+            # A chunk moved between buckets during the visit may be returned twice
+            if document["id"] not in seen_ids:
+                seen_ids.add(document["id"])
+                yield document
 
         # Check for continuation token to handle pagination
         if "continuation" in response_data and response_data["continuation"]:
@@ -221,161 +299,451 @@ def _get_vespa_chunks_by_document_id(
         else:
             break  # Exit loop if no continuation token
 
-    return document_chunks
+
+def _get_vespa_chunks_by_document_id(
+    document_id: str,
+    index_name: str,
+    user_access_control_list: list[str] | None = None,
+    min_chunk_ind: int | None = None,
+    max_chunk_ind: int | None = None,
+    field_names: list[str] | None = None,
+) -> list[dict]:
+    return list(
+        _iter_vespa_chunks_by_document_id(
+            document_id=document_id,
+            index_name=index_name,
+            user_access_control_list=user_access_control_list,
+            min_chunk_ind=min_chunk_ind,
+            max_chunk_ind=max_chunk_ind,
+            field_names=field_names,
+        )
+    )
 
 
-def _get_vespa_chunk_ids_by_document_id(
-    document_id: str, index_name: str, user_access_control_list: list[str] | None = None
+async def _async_iter_vespa_chunks_by_document_id(
+    document_id: str,
+    index_name: str,
+    user_access_control_list: list[str] | None = None,
+    min_chunk_ind: int | None = None,
+    max_chunk_ind: int | None = None,
+    field_names: list[str] | None = None,
+) -> AsyncIterator[dict]:
+    url = DOCUMENT_ID_ENDPOINT.format(index_name=index_name)
+    params = _build_vespa_visit_params(
+        document_id=document_id,
+        index_name=index_name,
+        user_access_control_list=user_access_control_list,
+        min_chunk_ind=min_chunk_ind,
+        max_chunk_ind=max_chunk_ind,
+        field_names=field_names,
+    )
+
+    seen_ids: set[str] = set()
+    while True:
+        # httpx rejects None valued params, requests silently drops them
+        response = await get_async_vespa_client().get(
+            url, params={k: v for k, v in params.items() if v is not None}
+        )
+        try:
+            response.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            error_base = _log_visit_error(document_id, params, response, e)
+            raise requests.HTTPError(error_base) from e
+
+        response_data = orjson.loads(response.content)
+        for document in _filter_visited_documents(
+            response_data, user_access_control_list
+        ):
+            if document["id"] not in seen_ids:
+                seen_ids.add(document["id"])
+                yield document
+
+        if "continuation" in response_data and response_data["continuation"]:
+            params["continuation"] = response_data["continuation"]
+        else:
+            break
+
+
+def _vespa_chunk_ids_in_range(
+    document_id: str,
+    chunk_count: int,
+    min_chunk_ind: int | None = None,
+    max_chunk_ind: int | None = None,
 ) -> list[str]:
+    last_chunk_ind = chunk_count - 1
+    if max_chunk_ind is not None:
+        last_chunk_ind = min(max_chunk_ind, last_chunk_ind)
+    return [
+        str(get_uuid_from_chunk_info(document_id, chunk_ind))
+        for chunk_ind in range(min_chunk_ind or 0, last_chunk_ind + 1)
+    ]
+
+
+def _get_vespa_chunk_by_id(
+    vespa_chunk_id: str, index_name: str, field_set: str | None = None
+) -> dict | None:
+    url = DOCUMENT_ID_ENDPOINT.format(index_name=index_name)
+    res = get_vespa_client().get(
+        f"{url}/{vespa_chunk_id}",
+        params={"fieldSet": field_set} if field_set else None,
+        metric_path=urlparse(url).path,
+    )
+    if res.status_code == 404:
+        return None
+    res.raise_for_status()
+    return orjson.loads(res.content)
+
+
+def _get_vespa_chunks_by_chunk_count(
+    document_id: str,
+    index_name: str,
+    chunk_count: int,
+    user_access_control_list: list[str] | None = None,
+    min_chunk_ind: int | None = None,
+    max_chunk_ind: int | None = None,
+    field_names: list[str] | None = None,
+) -> list[dict]:
+    """Same as `_get_vespa_chunks_by_document_id` with one direct GET per chunk instead of a
+    visit, which has to go through every bucket of the content cluster"""
+    field_set = _build_vespa_field_set(
+        index_name, field_names, user_access_control_list
+    )
+    vespa_chunks = run_functions_tuples_in_parallel(
+        [
+            (_get_vespa_chunk_by_id, (vespa_chunk_id, index_name, field_set))
+            for vespa_chunk_id in _vespa_chunk_ids_in_range(
+                document_id, chunk_count, min_chunk_ind, max_chunk_ind
+            )
+        ],
+        executor_name=VESPA_IO_EXECUTOR,
+    )
+    return _filter_visited_documents(
+        {"documents": [chunk for chunk in vespa_chunks if chunk is not None]},
+        user_access_control_list,
+    )
+
+
+async def _async_get_vespa_chunk_by_id(
+    vespa_chunk_id: str, index_name: str, field_set: str | None = None
+) -> dict | None:
+    url = DOCUMENT_ID_ENDPOINT.format(index_name=index_name)
+    response = await get_async_vespa_client().get(
+        f"{url}/{vespa_chunk_id}",
+        params={"fieldSet": field_set} if field_set else None,
+        metric_path=urlparse(url).path,
+    )
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    return orjson.loads(response.content)
+
+
+async def _async_get_vespa_chunks_by_chunk_count(
+    document_id: str,
+    index_name: str,
+    chunk_count: int,
+    user_access_control_list: list[str] | None = None,
+    min_chunk_ind: int | None = None,
+    max_chunk_ind: int | None = None,
+    field_names: list[str] | None = None,
+) -> list[dict]:
+    field_set = _build_vespa_field_set(
+        index_name, field_names, user_access_control_list
+    )
+    vespa_chunks = await asyncio.gather(
+        *[
+            _async_get_vespa_chunk_by_id(vespa_chunk_id, index_name, field_set)
+            for vespa_chunk_id in _vespa_chunk_ids_in_range(
+                document_id, chunk_count, min_chunk_ind, max_chunk_ind
+            )
+        ]
+    )
+    return _filter_visited_documents(
+        {"documents": [chunk for chunk in vespa_chunks if chunk is not None]},
+        user_access_control_list,
+    )
+
+
+def _visited_chunks_to_contents(vespa_chunks: Iterable[dict]) -> list[str]:
+    """Contents of the chunks in chunk order, for chunks visited with `_CHUNK_CONTENT_FIELDS`"""
+    chunk_id_to_content = {
+        chunk["fields"][CHUNK_ID]: _remove_title_from_content(
+            chunk["fields"][CONTENT], chunk["fields"][CHUNK_ID]
+        )
+        for chunk in vespa_chunks
+    }
+    return [chunk_id_to_content[chunk_id] for chunk_id in sorted(chunk_id_to_content)]
+
+
+def _visited_chunks_to_inference_chunks(
+    vespa_chunks: Iterable[dict],
+) -> list[InferenceChunk]:
+    inference_chunks = [_vespa_hit_to_inference_chunk(chunk) for chunk in vespa_chunks]
+    inference_chunks.sort(key=lambda chunk: chunk.chunk_id)
+    return inference_chunks
+
+
+def _get_vespa_chunk_hashes(
+    document_id: str, index_name: str
+) -> dict[int, ChunkHashes]:
     document_chunks = _get_vespa_chunks_by_document_id(
         document_id=document_id,
         index_name=index_name,
-        user_access_control_list=user_access_control_list,
-        field_names=[DOCUMENT_ID],
+        field_names=[CHUNK_ID, CONTENT_HASH, METADATA_HASH],
     )
-    return [chunk["id"].split("::", 1)[-1] for chunk in document_chunks]
+    return {
+        chunk["fields"][CHUNK_ID]: ChunkHashes(
+            content_hash=chunk["fields"].get(CONTENT_HASH),
+            metadata_hash=chunk["fields"].get(METADATA_HASH),
+        )
+        for chunk in document_chunks
+    }
 
 
 @retry(tries=3, delay=1, backoff=2)
-def _delete_vespa_doc_chunks(
-    document_id: str, index_name: str, http_client: httpx.Client
+def _delete_vespa_chunk(
+    document_id: str, chunk_id: int, index_name: str, http_client: httpx.Client
 ) -> None:
-    doc_chunk_ids = _get_vespa_chunk_ids_by_document_id(
-        document_id=document_id, index_name=index_name
+    vespa_chunk_id = str(get_uuid_from_chunk_info(document_id, chunk_id))
+    try:
+        res = http_client.delete(
+            f"{DOCUMENT_ID_ENDPOINT.format(index_name=index_name)}/{vespa_chunk_id}"
+        )
+        res.raise_for_status()
+    except httpx.HTTPStatusError as e:
+        logger.error(f"Failed to delete chunk, details: {e.response.text}")
+        raise
+
+
+@retry(tries=3, delay=1, backoff=2)
+def _does_document_exist(
+    document_id: str, index_name: str, http_client: httpx.Client
+) -> bool:
+    """Whether the first chunk of the document is in the index, a GET by id only touches the
+    bucket of the chunk rather than visiting all of them like a document selection"""
+    first_chunk_id = get_uuid_from_chunk_info(document_id=document_id, chunk_id=0)
+    response = http_client.get(
+        f"{DOCUMENT_ID_ENDPOINT.format(index_name=index_name)}/{first_chunk_id}",
+        params={"fieldSet": f"{index_name}:{DOCUMENT_ID}"},
+    )
+    if response.status_code == 404:
+        return False
+    try:
+        response.raise_for_status()
+    except httpx.HTTPStatusError as e:
+        logger.error(f"Failed to check for document, details: {e.response.text}")
+        raise
+    return True
+
+
+def _get_existing_document_ids(
+    document_ids: list[str], index_name: str, http_client: httpx.Client
+) -> set[str]:
+    """Documents that already have their first chunk in the index"""
+    if not document_ids:
+        return set()
+    exists = run_functions_tuples_in_parallel(
+        [
+            (_does_document_exist, (document_id, index_name, http_client))
+            for document_id in document_ids
+        ],
+        executor_name=VESPA_IO_EXECUTOR,
     )
+    return {
+        document_id
+        for document_id, document_exists in zip(document_ids, exists)
+        if document_exists
+    }
+
 
-    for chunk_id in doc_chunk_ids:
+@retry(tries=3, delay=1, backoff=2)
+def _delete_vespa_docs_by_selection(
+    document_ids: list[str], index_name: str, http_client: httpx.Client
+) -> None:
+    """Deletes all chunks of the documents with a single visit and delete, Vespa goes
+    through the matching chunks server side in time chunks and hands back a continuation
+    until done"""
+    url = DOCUMENT_ID_ENDPOINT.format(index_name=index_name)
+    params: dict[str, Any] = {
+        "selection": build_document_ids_selection(document_ids, index_name),
+        "cluster": VESPA_CONTENT_CLUSTER,
+        "timeChunk": _VESPA_SELECTION_TIME_CHUNK,
+    }
+    while True:
+        response = http_client.delete(url, params=params, timeout=_SELECTION_TIMEOUT)
         try:
-            res = http_client.delete(
-                f"{DOCUMENT_ID_ENDPOINT.format(index_name=index_name)}/{chunk_id}"
-            )
-            res.raise_for_status()
+            response.raise_for_status()
         except httpx.HTTPStatusError as e:
-            logger.error(f"Failed to delete chunk, details: {e.response.text}")
+            logger.error(f"Failed to delete documents, details: {e.response.text}")
             raise
+        continuation = response.json().get("continuation")
+        if not continuation:
+            break
+        params["continuation"] = continuation
 
 
-def _delete_vespa_docs(
+@retry(tries=3, delay=1, backoff=2)
+def _update_vespa_docs_by_selection(
     document_ids: list[str],
+    fields: dict[str, dict],
     index_name: str,
     http_client: httpx.Client,
-    executor: concurrent.futures.ThreadPoolExecutor | None = None,
 ) -> None:
-    external_executor = True
-
-    if not executor:
-        external_executor = False
-        executor = concurrent.futures.ThreadPoolExecutor(max_workers=_NUM_THREADS)
-
-    try:
-        doc_deletion_future = {
-            executor.submit(
-                _delete_vespa_doc_chunks, doc_id, index_name, http_client
-            ): doc_id
-            for doc_id in document_ids
-        }
-        for future in concurrent.futures.as_completed(doc_deletion_future):
-            # Will raise exception if the deletion raised an exception
-            future.result()
-
-    finally:
-        if not external_executor:
-            executor.shutdown(wait=True)
+    """Applies the same partial update to all chunks of the documents, Vespa finds the chunks
+    itself so there is no need to list them first"""
+    url = DOCUMENT_ID_ENDPOINT.format(index_name=index_name)
+    params: dict[str, Any] = {
+        "selection": build_document_ids_selection(document_ids, index_name),
+        "cluster": VESPA_CONTENT_CLUSTER,
+        "timeChunk": _VESPA_SELECTION_TIME_CHUNK,
+    }
+    while True:
+        response = http_client.put(
+            url, params=params, json={"fields": fields}, timeout=_SELECTION_TIMEOUT
+        )
+        try:
+            response.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            logger.error(f"Failed to update documents, details: {e.response.text}")
+            raise
+        continuation = response.json().get("continuation")
+        if not continuation:
+            break
+        params["continuation"] = continuation
 
 
-def _get_existing_documents_from_chunks(
-    chunks: list[DocMetadataAwareIndexChunk],
+def _delete_vespa_docs(
+    document_ids: list[str],
     index_name: str,
     http_client: httpx.Client,
-    executor: concurrent.futures.ThreadPoolExecutor | None = None,
-) -> set[str]:
-    external_executor = True
+) -> None:
+    # Will raise exception if any deletion raised an exception
+    run_functions_tuples_in_parallel(
+        [
+            (_delete_vespa_docs_by_selection, (doc_id_batch, index_name, http_client))
+            for doc_id_batch in batch_generator(document_ids, _SELECTION_BATCH_SIZE)
+        ],
+        executor_name=VESPA_IO_EXECUTOR,
+    )
 
-    if not executor:
-        external_executor = False
-        executor = concurrent.futures.ThreadPoolExecutor(max_workers=_NUM_THREADS)
 
-    document_ids: set[str] = set()
-    try:
-        chunk_existence_future = {
-            executor.submit(
-                _does_document_exist,
-                str(get_uuid_from_chunk(chunk)),
-                index_name,
-                http_client,
-            ): chunk
-            for chunk in chunks
-        }
-        for future in concurrent.futures.as_completed(chunk_existence_future):
-            chunk = chunk_existence_future[future]
-            chunk_already_existed = future.result()
-            if chunk_already_existed:
-                document_ids.add(chunk.source_document.id)
+def _vespa_chunk_metadata_fields(
+    chunk: DocMetadataAwareIndexChunk | DocMetadataAwareChunk,
+) -> dict[str, Any]:
+    """All the fields of a chunk that are not derived from the text it is embedded from, these
+    can be updated in place when only they changed"""
+    document = chunk.source_document
+    return {
+        BLURB: remove_invalid_unicode_chars(chunk.blurb),
+        SOURCE_TYPE: str(document.source.value),
+        SOURCE_LINKS: json.dumps(chunk.source_links),
+        SEMANTIC_IDENTIFIER: remove_invalid_unicode_chars(document.semantic_identifier),
+        SECTION_CONTINUATION: chunk.section_continuation,
+        METADATA: json.dumps(document.metadata),
+        # Save as a list for efficient extraction as an Attribute
+        METADATA_LIST: chunk.source_document.get_metadata_str_attributes(),
+        BOOST: chunk.boost,
+        DOC_UPDATED_AT: _vespa_get_updated_at_attribute(document.doc_updated_at),
+        PRIMARY_OWNERS: get_experts_stores_representations(document.primary_owners),
+        SECONDARY_OWNERS: get_experts_stores_representations(document.secondary_owners),
+        # the only `set` vespa has is `weightedset`, so we have to give each
+        # element an arbitrary weight
+        ACCESS_CONTROL_LIST: {acl_entry: 1 for acl_entry in chunk.access.to_acl()},
+        DOCUMENT_SETS: {document_set: 1 for document_set in chunk.document_sets},
+    }
 
-    finally:
-        if not external_executor:
-            executor.shutdown(wait=True)
 
-    return document_ids
+def _hash_metadata_fields(metadata_fields: dict[str, Any]) -> str:
+    return hashlib.sha256(
+        json.dumps(metadata_fields, sort_keys=True, default=str).encode()
+    ).hexdigest()
 
 
-@retry(tries=3, delay=1, backoff=2)
-def _index_vespa_chunk(
-    chunk: DocMetadataAwareIndexChunk, index_name: str, http_client: httpx.Client
-) -> None:
-    json_header = {
-        "Content-Type": "application/json",
-    }
+def _vespa_chunk_to_feed_operation(
+    chunk: DocMetadataAwareIndexChunk, index_name: str
+) -> VespaFeedOperation:
     document = chunk.source_document
     # No minichunk documents in vespa, minichunk vectors are stored in the chunk itself
     vespa_chunk_id = str(get_uuid_from_chunk(chunk))
 
     embeddings = chunk.embeddings
-    embeddings_name_vector_map = {"full_chunk": embeddings.full_embedding}
+    # Embeddings are carried around as numpy arrays, only converted for the JSON feed
+    embeddings_name_vector_map = {"full_chunk": embeddings.full_embedding.tolist()}
     if embeddings.mini_chunk_embeddings:
         for ind, m_c_embed in enumerate(embeddings.mini_chunk_embeddings):
-            embeddings_name_vector_map[f"mini_chunk_{ind}"] = m_c_embed
+            embeddings_name_vector_map[f"mini_chunk_{ind}"] = m_c_embed.tolist()
 
     title = document.get_title_for_document_index()
+    metadata_fields = _vespa_chunk_metadata_fields(chunk)
 
     vespa_document_fields = {
         DOCUMENT_ID: document.id,
         CHUNK_ID: chunk.chunk_id,
-        BLURB: remove_invalid_unicode_chars(chunk.blurb),
         TITLE: remove_invalid_unicode_chars(title) if title else None,
         SKIP_TITLE_EMBEDDING: not title,
         CONTENT: remove_invalid_unicode_chars(chunk.content),
         # This duplication of `content` is needed for keyword highlighting :(
         CONTENT_SUMMARY: remove_invalid_unicode_chars(chunk.content),
-        SOURCE_TYPE: str(document.source.value),
-        SOURCE_LINKS: json.dumps(chunk.source_links),
-        SEMANTIC_IDENTIFIER: remove_invalid_unicode_chars(document.semantic_identifier),
-        SECTION_CONTINUATION: chunk.section_continuation,
-        METADATA: json.dumps(document.metadata),
-        # Save as a list for efficient extraction as an Attribute
-        METADATA_LIST: chunk.source_document.get_metadata_str_attributes(),
         EMBEDDINGS: embeddings_name_vector_map,
-        TITLE_EMBEDDING: chunk.title_embedding,
-        BOOST: chunk.boost,
-        DOC_UPDATED_AT: _vespa_get_updated_at_attribute(document.doc_updated_at),
-        PRIMARY_OWNERS: get_experts_stores_representations(document.primary_owners),
-        SECONDARY_OWNERS: get_experts_stores_representations(document.secondary_owners),
-        # the only `set` vespa has is `weightedset`, so we have to give each
-        # element an arbitrary weight
-        ACCESS_CONTROL_LIST: {acl_entry: 1 for acl_entry in chunk.access.to_acl()},
-        DOCUMENT_SETS: {document_set: 1 for document_set in chunk.document_sets},
+        TITLE_EMBEDDING: chunk.title_embedding.tolist()
+        if chunk.title_embedding is not None
+        else None,
+        CONTENT_HASH: chunk.content_hash(),
+        METADATA_HASH: _hash_metadata_fields(metadata_fields),
+        **metadata_fields,
     }
 
-    vespa_url = f"{DOCUMENT_ID_ENDPOINT.format(index_name=index_name)}/{vespa_chunk_id}"
-    logger.debug(f'Indexing to URL "{vespa_url}"')
+    return VespaFeedOperation(
+        document_id=document.id,
+        url=f"{DOCUMENT_ID_ENDPOINT.format(index_name=index_name)}/{vespa_chunk_id}",
+        fields=vespa_document_fields,
+    )
+
+
+def _vespa_chunk_to_metadata_update(
+    chunk: DocMetadataAwareChunk, existing_hashes: ChunkHashes, index_name: str
+) -> _VespaUpdateRequest | None:
+    """Partial update of the fields of a chunk whose text is unchanged, None if none of its
+    fields changed either"""
+    metadata_fields = _vespa_chunk_metadata_fields(chunk)
+    metadata_hash = _hash_metadata_fields(metadata_fields)
+    if metadata_hash == existing_hashes.metadata_hash:
+        return None
+
+    vespa_chunk_id = str(get_uuid_from_chunk(chunk))
+    return _VespaUpdateRequest(
+        document_id=chunk.source_document.id,
+        url=f"{DOCUMENT_ID_ENDPOINT.format(index_name=index_name)}/{vespa_chunk_id}",
+        update_request={
+            "fields": {
+                field_name: {"assign": value}
+                for field_name, value in {
+                    **metadata_fields,
+                    METADATA_HASH: metadata_hash,
+                }.items()
+            }
+        },
+    )
+
+
+@retry(tries=3, delay=1, backoff=2)
+def _index_vespa_chunk(
+    chunk: DocMetadataAwareIndexChunk, index_name: str, http_client: httpx.Client
+) -> None:
+    json_header = {
+        "Content-Type": "application/json",
+    }
+    operation = _vespa_chunk_to_feed_operation(chunk, index_name)
+
+    logger.debug(f'Indexing to URL "{operation.url}"')
     res = http_client.post(
-        vespa_url, headers=json_header, json={"fields": vespa_document_fields}
+        operation.url, headers=json_header, json={"fields": operation.fields}
     )
     try:
         res.raise_for_status()
     except Exception as e:
         logger.exception(
-            f"Failed to index document: '{document.id}'. Got response: '{res.text}'"
+            f"Failed to index document: '{operation.document_id}'. Got response: '{res.text}'"
         )
         raise e
 
@@ -384,72 +752,56 @@ def _batch_index_vespa_chunks(
     chunks: list[DocMetadataAwareIndexChunk],
     index_name: str,
     http_client: httpx.Client,
-    executor: concurrent.futures.ThreadPoolExecutor | None = None,
 ) -> None:
-    external_executor = True
-
-    if not executor:
-        external_executor = False
-        executor = concurrent.futures.ThreadPoolExecutor(max_workers=_NUM_THREADS)
-
-    try:
-        chunk_index_future = {
-            executor.submit(_index_vespa_chunk, chunk, index_name, http_client): chunk
-            for chunk in chunks
-        }
-        for future in concurrent.futures.as_completed(chunk_index_future):
-            # Will raise exception if any indexing raised an exception
-            future.result()
-
-    finally:
-        if not external_executor:
-            executor.shutdown(wait=True)
+    # Will raise exception if any indexing raised an exception
+    run_functions_tuples_in_parallel(
+        [(_index_vespa_chunk, (chunk, index_name, http_client)) for chunk in chunks],
+        executor_name=VESPA_IO_EXECUTOR,
+    )
 
 
 def _clear_and_index_vespa_chunks(
     chunks: list[DocMetadataAwareIndexChunk],
     index_name: str,
+    streaming_feed: bool = False,
 ) -> set[DocumentInsertionRecord]:
     """Receive a list of chunks from a batch of documents and index the chunks into Vespa along
     with updating the associated permissions. Assumes that a document will not be split into
     multiple chunk batches calling this function multiple times, otherwise only the last set of
-    chunks will be kept"""
-    existing_docs: set[str] = set()
+    chunks will be kept
 
+    With `streaming_feed`, the chunks are written by the `VespaFeeder` rather than in fixed
+    waves of `_BATCH_SIZE` requests"""
     # NOTE: using `httpx` here since `requests` doesn't support HTTP2. This is beneficial for
     # indexing / updates / deletes since we have to make a large volume of requests.
-    with (
-        concurrent.futures.ThreadPoolExecutor(max_workers=_NUM_THREADS) as executor,
-        httpx.Client(http2=True) as http_client,
-    ):
+    with httpx.Client(http2=True) as http_client:
         # Check for existing documents, existing documents need to have all of their chunks deleted
         # prior to indexing as the document size (num chunks) may have shrunk
-        first_chunks = [chunk for chunk in chunks if chunk.chunk_id == 0]
-        for chunk_batch in batch_generator(first_chunks, _BATCH_SIZE):
-            existing_docs.update(
-                _get_existing_documents_from_chunks(
-                    chunks=chunk_batch,
-                    index_name=index_name,
-                    http_client=http_client,
-                    executor=executor,
-                )
-            )
-
-        for doc_id_batch in batch_generator(existing_docs, _BATCH_SIZE):
+        existing_docs = _get_existing_document_ids(
+            document_ids=[
+                chunk.source_document.id for chunk in chunks if chunk.chunk_id == 0
+            ],
+            index_name=index_name,
+            http_client=http_client,
+        )
+        if existing_docs:
             _delete_vespa_docs(
-                document_ids=doc_id_batch,
+                document_ids=list(existing_docs),
                 index_name=index_name,
                 http_client=http_client,
-                executor=executor,
             )
 
-        for chunk_batch in batch_generator(chunks, _BATCH_SIZE):
-            _batch_index_vespa_chunks(
-                chunks=chunk_batch,
-                index_name=index_name,
-                http_client=http_client,
-                executor=executor,
+        if streaming_feed:
+            VespaFeeder().feed(
+                _vespa_chunk_to_feed_operation(chunk, index_name) for chunk in chunks
             )
+        else:
+            for chunk_batch in batch_generator(chunks, _BATCH_SIZE):
+                _batch_index_vespa_chunks(
+                    chunks=chunk_batch,
+                    index_name=index_name,
+                    http_client=http_client,
+                )
 
     all_doc_ids = {chunk.source_document.id for chunk in chunks}
 
@@ -462,6 +814,96 @@ def _clear_and_index_vespa_chunks(
     }
 
 
+def _get_stale_chunk_ids(
+    chunks: list[DocMetadataAwareIndexChunk],
+    unchanged_chunks: list[DocMetadataAwareChunk],
+    existing_hashes: dict[str, dict[int, ChunkHashes]],
+) -> list[tuple[str, int]]:
+    """(document id, chunk id) of the chunks in the index that are past the new last chunk
+    of their document, left over from a longer previous version of the document"""
+    doc_id_to_num_chunks: dict[str, int] = {}
+    for chunk in [*chunks, *unchanged_chunks]:
+        doc_id = chunk.source_document.id
+        doc_id_to_num_chunks[doc_id] = max(
+            doc_id_to_num_chunks.get(doc_id, 0), chunk.chunk_id + 1
+        )
+
+    return [
+        (doc_id, chunk_id)
+        for doc_id, num_chunks in doc_id_to_num_chunks.items()
+        for chunk_id in sorted(existing_hashes.get(doc_id, {}))
+        if chunk_id >= num_chunks
+    ]
+
+
+def _index_vespa_chunk_diff(
+    chunks: list[DocMetadataAwareIndexChunk],
+    unchanged_chunks: list[DocMetadataAwareChunk],
+    existing_hashes: dict[str, dict[int, ChunkHashes]],
+    index_name: str,
+    streaming_feed: bool = False,
+) -> tuple[set[DocumentInsertionRecord], list[_VespaUpdateRequest]]:
+    """Writes the changed chunks in full and deletes the stale ones, returns the partial updates
+    that still need to be applied to the unchanged chunks whose metadata changed"""
+    metadata_updates = [
+        update
+        for update in (
+            _vespa_chunk_to_metadata_update(
+                chunk=chunk,
+                existing_hashes=existing_hashes[chunk.source_document.id][
+                    chunk.chunk_id
+                ],
+                index_name=index_name,
+            )
+            for chunk in unchanged_chunks
+        )
+        if update is not None
+    ]
+    stale_chunk_ids = _get_stale_chunk_ids(
+        chunks=chunks,
+        unchanged_chunks=unchanged_chunks,
+        existing_hashes=existing_hashes,
+    )
+
+    with httpx.Client(http2=True) as http_client:
+        if streaming_feed:
+            VespaFeeder().feed(
+                _vespa_chunk_to_feed_operation(chunk, index_name) for chunk in chunks
+            )
+        else:
+            for chunk_batch in batch_generator(chunks, _BATCH_SIZE):
+                _batch_index_vespa_chunks(
+                    chunks=chunk_batch,
+                    index_name=index_name,
+                    http_client=http_client,
+                )
+
+        # Deleted only once the new version is written so the document never disappears
+        for stale_batch in batch_generator(stale_chunk_ids, _BATCH_SIZE):
+            run_functions_tuples_in_parallel(
+                [
+                    (_delete_vespa_chunk, (doc_id, chunk_id, index_name, http_client))
+                    for doc_id, chunk_id in stale_batch
+                ],
+                executor_name=VESPA_IO_EXECUTOR,
+            )
+
+    logger.debug(
+        f"Chunk diff: {len(chunks)} written, {len(unchanged_chunks)} unchanged, "
+        f"{len(metadata_updates)} updated in place, {len(stale_chunk_ids)} deleted"
+    )
+
+    all_doc_ids = {chunk.source_document.id for chunk in [*chunks, *unchanged_chunks]}
+    insertion_records = {
+        DocumentInsertionRecord(
+            document_id=doc_id,
+            already_existed=doc_id in existing_hashes,
+        )
+        for doc_id in all_doc_ids
+    }
+    return insertion_records, metadata_updates
+
+
 def _build_vespa_filters(filters: IndexFilters, include_hidden: bool = False) -> str:
     def _build_or_filters(key: str, vals: list[str] | None) -> str:
         if vals is None:
@@ -558,11 +1000,20 @@ def _process_dynamic_summary(
     return processed_summary
 
 
+def _remove_title_from_content(content: str, chunk_id: int) -> str:
+    # Remove the title from the first chunk as every chunk already included
+    # its semantic identifier for LLM
+    if chunk_id == 0:
+        parts = content.split(TITLE_SEPARATOR, maxsplit=1)
+        content = parts[1] if len(parts) > 1 and "\n" not in parts[0] else content
+    return content
+
+
 def _vespa_hit_to_inference_chunk(hit: dict[str, Any]) -> InferenceChunk:
     fields = cast(dict[str, Any], hit["fields"])
 
     # parse fields that are stored as strings, but are really json / datetime
-    metadata = json.loads(fields[METADATA]) if METADATA in fields else {}
+    metadata = orjson.loads(fields[METADATA]) if METADATA in fields else {}
     updated_at = (
         datetime.fromtimestamp(fields[DOC_UPDATED_AT], tz=timezone.utc)
         if DOC_UPDATED_AT in fields
@@ -581,12 +1032,7 @@ def _vespa_hit_to_inference_chunk(hit: dict[str, Any]) -> InferenceChunk:
             f"Chunk with blurb: {fields.get(BLURB, 'Unknown')[:50]}... has no Semantic Identifier"
         )
 
-    # Remove the title from the first chunk as every chunk already included
-    # its semantic identifier for LLM
-    content = fields[CONTENT]
-    if fields[CHUNK_ID] == 0:
-        parts = content.split(TITLE_SEPARATOR, maxsplit=1)
-        content = parts[1] if len(parts) > 1 and "\n" not in parts[0] else content
+    content = _remove_title_from_content(fields[CONTENT], fields[CHUNK_ID])
 
     # User ran into this, not sure why this could happen, error checking here
     blurb = fields.get(BLURB)
@@ -596,25 +1042,28 @@ def _vespa_hit_to_inference_chunk(hit: dict[str, Any]) -> InferenceChunk:
 
     source_links = fields.get(SOURCE_LINKS, {})
     source_links_dict_unprocessed = (
-        json.loads(source_links) if isinstance(source_links, str) else source_links
+        orjson.loads(source_links) if isinstance(source_links, str) else source_links
     )
     source_links_dict = {
         int(k): v
         for k, v in cast(dict[str, str], source_links_dict_unprocessed).items()
     }
 
-    return InferenceChunk(
+    # Validating every field of every hit was most of the time spent decoding a search
+    # response. The fields come from our own schema, so the few that Vespa does not return
+    # with their final type are converted here and validation is skipped
+    return InferenceChunk.construct(
         chunk_id=fields[CHUNK_ID],
         blurb=blurb,
         content=content,
         source_links=source_links_dict,
         section_continuation=fields[SECTION_CONTINUATION],
         document_id=fields[DOCUMENT_ID],
-        source_type=fields[SOURCE_TYPE],
+        source_type=DocumentSource(fields[SOURCE_TYPE]),
         semantic_identifier=fields[SEMANTIC_IDENTIFIER],
-        boost=fields.get(BOOST, 1),
-        recency_bias=fields.get("matchfeatures", {}).get(RECENCY_BIAS, 1.0),
-        score=hit.get("relevance", 0),
+        boost=int(fields.get(BOOST, 1)),
+        recency_bias=float(fields.get("matchfeatures", {}).get(RECENCY_BIAS, 1.0)),
+        score=float(hit.get("relevance", 0)),
         hidden=fields.get(HIDDEN, False),
         primary_owners=fields.get(PRIMARY_OWNERS),
         secondary_owners=fields.get(SECONDARY_OWNERS),
@@ -624,42 +1073,41 @@ def _vespa_hit_to_inference_chunk(hit: dict[str, Any]) -> InferenceChunk:
     )
 
 
-@retry(tries=3, delay=1, backoff=2)
-def _query_vespa(query_params: Mapping[str, str | int | float]) -> list[InferenceChunk]:
+def _build_vespa_search_params(
+    query_params: Mapping[str, str | int | float]
+) -> dict[str, Any]:
     if "query" in query_params and not cast(str, query_params["query"]).strip():
         raise ValueError("No/empty query received")
 
-    params = dict(
+    return dict(
         **query_params,
         **{
             "presentation.timing": True,
         }
         if LOG_VESPA_TIMING_INFORMATION
-        else {},
-    )
-
-    response = requests.post(
-        SEARCH_ENDPOINT,
-        json=params,
-    )
-    try:
-        response.raise_for_status()
-    except requests.HTTPError as e:
-        request_info = f"Headers: {response.request.headers}\nPayload: {params}"
-        response_info = (
-            f"Status Code: {response.status_code}\n"
-            f"Response Content: {response.text}"
-        )
-        error_base = "Failed to query Vespa"
-        logger.error(
-            f"{error_base}:\n"
-            f"{request_info}\n"
-            f"{response_info}\n"
-            f"Exception: {e}"
-        )
-        raise requests.HTTPError(error_base) from e
+        else {},
+    )
+
+
+def _log_query_error(
+    params: dict[str, Any],
+    response: requests.Response | httpx.Response,
+    e: Exception,
+) -> str:
+    request_info = f"Headers: {response.request.headers}\nPayload: {params}"
+    response_info = (
+        f"Status Code: {response.status_code}\n" f"Response Content: {response.text}"
+    )
+    error_base = "Failed to query Vespa"
+    logger.error(
+        f"{error_base}:\n" f"{request_info}\n" f"{response_info}\n" f"Exception: {e}"
+    )
+    return error_base
 
-    response_json: dict[str, Any] = response.json()
+
+def _vespa_search_response_to_inference_chunks(
+    response_json: dict[str, Any]
+) -> list[InferenceChunk]:
     if LOG_VESPA_TIMING_INFORMATION:
         logger.info("Vespa timing info: %s", response_json.get("timing"))
     hits = response_json["root"].get("children", [])
@@ -680,14 +1128,260 @@ def _query_vespa(query_params: Mapping[str, str | int | float]) -> list[Inferenc
     return inference_chunks
 
 
-@retry(tries=3, delay=1, backoff=2)
+def _vespa_query_timeout(timeout: float) -> str:
+    return f"{int(timeout * 1000)}ms"
+
+
+def _post_vespa_query(params: dict[str, Any], timeout: float) -> dict[str, Any]:
+    """`timeout` is the deadline of the search in seconds, Vespa is asked to answer within
+    it with whatever it found so far"""
+    params["timeout"] = _vespa_query_timeout(timeout)
+    response = get_vespa_query_client().post(
+        SEARCH_ENDPOINT,
+        json=params,
+        deadline=timeout + _VESPA_QUERY_TIMEOUT_MARGIN,
+        hedge=True,
+    )
+    try:
+        response.raise_for_status()
+    except requests.HTTPError as e:
+        error_base = _log_query_error(params, response, e)
+        raise requests.HTTPError(error_base) from e
+    # Search responses hold the full content of every hit, orjson decodes them about twice as
+    # fast as the standard library
+    return orjson.loads(response.content)
+
+
+async def _async_post_vespa_query(
+    params: dict[str, Any], timeout: float
+) -> dict[str, Any]:
+    params["timeout"] = _vespa_query_timeout(timeout)
+    response = await get_async_vespa_query_client().post(
+        SEARCH_ENDPOINT,
+        json=params,
+        deadline=timeout + _VESPA_QUERY_TIMEOUT_MARGIN,
+        hedge=True,
+    )
+    try:
+        response.raise_for_status()
+    except httpx.HTTPStatusError as e:
+        error_base = _log_query_error(params, response, e)
+        raise requests.HTTPError(error_base) from e
+    # Search responses hold the full content of every hit, orjson decodes them about twice as
+    # fast as the standard library
+    return orjson.loads(response.content)
+
+
+def _query_vespa(
+    query_params: Mapping[str, str | int | float],
+    timeout: float = VESPA_QUERY_TIMEOUT,
+) -> list[InferenceChunk]:
+    params = _build_vespa_search_params(query_params)
+    return _vespa_search_response_to_inference_chunks(
+        _post_vespa_query(params, timeout)
+    )
+
+
+def _chunk_window_last_ind(window: ChunkWindow) -> int | None:
+    """None if the end of the document is not known"""
+    if window.chunk_count is None:
+        return window.max_chunk_ind
+    if window.max_chunk_ind is None:
+        return window.chunk_count - 1
+    return min(window.max_chunk_ind, window.chunk_count - 1)
+
+
+def _plan_chunk_window_queries(
+    windows: list[ChunkWindow], max_hits: int = _MAX_CHUNK_WINDOW_HITS
+) -> tuple[list[list[int]], list[int]]:
+    """Packs the windows with a known end into as few queries as the hit limit allows.
+    Returns the indices of the windows of each query and of the windows that have to be
+    fetched on their own, empty windows are in neither"""
+    queries: list[list[int]] = []
+    query_hits = 0
+    single_windows: list[int] = []
+    for ind, window in enumerate(windows):
+        last_chunk_ind = _chunk_window_last_ind(window)
+        if last_chunk_ind is None:
+            single_windows.append(ind)
+            continue
+        num_chunks = last_chunk_ind - (window.min_chunk_ind or 0) + 1
+        if num_chunks <= 0:
+            continue
+        if num_chunks > max_hits:
+            single_windows.append(ind)
+            continue
+        if not queries or query_hits + num_chunks > max_hits:
+            queries.append([])
+            query_hits = 0
+        queries[-1].append(ind)
+        query_hits += num_chunks
+    return queries, single_windows
+
+
+def _build_chunk_windows_query_params(
+    windows: list[ChunkWindow], index_name: str
+) -> dict[str, Any]:
+    window_filters: list[str] = []
+    num_hits = 0
+    for window in windows:
+        last_chunk_ind = cast(int, _chunk_window_last_ind(window))
+        window_filters.append(
+            build_chunk_window_filter(
+                window.document_id, window.min_chunk_ind, last_chunk_ind
+            )
+        )
+        num_hits += last_chunk_ind - (window.min_chunk_ind or 0) + 1
+
+    yql = (
+        f"select {DOCUMENT_ID}, {CHUNK_ID}, {CONTENT} from {index_name} where "
+        + " or ".join(window_filters)
+    )
+    return _build_vespa_search_params(
+        {
+            "yql": yql,
+            "hits": num_hits,
+            "ranking.profile": "unranked",
+        }
+    )
+
+
+def _chunk_windows_response_to_contents(
+    windows: list[ChunkWindow], response_json: dict[str, Any]
+) -> list[list[str]]:
+    doc_id_to_chunk_contents: dict[str, dict[int, str]] = {}
+    for hit in response_json["root"].get("children", []):
+        fields = hit["fields"]
+        doc_id_to_chunk_contents.setdefault(fields[DOCUMENT_ID], {})[
+            fields[CHUNK_ID]
+        ] = _remove_title_from_content(fields[CONTENT], fields[CHUNK_ID])
+
+    window_contents: list[list[str]] = []
+    for window in windows:
+        chunk_contents = doc_id_to_chunk_contents.get(window.document_id, {})
+        last_chunk_ind = cast(int, _chunk_window_last_ind(window))
+        window_contents.append(
+            [
+                chunk_contents[chunk_id]
+                for chunk_id in sorted(chunk_contents)
+                if (window.min_chunk_ind or 0) <= chunk_id <= last_chunk_ind
+            ]
+        )
+    return window_contents
+
+
+def _query_vespa_chunk_windows(
+    windows: list[ChunkWindow], index_name: str
+) -> list[list[str]]:
+    params = _build_chunk_windows_query_params(windows, index_name)
+    return _chunk_windows_response_to_contents(
+        windows, _post_vespa_query(params, VESPA_QUERY_TIMEOUT)
+    )
+
+
+async def _async_query_vespa_chunk_windows(
+    windows: list[ChunkWindow], index_name: str
+) -> list[list[str]]:
+    params = _build_chunk_windows_query_params(windows, index_name)
+    return _chunk_windows_response_to_contents(
+        windows, await _async_post_vespa_query(params, VESPA_QUERY_TIMEOUT)
+    )
+
+
+_VESPA_CLIENT: PooledHttpClient | None = None
+_ASYNC_VESPA_CLIENT: AsyncPooledHttpClient | None = None
+
+
+def get_vespa_client() -> PooledHttpClient:
+    global _VESPA_CLIENT
+    if _VESPA_CLIENT is None:
+        _VESPA_CLIENT = PooledHttpClient(
+            connect_timeout=_VESPA_CONNECT_TIMEOUT,
+            read_timeout=_VESPA_READ_TIMEOUT,
+            max_retries=2,
+            backoff_base=1.0,
+            metric_prefix="vespa",
+        )
+    return _VESPA_CLIENT
+
+
+# Shared by the sync and async query clients, Vespa being down affects both
+_VESPA_QUERY_CIRCUIT_BREAKER = CircuitBreaker(failure_threshold=5, reset_timeout=10)
+_VESPA_QUERY_CLIENT: PooledHttpClient | None = None
+_ASYNC_VESPA_QUERY_CLIENT: AsyncPooledHttpClient | None = None
+
+
+def get_vespa_query_client() -> PooledHttpClient:
+    """Client of the latency sensitive searches, bounded by their deadline rather than by
+    a fixed number of slow retries"""
+    global _VESPA_QUERY_CLIENT
+    if _VESPA_QUERY_CLIENT is None:
+        _VESPA_QUERY_CLIENT = PooledHttpClient(
+            connect_timeout=_VESPA_QUERY_CONNECT_TIMEOUT,
+            read_timeout=VESPA_QUERY_TIMEOUT + _VESPA_QUERY_TIMEOUT_MARGIN,
+            max_retries=2,
+            backoff_base=0.05,
+            metric_prefix="vespa",
+            hedge_percentile=(
+                _VESPA_QUERY_HEDGE_PERCENTILE if VESPA_QUERY_HEDGING else None
+            ),
+            circuit_breaker=_VESPA_QUERY_CIRCUIT_BREAKER,
+        )
+    return _VESPA_QUERY_CLIENT
+
+
+def get_async_vespa_query_client() -> AsyncPooledHttpClient:
+    global _ASYNC_VESPA_QUERY_CLIENT
+    if _ASYNC_VESPA_QUERY_CLIENT is None:
+        _ASYNC_VESPA_QUERY_CLIENT = AsyncPooledHttpClient(
+            connect_timeout=_VESPA_QUERY_CONNECT_TIMEOUT,
+            read_timeout=VESPA_QUERY_TIMEOUT + _VESPA_QUERY_TIMEOUT_MARGIN,
+            max_retries=2,
+            backoff_base=0.05,
+            metric_prefix="vespa",
+            hedge_percentile=(
+                _VESPA_QUERY_HEDGE_PERCENTILE if VESPA_QUERY_HEDGING else None
+            ),
+            circuit_breaker=_VESPA_QUERY_CIRCUIT_BREAKER,
+        )
+    return _ASYNC_VESPA_QUERY_CLIENT
+
+
+def get_async_vespa_client() -> AsyncPooledHttpClient:
+    global _ASYNC_VESPA_CLIENT
+    if _ASYNC_VESPA_CLIENT is None:
+        _ASYNC_VESPA_CLIENT = AsyncPooledHttpClient(
+            connect_timeout=_VESPA_CONNECT_TIMEOUT,
+            read_timeout=_VESPA_READ_TIMEOUT,
+            # Matches the 3 tries of the sync flow
+            max_retries=2,
+            backoff_base=1.0,
+            metric_prefix="vespa",
+        )
+    return _ASYNC_VESPA_CLIENT
+
+
+async def _async_query_vespa(
+    query_params: Mapping[str, str | int | float],
+    timeout: float = VESPA_QUERY_TIMEOUT,
+) -> list[InferenceChunk]:
+    params = _build_vespa_search_params(query_params)
+    return _vespa_search_response_to_inference_chunks(
+        await _async_post_vespa_query(params, timeout)
+    )
+
+
 def _inference_chunk_by_vespa_id(vespa_id: str, index_name: str) -> InferenceChunk:
-    res = requests.get(
-        f"{DOCUMENT_ID_ENDPOINT.format(index_name=index_name)}/{vespa_id}"
+    url = DOCUMENT_ID_ENDPOINT.format(index_name=index_name)
+    res = get_vespa_query_client().get(
+        f"{url}/{vespa_id}",
+        metric_path=urlparse(url).path,
+        deadline=VESPA_QUERY_TIMEOUT + _VESPA_QUERY_TIMEOUT_MARGIN,
+        hedge=True,
     )
     res.raise_for_status()
 
-    return _vespa_hit_to_inference_chunk(res.json())
+    return _vespa_hit_to_inference_chunk(orjson.loads(res.content))
 
 
 def in_memory_zip_from_file_bytes(file_contents: dict[str, bytes]) -> BinaryIO:
@@ -799,16 +1493,53 @@ class VespaIndex(DocumentIndex):
     def index(
         self,
         chunks: list[DocMetadataAwareIndexChunk],
+        streaming_feed: bool = VESPA_STREAMING_FEED,
+    ) -> set[DocumentInsertionRecord]:
+        # IMPORTANT: This must be done one index at a time, do not use secondary index here
+        return _clear_and_index_vespa_chunks(
+            chunks=chunks, index_name=self.index_name, streaming_feed=streaming_feed
+        )
+
+    def get_chunk_hashes(
+        self, document_ids: list[str]
+    ) -> dict[str, dict[int, ChunkHashes]] | None:
+        chunk_hashes = run_functions_tuples_in_parallel(
+            [
+                (_get_vespa_chunk_hashes, (document_id, self.index_name))
+                for document_id in document_ids
+            ],
+            executor_name=VESPA_IO_EXECUTOR,
+        )
+        return {
+            document_id: doc_chunk_hashes
+            for document_id, doc_chunk_hashes in zip(document_ids, chunk_hashes)
+            if doc_chunk_hashes
+        }
+
+    def index_chunk_diff(
+        self,
+        chunks: list[DocMetadataAwareIndexChunk],
+        unchanged_chunks: list[DocMetadataAwareChunk],
+        existing_hashes: dict[str, dict[int, ChunkHashes]],
+        streaming_feed: bool = VESPA_STREAMING_FEED,
     ) -> set[DocumentInsertionRecord]:
         # IMPORTANT: This must be done one index at a time, do not use secondary index here
-        return _clear_and_index_vespa_chunks(chunks=chunks, index_name=self.index_name)
+        insertion_records, metadata_updates = _index_vespa_chunk_diff(
+            chunks=chunks,
+            unchanged_chunks=unchanged_chunks,
+            existing_hashes=existing_hashes,
+            index_name=self.index_name,
+            streaming_feed=streaming_feed,
+        )
+        self._apply_updates_batched(metadata_updates)
+        return insertion_records
 
     @staticmethod
     def _apply_updates_batched(
         updates: list[_VespaUpdateRequest],
         batch_size: int = _BATCH_SIZE,
     ) -> None:
-        """Runs a batch of updates in parallel via the ThreadPoolExecutor."""
+        """Runs a batch of updates in parallel on the shared Vespa IO executor."""
 
         def _update_chunk(
             update: _VespaUpdateRequest, http_client: httpx.Client
@@ -824,105 +1555,95 @@ class VespaIndex(DocumentIndex):
 
         # NOTE: using `httpx` here since `requests` doesn't support HTTP2. This is beneficient for
         # indexing / updates / deletes since we have to make a large volume of requests.
-        with (
-            concurrent.futures.ThreadPoolExecutor(max_workers=_NUM_THREADS) as executor,
-            httpx.Client(http2=True) as http_client,
-        ):
+        with httpx.Client(http2=True) as http_client:
             for update_batch in batch_generator(updates, batch_size):
-                future_to_document_id = {
-                    executor.submit(
-                        _update_chunk,
-                        update,
-                        http_client,
-                    ): update.document_id
-                    for update in update_batch
-                }
-                for future in concurrent.futures.as_completed(future_to_document_id):
-                    res = future.result()
+                # Waits with `wait_result`, so a caller already running on the Vespa IO pool
+                # runs the updates itself rather than deadlocking on a saturated pool
+                responses = run_functions_tuples_in_parallel(
+                    [(_update_chunk, (update, http_client)) for update in update_batch],
+                    executor_name=VESPA_IO_EXECUTOR,
+                )
+                for update, response in zip(update_batch, responses):
                     try:
-                        res.raise_for_status()
-                    except requests.HTTPError as e:
-                        failure_msg = f"Failed to update document: {future_to_document_id[future]}"
+                        response.raise_for_status()
+                    except httpx.HTTPStatusError as e:
+                        failure_msg = f"Failed to update document: {update.document_id}"
                         raise requests.HTTPError(failure_msg) from e
 
     def update(self, update_requests: list[UpdateRequest]) -> None:
         logger.info(f"Updating {len(update_requests)} documents in Vespa")
         update_start = time.monotonic()
 
-        processed_updates_requests: list[_VespaUpdateRequest] = []
-        all_doc_chunk_ids: dict[str, list[str]] = {}
-
-        # Fetch all chunks for each document ahead of time
-        index_names = [self.index_name]
-        if self.secondary_index_name:
-            index_names.append(self.secondary_index_name)
-
-        chunk_id_start_time = time.monotonic()
-        with concurrent.futures.ThreadPoolExecutor(
-            max_workers=_NUM_THREADS
-        ) as executor:
-            future_to_doc_chunk_ids = {
-                executor.submit(
-                    _get_vespa_chunk_ids_by_document_id,
-                    document_id=document_id,
-                    index_name=index_name,
-                ): (document_id, index_name)
-                for index_name in index_names
-                for update_request in update_requests
-                for document_id in update_request.document_ids
-            }
-            for future in concurrent.futures.as_completed(future_to_doc_chunk_ids):
-                document_id, index_name = future_to_doc_chunk_ids[future]
-                try:
-                    doc_chunk_ids = future.result()
-                    if document_id not in all_doc_chunk_ids:
-                        all_doc_chunk_ids[document_id] = []
-                    all_doc_chunk_ids[document_id].extend(doc_chunk_ids)
-                except Exception as e:
-                    logger.error(
-                        f"Error retrieving chunk IDs for document {document_id} in index {index_name}: {e}"
-                    )
-        logger.debug(
-            f"Took {time.monotonic() - chunk_id_start_time:.2f} seconds to fetch all Vespa chunk IDs"
-        )
-
-        # Build the _VespaUpdateRequest objects
+        # Coalesce all the requests for a document into a single set of field updates, later
+        # requests win for fields that are set more than once
+        doc_id_to_fields: dict[str, dict[str, dict]] = {}
         for update_request in update_requests:
-            update_dict: dict[str, dict] = {"fields": {}}
+            update_fields: dict[str, dict] = {}
             if update_request.boost is not None:
-                update_dict["fields"][BOOST] = {"assign": update_request.boost}
+                update_fields[BOOST] = {"assign": update_request.boost}
             if update_request.document_sets is not None:
-                update_dict["fields"][DOCUMENT_SETS] = {
+                update_fields[DOCUMENT_SETS] = {
                     "assign": {
                         document_set: 1 for document_set in update_request.document_sets
                     }
                 }
             if update_request.access is not None:
-                update_dict["fields"][ACCESS_CONTROL_LIST] = {
+                update_fields[ACCESS_CONTROL_LIST] = {
                     "assign": {
                         acl_entry: 1 for acl_entry in update_request.access.to_acl()
                     }
                 }
+            if update_fields:
+                # The stored hash no longer matches, the next diff based re-index of these
+                # documents must rewrite their metadata
+                update_fields[METADATA_HASH] = {"assign": ""}
             if update_request.hidden is not None:
-                update_dict["fields"][HIDDEN] = {"assign": update_request.hidden}
+                update_fields[HIDDEN] = {"assign": update_request.hidden}
 
-            if not update_dict["fields"]:
+            if not update_fields:
                 logger.error("Update request received but nothing to update")
                 continue
 
             for document_id in update_request.document_ids:
-                for doc_chunk_id in all_doc_chunk_ids[document_id]:
-                    processed_updates_requests.append(
-                        _VespaUpdateRequest(
-                            document_id=document_id,
-                            url=f"{DOCUMENT_ID_ENDPOINT.format(index_name=self.index_name)}/{doc_chunk_id}",
-                            update_request=update_dict,
-                        )
+                doc_id_to_fields.setdefault(document_id, {}).update(update_fields)
+
+        # Documents getting the exact same update share selection based updates, e.g. all the
+        # documents of a document set
+        fields_key_to_update: dict[str, tuple[dict[str, dict], list[str]]] = {}
+        for document_id, fields in doc_id_to_fields.items():
+            fields_key = json.dumps(fields, sort_keys=True)
+            fields_key_to_update.setdefault(fields_key, (fields, []))[1].append(
+                document_id
+            )
+
+        index_names = [self.index_name]
+        if self.secondary_index_name:
+            index_names.append(self.secondary_index_name)
+
+        # NOTE: using `httpx` here since `requests` doesn't support HTTP2. This is beneficial for
+        # indexing / updates / deletes since we have to make a large volume of requests.
+        with httpx.Client(http2=True) as http_client:
+            # Will raise exception if any update raised an exception, the shared executor bounds
+            # how many are in flight at once
+            run_functions_tuples_in_parallel(
+                [
+                    (
+                        _update_vespa_docs_by_selection,
+                        (doc_id_batch, fields, index_name, http_client),
                     )
+                    for index_name in index_names
+                    for fields, document_ids in fields_key_to_update.values()
+                    for doc_id_batch in batch_generator(
+                        document_ids, _SELECTION_BATCH_SIZE
+                    )
+                ],
+                executor_name=VESPA_IO_EXECUTOR,
+            )
 
-        self._apply_updates_batched(processed_updates_requests)
         logger.info(
-            "Finished updating Vespa documents in %.2f seconds",
+            "Finished updating %d Vespa documents with %d distinct updates in %.2fs",
+            len(doc_id_to_fields),
+            len(fields_key_to_update),
             time.monotonic() - update_start,
         )
 
@@ -941,39 +1662,219 @@ class VespaIndex(DocumentIndex):
                     document_ids=doc_ids, index_name=index_name, http_client=http_client
                 )
 
+    def _get_chunks_by_document_id(
+        self,
+        document_id: str,
+        min_chunk_ind: int | None,
+        max_chunk_ind: int | None,
+        user_access_control_list: list[str] | None,
+        chunk_count: int | None,
+        field_names: list[str],
+    ) -> Iterable[dict]:
+        """Visited chunks are streamed page by page"""
+        if chunk_count is not None:
+            return _get_vespa_chunks_by_chunk_count(
+                document_id=document_id,
+                index_name=self.index_name,
+                chunk_count=chunk_count,
+                user_access_control_list=user_access_control_list,
+                min_chunk_ind=min_chunk_ind,
+                max_chunk_ind=max_chunk_ind,
+                field_names=field_names,
+            )
+        return _iter_vespa_chunks_by_document_id(
+            document_id=document_id,
+            index_name=self.index_name,
+            user_access_control_list=user_access_control_list,
+            min_chunk_ind=min_chunk_ind,
+            max_chunk_ind=max_chunk_ind,
+            field_names=field_names,
+        )
+
+    async def _async_get_chunks_by_document_id(
+        self,
+        document_id: str,
+        min_chunk_ind: int | None,
+        max_chunk_ind: int | None,
+        user_access_control_list: list[str] | None,
+        chunk_count: int | None,
+        field_names: list[str],
+    ) -> list[dict]:
+        if chunk_count is not None:
+            return await _async_get_vespa_chunks_by_chunk_count(
+                document_id=document_id,
+                index_name=self.index_name,
+                chunk_count=chunk_count,
+                user_access_control_list=user_access_control_list,
+                min_chunk_ind=min_chunk_ind,
+                max_chunk_ind=max_chunk_ind,
+                field_names=field_names,
+            )
+        return [
+            chunk
+            async for chunk in _async_iter_vespa_chunks_by_document_id(
+                document_id=document_id,
+                index_name=self.index_name,
+                user_access_control_list=user_access_control_list,
+                min_chunk_ind=min_chunk_ind,
+                max_chunk_ind=max_chunk_ind,
+                field_names=field_names,
+            )
+        ]
+
     def id_based_retrieval(
         self,
         document_id: str,
         min_chunk_ind: int | None,
         max_chunk_ind: int | None,
         user_access_control_list: list[str] | None = None,
+        chunk_count: int | None = None,
     ) -> list[InferenceChunk]:
-        vespa_chunks = _get_vespa_chunks_by_document_id(
+        vespa_chunks = self._get_chunks_by_document_id(
             document_id=document_id,
-            index_name=self.index_name,
+            min_chunk_ind=min_chunk_ind,
+            max_chunk_ind=max_chunk_ind,
             user_access_control_list=user_access_control_list,
+            chunk_count=chunk_count,
+            field_names=_INFERENCE_CHUNK_FIELDS,
+        )
+        return _visited_chunks_to_inference_chunks(vespa_chunks)
+
+    async def async_id_based_retrieval(
+        self,
+        document_id: str,
+        min_chunk_ind: int | None,
+        max_chunk_ind: int | None,
+        user_access_control_list: list[str] | None = None,
+        chunk_count: int | None = None,
+    ) -> list[InferenceChunk]:
+        vespa_chunks = await self._async_get_chunks_by_document_id(
+            document_id=document_id,
             min_chunk_ind=min_chunk_ind,
             max_chunk_ind=max_chunk_ind,
+            user_access_control_list=user_access_control_list,
+            chunk_count=chunk_count,
+            field_names=_INFERENCE_CHUNK_FIELDS,
         )
+        return _visited_chunks_to_inference_chunks(vespa_chunks)
 
-        if not vespa_chunks:
-            return []
+    def id_based_content_retrieval(
+        self,
+        document_id: str,
+        min_chunk_ind: int | None,
+        max_chunk_ind: int | None,
+        user_access_control_list: list[str] | None = None,
+        chunk_count: int | None = None,
+    ) -> list[str]:
+        vespa_chunks = self._get_chunks_by_document_id(
+            document_id=document_id,
+            min_chunk_ind=min_chunk_ind,
+            max_chunk_ind=max_chunk_ind,
+            user_access_control_list=user_access_control_list,
+            chunk_count=chunk_count,
+            field_names=_CHUNK_CONTENT_FIELDS,
+        )
+        return _visited_chunks_to_contents(vespa_chunks)
 
-        inference_chunks = [
-            _vespa_hit_to_inference_chunk(chunk) for chunk in vespa_chunks
+    async def async_id_based_content_retrieval(
+        self,
+        document_id: str,
+        min_chunk_ind: int | None,
+        max_chunk_ind: int | None,
+        user_access_control_list: list[str] | None = None,
+        chunk_count: int | None = None,
+    ) -> list[str]:
+        vespa_chunks = await self._async_get_chunks_by_document_id(
+            document_id=document_id,
+            min_chunk_ind=min_chunk_ind,
+            max_chunk_ind=max_chunk_ind,
+            user_access_control_list=user_access_control_list,
+            chunk_count=chunk_count,
+            field_names=_CHUNK_CONTENT_FIELDS,
+        )
+        return _visited_chunks_to_contents(vespa_chunks)
+
+    def chunk_windows_content_retrieval(
+        self, windows: list[ChunkWindow]
+    ) -> list[list[str]]:
+        # Windows with a known end are fetched with a single query for all of them, the others
+        # still need a visit each
+        queries, single_windows = _plan_chunk_window_queries(windows)
+        functions_with_args: list[tuple[Callable, tuple]] = [
+            (
+                _query_vespa_chunk_windows,
+                ([windows[ind] for ind in query], self.index_name),
+            )
+            for query in queries
+        ] + [
+            (
+                self.id_based_content_retrieval,
+                (
+                    windows[ind].document_id,
+                    windows[ind].min_chunk_ind,
+                    windows[ind].max_chunk_ind,
+                    None,
+                    windows[ind].chunk_count,
+                ),
+            )
+            for ind in single_windows
         ]
-        inference_chunks.sort(key=lambda chunk: chunk.chunk_id)
-        return inference_chunks
+        results = run_functions_tuples_in_parallel(
+            functions_with_args, executor_name=VESPA_IO_EXECUTOR
+        )
 
-    def keyword_retrieval(
+        window_contents: list[list[str]] = [[] for _ in windows]
+        for query, query_contents in zip(queries, results[: len(queries)]):
+            for ind, contents in zip(query, query_contents):
+                window_contents[ind] = contents
+        for ind, contents in zip(single_windows, results[len(queries) :]):
+            window_contents[ind] = contents
+        return window_contents
+
+    async def async_chunk_windows_content_retrieval(
+        self, windows: list[ChunkWindow]
+    ) -> list[list[str]]:
+        queries, single_windows = _plan_chunk_window_queries(windows)
+        query_results, single_results = await asyncio.gather(
+            asyncio.gather(
+                *[
+                    _async_query_vespa_chunk_windows(
+                        [windows[ind] for ind in query], self.index_name
+                    )
+                    for query in queries
+                ]
+            ),
+            asyncio.gather(
+                *[
+                    self.async_id_based_content_retrieval(
+                        windows[ind].document_id,
+                        windows[ind].min_chunk_ind,
+                        windows[ind].max_chunk_ind,
+                        None,
+                        windows[ind].chunk_count,
+                    )
+                    for ind in single_windows
+                ]
+            ),
+        )
+
+        window_contents: list[list[str]] = [[] for _ in windows]
+        for query, query_contents in zip(queries, query_results):
+            for ind, contents in zip(query, query_contents):
+                window_contents[ind] = contents
+        for ind, contents in zip(single_windows, single_results):
+            window_contents[ind] = contents
+        return window_contents
+
+    def _build_keyword_query_params(
         self,
         query: str,
         filters: IndexFilters,
         time_decay_multiplier: float,
-        num_to_retrieve: int = NUM_RETURNED_HITS,
-        offset: int = 0,
-        edit_keyword_query: bool = EDIT_KEYWORD_QUERY,
-    ) -> list[InferenceChunk]:
+        num_to_retrieve: int,
+        offset: int,
+        edit_keyword_query: bool,
+    ) -> dict[str, str | int]:
         # IMPORTANT: THIS FUNCTION IS NOT UP TO DATE, DOES NOT WORK CORRECTLY
         vespa_where_clauses = _build_vespa_filters(filters)
         yql = (
@@ -988,29 +1889,65 @@ class VespaIndex(DocumentIndex):
 
         final_query = query_processing(query) if edit_keyword_query else query
 
-        params: dict[str, str | int] = {
+        return {
             "yql": yql,
             "query": final_query,
             "input.query(decay_factor)": str(DOC_TIME_DECAY * time_decay_multiplier),
             "hits": num_to_retrieve,
             "offset": offset,
             "ranking.profile": "keyword_search",
-            "timeout": _VESPA_TIMEOUT,
         }
 
-        return _query_vespa(params)
+    def keyword_retrieval(
+        self,
+        query: str,
+        filters: IndexFilters,
+        time_decay_multiplier: float,
+        num_to_retrieve: int = NUM_RETURNED_HITS,
+        offset: int = 0,
+        edit_keyword_query: bool = EDIT_KEYWORD_QUERY,
+    ) -> list[InferenceChunk]:
+        return _query_vespa(
+            self._build_keyword_query_params(
+                query=query,
+                filters=filters,
+                time_decay_multiplier=time_decay_multiplier,
+                num_to_retrieve=num_to_retrieve,
+                offset=offset,
+                edit_keyword_query=edit_keyword_query,
+            )
+        )
 
-    def semantic_retrieval(
+    async def async_keyword_retrieval(
         self,
         query: str,
-        query_embedding: list[float],
         filters: IndexFilters,
         time_decay_multiplier: float,
         num_to_retrieve: int = NUM_RETURNED_HITS,
         offset: int = 0,
-        distance_cutoff: float | None = SEARCH_DISTANCE_CUTOFF,
         edit_keyword_query: bool = EDIT_KEYWORD_QUERY,
     ) -> list[InferenceChunk]:
+        return await _async_query_vespa(
+            self._build_keyword_query_params(
+                query=query,
+                filters=filters,
+                time_decay_multiplier=time_decay_multiplier,
+                num_to_retrieve=num_to_retrieve,
+                offset=offset,
+                edit_keyword_query=edit_keyword_query,
+            )
+        )
+
+    def _build_semantic_query_params(
+        self,
+        query: str,
+        query_embedding: list[float],
+        filters: IndexFilters,
+        time_decay_multiplier: float,
+        num_to_retrieve: int,
+        offset: int,
+        edit_keyword_query: bool,
+    ) -> dict[str, str | int]:
         # IMPORTANT: THIS FUNCTION IS NOT UP TO DATE, DOES NOT WORK CORRECTLY
         vespa_where_clauses = _build_vespa_filters(filters)
         yql = (
@@ -1029,7 +1966,7 @@ class VespaIndex(DocumentIndex):
             else query
         )
 
-        params: dict[str, str | int] = {
+        return {
             "yql": yql,
             "query": query_keywords,  # Needed for highlighting
             "input.query(query_embedding)": str(query_embedding),
@@ -1037,24 +1974,66 @@ class VespaIndex(DocumentIndex):
             "hits": num_to_retrieve,
             "offset": offset,
             "ranking.profile": f"hybrid_search{len(query_embedding)}",
-            "timeout": _VESPA_TIMEOUT,
         }
 
-        return _query_vespa(params)
+    def semantic_retrieval(
+        self,
+        query: str,
+        query_embedding: list[float],
+        filters: IndexFilters,
+        time_decay_multiplier: float,
+        num_to_retrieve: int = NUM_RETURNED_HITS,
+        offset: int = 0,
+        distance_cutoff: float | None = SEARCH_DISTANCE_CUTOFF,
+        edit_keyword_query: bool = EDIT_KEYWORD_QUERY,
+    ) -> list[InferenceChunk]:
+        return _query_vespa(
+            self._build_semantic_query_params(
+                query=query,
+                query_embedding=query_embedding,
+                filters=filters,
+                time_decay_multiplier=time_decay_multiplier,
+                num_to_retrieve=num_to_retrieve,
+                offset=offset,
+                edit_keyword_query=edit_keyword_query,
+            )
+        )
 
-    def hybrid_retrieval(
+    async def async_semantic_retrieval(
         self,
         query: str,
         query_embedding: list[float],
         filters: IndexFilters,
         time_decay_multiplier: float,
-        num_to_retrieve: int,
+        num_to_retrieve: int = NUM_RETURNED_HITS,
         offset: int = 0,
-        hybrid_alpha: float | None = HYBRID_ALPHA,
-        title_content_ratio: float | None = TITLE_CONTENT_RATIO,
         distance_cutoff: float | None = SEARCH_DISTANCE_CUTOFF,
         edit_keyword_query: bool = EDIT_KEYWORD_QUERY,
     ) -> list[InferenceChunk]:
+        return await _async_query_vespa(
+            self._build_semantic_query_params(
+                query=query,
+                query_embedding=query_embedding,
+                filters=filters,
+                time_decay_multiplier=time_decay_multiplier,
+                num_to_retrieve=num_to_retrieve,
+                offset=offset,
+                edit_keyword_query=edit_keyword_query,
+            )
+        )
+
+    def _build_hybrid_query_params(
+        self,
+        query: str,
+        query_embedding: list[float],
+        filters: IndexFilters,
+        time_decay_multiplier: float,
+        num_to_retrieve: int,
+        offset: int,
+        hybrid_alpha: float | None,
+        title_content_ratio: float | None,
+        edit_keyword_query: bool,
+    ) -> dict[str, str | int | float]:
         vespa_where_clauses = _build_vespa_filters(filters)
         # Needs to be at least as much as the value set in Vespa schema config
         target_hits = max(10 * num_to_retrieve, 1000)
@@ -1073,7 +2052,7 @@ class VespaIndex(DocumentIndex):
             else query
         )
 
-        params: dict[str, str | int | float] = {
+        return {
             "yql": yql,
             "query": query_keywords,
             "input.query(query_embedding)": str(query_embedding),
@@ -1087,18 +2066,65 @@ class VespaIndex(DocumentIndex):
             "hits": num_to_retrieve,
             "offset": offset,
             "ranking.profile": f"hybrid_search{len(query_embedding)}",
-            "timeout": _VESPA_TIMEOUT,
         }
 
-        return _query_vespa(params)
+    def hybrid_retrieval(
+        self,
+        query: str,
+        query_embedding: list[float],
+        filters: IndexFilters,
+        time_decay_multiplier: float,
+        num_to_retrieve: int,
+        offset: int = 0,
+        hybrid_alpha: float | None = HYBRID_ALPHA,
+        title_content_ratio: float | None = TITLE_CONTENT_RATIO,
+        distance_cutoff: float | None = SEARCH_DISTANCE_CUTOFF,
+        edit_keyword_query: bool = EDIT_KEYWORD_QUERY,
+    ) -> list[InferenceChunk]:
+        return _query_vespa(
+            self._build_hybrid_query_params(
+                query=query,
+                query_embedding=query_embedding,
+                filters=filters,
+                time_decay_multiplier=time_decay_multiplier,
+                num_to_retrieve=num_to_retrieve,
+                offset=offset,
+                hybrid_alpha=hybrid_alpha,
+                title_content_ratio=title_content_ratio,
+                edit_keyword_query=edit_keyword_query,
+            )
+        )
 
-    def admin_retrieval(
+    async def async_hybrid_retrieval(
         self,
         query: str,
+        query_embedding: list[float],
         filters: IndexFilters,
-        num_to_retrieve: int = NUM_RETURNED_HITS,
+        time_decay_multiplier: float,
+        num_to_retrieve: int,
         offset: int = 0,
+        hybrid_alpha: float | None = HYBRID_ALPHA,
+        title_content_ratio: float | None = TITLE_CONTENT_RATIO,
+        distance_cutoff: float | None = SEARCH_DISTANCE_CUTOFF,
+        edit_keyword_query: bool = EDIT_KEYWORD_QUERY,
     ) -> list[InferenceChunk]:
+        return await _async_query_vespa(
+            self._build_hybrid_query_params(
+                query=query,
+                query_embedding=query_embedding,
+                filters=filters,
+                time_decay_multiplier=time_decay_multiplier,
+                num_to_retrieve=num_to_retrieve,
+                offset=offset,
+                hybrid_alpha=hybrid_alpha,
+                title_content_ratio=title_content_ratio,
+                edit_keyword_query=edit_keyword_query,
+            )
+        )
+
+    def _build_admin_query_params(
+        self, query: str, filters: IndexFilters, num_to_retrieve: int
+    ) -> dict[str, str | int]:
         vespa_where_clauses = _build_vespa_filters(filters, include_hidden=True)
         yql = (
             VespaIndex.yql_base.format(index_name=self.index_name)
@@ -1110,13 +2136,36 @@ class VespaIndex(DocumentIndex):
             + f'or ({{defaultIndex: "{CONTENT_SUMMARY}"}}userInput(@query)))'
         )
 
-        params: dict[str, str | int] = {
+        return {
             "yql": yql,
             "query": query,
             "hits": num_to_retrieve,
             "offset": 0,
             "ranking.profile": "admin_search",
-            "timeout": _VESPA_TIMEOUT,
         }
 
-        return _query_vespa(params)
+    def admin_retrieval(
+        self,
+        query: str,
+        filters: IndexFilters,
+        num_to_retrieve: int = NUM_RETURNED_HITS,
+        offset: int = 0,
+    ) -> list[InferenceChunk]:
+        return _query_vespa(
+            self._build_admin_query_params(
+                query=query, filters=filters, num_to_retrieve=num_to_retrieve
+            )
+        )
+
+    async def async_admin_retrieval(
+        self,
+        query: str,
+        filters: IndexFilters,
+        num_to_retrieve: int = NUM_RETURNED_HITS,
+        offset: int = 0,
+    ) -> list[InferenceChunk]:
+        return await _async_query_vespa(
+            self._build_admin_query_params(
+                query=query, filters=filters, num_to_retrieve=num_to_retrieve
+            )
+        )
@@ -10,3 +10,33 @@ def remove_invalid_unicode_chars(text: str) -> str:
     """Vespa does not take in unicode chars that aren't valid for XML.
     This removes them."""
     return _illegal_xml_chars_RE.sub("", text)
+
+
+def _escape_selection_string(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def build_document_ids_selection(document_ids: list[str], index_name: str) -> str:
+    """Document selection matching all chunks of any of the documents, lets a single visit or
+    delete request cover many documents instead of one request per document or chunk"""
+    if not document_ids:
+        raise ValueError("Selection needs at least one document id")
+    return (
+        "("
+        + " or ".join(
+            f'{index_name}.document_id=="{_escape_selection_string(document_id)}"'
+            for document_id in document_ids
+        )
+        + ")"
+    )
+
+
+def build_chunk_window_filter(
+    document_id: str, min_chunk_ind: int | None, max_chunk_ind: int
+) -> str:
+    """YQL predicate matching chunks `min_chunk_ind` to `max_chunk_ind` of a document"""
+    window_filter = f'document_id contains "{_escape_selection_string(document_id)}"'
+    if min_chunk_ind:
+        window_filter += f" and chunk_id >= {min_chunk_ind}"
+    window_filter += f" and chunk_id <= {max_chunk_ind}"
+    return f"({window_filter})"
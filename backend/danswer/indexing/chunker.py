@@ -1,9 +1,9 @@
 import abc
 from collections.abc import Callable
-from typing import TYPE_CHECKING
 
 from danswer.configs.app_configs import BLURB_SIZE
 from danswer.configs.app_configs import CHUNK_OVERLAP
+from danswer.configs.app_configs import ENABLE_MINI_CHUNK
 from danswer.configs.app_configs import MINI_CHUNK_SIZE
 from danswer.configs.constants import DocumentSource
 from danswer.configs.constants import SECTION_SEPARATOR
@@ -11,60 +11,71 @@ from danswer.configs.constants import TITLE_SEPARATOR
 from danswer.configs.model_configs import DOC_EMBEDDING_CONTEXT_SIZE
 from danswer.connectors.models import Document
 from danswer.indexing.models import DocAwareChunk
+from danswer.indexing.sentence_splitter import join_splits
+from danswer.indexing.sentence_splitter import SegmentedText
+from danswer.indexing.sentence_splitter import SentenceSegmenter
+from danswer.indexing.sentence_splitter import TextSplit
 from danswer.search.search_nlp_models import get_default_tokenizer
 from danswer.utils.logger import setup_logger
 from danswer.utils.text_processing import shared_precompare_cleanup
 
-if TYPE_CHECKING:
-    from transformers import AutoTokenizer  # type:ignore
-
-
 logger = setup_logger()
 
 ChunkFunc = Callable[[Document], list[DocAwareChunk]]
 
+# Keyed by the max split size, building one sets up a new Punkt sentence tokenizer
+_SEGMENTERS: dict[int, SentenceSegmenter] = {}
 
-def extract_blurb(text: str, blurb_size: int) -> str:
-    from llama_index.text_splitter import SentenceSplitter
 
-    token_count_func = get_default_tokenizer().tokenize
-    blurb_splitter = SentenceSplitter(
-        tokenizer=token_count_func, chunk_size=blurb_size, chunk_overlap=0
-    )
+def _get_segmenter(
+    chunk_size: int = DOC_EMBEDDING_CONTEXT_SIZE,
+    blurb_size: int = BLURB_SIZE,
+    mini_chunk_size: int | None = None,
+) -> SentenceSegmenter:
+    # Segmented finely enough for every size that is derived from the splits
+    sizes = [chunk_size, blurb_size]
+    if mini_chunk_size is not None:
+        sizes.append(mini_chunk_size)
+    max_split_tokens = min(sizes)
+    if max_split_tokens not in _SEGMENTERS:
+        _SEGMENTERS[max_split_tokens] = SentenceSegmenter(
+            tokenizer=get_default_tokenizer(), max_split_tokens=max_split_tokens
+        )
+    return _SEGMENTERS[max_split_tokens]
+
 
-    return blurb_splitter.split_text(text)[0]
+def extract_blurb(text: str, blurb_size: int) -> str:
+    segmenter = _get_segmenter(chunk_size=blurb_size, blurb_size=blurb_size)
+    return segmenter.segment([text])[0].blurb(blurb_size)
 
 
 def chunk_large_section(
-    section_text: str,
+    section: SegmentedText,
     section_link_text: str,
     document: Document,
     start_chunk_id: int,
-    tokenizer: "AutoTokenizer",
     chunk_size: int = DOC_EMBEDDING_CONTEXT_SIZE,
     chunk_overlap: int = CHUNK_OVERLAP,
     blurb_size: int = BLURB_SIZE,
+    mini_chunk_size: int | None = None,
 ) -> list[DocAwareChunk]:
-    from llama_index.text_splitter import SentenceSplitter
-
-    blurb = extract_blurb(section_text, blurb_size)
-
-    sentence_aware_splitter = SentenceSplitter(
-        tokenizer=tokenizer.tokenize, chunk_size=chunk_size, chunk_overlap=chunk_overlap
-    )
-
-    split_texts = sentence_aware_splitter.split_text(section_text)
+    blurb = section.blurb(blurb_size)
 
     chunks = [
         DocAwareChunk(
             source_document=document,
             chunk_id=start_chunk_id + chunk_ind,
             blurb=blurb,
-            content=chunk_str,
+            content=join_splits(chunk_section.splits),
             source_links={0: section_link_text},
             section_continuation=(chunk_ind != 0),
+            mini_chunk_texts=chunk_section.chunk_texts(mini_chunk_size)
+            if mini_chunk_size is not None
+            else None,
+        )
+        for chunk_ind, chunk_section in enumerate(
+            section.split_groups(chunk_size, chunk_overlap)
         )
-        for chunk_ind, chunk_str in enumerate(split_texts)
     ]
     return chunks
 
@@ -74,104 +85,114 @@ def chunk_document(
     chunk_tok_size: int = DOC_EMBEDDING_CONTEXT_SIZE,
     subsection_overlap: int = CHUNK_OVERLAP,
     blurb_size: int = BLURB_SIZE,
+    mini_chunk_size: int | None = None,
 ) -> list[DocAwareChunk]:
+    """Every section is segmented into sentences and tokenized exactly once, the chunks, blurbs
+    and mini-chunks (if `mini_chunk_size` is set) are all derived from these sentences. The
+    token count and the cleaned up length of the chunk being built are kept as running totals.
+    The separator is whitespace so neither tokens nor the cleanup span across it, summing the
+    parts gives the same values as recomputing them over the whole chunk text."""
     title = document.get_title_for_document_index()
     title_prefix = title.replace("\n", " ") + TITLE_SEPARATOR if title else ""
-    tokenizer = get_default_tokenizer()
+    segmenter = _get_segmenter(chunk_tok_size, blurb_size, mini_chunk_size)
+
+    section_texts = [
+        title_prefix + section.text if ind == 0 else section.text
+        for ind, section in enumerate(document.sections)
+    ]
+    segmented_sections = segmenter.segment(section_texts)
+    separator = TextSplit(
+        text=SECTION_SEPARATOR,
+        token_count=len(segmenter.tokenizer.tokenize(SECTION_SEPARATOR)),
+    )
 
     chunks: list[DocAwareChunk] = []
     link_offsets: dict[int, str] = {}
-    chunk_text = ""
-    for ind, section in enumerate(document.sections):
-        section_text = title_prefix + section.text if ind == 0 else section.text
-        section_link_text = section.link or ""
+    # Joined only when the chunk is complete, avoids re-copying the text for every section
+    chunk_text_parts: list[str] = []
+    chunk_sections: list[SegmentedText] = []
+    current_tok_length = 0
+    curr_offset_len = 0
+
+    def _add_chunk() -> None:
+        chunk = SegmentedText.concat(chunk_sections, separator)
+        chunks.append(
+            DocAwareChunk(
+                source_document=document,
+                chunk_id=len(chunks),
+                blurb=chunk.blurb(blurb_size),
+                content=SECTION_SEPARATOR.join(chunk_text_parts),
+                source_links=link_offsets,
+                section_continuation=False,
+                mini_chunk_texts=chunk.chunk_texts(mini_chunk_size)
+                if mini_chunk_size is not None
+                else None,
+            )
+        )
 
-        section_tok_length = len(tokenizer.tokenize(section_text))
-        current_tok_length = len(tokenizer.tokenize(chunk_text))
-        curr_offset_len = len(shared_precompare_cleanup(chunk_text))
+    for section, section_text, segmented_section in zip(
+        document.sections, section_texts, segmented_sections
+    ):
+        section_link_text = section.link or ""
+        section_tok_length = segmented_section.token_count
 
         # Large sections are considered self-contained/unique therefore they start a new chunk and are not concatenated
         # at the end by other sections
         if section_tok_length > chunk_tok_size:
-            if chunk_text:
-                chunks.append(
-                    DocAwareChunk(
-                        source_document=document,
-                        chunk_id=len(chunks),
-                        blurb=extract_blurb(chunk_text, blurb_size),
-                        content=chunk_text,
-                        source_links=link_offsets,
-                        section_continuation=False,
-                    )
-                )
+            if chunk_text_parts:
+                _add_chunk()
                 link_offsets = {}
-                chunk_text = ""
+                chunk_text_parts = []
+                chunk_sections = []
+                current_tok_length = 0
+                curr_offset_len = 0
 
             large_section_chunks = chunk_large_section(
-                section_text=section_text,
+                section=segmented_section,
                 section_link_text=section_link_text,
                 document=document,
                 start_chunk_id=len(chunks),
-                tokenizer=tokenizer,
                 chunk_size=chunk_tok_size,
                 chunk_overlap=subsection_overlap,
                 blurb_size=blurb_size,
+                mini_chunk_size=mini_chunk_size,
             )
             chunks.extend(large_section_chunks)
             continue
 
+        section_offset_len = len(shared_precompare_cleanup(section_text))
+        added_tok_length = section_tok_length + (
+            separator.token_count if chunk_text_parts else 0
+        )
+
         # In the case where the whole section is shorter than a chunk, either adding to chunk or start a new one
-        if (
-            current_tok_length
-            + len(tokenizer.tokenize(SECTION_SEPARATOR))
-            + section_tok_length
-            <= chunk_tok_size
-        ):
-            chunk_text += (
-                SECTION_SEPARATOR + section_text if chunk_text else section_text
-            )
+        if current_tok_length + added_tok_length <= chunk_tok_size:
             link_offsets[curr_offset_len] = section_link_text
+            if chunk_text_parts or section_text:
+                chunk_text_parts.append(section_text)
+                chunk_sections.append(segmented_section)
+                current_tok_length += added_tok_length
+            curr_offset_len += section_offset_len
         else:
-            chunks.append(
-                DocAwareChunk(
-                    source_document=document,
-                    chunk_id=len(chunks),
-                    blurb=extract_blurb(chunk_text, blurb_size),
-                    content=chunk_text,
-                    source_links=link_offsets,
-                    section_continuation=False,
-                )
-            )
+            _add_chunk()
             link_offsets = {0: section_link_text}
-            chunk_text = section_text
+            chunk_text_parts = [section_text] if section_text else []
+            chunk_sections = [segmented_section] if section_text else []
+            current_tok_length = section_tok_length
+            curr_offset_len = section_offset_len
 
     # Once we hit the end, if we're still in the process of building a chunk, add what we have
     # NOTE: if it's just whitespace, ignore it.
-    if chunk_text.strip():
-        chunks.append(
-            DocAwareChunk(
-                source_document=document,
-                chunk_id=len(chunks),
-                blurb=extract_blurb(chunk_text, blurb_size),
-                content=chunk_text,
-                source_links=link_offsets,
-                section_continuation=False,
-            )
-        )
+    if SECTION_SEPARATOR.join(chunk_text_parts).strip():
+        _add_chunk()
     return chunks
 
 
 def split_chunk_text_into_mini_chunks(
     chunk_text: str, mini_chunk_size: int = MINI_CHUNK_SIZE
 ) -> list[str]:
-    from llama_index.text_splitter import SentenceSplitter
-
-    token_count_func = get_default_tokenizer().tokenize
-    sentence_aware_splitter = SentenceSplitter(
-        tokenizer=token_count_func, chunk_size=mini_chunk_size, chunk_overlap=0
-    )
-
-    return sentence_aware_splitter.split_text(chunk_text)
+    segmenter = _get_segmenter(chunk_size=mini_chunk_size, blurb_size=mini_chunk_size)
+    return segmenter.segment([chunk_text])[0].chunk_texts(mini_chunk_size)
 
 
 class Chunker:
@@ -181,8 +202,14 @@ class Chunker:
 
 
 class DefaultChunker(Chunker):
+    def __init__(self, enable_mini_chunk: bool = ENABLE_MINI_CHUNK) -> None:
+        self.enable_mini_chunk = enable_mini_chunk
+
     def chunk(self, document: Document) -> list[DocAwareChunk]:
         # Specifically for reproducing an issue with gmail
         if document.source == DocumentSource.GMAIL:
             logger.debug(f"Chunking {document.semantic_identifier}")
-        return chunk_document(document)
+        return chunk_document(
+            document,
+            mini_chunk_size=MINI_CHUNK_SIZE if self.enable_mini_chunk else None,
+        )
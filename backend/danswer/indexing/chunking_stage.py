@@ -0,0 +1,92 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from types import TracebackType
+
+from danswer.configs.app_configs import NUM_CHUNKING_PROCESSES
+from danswer.connectors.models import Document
+from danswer.indexing.chunker import Chunker
+from danswer.indexing.models import DocAwareChunk
+from danswer.search.search_nlp_models import get_default_tokenizer
+from danswer.utils.logger import setup_logger
+
+logger = setup_logger()
+
+# Set in each worker process by the pool initializer
+_worker_chunker: Chunker | None = None
+
+
+def _init_chunking_worker(chunker: Chunker) -> None:
+    global _worker_chunker
+    _worker_chunker = chunker
+    # Load the tokenizer once per worker instead of with the first document it chunks
+    get_default_tokenizer()
+
+
+def _chunk_in_worker(document: Document) -> list[DocAwareChunk]:
+    if _worker_chunker is None:
+        raise RuntimeError("Chunking worker was not initialized")
+    return _worker_chunker.chunk(document=document)
+
+
+class ChunkingStage:
+    """Chunks batches of documents, on a pool of worker processes if `num_processes` > 0 or
+    in the current process otherwise. The chunker must be picklable to be sent to the workers.
+
+    Daemonic processes cannot start children, so the pool is only used when the indexing job
+    runs in a non-daemonic process: the SimpleJobClient's jobs but not Dask workers.
+
+    Safe to share between threads, the staged indexing pipeline chunks several batches at once
+    and each `chunk` call only waits on the documents it was given."""
+
+    def __init__(
+        self, chunker: Chunker, num_processes: int = NUM_CHUNKING_PROCESSES
+    ) -> None:
+        self.chunker = chunker
+        self._pool: ProcessPoolExecutor | None = None
+
+        if num_processes <= 0:
+            return
+        if multiprocessing.current_process().daemon:
+            logger.warning(
+                "Indexing job runs in a daemonic process which cannot start children, "
+                "chunking in process"
+            )
+            return
+        # Spawned rather than forked, the parent holds DB connections and thread pools
+        self._pool = ProcessPoolExecutor(
+            max_workers=num_processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_chunking_worker,
+            initargs=(chunker,),
+        )
+
+    def chunk(self, documents: list[Document]) -> list[DocAwareChunk]:
+        """Chunks of all the documents in order"""
+        if self._pool is None:
+            return list(
+                chain(
+                    *[self.chunker.chunk(document=document) for document in documents]
+                )
+            )
+
+        futures = [
+            self._pool.submit(_chunk_in_worker, document) for document in documents
+        ]
+        return list(chain(*[future.result() for future in futures]))
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def __enter__(self) -> "ChunkingStage":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.shutdown()
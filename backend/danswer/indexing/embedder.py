@@ -1,30 +1,80 @@
 from abc import ABC
 from abc import abstractmethod
+from typing import cast
 
 from sqlalchemy.orm import Session
 
 from danswer.configs.app_configs import ENABLE_MINI_CHUNK
 from danswer.configs.model_configs import BATCH_SIZE_ENCODE_CHUNKS
 from danswer.configs.model_configs import DOC_EMBEDDING_CONTEXT_SIZE
+from danswer.configs.model_configs import EMBEDDING_BATCH_TOKEN_BUDGET
 from danswer.db.embedding_model import get_current_db_embedding_model
 from danswer.db.embedding_model import get_secondary_db_embedding_model
 from danswer.db.models import EmbeddingModel as DbEmbeddingModel
 from danswer.db.models import IndexModelStatus
 from danswer.indexing.chunker import split_chunk_text_into_mini_chunks
+from danswer.indexing.embedding_cache import build_embedding_cache_key
+from danswer.indexing.embedding_cache import EmbeddingCache
+from danswer.indexing.embedding_cache import get_default_embedding_cache
 from danswer.indexing.models import ChunkEmbedding
 from danswer.indexing.models import DocAwareChunk
+from danswer.indexing.models import Embedding
 from danswer.indexing.models import IndexChunk
-from danswer.search.enums import EmbedTextType
 from danswer.search.search_nlp_models import EmbeddingModel
+from danswer.search.search_nlp_models import get_model_tokenizer
 from danswer.utils.batching import batch_list
 from danswer.utils.logger import setup_logger
 from shared_configs.configs import INDEXING_MODEL_SERVER_HOST
 from shared_configs.configs import MODEL_SERVER_PORT
+from shared_configs.enums import EmbedTextType
 
 
 logger = setup_logger()
 
 
+def get_token_lengths(
+    texts: list[str], max_length: int, model_name: str, passage_prefix: str | None
+) -> list[int]:
+    """Token counts as seen by the embedding model, with its tokenizer and the passage prefix
+    the model server is sent. Texts past the max length get truncated by the model so they
+    are capped here as well"""
+    if not texts:
+        return []
+
+    if passage_prefix:
+        texts = [passage_prefix + text for text in texts]
+
+    tokenizer = get_model_tokenizer(model_name)
+    # Fast tokenizers handle a list of texts in a single call
+    input_ids = tokenizer(texts, add_special_tokens=True, truncation=False)["input_ids"]
+    return [min(len(ids), max_length) for ids in input_ids]
+
+
+def batch_indices_by_token_budget(
+    token_lengths: list[int], token_budget: int
+) -> list[list[int]]:
+    """Sorts the texts by length and groups them so that the padded size of each batch
+    (longest member * number of members) stays within the token budget. Returns the indices
+    into the original list for each batch. A single text longer than the budget gets its own
+    batch."""
+    sorted_inds = sorted(range(len(token_lengths)), key=lambda ind: token_lengths[ind])
+
+    batches: list[list[int]] = []
+    current_batch: list[int] = []
+    for ind in sorted_inds:
+        # Sorted ascending, so the current text is always the longest in the batch
+        padded_size = max(token_lengths[ind], 1) * (len(current_batch) + 1)
+        if current_batch and padded_size > token_budget:
+            batches.append(current_batch)
+            current_batch = []
+        current_batch.append(ind)
+
+    if current_batch:
+        batches.append(current_batch)
+
+    return batches
+
+
 class IndexingEmbedder(ABC):
     def __init__(
         self,
@@ -50,9 +100,12 @@ class DefaultIndexingEmbedder(IndexingEmbedder):
         normalize: bool,
         query_prefix: str | None,
         passage_prefix: str | None,
+        embedding_cache: EmbeddingCache | None = None,
     ):
         super().__init__(model_name, normalize, query_prefix, passage_prefix)
         self.max_seq_length = DOC_EMBEDDING_CONTEXT_SIZE  # Currently not customizable
+        # Disabled unless EMBEDDING_CACHE_TYPE is set
+        self.embedding_cache = embedding_cache or get_default_embedding_cache()
 
         self.embedding_model = EmbeddingModel(
             model_name=model_name,
@@ -64,14 +117,99 @@ class DefaultIndexingEmbedder(IndexingEmbedder):
             server_port=MODEL_SERVER_PORT,
         )
 
+    def _encode_texts(
+        self,
+        texts: list[str],
+        batch_size: int,
+        token_budget: int,
+    ) -> list[Embedding]:
+        """Embeds passages with the model server, returning the embeddings in the same order
+        as the texts"""
+        if token_budget > 0:
+            token_lengths = get_token_lengths(
+                texts,
+                max_length=self.max_seq_length,
+                model_name=self.model_name,
+                passage_prefix=self.passage_prefix,
+            )
+            index_batches = batch_indices_by_token_budget(
+                token_lengths=token_lengths, token_budget=token_budget
+            )
+        else:
+            index_batches = batch_list(list(range(len(texts))), batch_size)
+
+        embeddings: list[Embedding | None] = [None] * len(texts)
+        len_index_batches = len(index_batches)
+        for batch_ind, index_batch in enumerate(index_batches, start=1):
+            logger.debug(f"Embedding texts batch {batch_ind} of {len_index_batches}")
+            # Normalize embeddings is only configured via model_configs.py, be sure to use right
+            # value for the set loss
+            batch_embeddings = self.embedding_model.encode_array(
+                [texts[ind] for ind in index_batch], text_type=EmbedTextType.PASSAGE
+            )
+
+            # Replace line above with the line below for easy debugging of indexing flow
+            # skipping the actual model
+            # batch_embeddings = np.zeros((len(index_batch), 384), dtype=np.float32)
+
+            for ind, embedding in zip(index_batch, batch_embeddings):
+                embeddings[ind] = embedding
+
+        return cast(list[Embedding], embeddings)
+
+    def _embed_texts(
+        self,
+        texts: list[str],
+        batch_size: int,
+        token_budget: int,
+    ) -> list[Embedding]:
+        """Same as `_encode_texts` but only texts missing from the embedding cache are sent
+        to the model server"""
+        if self.embedding_cache is None:
+            return self._encode_texts(texts, batch_size, token_budget)
+
+        cache_keys = [
+            build_embedding_cache_key(
+                model_name=self.model_name,
+                normalize=self.normalize,
+                prefix=self.passage_prefix,
+                text=text,
+            )
+            for text in texts
+        ]
+        embeddings = self.embedding_cache.get(cache_keys)
+
+        # Identical texts (such as a title repeated as a chunk) only need to be embedded once
+        missing_keys = list(
+            dict.fromkeys(key for key in cache_keys if key not in embeddings)
+        )
+        if missing_keys:
+            text_by_key = dict(zip(cache_keys, texts))
+            new_embeddings = dict(
+                zip(
+                    missing_keys,
+                    self._encode_texts(
+                        [text_by_key[key] for key in missing_keys],
+                        batch_size,
+                        token_budget,
+                    ),
+                )
+            )
+            self.embedding_cache.put(new_embeddings)
+            embeddings.update(new_embeddings)
+
+        logger.debug(
+            f"Embedding cache served {len(texts) - len(missing_keys)} of {len(texts)} texts"
+        )
+        return [embeddings[key] for key in cache_keys]
+
     def embed_chunks(
         self,
         chunks: list[DocAwareChunk],
         batch_size: int = BATCH_SIZE_ENCODE_CHUNKS,
         enable_mini_chunk: bool = ENABLE_MINI_CHUNK,
+        token_budget: int = EMBEDDING_BATCH_TOKEN_BUDGET,
     ) -> list[IndexChunk]:
-        # Cache the Title embeddings to only have to do it once
-        title_embed_dict: dict[str, list[float]] = {}
         embedded_chunks: list[IndexChunk] = []
 
         # Create Mini Chunks for more precise matching of details
@@ -80,31 +218,16 @@ class DefaultIndexingEmbedder(IndexingEmbedder):
         chunk_mini_chunks_count = {}
         for chunk_ind, chunk in enumerate(chunks):
             chunk_texts.append(chunk.content)
-            mini_chunk_texts = (
-                split_chunk_text_into_mini_chunks(chunk.content)
-                if enable_mini_chunk
-                else []
-            )
+            mini_chunk_texts: list[str] = []
+            if enable_mini_chunk:
+                mini_chunk_texts = (
+                    chunk.mini_chunk_texts
+                    if chunk.mini_chunk_texts is not None
+                    else split_chunk_text_into_mini_chunks(chunk.content)
+                )
             chunk_texts.extend(mini_chunk_texts)
             chunk_mini_chunks_count[chunk_ind] = 1 + len(mini_chunk_texts)
 
-        # Batching for embedding
-        text_batches = batch_list(chunk_texts, batch_size)
-
-        embeddings: list[list[float]] = []
-        len_text_batches = len(text_batches)
-        for idx, text_batch in enumerate(text_batches, start=1):
-            logger.debug(f"Embedding Content Texts batch {idx} of {len_text_batches}")
-            # Normalize embeddings is only configured via model_configs.py, be sure to use right
-            # value for the set loss
-            embeddings.extend(
-                self.embedding_model.encode(text_batch, text_type=EmbedTextType.PASSAGE)
-            )
-
-            # Replace line above with the line below for easy debugging of indexing flow
-            # skipping the actual model
-            # embeddings.extend([[0.0] * 384 for _ in range(len(text_batch))])
-
         chunk_titles = {
             chunk.source_document.get_title_for_document_index() for chunk in chunks
         }
@@ -112,17 +235,18 @@ class DefaultIndexingEmbedder(IndexingEmbedder):
         # Drop any None or empty strings
         chunk_titles_list = [title for title in chunk_titles if title]
 
-        # Embed Titles in batches
-        title_batches = batch_list(chunk_titles_list, batch_size)
-        len_title_batches = len(title_batches)
-        for ind_batch, title_batch in enumerate(title_batches, start=1):
-            logger.debug(f"Embedding Titles batch {ind_batch} of {len_title_batches}")
-            title_embeddings = self.embedding_model.encode(
-                title_batch, text_type=EmbedTextType.PASSAGE
-            )
-            title_embed_dict.update(
-                {title: vector for title, vector in zip(title_batch, title_embeddings)}
-            )
+        # Titles are embedded once per batch alongside the chunk contents so that they can be
+        # batched together with other short texts
+        all_embeddings = self._embed_texts(
+            texts=chunk_texts + chunk_titles_list,
+            batch_size=batch_size,
+            token_budget=token_budget,
+        )
+        embeddings = all_embeddings[: len(chunk_texts)]
+        # Cache the Title embeddings to only have to do it once
+        title_embed_dict: dict[str, Embedding] = dict(
+            zip(chunk_titles_list, all_embeddings[len(chunk_texts) :])
+        )
 
         # Mapping embeddings to chunks
         embedding_ind_start = 0
@@ -143,7 +267,7 @@ class DefaultIndexingEmbedder(IndexingEmbedder):
                     logger.error(
                         "Title had to be embedded separately, this should not happen!"
                     )
-                    title_embedding = self.embedding_model.encode(
+                    title_embedding = self.embedding_model.encode_array(
                         [title], text_type=EmbedTextType.PASSAGE
                     )[0]
                     title_embed_dict[title] = title_embedding
@@ -0,0 +1,214 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from abc import ABC
+from abc import abstractmethod
+
+import numpy as np
+
+from danswer.configs.app_configs import EMBEDDING_CACHE_MAX_ENTRIES
+from danswer.configs.app_configs import EMBEDDING_CACHE_SQLITE_PATH
+from danswer.configs.app_configs import EMBEDDING_CACHE_TYPE
+from danswer.db.embedding_cache import evict_least_recently_used_embeddings
+from danswer.db.embedding_cache import fetch_cached_embeddings
+from danswer.db.embedding_cache import upsert_cached_embeddings
+from danswer.db.engine import get_session_context_manager
+from danswer.indexing.models import Embedding
+from danswer.utils.logger import setup_logger
+
+logger = setup_logger()
+
+
+def build_embedding_cache_key(
+    model_name: str, normalize: bool, prefix: str | None, text: str
+) -> str:
+    """The same text only maps to the same embedding if the model, normalization and the
+    prefix prepended before encoding are all unchanged"""
+    settings = f"{model_name}\x00{normalize}\x00{prefix or ''}"
+    settings_hash = hashlib.sha256(settings.encode()).hexdigest()[:16]
+    text_hash = hashlib.sha256(text.encode()).hexdigest()
+    return f"{settings_hash}:{text_hash}"
+
+
+def serialize_embedding(embedding: Embedding) -> bytes:
+    # The model server computes float32 embeddings, so this is lossless
+    return np.asarray(embedding, dtype=np.float32).tobytes()
+
+
+def deserialize_embedding(data: bytes) -> Embedding:
+    return np.frombuffer(data, dtype=np.float32)
+
+
+class EmbeddingCache(ABC):
+    """Maps cache keys (see `build_embedding_cache_key`) to embeddings. Failures of the
+    underlying store are logged and treated as misses, the cache must never fail indexing.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # Counting the entries can be expensive, so eviction is only checked after roughly
+        # 1% of the capacity has been written
+        self._eviction_check_interval = max(1, max_entries // 100)
+        self._writes_since_eviction_check = self._eviction_check_interval
+
+    @abstractmethod
+    def _load(self, keys: list[str]) -> dict[str, bytes]:
+        """Returns the found entries and refreshes their last used time"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def _store(self, entries: dict[str, bytes]) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _evict(self, max_entries: int) -> int:
+        """Removes the least recently used entries past `max_entries`, returns the count"""
+        raise NotImplementedError
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get(self, keys: list[str]) -> dict[str, Embedding]:
+        unique_keys = list(set(keys))
+        try:
+            found = {
+                key: deserialize_embedding(data)
+                for key, data in self._load(unique_keys).items()
+            }
+        except Exception:
+            logger.exception("Failed to read from the embedding cache")
+            found = {}
+
+        self.hits += len(found)
+        self.misses += len(unique_keys) - len(found)
+        return found
+
+    def put(self, entries: dict[str, Embedding]) -> None:
+        if not entries:
+            return
+
+        try:
+            self._store({key: serialize_embedding(emb) for key, emb in entries.items()})
+
+            self._writes_since_eviction_check += len(entries)
+            if self._writes_since_eviction_check >= self._eviction_check_interval:
+                self._writes_since_eviction_check = 0
+                num_evicted = self._evict(self.max_entries)
+                if num_evicted:
+                    logger.info(f"Evicted {num_evicted} embeddings from the cache")
+        except Exception:
+            logger.exception("Failed to write to the embedding cache")
+
+
+class PostgresEmbeddingCache(EmbeddingCache):
+    def _load(self, keys: list[str]) -> dict[str, bytes]:
+        with get_session_context_manager() as db_session:
+            return fetch_cached_embeddings(keys, db_session)
+
+    def _store(self, entries: dict[str, bytes]) -> None:
+        with get_session_context_manager() as db_session:
+            upsert_cached_embeddings(entries, db_session)
+
+    def _evict(self, max_entries: int) -> int:
+        with get_session_context_manager() as db_session:
+            return evict_least_recently_used_embeddings(max_entries, db_session)
+
+
+class SqliteEmbeddingCache(EmbeddingCache):
+    """Local to the machine, suitable when all indexing runs in the same container"""
+
+    def __init__(self, db_path: str, max_entries: int) -> None:
+        super().__init__(max_entries)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        # Multiple indexing processes may share the file, WAL allows concurrent readers
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embedding_cache "
+            "(key TEXT PRIMARY KEY, embedding BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_embedding_cache_last_used "
+            "ON embedding_cache (last_used)"
+        )
+        self._conn.commit()
+
+    def _load(self, keys: list[str]) -> dict[str, bytes]:
+        found: dict[str, bytes] = {}
+        with self._lock:
+            # Stay under SQLite's limit on the number of bound variables
+            for start in range(0, len(keys), 500):
+                key_batch = keys[start : start + 500]
+                placeholders = ",".join("?" * len(key_batch))
+                rows = self._conn.execute(
+                    f"SELECT key, embedding FROM embedding_cache WHERE key IN ({placeholders})",
+                    key_batch,
+                ).fetchall()
+                found.update(rows)
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embedding_cache SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+                self._conn.commit()
+        return found
+
+    def _store(self, entries: dict[str, bytes]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embedding_cache (key, embedding, last_used) "
+                "VALUES (?, ?, ?)",
+                [(key, data, now) for key, data in entries.items()],
+            )
+            self._conn.commit()
+
+    def _evict(self, max_entries: int) -> int:
+        with self._lock:
+            (num_entries,) = self._conn.execute(
+                "SELECT COUNT(*) FROM embedding_cache"
+            ).fetchone()
+            num_to_evict = num_entries - max_entries
+            if num_to_evict <= 0:
+                return 0
+
+            self._conn.execute(
+                "DELETE FROM embedding_cache WHERE key IN "
+                "(SELECT key FROM embedding_cache ORDER BY last_used ASC LIMIT ?)",
+                (num_to_evict,),
+            )
+            self._conn.commit()
+            return num_to_evict
+
+
+_EMBEDDING_CACHE: EmbeddingCache | None = None
+
+
+def get_default_embedding_cache() -> EmbeddingCache | None:
+    """Returns the process wide embedding cache, or None if caching is disabled"""
+    global _EMBEDDING_CACHE
+
+    if _EMBEDDING_CACHE is not None or not EMBEDDING_CACHE_TYPE:
+        return _EMBEDDING_CACHE
+
+    if EMBEDDING_CACHE_TYPE == "postgres":
+        _EMBEDDING_CACHE = PostgresEmbeddingCache(
+            max_entries=EMBEDDING_CACHE_MAX_ENTRIES
+        )
+    elif EMBEDDING_CACHE_TYPE == "sqlite":
+        _EMBEDDING_CACHE = SqliteEmbeddingCache(
+            db_path=EMBEDDING_CACHE_SQLITE_PATH,
+            max_entries=EMBEDDING_CACHE_MAX_ENTRIES,
+        )
+    else:
+        raise ValueError(f"Unknown embedding cache type: {EMBEDDING_CACHE_TYPE}")
+
+    return _EMBEDDING_CACHE
@@ -1,10 +1,18 @@
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass
+from dataclasses import field
 from functools import partial
-from itertools import chain
 from typing import Protocol
 
 from sqlalchemy.orm import Session
 
 from danswer.access.access import get_access_for_documents
+from danswer.configs.app_configs import ENABLE_CHUNK_DIFF_INDEXING
+from danswer.configs.app_configs import INDEXING_CHUNK_WORKERS
+from danswer.configs.app_configs import INDEXING_EMBED_WORKERS
+from danswer.configs.app_configs import INDEXING_STAGE_QUEUE_SIZE
+from danswer.configs.app_configs import INDEXING_WRITE_WORKERS
 from danswer.configs.constants import DEFAULT_BOOST
 from danswer.connectors.cross_connector_utils.miscellaneous_utils import (
     get_experts_stores_representations,
@@ -13,28 +21,42 @@ from danswer.connectors.models import Document
 from danswer.connectors.models import IndexAttemptMetadata
 from danswer.db.document import get_documents_by_ids
 from danswer.db.document import prepare_to_modify_documents
+from danswer.db.document import update_docs_chunk_count__no_commit
 from danswer.db.document import update_docs_updated_at
 from danswer.db.document import upsert_documents_complete
 from danswer.db.document_set import fetch_document_sets_for_documents
+from danswer.db.engine import get_session_context_manager
 from danswer.db.models import Document as DBDocument
 from danswer.db.tag import create_or_add_document_tag
 from danswer.db.tag import create_or_add_document_tag_list
+from danswer.document_index.interfaces import ChunkHashes
 from danswer.document_index.interfaces import DocumentIndex
 from danswer.document_index.interfaces import DocumentMetadata
 from danswer.indexing.chunker import Chunker
 from danswer.indexing.chunker import DefaultChunker
+from danswer.indexing.chunking_stage import ChunkingStage
 from danswer.indexing.embedder import IndexingEmbedder
 from danswer.indexing.models import DocAwareChunk
+from danswer.indexing.models import DocMetadataAwareChunk
 from danswer.indexing.models import DocMetadataAwareIndexChunk
+from danswer.indexing.models import IndexChunk
+from danswer.search.search_result_cache import bump_index_generation
 from danswer.utils.logger import setup_logger
+from danswer.utils.staged_pipeline import Stage
+from danswer.utils.staged_pipeline import StagedPipeline
 from danswer.utils.timing import log_function_time
 
 logger = setup_logger()
 
+# How often a batch waiting on the write of an earlier batch checks whether the pipeline stopped
+_IN_FLIGHT_POLL_INTERVAL = 0.1
+
 
 class IndexingPipelineProtocol(Protocol):
     def __call__(
-        self, documents: list[Document], index_attempt_metadata: IndexAttemptMetadata
+        self,
+        documents: list[Document],
+        index_attempt_metadata: IndexAttemptMetadata,
     ) -> tuple[int, int]:
         ...
 
@@ -110,26 +132,15 @@ def get_doc_ids_to_update(
     return updatable_docs
 
 
-@log_function_time()
-def index_doc_batch(
-    *,
-    chunker: Chunker,
-    embedder: IndexingEmbedder,
-    document_index: DocumentIndex,
-    documents: list[Document],
-    index_attempt_metadata: IndexAttemptMetadata,
-    db_session: Session,
-    ignore_time_skip: bool = False,
-) -> tuple[int, int]:
-    """Takes different pieces of the indexing pipeline and applies it to a batch of documents
-    Note that the documents should already be batched at this point so that it does not inflate the
-    memory requirements"""
-    document_ids = [document.id for document in documents]
+def filter_updatable_docs(
+    documents: list[Document], db_session: Session, ignore_time_skip: bool = False
+) -> tuple[list[Document], dict[str, int]]:
+    """Returns the documents to (re)index along with the boost of those already in Postgres"""
     db_docs = get_documents_by_ids(
-        document_ids=document_ids,
+        document_ids=[document.id for document in documents],
         db_session=db_session,
     )
-    id_to_db_doc_map = {doc.id: doc for doc in db_docs}
+    id_to_boost = {doc.id: doc.boost for doc in db_docs}
 
     # Skip indexing docs that don't have a newer updated at
     # Shortcuts the time-consuming flow on connector index retries
@@ -138,25 +149,64 @@ def index_doc_batch(
         if not ignore_time_skip
         else documents
     )
-    updatable_ids = [doc.id for doc in updatable_docs]
+    return updatable_docs, id_to_boost
 
-    # Create records in the source of truth about these documents,
-    # does not include doc_updated_at which is also used to indicate a successful update
-    upsert_documents_in_db(
-        documents=documents,
-        index_attempt_metadata=index_attempt_metadata,
-        db_session=db_session,
-    )
 
-    logger.debug("Starting chunking")
+def get_existing_chunk_hashes(
+    document_index: DocumentIndex,
+    chunks: list[DocAwareChunk],
+    enable_chunk_diff: bool = ENABLE_CHUNK_DIFF_INDEXING,
+) -> dict[str, dict[int, ChunkHashes]] | None:
+    """Hashes of the indexed chunks of the documents being re-indexed, None if every chunk
+    must be embedded and written again"""
+    if not enable_chunk_diff or not chunks:
+        return None
+    document_ids = list(dict.fromkeys(chunk.source_document.id for chunk in chunks))
+    return document_index.get_chunk_hashes(document_ids)
 
-    # The first chunk additionally contains the Title of the Document
-    chunks: list[DocAwareChunk] = list(
-        chain(*[chunker.chunk(document=document) for document in updatable_docs])
-    )
 
-    logger.debug("Starting embedding")
-    chunks_with_embeddings = embedder.embed_chunks(chunks=chunks)
+def split_unchanged_chunks(
+    chunks: list[DocAwareChunk],
+    existing_hashes: dict[str, dict[int, ChunkHashes]],
+) -> tuple[list[DocAwareChunk], list[DocAwareChunk]]:
+    """Splits chunks into the ones that need to be embedded and the ones whose text is the same
+    as the chunk with the same id in the index, these keep their indexed embeddings"""
+    changed_chunks: list[DocAwareChunk] = []
+    unchanged_chunks: list[DocAwareChunk] = []
+    for chunk in chunks:
+        indexed_hashes = existing_hashes.get(chunk.source_document.id, {}).get(
+            chunk.chunk_id
+        )
+        if (
+            indexed_hashes is not None
+            and indexed_hashes.content_hash is not None
+            and indexed_hashes.content_hash == chunk.content_hash()
+        ):
+            unchanged_chunks.append(chunk)
+        else:
+            changed_chunks.append(chunk)
+    return changed_chunks, unchanged_chunks
+
+
+def write_chunks_to_index(
+    *,
+    document_index: DocumentIndex,
+    updatable_docs: list[Document],
+    chunks_with_embeddings: list[IndexChunk],
+    id_to_boost: dict[str, int],
+    db_session: Session,
+    unchanged_chunks: list[DocAwareChunk] | None = None,
+    existing_hashes: dict[str, dict[int, ChunkHashes]] | None = None,
+    record_chunk_counts: bool = True,
+) -> int:
+    """Writes the embedded chunks of the documents to the document index under the document
+    locks, returns the number of documents that were not in the index before
+
+    With `existing_hashes`, only the difference with what is already indexed is written, the
+    `unchanged_chunks` were not embedded and only have their metadata updated.
+    `record_chunk_counts` must be off when writing to an index other than the current one, the
+    counts stored in Postgres are those of the current index"""
+    updatable_ids = [doc.id for doc in updatable_docs]
 
     # Acquires a lock on the documents so that no other process can modify them
     # NOTE: don't need to acquire till here, since this is when the actual race condition
@@ -181,24 +231,39 @@ def index_doc_batch(
                 document_sets=set(
                     document_id_to_document_set.get(chunk.source_document.id, [])
                 ),
-                boost=(
-                    id_to_db_doc_map[chunk.source_document.id].boost
-                    if chunk.source_document.id in id_to_db_doc_map
-                    else DEFAULT_BOOST
-                ),
+                boost=id_to_boost.get(chunk.source_document.id, DEFAULT_BOOST),
             )
             for chunk in chunks_with_embeddings
         ]
 
         logger.debug(
-            f"Indexing the following chunks: {[chunk.to_short_descriptor() for chunk in chunks]}"
+            f"Indexing the following chunks: {[chunk.to_short_descriptor() for chunk in chunks_with_embeddings]}"
         )
         # A document will not be spread across different batches, so all the
         # documents with chunks in this set, are fully represented by the chunks
         # in this set
-        insertion_records = document_index.index(chunks=access_aware_chunks)
+        if existing_hashes is None:
+            insertion_records = document_index.index(chunks=access_aware_chunks)
+        else:
+            insertion_records = document_index.index_chunk_diff(
+                chunks=access_aware_chunks,
+                unchanged_chunks=[
+                    DocMetadataAwareChunk.from_doc_aware_chunk(
+                        chunk=chunk,
+                        access=document_id_to_access_info[chunk.source_document.id],
+                        document_sets=set(
+                            document_id_to_document_set.get(
+                                chunk.source_document.id, []
+                            )
+                        ),
+                        boost=id_to_boost.get(chunk.source_document.id, DEFAULT_BOOST),
+                    )
+                    for chunk in unchanged_chunks or []
+                ],
+                existing_hashes=existing_hashes,
+            )
 
-        successful_doc_ids = [record.document_id for record in insertion_records]
+        successful_doc_ids = {record.document_id for record in insertion_records}
         successful_docs = [
             doc for doc in updatable_docs if doc.id in successful_doc_ids
         ]
@@ -210,14 +275,85 @@ def index_doc_batch(
                 continue
             ids_to_new_updated_at[doc.id] = doc.doc_updated_at
 
+        # Lets the chunks of a document be addressed directly by id later on
+        ids_to_chunk_count: dict[str, int] = {}
+        for chunk in [*chunks_with_embeddings, *(unchanged_chunks or [])]:
+            doc_id = chunk.source_document.id
+            if doc_id in successful_doc_ids:
+                ids_to_chunk_count[doc_id] = max(
+                    ids_to_chunk_count.get(doc_id, 0), chunk.chunk_id + 1
+                )
+        if record_chunk_counts:
+            update_docs_chunk_count__no_commit(
+                ids_to_chunk_count=ids_to_chunk_count, db_session=db_session
+            )
+
         update_docs_updated_at(
             ids_to_new_updated_at=ids_to_new_updated_at, db_session=db_session
         )
 
-    return len([r for r in insertion_records if r.already_existed is False]), len(
-        chunks
+    return len([r for r in insertion_records if r.already_existed is False])
+
+
+@log_function_time()
+def index_doc_batch(
+    *,
+    chunking_stage: ChunkingStage,
+    embedder: IndexingEmbedder,
+    document_index: DocumentIndex,
+    documents: list[Document],
+    index_attempt_metadata: IndexAttemptMetadata,
+    db_session: Session,
+    ignore_time_skip: bool = False,
+    record_chunk_counts: bool = True,
+) -> tuple[int, int]:
+    """Takes different pieces of the indexing pipeline and applies it to a batch of documents
+    Note that the documents should already be batched at this point so that it does not inflate the
+    memory requirements"""
+    updatable_docs, id_to_boost = filter_updatable_docs(
+        documents=documents, db_session=db_session, ignore_time_skip=ignore_time_skip
+    )
+
+    # Create records in the source of truth about these documents,
+    # does not include doc_updated_at which is also used to indicate a successful update
+    upsert_documents_in_db(
+        documents=documents,
+        index_attempt_metadata=index_attempt_metadata,
+        db_session=db_session,
     )
 
+    logger.debug("Starting chunking")
+
+    # The first chunk additionally contains the Title of the Document
+    chunks: list[DocAwareChunk] = chunking_stage.chunk(updatable_docs)
+
+    existing_hashes = get_existing_chunk_hashes(
+        document_index=document_index, chunks=chunks
+    )
+    changed_chunks, unchanged_chunks = (
+        split_unchanged_chunks(chunks=chunks, existing_hashes=existing_hashes)
+        if existing_hashes is not None
+        else (chunks, [])
+    )
+
+    logger.debug("Starting embedding")
+    chunks_with_embeddings = embedder.embed_chunks(chunks=changed_chunks)
+
+    new_docs = write_chunks_to_index(
+        document_index=document_index,
+        updatable_docs=updatable_docs,
+        chunks_with_embeddings=chunks_with_embeddings,
+        id_to_boost=id_to_boost,
+        db_session=db_session,
+        unchanged_chunks=unchanged_chunks,
+        existing_hashes=existing_hashes,
+        record_chunk_counts=record_chunk_counts,
+    )
+    if updatable_docs:
+        bump_index_generation()
+
+    return new_docs, len(chunks)
+
 
 def build_indexing_pipeline(
     *,
@@ -225,16 +361,157 @@ def build_indexing_pipeline(
     document_index: DocumentIndex,
     db_session: Session,
     chunker: Chunker | None = None,
+    chunking_stage: ChunkingStage | None = None,
     ignore_time_skip: bool = False,
+    record_chunk_counts: bool = True,
 ) -> IndexingPipelineProtocol:
-    """Builds a pipline which takes in a list (batch) of docs and indexes them."""
-    chunker = chunker or DefaultChunker()
+    """Builds a pipline which takes in a list (batch) of docs and indexes them.
+
+    Pass a `chunking_stage` to chunk on worker processes, the caller owns it and shuts it down
+    once done. Otherwise documents are chunked in process with `chunker`. Turn off
+    `record_chunk_counts` for the future index, see `write_chunks_to_index`."""
+    chunking_stage = chunking_stage or ChunkingStage(
+        chunker or DefaultChunker(), num_processes=0
+    )
 
     return partial(
         index_doc_batch,
-        chunker=chunker,
+        chunking_stage=chunking_stage,
         embedder=embedder,
         document_index=document_index,
         ignore_time_skip=ignore_time_skip,
+        record_chunk_counts=record_chunk_counts,
         db_session=db_session,
     )
+
+
+@dataclass
+class IndexingBatch:
+    """A batch of documents moving through the stages of the staged indexing pipeline, each
+    stage fills in its part"""
+
+    documents: list[Document]
+    updatable_docs: list[Document] = field(default_factory=list)
+    id_to_boost: dict[str, int] = field(default_factory=dict)
+    chunks: list[DocAwareChunk] = field(default_factory=list)
+    # Only set when chunk diff indexing is enabled, see `split_unchanged_chunks`
+    unchanged_chunks: list[DocAwareChunk] = field(default_factory=list)
+    existing_hashes: dict[str, dict[int, ChunkHashes]] | None = None
+    chunks_with_embeddings: list[IndexChunk] = field(default_factory=list)
+    num_chunks: int = 0
+    new_docs: int = 0
+
+
+class _InFlightDocuments:
+    """Ids of the documents of the batches between the chunk and the write stage. A batch that
+    shares a document with an earlier batch waits for that batch to be written, otherwise it
+    would compare against what was indexed before it, leaving stale chunks behind"""
+
+    def __init__(self, is_stopped: Callable[[], bool]) -> None:
+        self._is_stopped = is_stopped
+        self._condition = threading.Condition()
+        self._document_ids: set[str] = set()
+
+    def add(self, document_ids: set[str]) -> bool:
+        """Waits until none of the documents are in flight, False if the pipeline stopped"""
+        with self._condition:
+            while not self._document_ids.isdisjoint(document_ids):
+                if self._is_stopped():
+                    return False
+                self._condition.wait(timeout=_IN_FLIGHT_POLL_INTERVAL)
+            self._document_ids |= document_ids
+            return True
+
+    def remove(self, document_ids: set[str]) -> None:
+        with self._condition:
+            self._document_ids -= document_ids
+            self._condition.notify_all()
+
+
+def build_staged_indexing_pipeline(
+    *,
+    embedder: IndexingEmbedder,
+    document_index: DocumentIndex,
+    chunking_stage: ChunkingStage,
+    index_attempt_metadata: IndexAttemptMetadata,
+    ignore_time_skip: bool = False,
+    record_chunk_counts: bool = True,
+    num_chunk_workers: int = INDEXING_CHUNK_WORKERS,
+    num_embed_workers: int = INDEXING_EMBED_WORKERS,
+    num_write_workers: int = INDEXING_WRITE_WORKERS,
+    queue_size: int = INDEXING_STAGE_QUEUE_SIZE,
+) -> StagedPipeline:
+    """Same steps as `index_doc_batch`, split into chunk -> embed -> write stages that work on
+    different batches at the same time. Run it over `IndexingBatch`es, each stage that needs
+    Postgres uses its own session per batch since sessions cannot be shared across threads.
+    A batch is only chunked once earlier batches with its documents are written."""
+
+    def _chunk(batch: IndexingBatch) -> IndexingBatch:
+        if not in_flight_documents.add({doc.id for doc in batch.documents}):
+            # Dropped by the stopped pipeline anyway
+            return batch
+
+        with get_session_context_manager() as db_session:
+            batch.updatable_docs, batch.id_to_boost = filter_updatable_docs(
+                documents=batch.documents,
+                db_session=db_session,
+                ignore_time_skip=ignore_time_skip,
+            )
+        batch.chunks = chunking_stage.chunk(batch.updatable_docs)
+        batch.num_chunks = len(batch.chunks)
+        batch.existing_hashes = get_existing_chunk_hashes(
+            document_index=document_index, chunks=batch.chunks
+        )
+        if batch.existing_hashes is not None:
+            batch.chunks, batch.unchanged_chunks = split_unchanged_chunks(
+                chunks=batch.chunks, existing_hashes=batch.existing_hashes
+            )
+        return batch
+
+    def _embed(batch: IndexingBatch) -> IndexingBatch:
+        batch.chunks_with_embeddings = embedder.embed_chunks(chunks=batch.chunks)
+        batch.chunks = []
+        return batch
+
+    def _write(batch: IndexingBatch) -> IndexingBatch:
+        try:
+            with get_session_context_manager() as db_session:
+                # Create records in the source of truth about these documents, does not
+                # include doc_updated_at which is also used to indicate a successful update
+                upsert_documents_in_db(
+                    documents=batch.documents,
+                    index_attempt_metadata=index_attempt_metadata,
+                    db_session=db_session,
+                )
+                batch.new_docs = write_chunks_to_index(
+                    document_index=document_index,
+                    updatable_docs=batch.updatable_docs,
+                    chunks_with_embeddings=batch.chunks_with_embeddings,
+                    id_to_boost=batch.id_to_boost,
+                    db_session=db_session,
+                    unchanged_chunks=batch.unchanged_chunks,
+                    existing_hashes=batch.existing_hashes,
+                    record_chunk_counts=record_chunk_counts,
+                )
+        finally:
+            in_flight_documents.remove({doc.id for doc in batch.documents})
+        # Committed by now, cached search results from before the write are stale
+        if batch.updatable_docs:
+            bump_index_generation()
+        batch.chunks_with_embeddings = []
+        batch.unchanged_chunks = []
+        batch.existing_hashes = None
+        return batch
+
+    pipeline = StagedPipeline(
+        stages=[
+            Stage(name="chunk", func=_chunk, num_workers=num_chunk_workers),
+            Stage(name="embed", func=_embed, num_workers=num_embed_workers),
+            Stage(name="write", func=_write, num_workers=num_write_workers),
+        ],
+        queue_size=queue_size,
+        count_units=lambda batch: len(batch.documents),
+        metric_prefix="indexing_stage",
+    )
+    in_flight_documents = _InFlightDocuments(is_stopped=lambda: pipeline.is_stopped)
+    return pipeline
@@ -1,5 +1,7 @@
+import hashlib
 from typing import TYPE_CHECKING
 
+import numpy as np
 from pydantic import BaseModel
 
 from danswer.access.models import DocumentAccess
@@ -13,13 +15,18 @@ if TYPE_CHECKING:
 logger = setup_logger()
 
 
-Embedding = list[float]
+# 1D float32 array, much more compact than a list of Python floats. Only converted to a list
+# when the chunk is written to the document index
+Embedding = np.ndarray
 
 
 class ChunkEmbedding(BaseModel):
     full_embedding: Embedding
     mini_chunk_embeddings: list[Embedding]
 
+    class Config:
+        arbitrary_types_allowed = True
+
 
 class BaseChunk(BaseModel):
     chunk_id: int
@@ -35,6 +42,9 @@ class DocAwareChunk(BaseChunk):
     # During indexing flow, we have access to a complete "Document"
     # During inference we only have access to the document id and do not reconstruct the Document
     source_document: Document
+    # Set by the chunker when mini-chunks are enabled, derived from the same sentence splits as
+    # the chunk itself
+    mini_chunk_texts: list[str] | None = None
 
     def to_short_descriptor(self) -> str:
         """Used when logging the identity of a chunk"""
@@ -42,11 +52,31 @@ class DocAwareChunk(BaseChunk):
             f"Chunk ID: '{self.chunk_id}'; {self.source_document.to_short_descriptor()}"
         )
 
+    def content_hash(self) -> str:
+        """Changes whenever any of the texts the embeddings of the chunk are computed
+        from changes, chunks with the same hash can reuse the embeddings already in the
+        index"""
+        hasher = hashlib.sha256()
+        texts = [
+            self.source_document.get_title_for_document_index() or "",
+            self.content,
+            # Mini-chunks being enabled or not also changes the embeddings
+            str(self.mini_chunk_texts is not None),
+            *(self.mini_chunk_texts or []),
+        ]
+        for text in texts:
+            hasher.update(text.encode())
+            hasher.update(b"\0")
+        return hasher.hexdigest()
+
 
 class IndexChunk(DocAwareChunk):
     embeddings: ChunkEmbedding
     title_embedding: Embedding | None
 
+    class Config:
+        arbitrary_types_allowed = True
+
 
 class DocMetadataAwareIndexChunk(IndexChunk):
     """An `IndexChunk` that contains all necessary metadata to be indexed. This includes
@@ -81,6 +111,30 @@ class DocMetadataAwareIndexChunk(IndexChunk):
         )
 
 
+class DocMetadataAwareChunk(DocAwareChunk):
+    """Same metadata as `DocMetadataAwareIndexChunk` for a chunk that is not re-embedded
+    because its text did not change since it was last indexed"""
+
+    access: "DocumentAccess"
+    document_sets: set[str]
+    boost: int
+
+    @classmethod
+    def from_doc_aware_chunk(
+        cls,
+        chunk: DocAwareChunk,
+        access: "DocumentAccess",
+        document_sets: set[str],
+        boost: int,
+    ) -> "DocMetadataAwareChunk":
+        return cls(
+            **chunk.dict(),
+            access=access,
+            document_sets=document_sets,
+            boost=boost,
+        )
+
+
 class EmbeddingModelDetail(BaseModel):
     model_name: str
     model_dim: int
@@ -0,0 +1,208 @@
+import re
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from transformers import AutoTokenizer  # type:ignore
+
+# Same split hierarchy as the llama_index SentenceSplitter used previously, from coarsest to finest
+_PARAGRAPH_SEPARATOR = "\n\n\n"
+_SECONDARY_SENTENCE_REGEX = "[^,.;。？！]+[,.;。？！]?"
+_WORD_SEPARATOR = " "
+
+
+@dataclass
+class TextSplit:
+    text: str
+    token_count: int
+
+
+def count_tokens_batched(texts: list[str], tokenizer: "AutoTokenizer") -> list[int]:
+    """Same counts as `len(tokenizer.tokenize(text))` for each text, fast tokenizers count the
+    whole list in a single call"""
+    if not texts:
+        return []
+    if getattr(tokenizer, "is_fast", False):
+        return [
+            len(input_ids)
+            for input_ids in tokenizer(texts, add_special_tokens=False)["input_ids"]
+        ]
+    return [len(tokenizer.tokenize(text)) for text in texts]
+
+
+def _split_keep_separator(text: str, separator: str) -> list[str]:
+    parts = text.split(separator)
+    return [part + separator for part in parts[:-1]] + parts[-1:]
+
+
+def merge_splits(
+    splits: list[TextSplit], chunk_size: int, chunk_overlap: int = 0
+) -> list[list[TextSplit]]:
+    """Greedily packs consecutive splits into groups of at most `chunk_size` tokens, the
+    start of each group repeats up to `chunk_overlap` tokens from the end of the previous
+    one. A split larger than `chunk_size` only overflows a group it starts. Groups that are
+    only whitespace are dropped."""
+    groups: list[list[TextSplit]] = []
+    current: list[TextSplit] = []
+    current_tok_count = 0
+    new_group = True
+
+    def _close_group() -> None:
+        nonlocal current, current_tok_count, new_group
+        groups.append(current)
+        previous = current
+        current = []
+        current_tok_count = 0
+        new_group = True
+        for split in reversed(previous):
+            if current_tok_count + split.token_count > chunk_overlap:
+                break
+            current.insert(0, split)
+            current_tok_count += split.token_count
+
+    split_ind = 0
+    while split_ind < len(splits):
+        split = splits[split_ind]
+        if current_tok_count + split.token_count > chunk_size and not new_group:
+            _close_group()
+        else:
+            current.append(split)
+            current_tok_count += split.token_count
+            new_group = False
+            split_ind += 1
+
+    if not new_group:
+        groups.append(current)
+
+    return [group for group in groups if join_splits(group)]
+
+
+def join_splits(splits: list[TextSplit]) -> str:
+    return "".join(split.text for split in splits).strip()
+
+
+class SegmentedText:
+    """A text cut into sentence level splits whose token counts are known. Chunks, blurbs
+    and mini-chunks are all derived from the same splits without tokenizing the text
+    again."""
+
+    def __init__(self, splits: list[TextSplit]) -> None:
+        self.splits = splits
+        self.token_count = sum(split.token_count for split in splits)
+
+    @classmethod
+    def concat(
+        cls, texts: list["SegmentedText"], separator: TextSplit
+    ) -> "SegmentedText":
+        splits: list[TextSplit] = []
+        for ind, text in enumerate(texts):
+            if ind:
+                splits.append(separator)
+            splits.extend(text.splits)
+        return cls(splits)
+
+    def split_groups(
+        self, chunk_size: int, chunk_overlap: int = 0
+    ) -> list["SegmentedText"]:
+        return [
+            SegmentedText(group)
+            for group in merge_splits(self.splits, chunk_size, chunk_overlap)
+        ]
+
+    def chunk_texts(self, chunk_size: int, chunk_overlap: int = 0) -> list[str]:
+        return [
+            join_splits(group)
+            for group in merge_splits(self.splits, chunk_size, chunk_overlap)
+        ]
+
+    def blurb(self, blurb_size: int) -> str:
+        """The first sentence(s) of the text, up to `blurb_size` tokens"""
+        blurb_splits: list[TextSplit] = []
+        blurb_tok_count = 0
+        for split in self.splits:
+            if blurb_splits and blurb_tok_count + split.token_count > blurb_size:
+                # Whitespace only splits do not count as content
+                if join_splits(blurb_splits):
+                    break
+            blurb_splits.append(split)
+            blurb_tok_count += split.token_count
+        return join_splits(blurb_splits)
+
+
+class SentenceSegmenter:
+    """Segments texts into sentences, then only the sentences longer than `max_split_tokens`
+    are cut further into phrases, words and finally characters. Token counts of all the texts
+    passed in one call are computed in a single batched tokenizer call."""
+
+    def __init__(self, tokenizer: "AutoTokenizer", max_split_tokens: int) -> None:
+        import nltk  # type:ignore
+
+        self.tokenizer = tokenizer
+        self.max_split_tokens = max_split_tokens
+        # Untrained Punkt, does not need any downloaded data
+        self._sentence_tokenizer = nltk.tokenize.PunktSentenceTokenizer()
+        self._secondary_regex = re.compile(_SECONDARY_SENTENCE_REGEX)
+
+    def _split_sentences(self, text: str) -> list[str]:
+        starts = [start for start, _ in self._sentence_tokenizer.span_tokenize(text)]
+        if not starts:
+            return [text] if text else []
+        # Each sentence keeps the whitespace around it so that joining them gives back the
+        # original text
+        starts[0] = 0
+        ends = starts[1:] + [len(text)]
+        return [text[start:end] for start, end in zip(starts, ends)]
+
+    def _finer_splitters(self) -> list[Callable[[str], list[str]]]:
+        return [
+            self._secondary_regex.findall,
+            lambda text: _split_keep_separator(text, _WORD_SEPARATOR),
+            list,
+        ]
+
+    def _split_oversized(self, text: str, splitter_ind: int) -> list[TextSplit]:
+        splitters = self._finer_splitters()
+        parts = [part for part in splitters[splitter_ind](text) if part]
+        if len(parts) <= 1 and splitter_ind + 1 < len(splitters):
+            return self._split_oversized(text, splitter_ind + 1)
+
+        splits = []
+        for part, token_count in zip(
+            parts, count_tokens_batched(parts, self.tokenizer)
+        ):
+            if token_count > self.max_split_tokens and splitter_ind + 1 < len(
+                splitters
+            ):
+                splits.extend(self._split_oversized(part, splitter_ind + 1))
+            else:
+                splits.append(TextSplit(text=part, token_count=token_count))
+        return splits
+
+    def segment(self, texts: list[str]) -> list[SegmentedText]:
+        texts_sentences = [
+            [
+                sentence
+                for paragraph in _split_keep_separator(text, _PARAGRAPH_SEPARATOR)
+                for sentence in self._split_sentences(paragraph)
+            ]
+            for text in texts
+        ]
+        token_counts = iter(
+            count_tokens_batched(
+                [sentence for sentences in texts_sentences for sentence in sentences],
+                self.tokenizer,
+            )
+        )
+
+        segmented_texts = []
+        for sentences in texts_sentences:
+            splits: list[TextSplit] = []
+            for sentence in sentences:
+                token_count = next(token_counts)
+                if token_count > self.max_split_tokens:
+                    splits.extend(self._split_oversized(sentence, 0))
+                else:
+                    splits.append(TextSplit(text=sentence, token_count=token_count))
+            segmented_texts.append(SegmentedText(splits))
+        return segmented_texts
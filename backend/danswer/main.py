@@ -79,6 +79,7 @@ from danswer.server.settings.api import basic_router as settings_router
 from danswer.tools.built_in_tools import auto_add_search_tool_to_personas
 from danswer.tools.built_in_tools import load_builtin_tools
 from danswer.tools.built_in_tools import refresh_built_in_tools_cache
+from danswer.utils.chunk_counts import backfill_chunk_counts_nonblocking
 from danswer.utils.logger import setup_logger
 from danswer.utils.telemetry import optional_telemetry
 from danswer.utils.telemetry import RecordType
@@ -230,6 +231,9 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
                 logger.info(f"Waiting on Vespa, retrying in {wait_time} seconds...")
                 time.sleep(wait_time)
 
+        # Documents indexed before chunk counts were tracked, or before an index swap
+        backfill_chunk_counts_nonblocking(should_check_if_already_done=True)
+
     logger.info(f"Model Server: http://{MODEL_SERVER_HOST}:{MODEL_SERVER_PORT}")
     warm_up_encoders(
         model_name=db_embedding_model.model_name,
@@ -10,6 +10,7 @@ from danswer.chat.models import DanswerAnswerPiece
 from danswer.chat.models import DanswerContexts
 from danswer.chat.models import DanswerQuotes
 from danswer.chat.models import LLMRelevanceFilterResponse
+from danswer.chat.models import ProvisionalQADocsResponse
 from danswer.chat.models import QADocsResponse
 from danswer.chat.models import StreamingError
 from danswer.configs.chat_configs import MAX_CHUNKS_FED_TO_CHAT
@@ -36,6 +37,7 @@ from danswer.one_shot_answer.models import DirectQARequest
 from danswer.one_shot_answer.models import OneShotQAResponse
 from danswer.one_shot_answer.models import QueryRephrase
 from danswer.one_shot_answer.qa_utils import combine_message_thread
+from danswer.search.models import InferenceChunk
 from danswer.search.models import RerankMetricsContainer
 from danswer.search.models import RetrievalMetricsContainer
 from danswer.search.utils import chunks_or_sections_to_search_docs
@@ -44,6 +46,7 @@ from danswer.secondary_llm_flows.query_expansion import thread_based_query_rephr
 from danswer.server.query_and_chat.models import ChatMessageDetail
 from danswer.server.utils import get_json_line
 from danswer.tools.force import ForceUseTool
+from danswer.tools.search.search_tool import SEARCH_PROVISIONAL_RESULTS_ID
 from danswer.tools.search.search_tool import SEARCH_RESPONSE_SUMMARY_ID
 from danswer.tools.search.search_tool import SearchResponseSummary
 from danswer.tools.search.search_tool import SearchTool
@@ -57,6 +60,7 @@ logger = setup_logger()
 
 AnswerObjectIterator = Iterator[
     QueryRephrase
+    | ProvisionalQADocsResponse
     | QADocsResponse
     | LLMRelevanceFilterResponse
     | DanswerAnswerPiece
@@ -89,6 +93,7 @@ def stream_answer_objects(
     rerank_metrics_callback: Callable[[RerankMetricsContainer], None] | None = None,
 ) -> AnswerObjectIterator:
     """Streams in order:
+    0. [conditional] Retrieved documents before reranking, if provisional results are enabled
     1. [always] Retrieved documents, stops flow if nothing is found
     2. [conditional] LLM selected chunk indices if LLM chunk filtering is turned on
     3. [always] A set of streamed DanswerAnswerPiece and DanswerQuotes at the end
@@ -196,7 +201,13 @@ def stream_answer_objects(
     for packet in cast(AnswerObjectIterator, answer.processed_streamed_output):
         # for one-shot flow, don't currently do anything with these
         if isinstance(packet, ToolResponse):
-            if packet.id == SEARCH_RESPONSE_SUMMARY_ID:
+            if packet.id == SEARCH_PROVISIONAL_RESULTS_ID:
+                yield ProvisionalQADocsResponse(
+                    provisional_documents=chunks_or_sections_to_search_docs(
+                        cast(list[InferenceChunk], packet.response)
+                    )
+                )
+            elif packet.id == SEARCH_RESPONSE_SUMMARY_ID:
                 search_response_summary = cast(SearchResponseSummary, packet.response)
 
                 top_docs = chunks_or_sections_to_search_docs(
@@ -1,4 +1,6 @@
+import asyncio
 from collections import defaultdict
+from collections.abc import AsyncGenerator
 from collections.abc import Callable
 from collections.abc import Generator
 from typing import cast
@@ -7,22 +9,40 @@ from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from danswer.configs.chat_configs import MULTILINGUAL_QUERY_EXPANSION
+from danswer.db.document import get_document_chunk_counts
 from danswer.db.embedding_model import get_current_db_embedding_model
+from danswer.db.models import EmbeddingModel as DbEmbeddingModel
 from danswer.db.models import User
 from danswer.document_index.factory import get_default_document_index
+from danswer.document_index.interfaces import ChunkWindow
 from danswer.search.enums import QueryFlow
 from danswer.search.enums import SearchType
-from danswer.search.models import IndexFilters
 from danswer.search.models import InferenceChunk
 from danswer.search.models import InferenceSection
 from danswer.search.models import RerankMetricsContainer
 from danswer.search.models import RetrievalMetricsContainer
 from danswer.search.models import SearchQuery
 from danswer.search.models import SearchRequest
+from danswer.search.postprocessing.postprocessing import async_search_postprocessing
 from danswer.search.postprocessing.postprocessing import search_postprocessing
-from danswer.search.preprocessing.preprocessing import retrieval_preprocessing
+from danswer.search.preprocessing.access_filters import build_access_filters_for_user
+from danswer.search.preprocessing.danswer_helper import async_query_intent
+from danswer.search.preprocessing.danswer_helper import query_intent
+from danswer.search.preprocessing.preprocessing import async_search_query_preprocessing
+from danswer.search.preprocessing.preprocessing import get_search_type
+from danswer.search.preprocessing.preprocessing import search_query_preprocessing
+from danswer.search.retrieval.search_runner import async_embed_query
+from danswer.search.retrieval.search_runner import async_retrieve_chunks
+from danswer.search.retrieval.search_runner import build_query_embedding_model
+from danswer.search.retrieval.search_runner import embed_query
 from danswer.search.retrieval.search_runner import retrieve_chunks
-from danswer.utils.threadpool_concurrency import run_functions_tuples_in_parallel
+from danswer.search.search_result_cache import build_search_cache_key
+from danswer.search.search_result_cache import CachedSearchResult
+from danswer.search.search_result_cache import get_index_generation
+from danswer.search.search_result_cache import get_search_result_cache
+from danswer.utils.threadpool_concurrency import get_executor
+from danswer.utils.threadpool_concurrency import run_in_executor
+from danswer.utils.threadpool_concurrency import TaskFuture
 
 
 class ChunkRange(BaseModel):
@@ -49,6 +69,110 @@ def merge_chunk_intervals(chunk_ranges: list[ChunkRange]) -> list[ChunkRange]:
     return ans
 
 
+class SectionExpansion(BaseModel):
+    """The chunks to fetch around a center chunk, None bounds mean the start / end of the
+    document"""
+
+    chunk: InferenceChunk
+    min_chunk_ind: int | None
+    max_chunk_ind: int | None
+
+
+def plan_section_expansions(
+    search_query: SearchQuery, chunks: list[InferenceChunk]
+) -> list[SectionExpansion] | None:
+    """Returns None if the chunks do not need to be expanded into larger sections"""
+    if (
+        not search_query.chunks_above
+        and not search_query.chunks_below
+        and not search_query.full_doc
+    ):
+        return None
+
+    # Full doc setting takes priority
+    if search_query.full_doc:
+        seen_document_ids = set()
+        expansions = []
+        for chunk in chunks:
+            if chunk.document_id not in seen_document_ids:
+                seen_document_ids.add(chunk.document_id)
+                expansions.append(
+                    SectionExpansion(
+                        chunk=chunk, min_chunk_ind=None, max_chunk_ind=None
+                    )
+                )
+        return expansions
+
+    # General flow:
+    # - Combine chunks into lists by document_id
+    # - For each document, run merge-intervals to get combined ranges
+    # - Fetch all of the new chunks with contents for the combined ranges
+    # - Map it back to the combined ranges (which each know their "center" chunk)
+    # - Reiterate the chunks again and map to the results above based on the chunk.
+    #   This maintains the original chunks ordering. Note, we cannot simply sort by score here
+    #   as reranking flow may wipe the scores for a lot of the chunks.
+    doc_chunk_ranges_map = defaultdict(list)
+    for chunk in chunks:
+        doc_chunk_ranges_map[chunk.document_id].append(
+            ChunkRange(
+                chunk=chunk,
+                start=max(0, chunk.chunk_id - search_query.chunks_above),
+                # No max known ahead of time, filter will handle this anyway
+                end=chunk.chunk_id + search_query.chunks_below,
+            )
+        )
+
+    return [
+        SectionExpansion(
+            chunk=chunk_range.chunk,
+            min_chunk_ind=chunk_range.start,
+            max_chunk_ind=chunk_range.end,
+        )
+        for doc_ranges in doc_chunk_ranges_map.values()
+        for chunk_range in merge_chunk_intervals(doc_ranges)
+    ]
+
+
+def build_chunk_windows(
+    expansions: list[SectionExpansion], db_session: Session
+) -> list[ChunkWindow]:
+    # Known chunk counts bound the full doc expansions so they can go in the single query
+    doc_id_to_chunk_count = get_document_chunk_counts(
+        document_ids=[expansion.chunk.document_id for expansion in expansions],
+        db_session=db_session,
+    )
+    # There is no chunk level permissioning, this expansion around chunks can be assumed
+    # to be safe
+    return [
+        ChunkWindow(
+            document_id=expansion.chunk.document_id,
+            min_chunk_ind=expansion.min_chunk_ind,
+            max_chunk_ind=expansion.max_chunk_ind,
+            chunk_count=doc_id_to_chunk_count.get(expansion.chunk.document_id),
+        )
+        for expansion in expansions
+    ]
+
+
+def assemble_sections(
+    chunks: list[InferenceChunk],
+    expansions: list[SectionExpansion],
+    expansion_contents: list[list[str]],
+) -> list[InferenceSection]:
+    """Chunks that were merged into the section of another chunk are dropped, the rest keep
+    their original order. `expansion_contents` are the contents of the chunks of each
+    expansion, in chunk order"""
+    combined_contents = {
+        expansion.chunk: "\n".join(contents)
+        for expansion, contents in zip(expansions, expansion_contents)
+    }
+    return [
+        InferenceSection.from_chunk(chunk, content=combined_contents[chunk])
+        for chunk in chunks
+        if chunk in combined_contents
+    ]
+
+
 class SearchPipeline:
     def __init__(
         self,
@@ -87,6 +211,18 @@ class SearchPipeline:
         # as the indices no longer match. Can be implemented later as needed
         self.ran_merge_chunk = False
 
+        # Search result cache state, the key and generation are set by preprocessing
+        self._result_cache = get_search_result_cache()
+        self._cache_key: str | None = None
+        self._index_generation = ""
+        self._cached_reranked_chunks: list[InferenceChunk] | None = None
+
+        # Started by preprocessing, neither is needed to build the search query
+        self._query_embedding_future: TaskFuture[list[float]] | None = None
+        self._query_intent_future: TaskFuture[
+            tuple[SearchType, QueryFlow]
+        ] | None = None
+
         # generator state
         self._postprocessing_generator: Generator[
             list[InferenceChunk] | list[str], None, None
@@ -107,134 +243,115 @@ class SearchPipeline:
             # Should never happen
             raise RuntimeError("Failed in Query Preprocessing")
 
-        functions_with_args: list[tuple[Callable, tuple]] = []
-        final_inference_sections = []
-
+        expansions = plan_section_expansions(self._search_query, chunks)
         # Nothing to combine, just return the chunks
-        if (
-            not self._search_query.chunks_above
-            and not self._search_query.chunks_below
-            and not self._search_query.full_doc
-        ):
+        if expansions is None:
             return [InferenceSection.from_chunk(chunk) for chunk in chunks]
 
         # If chunk merges have been run, LLM reranking loses meaning
         # Needs reimplementation, out of scope for now
         self.ran_merge_chunk = True
 
-        # Full doc setting takes priority
-        if self._search_query.full_doc:
-            seen_document_ids = set()
-            unique_chunks = []
-            for chunk in chunks:
-                if chunk.document_id not in seen_document_ids:
-                    seen_document_ids.add(chunk.document_id)
-                    unique_chunks.append(chunk)
-
-                    functions_with_args.append(
-                        (
-                            self.document_index.id_based_retrieval,
-                            (
-                                chunk.document_id,
-                                None,  # Start chunk ind
-                                None,  # End chunk ind
-                                # There is no chunk level permissioning, this expansion around chunks
-                                # can be assumed to be safe
-                                IndexFilters(access_control_list=None),
-                            ),
-                        )
-                    )
-
-            list_inference_chunks = run_functions_tuples_in_parallel(
-                functions_with_args, allow_failures=False
-            )
+        # list of list of chunk contents where the inner list needs to be combined
+        list_chunk_contents = self.document_index.chunk_windows_content_retrieval(
+            build_chunk_windows(expansions, self.db_session)
+        )
 
-            for ind, chunk in enumerate(unique_chunks):
-                inf_chunks = list_inference_chunks[ind]
-                combined_content = "\n".join([chunk.content for chunk in inf_chunks])
-                final_inference_sections.append(
-                    InferenceSection.from_chunk(chunk, content=combined_content)
-                )
+        return assemble_sections(chunks, expansions, list_chunk_contents)
 
-            return final_inference_sections
-
-        # General flow:
-        # - Combine chunks into lists by document_id
-        # - For each document, run merge-intervals to get combined ranges
-        # - Fetch all of the new chunks with contents for the combined ranges
-        # - Map it back to the combined ranges (which each know their "center" chunk)
-        # - Reiterate the chunks again and map to the results above based on the chunk.
-        #   This maintains the original chunks ordering. Note, we cannot simply sort by score here
-        #   as reranking flow may wipe the scores for a lot of the chunks.
-        doc_chunk_ranges_map = defaultdict(list)
-        for chunk in chunks:
-            doc_chunk_ranges_map[chunk.document_id].append(
-                ChunkRange(
-                    chunk=chunk,
-                    start=max(0, chunk.chunk_id - self._search_query.chunks_above),
-                    # No max known ahead of time, filter will handle this anyway
-                    end=chunk.chunk_id + self._search_query.chunks_below,
-                )
-            )
+    """Pre-processing"""
 
-        merged_ranges = [
-            merge_chunk_intervals(ranges) for ranges in doc_chunk_ranges_map.values()
-        ]
-        reverse_map = {r.chunk: r for doc_ranges in merged_ranges for r in doc_ranges}
-
-        for chunk_range in reverse_map.values():
-            functions_with_args.append(
-                (
-                    self.document_index.id_based_retrieval,
-                    (
-                        chunk_range.chunk.document_id,
-                        chunk_range.start,
-                        chunk_range.end,
-                        # There is no chunk level permissioning, this expansion around chunks
-                        # can be assumed to be safe
-                        IndexFilters(access_control_list=None),
-                    ),
-                )
+    def _use_cached_result(self, cached_result: CachedSearchResult) -> None:
+        self._search_query = cached_result.search_query
+        self._predicted_search_type = cached_result.predicted_search_type
+        self._predicted_flow = cached_result.predicted_flow
+        self._retrieved_chunks = cached_result.retrieved_chunks
+        self._cached_reranked_chunks = cached_result.reranked_chunks
+        if self._predicted_search_type is None or self._predicted_flow is None:
+            # Cached before the intent of the search that cached it resolved
+            self._query_intent_future = get_executor().submit(
+                query_intent, self.search_request.query
             )
 
-        # list of list of inference chunks where the inner list needs to be combined for content
-        list_inference_chunks = run_functions_tuples_in_parallel(
-            functions_with_args, allow_failures=False
+    def _cache_retrieved_chunks(self) -> None:
+        if self._result_cache is None or self._cache_key is None:
+            return
+
+        # Does not wait on the query intent, `_cache_query_intent` adds it once it resolves
+        self._result_cache.put(
+            self._cache_key,
+            self._index_generation,
+            CachedSearchResult(
+                search_query=self.search_query,
+                predicted_search_type=self._predicted_search_type,
+                predicted_flow=self._predicted_flow,
+                retrieved_chunks=cast(list[InferenceChunk], self._retrieved_chunks),
+            ),
         )
 
-        for ind, chunk_range in enumerate(reverse_map.values()):
-            inf_chunks = list_inference_chunks[ind]
-            combined_content = "\n".join([chunk.content for chunk in inf_chunks])
-            chunk_range.combined_content = combined_content
+    def _cache_query_intent(self) -> None:
+        if self._result_cache is None or self._cache_key is None:
+            return
+        if self._predicted_search_type is None or self._predicted_flow is None:
+            return
+
+        self._result_cache.update_query_intent(
+            self._cache_key,
+            self._index_generation,
+            self._predicted_search_type,
+            self._predicted_flow,
+        )
 
-        for chunk in chunks:
-            if chunk not in reverse_map:
-                continue
-            chunk_range = reverse_map[chunk]
-            final_inference_sections.append(
-                InferenceSection.from_chunk(
-                    chunk_range.chunk, content=chunk_range.combined_content
-                )
+    def _run_preprocessing(self) -> None:
+        if self._result_cache is not None:
+            # Read first, an index write during this search must invalidate its result
+            self._index_generation = get_index_generation()
+            self._cache_key = build_search_cache_key(
+                search_request=self.search_request,
+                access_control_list=None
+                if self.bypass_acl
+                else build_access_filters_for_user(self.user, self.db_session),
+                index_name=self.embedding_model.index_name,
+                multilingual_expansion=MULTILINGUAL_QUERY_EXPANSION,
             )
+            cached_result = self._result_cache.get(
+                self._cache_key, self._index_generation
+            )
+            if cached_result is not None:
+                self._use_cached_result(cached_result)
+                return
+
+        # Neither the query embedding nor the query intent depend on the filters extracted by
+        # the LLM. They run concurrently with the extraction, retrieval is dispatched as soon
+        # as the filters are known and does not wait on the intent
+        executor = get_executor()
+        if get_search_type(self.search_request) != SearchType.KEYWORD:
+            self._query_embedding_future = executor.submit(
+                embed_query,
+                build_query_embedding_model(self.embedding_model),
+                self.search_request.query,
+            )
+        self._query_intent_future = executor.submit(
+            query_intent, self.search_request.query
+        )
 
-        return final_inference_sections
-
-    """Pre-processing"""
-
-    def _run_preprocessing(self) -> None:
-        (
-            final_search_query,
-            predicted_search_type,
-            predicted_flow,
-        ) = retrieval_preprocessing(
+        self._search_query = search_query_preprocessing(
             search_request=self.search_request,
             user=self.user,
             db_session=self.db_session,
             bypass_acl=self.bypass_acl,
         )
-        self._predicted_search_type = predicted_search_type
-        self._predicted_flow = predicted_flow
-        self._search_query = final_search_query
+
+    def _wait_for_query_intent(self) -> None:
+        if self._search_query is None:
+            self._run_preprocessing()
+        if self._query_intent_future is not None:
+            (
+                self._predicted_search_type,
+                self._predicted_flow,
+            ) = self._query_intent_future.wait_result()
+            self._query_intent_future = None
+            self._cache_query_intent()
 
     @property
     def search_query(self) -> SearchQuery:
@@ -249,7 +366,7 @@ class SearchPipeline:
         if self._predicted_search_type is not None:
             return self._predicted_search_type
 
-        self._run_preprocessing()
+        self._wait_for_query_intent()
         return cast(SearchType, self._predicted_search_type)
 
     @property
@@ -257,7 +374,7 @@ class SearchPipeline:
         if self._predicted_flow is not None:
             return self._predicted_flow
 
-        self._run_preprocessing()
+        self._wait_for_query_intent()
         return cast(QueryFlow, self._predicted_flow)
 
     """Retrieval"""
@@ -267,14 +384,21 @@ class SearchPipeline:
         if self._retrieved_chunks is not None:
             return self._retrieved_chunks
 
-        self._retrieved_chunks = retrieve_chunks(
-            query=self.search_query,
-            document_index=self.document_index,
-            db_session=self.db_session,
-            hybrid_alpha=self.search_request.hybrid_alpha,
-            multilingual_expansion_str=MULTILINGUAL_QUERY_EXPANSION,
-            retrieval_metrics_callback=self.retrieval_metrics_callback,
-        )
+        # Preprocessing sets the retrieved chunks on search result cache hits
+        search_query = self.search_query
+        if self._retrieved_chunks is None:
+            self._retrieved_chunks = retrieve_chunks(
+                query=search_query,
+                document_index=self.document_index,
+                db_session=self.db_session,
+                hybrid_alpha=self.search_request.hybrid_alpha,
+                multilingual_expansion_str=MULTILINGUAL_QUERY_EXPANSION,
+                retrieval_metrics_callback=self.retrieval_metrics_callback,
+                query_embedding=self._query_embedding_future.wait_result()
+                if self._query_embedding_future is not None
+                else None,
+            )
+            self._cache_retrieved_chunks()
 
         return cast(list[InferenceChunk], self._retrieved_chunks)
 
@@ -291,14 +415,30 @@ class SearchPipeline:
         if self._reranked_chunks is not None:
             return self._reranked_chunks
 
+        retrieved_chunks = self.retrieved_chunks
+        if self._cached_reranked_chunks is not None:
+            # Only the LLM filter is left to run, it is given the same chunks as on the
+            # search that cached the result
+            self._postprocessing_generator = search_postprocessing(
+                search_query=self.search_query.copy(update={"skip_rerank": True}),
+                retrieved_chunks=retrieved_chunks,
+            )
+            next(self._postprocessing_generator)
+            self._reranked_chunks = self._cached_reranked_chunks
+            return self._reranked_chunks
+
         self._postprocessing_generator = search_postprocessing(
             search_query=self.search_query,
-            retrieved_chunks=self.retrieved_chunks,
+            retrieved_chunks=retrieved_chunks,
             rerank_metrics_callback=self.rerank_metrics_callback,
         )
         self._reranked_chunks = cast(
             list[InferenceChunk], next(self._postprocessing_generator)
         )
+        if self._result_cache is not None and self._cache_key is not None:
+            self._result_cache.update_reranked_chunks(
+                self._cache_key, self._index_generation, self._reranked_chunks
+            )
         return self._reranked_chunks
 
     @property
@@ -348,3 +488,313 @@ class SearchPipeline:
             True if ind in self.relevant_chunk_indices else False
             for ind in range(len(self.reranked_chunks))
         ]
+
+
+class AsyncSearchPipeline:
+    """asyncio counterpart of `SearchPipeline` for the async endpoints. Each step is an
+    awaitable method instead of a lazy property, results are cached the same way. Model server
+    and document index calls do not block the event loop nor hold a worker thread while
+    waiting; the blocking LLM calls are pushed to worker threads.
+
+    The db session is only ever used by one thread at a time, but it is used across awaits so
+    a pipeline must not be shared between concurrent requests."""
+
+    def __init__(
+        self,
+        search_request: SearchRequest,
+        user: User | None,
+        db_session: Session,
+        embedding_model: DbEmbeddingModel,
+        bypass_acl: bool = False,  # NOTE: VERY DANGEROUS, USE WITH CAUTION
+        retrieval_metrics_callback: Callable[[RetrievalMetricsContainer], None]
+        | None = None,
+        rerank_metrics_callback: Callable[[RerankMetricsContainer], None] | None = None,
+    ):
+        """`embedding_model` is the current one. The caller looks it up off the event loop,
+        e.g. with `run_in_executor(get_current_db_embedding_model, db_session)`"""
+        self.search_request = search_request
+        self.user = user
+        self.db_session = db_session
+        self.bypass_acl = bypass_acl
+        self.retrieval_metrics_callback = retrieval_metrics_callback
+        self.rerank_metrics_callback = rerank_metrics_callback
+
+        self.embedding_model = embedding_model
+        self.query_embedding_model = build_query_embedding_model(embedding_model)
+        self.document_index = get_default_document_index(
+            primary_index_name=self.embedding_model.index_name,
+            secondary_index_name=None,
+        )
+
+        self._search_query: SearchQuery | None = None
+        self._predicted_search_type: SearchType | None = None
+        self._predicted_flow: QueryFlow | None = None
+
+        self._retrieved_chunks: list[InferenceChunk] | None = None
+        self._retrieved_sections: list[InferenceSection] | None = None
+        self._reranked_chunks: list[InferenceChunk] | None = None
+        self._reranked_sections: list[InferenceSection] | None = None
+        self._relevant_chunk_indices: list[int] | None = None
+
+        # If chunks have been merged, the LLM filter flow no longer applies
+        # as the indices no longer match. Can be implemented later as needed
+        self.ran_merge_chunk = False
+
+        # Search result cache state, the key and generation are set by preprocessing
+        self._result_cache = get_search_result_cache()
+        self._cache_key: str | None = None
+        self._index_generation = ""
+        self._cached_reranked_chunks: list[InferenceChunk] | None = None
+
+        # See `SearchPipeline`
+        self._query_embedding_task: asyncio.Task[list[float]] | None = None
+        self._query_intent_task: asyncio.Task[
+            tuple[SearchType, QueryFlow]
+        ] | None = None
+
+        # generator state
+        self._postprocessing_generator: AsyncGenerator[
+            list[InferenceChunk] | list[str], None
+        ] | None = None
+
+    async def aclose(self) -> None:
+        """Cancels the LLM chunk filter and the preprocessing tasks if they are still running
+        and their results are not needed"""
+        for task in (self._query_embedding_task, self._query_intent_task):
+            if task is not None and not task.done():
+                task.cancel()
+        if self._postprocessing_generator is not None:
+            await self._postprocessing_generator.aclose()
+
+    async def _combine_chunks(self, post_rerank: bool) -> list[InferenceSection]:
+        if not post_rerank and self._retrieved_sections:
+            return self._retrieved_sections
+        if post_rerank and self._reranked_sections:
+            return self._reranked_sections
+
+        if not post_rerank:
+            chunks = await self.retrieved_chunks()
+        else:
+            chunks = await self.reranked_chunks()
+
+        search_query = await self.search_query()
+        expansions = plan_section_expansions(search_query, chunks)
+        if expansions is None:
+            return [InferenceSection.from_chunk(chunk) for chunk in chunks]
+
+        self.ran_merge_chunk = True
+
+        # Looks up the chunk counts in Postgres, kept off the event loop
+        chunk_windows = await run_in_executor(
+            build_chunk_windows, expansions, self.db_session
+        )
+        expansion_contents = (
+            await self.document_index.async_chunk_windows_content_retrieval(
+                chunk_windows
+            )
+        )
+
+        return assemble_sections(chunks, expansions, expansion_contents)
+
+    """Pre-processing"""
+
+    def _use_cached_result(self, cached_result: CachedSearchResult) -> None:
+        self._search_query = cached_result.search_query
+        self._predicted_search_type = cached_result.predicted_search_type
+        self._predicted_flow = cached_result.predicted_flow
+        self._retrieved_chunks = cached_result.retrieved_chunks
+        self._cached_reranked_chunks = cached_result.reranked_chunks
+        if self._predicted_search_type is None or self._predicted_flow is None:
+            # Cached before the intent of the search that cached it resolved
+            self._query_intent_task = asyncio.create_task(
+                async_query_intent(self.search_request.query)
+            )
+
+    async def _cache_retrieved_chunks(self) -> None:
+        if self._result_cache is None or self._cache_key is None:
+            return
+
+        # See `SearchPipeline._cache_retrieved_chunks`
+        self._result_cache.put(
+            self._cache_key,
+            self._index_generation,
+            CachedSearchResult(
+                search_query=await self.search_query(),
+                predicted_search_type=self._predicted_search_type,
+                predicted_flow=self._predicted_flow,
+                retrieved_chunks=cast(list[InferenceChunk], self._retrieved_chunks),
+            ),
+        )
+
+    def _cache_query_intent(self) -> None:
+        if self._result_cache is None or self._cache_key is None:
+            return
+        if self._predicted_search_type is None or self._predicted_flow is None:
+            return
+
+        self._result_cache.update_query_intent(
+            self._cache_key,
+            self._index_generation,
+            self._predicted_search_type,
+            self._predicted_flow,
+        )
+
+    async def _run_preprocessing(self) -> None:
+        if self._result_cache is not None:
+            # Read first, an index write during this search must invalidate its result
+            self._index_generation = await run_in_executor(get_index_generation)
+            self._cache_key = build_search_cache_key(
+                search_request=self.search_request,
+                access_control_list=None
+                if self.bypass_acl
+                else await run_in_executor(
+                    build_access_filters_for_user, self.user, self.db_session
+                ),
+                index_name=self.embedding_model.index_name,
+                multilingual_expansion=MULTILINGUAL_QUERY_EXPANSION,
+            )
+            cached_result = self._result_cache.get(
+                self._cache_key, self._index_generation
+            )
+            if cached_result is not None:
+                self._use_cached_result(cached_result)
+                return
+
+        # See `SearchPipeline._run_preprocessing`
+        if get_search_type(self.search_request) != SearchType.KEYWORD:
+            self._query_embedding_task = asyncio.create_task(
+                async_embed_query(self.query_embedding_model, self.search_request.query)
+            )
+        self._query_intent_task = asyncio.create_task(
+            async_query_intent(self.search_request.query)
+        )
+
+        self._search_query = await async_search_query_preprocessing(
+            search_request=self.search_request,
+            user=self.user,
+            db_session=self.db_session,
+            bypass_acl=self.bypass_acl,
+        )
+
+    async def _wait_for_query_intent(self) -> None:
+        if self._search_query is None:
+            await self._run_preprocessing()
+        if self._query_intent_task is not None:
+            (
+                self._predicted_search_type,
+                self._predicted_flow,
+            ) = await self._query_intent_task
+            self._query_intent_task = None
+            self._cache_query_intent()
+
+    async def search_query(self) -> SearchQuery:
+        if self._search_query is None:
+            await self._run_preprocessing()
+        return cast(SearchQuery, self._search_query)
+
+    async def predicted_search_type(self) -> SearchType:
+        if self._predicted_search_type is None:
+            await self._wait_for_query_intent()
+        return cast(SearchType, self._predicted_search_type)
+
+    async def predicted_flow(self) -> QueryFlow:
+        if self._predicted_flow is None:
+            await self._wait_for_query_intent()
+        return cast(QueryFlow, self._predicted_flow)
+
+    """Retrieval"""
+
+    async def retrieved_chunks(self) -> list[InferenceChunk]:
+        if self._retrieved_chunks is not None:
+            return self._retrieved_chunks
+
+        # Preprocessing sets the retrieved chunks on search result cache hits
+        search_query = await self.search_query()
+        if self._retrieved_chunks is None:
+            self._retrieved_chunks = await async_retrieve_chunks(
+                query=search_query,
+                document_index=self.document_index,
+                db_session=self.db_session,
+                hybrid_alpha=self.search_request.hybrid_alpha,
+                multilingual_expansion_str=MULTILINGUAL_QUERY_EXPANSION,
+                retrieval_metrics_callback=self.retrieval_metrics_callback,
+                query_embedding=await self._query_embedding_task
+                if self._query_embedding_task is not None
+                else None,
+                query_embedding_model=self.query_embedding_model,
+            )
+            await self._cache_retrieved_chunks()
+        return self._retrieved_chunks
+
+    async def retrieved_sections(self) -> list[InferenceSection]:
+        self._retrieved_sections = await self._combine_chunks(post_rerank=False)
+        return self._retrieved_sections
+
+    """Post-Processing"""
+
+    async def reranked_chunks(self) -> list[InferenceChunk]:
+        if self._reranked_chunks is not None:
+            return self._reranked_chunks
+
+        retrieved_chunks = await self.retrieved_chunks()
+        search_query = await self.search_query()
+        if self._cached_reranked_chunks is not None:
+            # See `SearchPipeline.reranked_chunks`
+            self._postprocessing_generator = async_search_postprocessing(
+                search_query=search_query.copy(update={"skip_rerank": True}),
+                retrieved_chunks=retrieved_chunks,
+            )
+            await self._postprocessing_generator.__anext__()
+            self._reranked_chunks = self._cached_reranked_chunks
+            return self._reranked_chunks
+
+        self._postprocessing_generator = async_search_postprocessing(
+            search_query=search_query,
+            retrieved_chunks=retrieved_chunks,
+            rerank_metrics_callback=self.rerank_metrics_callback,
+        )
+        self._reranked_chunks = cast(
+            list[InferenceChunk], await self._postprocessing_generator.__anext__()
+        )
+        if self._result_cache is not None and self._cache_key is not None:
+            self._result_cache.update_reranked_chunks(
+                self._cache_key, self._index_generation, self._reranked_chunks
+            )
+        return self._reranked_chunks
+
+    async def reranked_sections(self) -> list[InferenceSection]:
+        self._reranked_sections = await self._combine_chunks(post_rerank=True)
+        return self._reranked_sections
+
+    async def relevant_chunk_indices(self) -> list[int]:
+        # See `SearchPipeline.relevant_chunk_indices`
+        if self.ran_merge_chunk:
+            return []
+
+        if self._relevant_chunk_indices is not None:
+            return self._relevant_chunk_indices
+
+        reranked_docs = await self.reranked_chunks()
+
+        relevant_chunk_ids = await cast(
+            AsyncGenerator[list[str], None], self._postprocessing_generator
+        ).__anext__()
+        self._relevant_chunk_indices = [
+            ind
+            for ind, chunk in enumerate(reranked_docs)
+            if chunk.unique_id in relevant_chunk_ids
+        ]
+        return self._relevant_chunk_indices
+
+    async def chunk_relevance_list(self) -> list[bool]:
+        relevant_chunk_indices = await self.relevant_chunk_indices()
+        return [
+            ind in relevant_chunk_indices
+            for ind in range(len(await self.reranked_chunks()))
+        ]
+
+    async def section_relevance_list(self) -> list[bool]:
+        if self.ran_merge_chunk:
+            return [False] * len(await self.reranked_sections())
+
+        return await self.chunk_relevance_list()
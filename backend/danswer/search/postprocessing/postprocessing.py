@@ -1,3 +1,5 @@
+import asyncio
+from collections.abc import AsyncGenerator
 from collections.abc import Callable
 from collections.abc import Generator
 from typing import cast
@@ -19,8 +21,14 @@ from danswer.search.search_nlp_models import CrossEncoderEnsembleModel
 from danswer.secondary_llm_flows.chunk_usefulness import llm_batch_eval_chunks
 from danswer.utils.logger import setup_logger
 from danswer.utils.threadpool_concurrency import FunctionCall
+from danswer.utils.threadpool_concurrency import LLM_EXECUTOR
 from danswer.utils.threadpool_concurrency import run_functions_in_parallel
+from danswer.utils.threadpool_concurrency import run_in_executor
+from danswer.utils.timing import log_async_function_time
 from danswer.utils.timing import log_function_time
+from shared_configs.configs import RERANK_CASCADE_MIN_SCORE
+from shared_configs.configs import RERANK_CASCADE_MODEL
+from shared_configs.configs import RERANK_CASCADE_TOP_K
 
 
 logger = setup_logger()
@@ -42,23 +50,13 @@ def should_apply_llm_based_relevance_filter(query: SearchQuery) -> bool:
     return not query.skip_llm_chunk_filter
 
 
-@log_function_time(print_only=True)
-def semantic_reranking(
-    query: str,
+def _apply_rerank_scores(
     chunks: list[InferenceChunk],
-    model_min: int = CROSS_ENCODER_RANGE_MIN,
-    model_max: int = CROSS_ENCODER_RANGE_MAX,
-    rerank_metrics_callback: Callable[[RerankMetricsContainer], None] | None = None,
+    sim_scores_floats: numpy.ndarray,
+    model_min: int,
+    model_max: int,
+    rerank_metrics_callback: Callable[[RerankMetricsContainer], None] | None,
 ) -> tuple[list[InferenceChunk], list[int]]:
-    """Reranks chunks based on cross-encoder models. Additionally provides the original indices
-    of the chunks in their new sorted order.
-
-    Note: this updates the chunks in place, it updates the chunk scores which came from retrieval
-    """
-    cross_encoders = CrossEncoderEnsembleModel()
-    passages = [chunk.content for chunk in chunks]
-    sim_scores_floats = cross_encoders.predict(query=query, passages=passages)
-
     sim_scores = [numpy.array(scores) for scores in sim_scores_floats]
 
     raw_sim_scores = cast(numpy.ndarray, sum(sim_scores) / len(sim_scores))
@@ -112,6 +110,166 @@ def semantic_reranking(
     return list(ranked_chunks), list(ranked_indices)
 
 
+def select_cascade_candidates(
+    first_pass_scores: numpy.ndarray, top_k: int, min_score: float
+) -> list[int]:
+    """Indices of the chunks the ensemble should rescore, by descending first pass score.
+    Chunks the first pass scores below `min_score` are left out even if within the `top_k`,
+    so no chunk at all may need the ensemble."""
+    order = numpy.argsort(-first_pass_scores, kind="stable")
+    return [int(ind) for ind in order[:top_k] if first_pass_scores[ind] >= min_score]
+
+
+def _apply_cascade_scores(
+    chunks: list[InferenceChunk],
+    first_pass_scores: numpy.ndarray,
+    candidate_inds: list[int],
+    candidate_sim_scores: numpy.ndarray | None,
+    model_min: int,
+    model_max: int,
+    rerank_metrics_callback: Callable[[RerankMetricsContainer], None] | None,
+) -> tuple[list[InferenceChunk], list[int]]:
+    """The candidates come first, ordered by the ensemble, then the other chunks ordered by
+    the first pass. Metrics only cover the candidates."""
+    ranked_chunks: list[InferenceChunk] = []
+    ranked_indices: list[int] = []
+    if candidate_inds and candidate_sim_scores is not None:
+        ranked_chunks, candidate_order = _apply_rerank_scores(
+            [chunks[ind] for ind in candidate_inds],
+            candidate_sim_scores,
+            model_min,
+            model_max,
+            rerank_metrics_callback,
+        )
+        ranked_indices = [candidate_inds[ind] for ind in candidate_order]
+
+    candidates = set(candidate_inds)
+    remaining_indices = [
+        int(ind)
+        for ind in numpy.argsort(-first_pass_scores, kind="stable")
+        if ind not in candidates
+    ]
+    # Like chunks past `num_rerank`, no score comparable to the reranked ones
+    for ind in remaining_indices:
+        chunks[ind].score = None
+
+    return (
+        ranked_chunks + [chunks[ind] for ind in remaining_indices],
+        ranked_indices + remaining_indices,
+    )
+
+
+@log_function_time(print_only=True)
+def semantic_reranking(
+    query: str,
+    chunks: list[InferenceChunk],
+    model_min: int = CROSS_ENCODER_RANGE_MIN,
+    model_max: int = CROSS_ENCODER_RANGE_MAX,
+    rerank_metrics_callback: Callable[[RerankMetricsContainer], None] | None = None,
+    cascade_model: str | None = RERANK_CASCADE_MODEL,
+    cascade_top_k: int = RERANK_CASCADE_TOP_K,
+    cascade_min_score: float = RERANK_CASCADE_MIN_SCORE,
+) -> tuple[list[InferenceChunk], list[int]]:
+    """Reranks chunks based on cross-encoder models. Additionally provides the original indices
+    of the chunks in their new sorted order.
+
+    With a `cascade_model`, it scores all of the chunks first and the ensemble only rescores
+    the candidates picked by `select_cascade_candidates`, the rest lose their score.
+
+    Note: this updates the chunks in place, it updates the chunk scores which came from retrieval
+    """
+    cross_encoders = CrossEncoderEnsembleModel()
+    passages = [chunk.content for chunk in chunks]
+    if cascade_model is None:
+        sim_scores_floats = cross_encoders.predict(query=query, passages=passages)
+        return _apply_rerank_scores(
+            chunks, sim_scores_floats, model_min, model_max, rerank_metrics_callback
+        )
+
+    first_pass_scores = cross_encoders.predict(
+        query=query, passages=passages, model_names=[cascade_model]
+    )[0]
+    candidate_inds = select_cascade_candidates(
+        first_pass_scores, cascade_top_k, cascade_min_score
+    )
+    candidate_sim_scores = (
+        cross_encoders.predict(
+            query=query, passages=[passages[ind] for ind in candidate_inds]
+        )
+        if candidate_inds
+        else None
+    )
+
+    return _apply_cascade_scores(
+        chunks,
+        first_pass_scores,
+        candidate_inds,
+        candidate_sim_scores,
+        model_min,
+        model_max,
+        rerank_metrics_callback,
+    )
+
+
+@log_async_function_time(print_only=True)
+async def async_semantic_reranking(
+    query: str,
+    chunks: list[InferenceChunk],
+    model_min: int = CROSS_ENCODER_RANGE_MIN,
+    model_max: int = CROSS_ENCODER_RANGE_MAX,
+    rerank_metrics_callback: Callable[[RerankMetricsContainer], None] | None = None,
+    cascade_model: str | None = RERANK_CASCADE_MODEL,
+    cascade_top_k: int = RERANK_CASCADE_TOP_K,
+    cascade_min_score: float = RERANK_CASCADE_MIN_SCORE,
+) -> tuple[list[InferenceChunk], list[int]]:
+    """Awaitable version of `semantic_reranking`, also updates the chunk scores in place"""
+    cross_encoders = CrossEncoderEnsembleModel()
+    passages = [chunk.content for chunk in chunks]
+    if cascade_model is None:
+        sim_scores_floats = await cross_encoders.async_predict(
+            query=query, passages=passages
+        )
+        return _apply_rerank_scores(
+            chunks, sim_scores_floats, model_min, model_max, rerank_metrics_callback
+        )
+
+    first_pass_scores = (
+        await cross_encoders.async_predict(
+            query=query, passages=passages, model_names=[cascade_model]
+        )
+    )[0]
+    candidate_inds = select_cascade_candidates(
+        first_pass_scores, cascade_top_k, cascade_min_score
+    )
+    candidate_sim_scores = (
+        await cross_encoders.async_predict(
+            query=query, passages=[passages[ind] for ind in candidate_inds]
+        )
+        if candidate_inds
+        else None
+    )
+
+    return _apply_cascade_scores(
+        chunks,
+        first_pass_scores,
+        candidate_inds,
+        candidate_sim_scores,
+        model_min,
+        model_max,
+        rerank_metrics_callback,
+    )
+
+
+def _append_unranked_chunks(
+    ranked_chunks: list[InferenceChunk], lower_chunks: list[InferenceChunk]
+) -> list[InferenceChunk]:
+    # Scores from rerank cannot be meaningfully combined with scores without rerank
+    for lower_chunk in lower_chunks:
+        lower_chunk.score = None
+    ranked_chunks.extend(lower_chunks)
+    return ranked_chunks
+
+
 def rerank_chunks(
     query: SearchQuery,
     chunks_to_rerank: list[InferenceChunk],
@@ -122,12 +280,20 @@ def rerank_chunks(
         chunks=chunks_to_rerank[: query.num_rerank],
         rerank_metrics_callback=rerank_metrics_callback,
     )
-    lower_chunks = chunks_to_rerank[query.num_rerank :]
-    # Scores from rerank cannot be meaningfully combined with scores without rerank
-    for lower_chunk in lower_chunks:
-        lower_chunk.score = None
-    ranked_chunks.extend(lower_chunks)
-    return ranked_chunks
+    return _append_unranked_chunks(ranked_chunks, chunks_to_rerank[query.num_rerank :])
+
+
+async def async_rerank_chunks(
+    query: SearchQuery,
+    chunks_to_rerank: list[InferenceChunk],
+    rerank_metrics_callback: Callable[[RerankMetricsContainer], None] | None = None,
+) -> list[InferenceChunk]:
+    ranked_chunks, _ = await async_semantic_reranking(
+        query=query.query,
+        chunks=chunks_to_rerank[: query.num_rerank],
+        rerank_metrics_callback=rerank_metrics_callback,
+    )
+    return _append_unranked_chunks(ranked_chunks, chunks_to_rerank[query.num_rerank :])
 
 
 @log_function_time(print_only=True)
@@ -221,3 +387,49 @@ def search_postprocessing(
         ]
     else:
         yield cast(list[str], [])
+
+
+async def async_search_postprocessing(
+    search_query: SearchQuery,
+    retrieved_chunks: list[InferenceChunk],
+    rerank_metrics_callback: Callable[[RerankMetricsContainer], None] | None = None,
+) -> AsyncGenerator[list[InferenceChunk] | list[str], None]:
+    """Same contract as `search_postprocessing`: first yields the final ordering of the chunks,
+    then the unique ids of the chunks the LLM considered relevant. The LLM filter is started
+    right away so it runs concurrently with the rerank, it is cancelled if the caller stops
+    consuming before it finishes."""
+    llm_filter_task: asyncio.Task[list[str]] | None = None
+    if should_apply_llm_based_relevance_filter(search_query):
+        # The LLM client is blocking
+        llm_filter_task = asyncio.create_task(
+            run_in_executor(
+                filter_chunks,
+                search_query,
+                retrieved_chunks[: search_query.max_llm_filter_chunks],
+                executor_name=LLM_EXECUTOR,
+            )
+        )
+
+    try:
+        if should_rerank(search_query):
+            final_chunks = await async_rerank_chunks(
+                search_query, retrieved_chunks, rerank_metrics_callback
+            )
+        else:
+            final_chunks = retrieved_chunks
+        _log_top_chunk_links(search_query.search_type.value, final_chunks)
+        yield final_chunks
+
+        if llm_filter_task is None:
+            yield cast(list[str], [])
+            return
+
+        llm_chunk_selection = await llm_filter_task
+        yield [
+            chunk.unique_id
+            for chunk in final_chunks
+            if chunk.unique_id in llm_chunk_selection
+        ]
+    finally:
+        if llm_filter_task is not None and not llm_filter_task.done():
+            llm_filter_task.cancel()
@@ -25,9 +25,7 @@ def count_unk_tokens(text: str, tokenizer: "AutoTokenizer") -> int:
     return num_unk_tokens
 
 
-def query_intent(query: str) -> tuple[SearchType, QueryFlow]:
-    intent_model = IntentModel()
-    class_probs = intent_model.predict(query)
+def _intent_from_class_probs(class_probs: list[float]) -> tuple[SearchType, QueryFlow]:
     keyword = class_probs[0]
     semantic = class_probs[1]
     qa = class_probs[2]
@@ -58,6 +56,16 @@ def query_intent(query: str) -> tuple[SearchType, QueryFlow]:
     return predicted_search, predicted_flow
 
 
+def query_intent(query: str) -> tuple[SearchType, QueryFlow]:
+    intent_model = IntentModel()
+    return _intent_from_class_probs(intent_model.predict(query))
+
+
+async def async_query_intent(query: str) -> tuple[SearchType, QueryFlow]:
+    intent_model = IntentModel()
+    return _intent_from_class_probs(await intent_model.async_predict(query))
+
+
 def recommend_search_flow(
     query: str,
     model_name: str,
@@ -1,3 +1,8 @@
+import asyncio
+from collections.abc import Awaitable
+from datetime import datetime
+from typing import TypeVar
+
 from sqlalchemy.orm import Session
 
 from danswer.configs.chat_configs import BASE_RECENCY_DECAY
@@ -5,8 +10,8 @@ from danswer.configs.chat_configs import DISABLE_LLM_CHUNK_FILTER
 from danswer.configs.chat_configs import DISABLE_LLM_FILTER_EXTRACTION
 from danswer.configs.chat_configs import FAVOR_RECENT_DECAY_MULTIPLIER
 from danswer.configs.chat_configs import NUM_RETURNED_HITS
+from danswer.configs.constants import DocumentSource
 from danswer.db.models import User
-from danswer.search.enums import QueryFlow
 from danswer.search.enums import RecencyBiasSetting
 from danswer.search.models import BaseFilters
 from danswer.search.models import IndexFilters
@@ -14,12 +19,13 @@ from danswer.search.models import SearchQuery
 from danswer.search.models import SearchRequest
 from danswer.search.models import SearchType
 from danswer.search.preprocessing.access_filters import build_access_filters_for_user
-from danswer.search.preprocessing.danswer_helper import query_intent
 from danswer.secondary_llm_flows.source_filter import extract_source_filter
 from danswer.secondary_llm_flows.time_filter import extract_time_filter
 from danswer.utils.logger import setup_logger
 from danswer.utils.threadpool_concurrency import FunctionCall
+from danswer.utils.threadpool_concurrency import LLM_EXECUTOR
 from danswer.utils.threadpool_concurrency import run_functions_in_parallel
+from danswer.utils.threadpool_concurrency import run_in_executor
 from danswer.utils.timing import log_function_time
 from shared_configs.configs import ENABLE_RERANKING_REAL_TIME_FLOW
 
@@ -27,27 +33,16 @@ from shared_configs.configs import ENABLE_RERANKING_REAL_TIME_FLOW
 logger = setup_logger()
 
 
-@log_function_time(print_only=True)
-def retrieval_preprocessing(
+T = TypeVar("T")
+
+
+def _get_preset_filters_and_auto_detection(
     search_request: SearchRequest,
-    user: User | None,
-    db_session: Session,
-    bypass_acl: bool = False,
-    include_query_intent: bool = True,
-    enable_auto_detect_filters: bool = False,
-    disable_llm_filter_extraction: bool = DISABLE_LLM_FILTER_EXTRACTION,
-    disable_llm_chunk_filter: bool = DISABLE_LLM_CHUNK_FILTER,
-    base_recency_decay: float = BASE_RECENCY_DECAY,
-    favor_recent_decay_multiplier: float = FAVOR_RECENT_DECAY_MULTIPLIER,
-) -> tuple[SearchQuery, SearchType | None, QueryFlow | None]:
-    """Logic is as follows:
-    Any global disables apply first
-    Then any filters or settings as part of the query are used
-    Then defaults to Persona settings if not specified by the query
-    """
-    query = search_request.query
-    limit = search_request.limit
-    offset = search_request.offset
+    enable_auto_detect_filters: bool,
+    disable_llm_filter_extraction: bool,
+) -> tuple[BaseFilters, bool, bool]:
+    """Returns the filters explicitly set for the search and whether the time and the source
+    filters should additionally be extracted from the query by the LLM"""
     persona = search_request.persona
 
     preset_filters = search_request.human_selected_filters or BaseFilters()
@@ -84,55 +79,30 @@ def retrieval_preprocessing(
         logger.debug("Not extract source filter - already provided")
         auto_detect_source_filter = False
 
-    # Based on the query figure out if we should apply any hard time filters /
-    # if we should bias more recent docs even more strongly
-    run_time_filters = (
-        FunctionCall(extract_time_filter, (query,), {})
-        if auto_detect_time_filter
-        else None
-    )
+    return preset_filters, auto_detect_time_filter, auto_detect_source_filter
 
-    # Based on the query, figure out if we should apply any source filters
-    run_source_filters = (
-        FunctionCall(extract_source_filter, (query, db_session), {})
-        if auto_detect_source_filter
-        else None
-    )
 
-    # NOTE: this isn't really part of building the retrieval request, but is done here
-    # so it can be simply done in parallel with the filters without multi-level multithreading
-    run_query_intent = (
-        FunctionCall(query_intent, (query,), {}) if include_query_intent else None
-    )
+def get_search_type(search_request: SearchRequest) -> SearchType:
+    """Known before any preprocessing, the predicted query intent does not change it"""
+    persona = search_request.persona
+    return persona.search_type if persona else SearchType.HYBRID
 
-    functions_to_run = [
-        filter_fn
-        for filter_fn in [
-            run_time_filters,
-            run_source_filters,
-            run_query_intent,
-        ]
-        if filter_fn
-    ]
-    parallel_results = run_functions_in_parallel(functions_to_run)
 
-    predicted_time_cutoff, predicted_favor_recent = (
-        parallel_results[run_time_filters.result_id]
-        if run_time_filters
-        else (None, None)
-    )
-    predicted_source_filters = (
-        parallel_results[run_source_filters.result_id] if run_source_filters else None
-    )
-    predicted_search_type, predicted_flow = (
-        parallel_results[run_query_intent.result_id]
-        if run_query_intent
-        else (None, None)
-    )
+def _build_search_query(
+    search_request: SearchRequest,
+    preset_filters: BaseFilters,
+    predicted_time_cutoff: datetime | None,
+    predicted_favor_recent: bool | None,
+    predicted_source_filters: list[DocumentSource] | None,
+    user_acl_filters: list[str] | None,
+    disable_llm_chunk_filter: bool,
+    base_recency_decay: float,
+    favor_recent_decay_multiplier: float,
+) -> SearchQuery:
+    limit = search_request.limit
+    offset = search_request.offset
+    persona = search_request.persona
 
-    user_acl_filters = (
-        None if bypass_acl else build_access_filters_for_user(user, db_session)
-    )
     final_filters = IndexFilters(
         source_type=preset_filters.source_type or predicted_source_filters,
         document_set=preset_filters.document_set,
@@ -171,20 +141,169 @@ def retrieval_preprocessing(
         else:
             recency_bias_multiplier = base_recency_decay
 
-    return (
-        SearchQuery(
-            query=query,
-            search_type=persona.search_type if persona else SearchType.HYBRID,
-            filters=final_filters,
-            recency_bias_multiplier=recency_bias_multiplier,
-            num_hits=limit if limit is not None else NUM_RETURNED_HITS,
-            offset=offset or 0,
-            skip_rerank=skip_rerank,
-            skip_llm_chunk_filter=not llm_chunk_filter,
-            chunks_above=search_request.chunks_above,
-            chunks_below=search_request.chunks_below,
-            full_doc=search_request.full_doc,
+    return SearchQuery(
+        query=search_request.query,
+        search_type=get_search_type(search_request),
+        filters=final_filters,
+        recency_bias_multiplier=recency_bias_multiplier,
+        num_hits=limit if limit is not None else NUM_RETURNED_HITS,
+        offset=offset or 0,
+        skip_rerank=skip_rerank,
+        skip_llm_chunk_filter=not llm_chunk_filter,
+        chunks_above=search_request.chunks_above,
+        chunks_below=search_request.chunks_below,
+        full_doc=search_request.full_doc,
+    )
+
+
+@log_function_time(print_only=True)
+def search_query_preprocessing(
+    search_request: SearchRequest,
+    user: User | None,
+    db_session: Session,
+    bypass_acl: bool = False,
+    enable_auto_detect_filters: bool = False,
+    disable_llm_filter_extraction: bool = DISABLE_LLM_FILTER_EXTRACTION,
+    disable_llm_chunk_filter: bool = DISABLE_LLM_CHUNK_FILTER,
+    base_recency_decay: float = BASE_RECENCY_DECAY,
+    favor_recent_decay_multiplier: float = FAVOR_RECENT_DECAY_MULTIPLIER,
+) -> SearchQuery:
+    """Builds the query to retrieve with, the filters extracted by the LLM included. Unlike
+    the query intent, the result of this step is needed before retrieval can start.
+
+    Logic is as follows:
+    Any global disables apply first
+    Then any filters or settings as part of the query are used
+    Then defaults to Persona settings if not specified by the query
+    """
+    query = search_request.query
+    (
+        preset_filters,
+        auto_detect_time_filter,
+        auto_detect_source_filter,
+    ) = _get_preset_filters_and_auto_detection(
+        search_request=search_request,
+        enable_auto_detect_filters=enable_auto_detect_filters,
+        disable_llm_filter_extraction=disable_llm_filter_extraction,
+    )
+
+    # Based on the query figure out if we should apply any hard time filters /
+    # if we should bias more recent docs even more strongly
+    run_time_filters = (
+        FunctionCall(extract_time_filter, (query,), {})
+        if auto_detect_time_filter
+        else None
+    )
+
+    # Based on the query, figure out if we should apply any source filters
+    run_source_filters = (
+        FunctionCall(extract_source_filter, (query, db_session), {})
+        if auto_detect_source_filter
+        else None
+    )
+
+    functions_to_run = [
+        filter_fn
+        for filter_fn in [
+            run_time_filters,
+            run_source_filters,
+        ]
+        if filter_fn
+    ]
+    parallel_results = run_functions_in_parallel(functions_to_run)
+
+    predicted_time_cutoff, predicted_favor_recent = (
+        parallel_results[run_time_filters.result_id]
+        if run_time_filters
+        else (None, None)
+    )
+    predicted_source_filters = (
+        parallel_results[run_source_filters.result_id] if run_source_filters else None
+    )
+
+    user_acl_filters = (
+        None if bypass_acl else build_access_filters_for_user(user, db_session)
+    )
+
+    return _build_search_query(
+        search_request=search_request,
+        preset_filters=preset_filters,
+        predicted_time_cutoff=predicted_time_cutoff,
+        predicted_favor_recent=predicted_favor_recent,
+        predicted_source_filters=predicted_source_filters,
+        user_acl_filters=user_acl_filters,
+        disable_llm_chunk_filter=disable_llm_chunk_filter,
+        base_recency_decay=base_recency_decay,
+        favor_recent_decay_multiplier=favor_recent_decay_multiplier,
+    )
+
+
+async def _await_or_default(awaitable: Awaitable[T] | None, default: T) -> T:
+    return await awaitable if awaitable is not None else default
+
+
+async def async_search_query_preprocessing(
+    search_request: SearchRequest,
+    user: User | None,
+    db_session: Session,
+    bypass_acl: bool = False,
+    enable_auto_detect_filters: bool = False,
+    disable_llm_filter_extraction: bool = DISABLE_LLM_FILTER_EXTRACTION,
+    disable_llm_chunk_filter: bool = DISABLE_LLM_CHUNK_FILTER,
+    base_recency_decay: float = BASE_RECENCY_DECAY,
+    favor_recent_decay_multiplier: float = FAVOR_RECENT_DECAY_MULTIPLIER,
+) -> SearchQuery:
+    """Same as `search_query_preprocessing` but awaitable. The LLM filter extraction only has
+    a blocking client so it runs in worker threads. The db session is never used by two
+    threads at once."""
+    query = search_request.query
+    (
+        preset_filters,
+        auto_detect_time_filter,
+        auto_detect_source_filter,
+    ) = _get_preset_filters_and_auto_detection(
+        search_request=search_request,
+        enable_auto_detect_filters=enable_auto_detect_filters,
+        disable_llm_filter_extraction=disable_llm_filter_extraction,
+    )
+
+    (
+        (predicted_time_cutoff, predicted_favor_recent),
+        predicted_source_filters,
+    ) = await asyncio.gather(
+        _await_or_default(
+            run_in_executor(extract_time_filter, query, executor_name=LLM_EXECUTOR)
+            if auto_detect_time_filter
+            else None,
+            (None, None),
+        ),
+        _await_or_default(
+            run_in_executor(
+                extract_source_filter,
+                query,
+                db_session,
+                executor_name=LLM_EXECUTOR,
+            )
+            if auto_detect_source_filter
+            else None,
+            None,
         ),
-        predicted_search_type,
-        predicted_flow,
+    )
+
+    user_acl_filters = (
+        None
+        if bypass_acl
+        else await run_in_executor(build_access_filters_for_user, user, db_session)
+    )
+
+    return _build_search_query(
+        search_request=search_request,
+        preset_filters=preset_filters,
+        predicted_time_cutoff=predicted_time_cutoff,
+        predicted_favor_recent=predicted_favor_recent,
+        predicted_source_filters=predicted_source_filters,
+        user_acl_filters=user_acl_filters,
+        disable_llm_chunk_filter=disable_llm_chunk_filter,
+        base_recency_decay=base_recency_decay,
+        favor_recent_decay_multiplier=favor_recent_decay_multiplier,
     )
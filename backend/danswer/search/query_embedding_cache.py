@@ -0,0 +1,152 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from danswer.configs.app_configs import QUERY_EMBEDDING_CACHE_SIZE
+from danswer.configs.app_configs import QUERY_EMBEDDING_CACHE_TTL
+from danswer.configs.app_configs import QUERY_EMBEDDING_SHARED_CACHE
+from danswer.indexing.embedding_cache import build_embedding_cache_key
+from danswer.indexing.embedding_cache import EmbeddingCache
+from danswer.indexing.embedding_cache import get_default_embedding_cache
+from danswer.utils.logger import setup_logger
+
+logger = setup_logger()
+
+# Hit rate is logged every this many lookups
+_LOG_STATS_INTERVAL = 1000
+
+
+def normalize_query(query: str) -> str:
+    """Queries differing only in whitespace share an embedding"""
+    return " ".join(query.split())
+
+
+def build_query_embedding_cache_key(
+    model_name: str, normalize: bool, query_prefix: str | None, query: str
+) -> str:
+    """Same keys as the passage embedding cache, with the query prefix. The model
+    settings being part of the key, entries of a swapped out embedding model are never
+    hit again"""
+    return build_embedding_cache_key(
+        model_name=model_name,
+        normalize=normalize,
+        prefix=query_prefix,
+        text=normalize_query(query),
+    )
+
+
+class QueryEmbeddingCache:
+    """Thread safe LRU of query embeddings whose entries expire after `ttl` seconds. With a
+    `shared_cache`, local misses are looked up there and new embeddings written to it so that
+    processes benefit from each other's queries.
+
+    The shared cache has no expiry of its own, so shared entries are keyed by the `ttl` long
+    window of wall clock time they were written in. They stop being hit once the window is
+    over and are left to its LRU eviction, entries read from it expire locally at the end of
+    their window as well."""
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl: float,
+        shared_cache: EmbeddingCache | None = None,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.shared_cache = shared_cache
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        # Least recently used first, values are (expiry time, embedding)
+        self._entries: OrderedDict[str, tuple[float, list[float]]] = OrderedDict()
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def _get_local(self, key: str) -> list[float] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, embedding = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return embedding
+
+    def _put_local(
+        self, key: str, embedding: list[float], ttl: float | None = None
+    ) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, embedding)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _record_lookup(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            lookups = self.hits + self.misses
+        if lookups % _LOG_STATS_INTERVAL == 0:
+            logger.info(
+                f"Query embedding cache hits: {self.hits}, misses: {self.misses}, "
+                f"hit rate: {self.hit_rate:.2%}"
+            )
+
+    def _shared_key(self, key: str) -> tuple[str, float]:
+        """Key of the entry in the shared cache and the seconds left until it expires"""
+        now = time.time()
+        window = int(now // self.ttl)
+        return f"{key}:{window}", (window + 1) * self.ttl - now
+
+    def get(self, key: str) -> list[float] | None:
+        """The shared cache is only read on a local miss, it may block on its store"""
+        embedding = self._get_local(key)
+        if embedding is None and self.shared_cache is not None:
+            shared_key, time_left = self._shared_key(key)
+            shared_embedding = self.shared_cache.get([shared_key]).get(shared_key)
+            if shared_embedding is not None:
+                embedding = shared_embedding.tolist()
+                # Not a new entry, it must not outlive the shared one
+                self._put_local(key, embedding, ttl=min(self.ttl, time_left))
+
+        self._record_lookup(hit=embedding is not None)
+        return embedding
+
+    def put(self, key: str, embedding: list[float]) -> None:
+        self._put_local(key, embedding)
+        if self.shared_cache is not None:
+            shared_key, _ = self._shared_key(key)
+            self.shared_cache.put({shared_key: np.asarray(embedding, dtype=np.float32)})
+
+
+_QUERY_EMBEDDING_CACHE: QueryEmbeddingCache | None = None
+
+
+def get_query_embedding_cache() -> QueryEmbeddingCache | None:
+    """Returns the process wide query embedding cache, or None if it is disabled"""
+    global _QUERY_EMBEDDING_CACHE
+
+    if (
+        _QUERY_EMBEDDING_CACHE is None
+        and QUERY_EMBEDDING_CACHE_TTL > 0
+        and QUERY_EMBEDDING_CACHE_SIZE > 0
+    ):
+        _QUERY_EMBEDDING_CACHE = QueryEmbeddingCache(
+            max_entries=QUERY_EMBEDDING_CACHE_SIZE,
+            ttl=QUERY_EMBEDDING_CACHE_TTL,
+            shared_cache=(
+                get_default_embedding_cache() if QUERY_EMBEDDING_SHARED_CACHE else None
+            ),
+        )
+    return _QUERY_EMBEDDING_CACHE
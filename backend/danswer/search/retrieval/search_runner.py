@@ -1,5 +1,7 @@
+import asyncio
 import string
 from collections.abc import Callable
+from typing import cast
 
 import nltk  # type:ignore
 from nltk.corpus import stopwords  # type:ignore
@@ -11,8 +13,8 @@ from danswer.chat.models import LlmDoc
 from danswer.configs.chat_configs import HYBRID_ALPHA
 from danswer.configs.chat_configs import MULTILINGUAL_QUERY_EXPANSION
 from danswer.db.embedding_model import get_current_db_embedding_model
+from danswer.db.models import EmbeddingModel as DbEmbeddingModel
 from danswer.document_index.interfaces import DocumentIndex
-from danswer.search.enums import EmbedTextType
 from danswer.search.models import ChunkMetric
 from danswer.search.models import IndexFilters
 from danswer.search.models import InferenceChunk
@@ -20,13 +22,19 @@ from danswer.search.models import MAX_METRICS_CONTENT
 from danswer.search.models import RetrievalMetricsContainer
 from danswer.search.models import SearchQuery
 from danswer.search.models import SearchType
+from danswer.search.query_embedding_cache import build_query_embedding_cache_key
+from danswer.search.query_embedding_cache import get_query_embedding_cache
+from danswer.search.query_embedding_cache import normalize_query
 from danswer.search.search_nlp_models import EmbeddingModel
 from danswer.secondary_llm_flows.query_expansion import multilingual_query_expansion
 from danswer.utils.logger import setup_logger
 from danswer.utils.threadpool_concurrency import run_functions_tuples_in_parallel
+from danswer.utils.threadpool_concurrency import run_in_executor
+from danswer.utils.timing import log_async_function_time
 from danswer.utils.timing import log_function_time
 from shared_configs.configs import MODEL_SERVER_HOST
 from shared_configs.configs import MODEL_SERVER_PORT
+from shared_configs.enums import EmbedTextType
 
 
 logger = setup_logger()
@@ -107,13 +115,81 @@ def combine_retrieval_results(
     return sorted_chunks
 
 
+def build_query_embedding_model(
+    db_embedding_model: DbEmbeddingModel,
+) -> EmbeddingModel:
+    return EmbeddingModel(
+        model_name=db_embedding_model.model_name,
+        query_prefix=db_embedding_model.query_prefix,
+        passage_prefix=db_embedding_model.passage_prefix,
+        normalize=db_embedding_model.normalize,
+        # The below are globally set, this flow always uses the indexing one
+        server_host=MODEL_SERVER_HOST,
+        server_port=MODEL_SERVER_PORT,
+    )
+
+
+def _get_query_embedding_model(db_session: Session) -> EmbeddingModel:
+    return build_query_embedding_model(get_current_db_embedding_model(db_session))
+
+
+def embed_query(model: EmbeddingModel, query: str) -> list[float]:
+    query_embedding_cache = get_query_embedding_cache()
+    if query_embedding_cache is None:
+        return model.encode([query], text_type=EmbedTextType.QUERY)[0]
+
+    cache_key = build_query_embedding_cache_key(
+        model.model_name, model.normalize, model.query_prefix, query
+    )
+    query_embedding = query_embedding_cache.get(cache_key)
+    if query_embedding is None:
+        # The normalized query is embedded so that the cached embedding is exactly the one of
+        # every query mapping to the key
+        query_embedding = model.encode(
+            [normalize_query(query)], text_type=EmbedTextType.QUERY
+        )[0]
+        query_embedding_cache.put(cache_key, query_embedding)
+    return query_embedding
+
+
+async def async_embed_query(model: EmbeddingModel, query: str) -> list[float]:
+    query_embedding_cache = get_query_embedding_cache()
+    if query_embedding_cache is None:
+        return (await model.async_encode([query], text_type=EmbedTextType.QUERY))[0]
+
+    cache_key = build_query_embedding_cache_key(
+        model.model_name, model.normalize, model.query_prefix, query
+    )
+    # The shared cache is backed by a database, kept off the event loop
+    query_embedding = (
+        await asyncio.to_thread(query_embedding_cache.get, cache_key)
+        if query_embedding_cache.shared_cache is not None
+        else query_embedding_cache.get(cache_key)
+    )
+    if query_embedding is None:
+        query_embedding = (
+            await model.async_encode(
+                [normalize_query(query)], text_type=EmbedTextType.QUERY
+            )
+        )[0]
+        if query_embedding_cache.shared_cache is not None:
+            await asyncio.to_thread(
+                query_embedding_cache.put, cache_key, query_embedding
+            )
+        else:
+            query_embedding_cache.put(cache_key, query_embedding)
+    return query_embedding
+
+
 @log_function_time(print_only=True)
 def doc_index_retrieval(
     query: SearchQuery,
     document_index: DocumentIndex,
     db_session: Session,
     hybrid_alpha: float = HYBRID_ALPHA,
+    query_embedding: list[float] | None = None,
 ) -> list[InferenceChunk]:
+    """`query_embedding` is the embedding of the query if it was computed ahead of time"""
     if query.search_type == SearchType.KEYWORD:
         top_chunks = document_index.keyword_retrieval(
             query=query.query,
@@ -122,19 +198,10 @@ def doc_index_retrieval(
             num_to_retrieve=query.num_hits,
         )
     else:
-        db_embedding_model = get_current_db_embedding_model(db_session)
-
-        model = EmbeddingModel(
-            model_name=db_embedding_model.model_name,
-            query_prefix=db_embedding_model.query_prefix,
-            passage_prefix=db_embedding_model.passage_prefix,
-            normalize=db_embedding_model.normalize,
-            # The below are globally set, this flow always uses the indexing one
-            server_host=MODEL_SERVER_HOST,
-            server_port=MODEL_SERVER_PORT,
-        )
-
-        query_embedding = model.encode([query.query], text_type=EmbedTextType.QUERY)[0]
+        if query_embedding is None:
+            query_embedding = embed_query(
+                _get_query_embedding_model(db_session), query.query
+            )
 
         if query.search_type == SearchType.SEMANTIC:
             top_chunks = document_index.semantic_retrieval(
@@ -162,12 +229,119 @@ def doc_index_retrieval(
     return top_chunks
 
 
+@log_async_function_time(print_only=True)
+async def async_doc_index_retrieval(
+    query: SearchQuery,
+    document_index: DocumentIndex,
+    db_session: Session,
+    hybrid_alpha: float = HYBRID_ALPHA,
+    query_embedding: list[float] | None = None,
+    query_embedding_model: EmbeddingModel | None = None,
+) -> list[InferenceChunk]:
+    """`query_embedding_model` saves looking up the current embedding model, which would be
+    a blocking db query"""
+    if query.search_type == SearchType.KEYWORD:
+        return await document_index.async_keyword_retrieval(
+            query=query.query,
+            filters=query.filters,
+            time_decay_multiplier=query.recency_bias_multiplier,
+            num_to_retrieve=query.num_hits,
+        )
+
+    if query_embedding is None:
+        if query_embedding_model is None:
+            query_embedding_model = await run_in_executor(
+                _get_query_embedding_model, db_session
+            )
+        query_embedding = await async_embed_query(query_embedding_model, query.query)
+
+    if query.search_type == SearchType.SEMANTIC:
+        return await document_index.async_semantic_retrieval(
+            query=query.query,
+            query_embedding=query_embedding,
+            filters=query.filters,
+            time_decay_multiplier=query.recency_bias_multiplier,
+            num_to_retrieve=query.num_hits,
+        )
+
+    if query.search_type == SearchType.HYBRID:
+        return await document_index.async_hybrid_retrieval(
+            query=query.query,
+            query_embedding=query_embedding,
+            filters=query.filters,
+            time_decay_multiplier=query.recency_bias_multiplier,
+            num_to_retrieve=query.num_hits,
+            offset=query.offset,
+            hybrid_alpha=hybrid_alpha,
+        )
+
+    raise RuntimeError("Invalid Search Flow")
+
+
 def _simplify_text(text: str) -> str:
     return "".join(
         char for char in text if char not in string.punctuation and not char.isspace()
     ).lower()
 
 
+def _should_expand_query(
+    query: SearchQuery, multilingual_expansion_str: str | None
+) -> bool:
+    # Don't do query expansion on complex queries, rephrasings likely would not work well
+    return bool(multilingual_expansion_str) and not (
+        "\n" in query.query or "\r" in query.query
+    )
+
+
+def _dedupe_query_rephrases(
+    query: SearchQuery, query_rephrases: list[str]
+) -> list[SearchQuery]:
+    simplified_queries = set()
+    rephrased_queries: list[SearchQuery] = []
+
+    # Just to be extra sure, add the original query.
+    query_rephrases.append(query.query)
+    for rephrase in set(query_rephrases):
+        # Sometimes the model rephrases the query in the same language with minor changes
+        # Avoid doing an extra search with the minor changes as this biases the results
+        simplified_rephrase = _simplify_text(rephrase)
+        if simplified_rephrase in simplified_queries:
+            continue
+        simplified_queries.add(simplified_rephrase)
+
+        rephrased_queries.append(query.copy(update={"query": rephrase}, deep=True))
+    return rephrased_queries
+
+
+def _report_retrieval_results(
+    query: SearchQuery,
+    top_chunks: list[InferenceChunk],
+    retrieval_metrics_callback: Callable[[RetrievalMetricsContainer], None] | None,
+) -> None:
+    if not top_chunks:
+        logger.info(
+            f"{query.search_type.value.capitalize()} search returned no results "
+            f"with filters: {query.filters}"
+        )
+        return
+
+    if retrieval_metrics_callback is not None:
+        chunk_metrics = [
+            ChunkMetric(
+                document_id=chunk.document_id,
+                chunk_content_start=chunk.content[:MAX_METRICS_CONTENT],
+                first_link=chunk.source_links[0] if chunk.source_links else None,
+                score=chunk.score if chunk.score is not None else 0,
+            )
+            for chunk in top_chunks
+        ]
+        retrieval_metrics_callback(
+            RetrievalMetricsContainer(
+                search_type=query.search_type, metrics=chunk_metrics
+            )
+        )
+
+
 def retrieve_chunks(
     query: SearchQuery,
     document_index: DocumentIndex,
@@ -176,67 +350,96 @@ def retrieve_chunks(
     multilingual_expansion_str: str | None = MULTILINGUAL_QUERY_EXPANSION,
     retrieval_metrics_callback: Callable[[RetrievalMetricsContainer], None]
     | None = None,
+    query_embedding: list[float] | None = None,
 ) -> list[InferenceChunk]:
-    """Returns a list of the best chunks from an initial keyword/semantic/ hybrid search."""
-    # Don't do query expansion on complex queries, rephrasings likely would not work well
-    if not multilingual_expansion_str or "\n" in query.query or "\r" in query.query:
+    """Returns a list of the best chunks from an initial keyword/semantic/ hybrid search.
+    A precomputed `query_embedding` of the query is only used for the query itself, not its
+    rephrasings."""
+    if not _should_expand_query(query, multilingual_expansion_str):
         top_chunks = doc_index_retrieval(
             query=query,
             document_index=document_index,
             db_session=db_session,
             hybrid_alpha=hybrid_alpha,
+            query_embedding=query_embedding,
         )
     else:
-        simplified_queries = set()
-        run_queries: list[tuple[Callable, tuple]] = []
-
         # Currently only uses query expansion on multilingual use cases
         query_rephrases = multilingual_query_expansion(
-            query.query, multilingual_expansion_str
+            query.query, cast(str, multilingual_expansion_str)
         )
-        # Just to be extra sure, add the original query.
-        query_rephrases.append(query.query)
-        for rephrase in set(query_rephrases):
-            # Sometimes the model rephrases the query in the same language with minor changes
-            # Avoid doing an extra search with the minor changes as this biases the results
-            simplified_rephrase = _simplify_text(rephrase)
-            if simplified_rephrase in simplified_queries:
-                continue
-            simplified_queries.add(simplified_rephrase)
-
-            q_copy = query.copy(update={"query": rephrase}, deep=True)
-            run_queries.append(
+        run_queries: list[tuple[Callable, tuple]] = [
+            (
+                doc_index_retrieval,
                 (
-                    doc_index_retrieval,
-                    (q_copy, document_index, db_session, hybrid_alpha),
-                )
+                    rephrased_query,
+                    document_index,
+                    db_session,
+                    hybrid_alpha,
+                    query_embedding if rephrased_query.query == query.query else None,
+                ),
             )
+            for rephrased_query in _dedupe_query_rephrases(query, query_rephrases)
+        ]
         parallel_search_results = run_functions_tuples_in_parallel(run_queries)
         top_chunks = combine_retrieval_results(parallel_search_results)
 
-    if not top_chunks:
-        logger.info(
-            f"{query.search_type.value.capitalize()} search returned no results "
-            f"with filters: {query.filters}"
-        )
-        return []
+    _report_retrieval_results(query, top_chunks, retrieval_metrics_callback)
+    return top_chunks
 
-    if retrieval_metrics_callback is not None:
-        chunk_metrics = [
-            ChunkMetric(
-                document_id=chunk.document_id,
-                chunk_content_start=chunk.content[:MAX_METRICS_CONTENT],
-                first_link=chunk.source_links[0] if chunk.source_links else None,
-                score=chunk.score if chunk.score is not None else 0,
-            )
-            for chunk in top_chunks
-        ]
-        retrieval_metrics_callback(
-            RetrievalMetricsContainer(
-                search_type=query.search_type, metrics=chunk_metrics
+
+async def async_retrieve_chunks(
+    query: SearchQuery,
+    document_index: DocumentIndex,
+    db_session: Session,
+    hybrid_alpha: float = HYBRID_ALPHA,  # Only applicable to hybrid search
+    multilingual_expansion_str: str | None = MULTILINGUAL_QUERY_EXPANSION,
+    retrieval_metrics_callback: Callable[[RetrievalMetricsContainer], None]
+    | None = None,
+    query_embedding: list[float] | None = None,
+    query_embedding_model: EmbeddingModel | None = None,
+) -> list[InferenceChunk]:
+    """Awaitable version of `retrieve_chunks`, the searches for the query rephrasings run
+    concurrently on the event loop instead of in a threadpool. Without a
+    `query_embedding_model`, it is looked up off the event loop."""
+    if not _should_expand_query(query, multilingual_expansion_str):
+        top_chunks = await async_doc_index_retrieval(
+            query=query,
+            document_index=document_index,
+            db_session=db_session,
+            hybrid_alpha=hybrid_alpha,
+            query_embedding=query_embedding,
+            query_embedding_model=query_embedding_model,
+        )
+    else:
+        if query_embedding_model is None and query.search_type != SearchType.KEYWORD:
+            # Once for all of the rephrasings, the db session must not be used by several
+            # threads at once
+            query_embedding_model = await run_in_executor(
+                _get_query_embedding_model, db_session
             )
+        # The LLM client is blocking
+        query_rephrases = await run_in_executor(
+            multilingual_query_expansion,
+            query.query,
+            cast(str, multilingual_expansion_str),
+        )
+        search_results = await asyncio.gather(
+            *[
+                async_doc_index_retrieval(
+                    rephrased_query,
+                    document_index,
+                    db_session,
+                    hybrid_alpha,
+                    query_embedding if rephrased_query.query == query.query else None,
+                    query_embedding_model,
+                )
+                for rephrased_query in _dedupe_query_rephrases(query, query_rephrases)
+            ]
         )
+        top_chunks = combine_retrieval_results(list(search_results))
 
+    _report_retrieval_results(query, top_chunks, retrieval_metrics_callback)
     return top_chunks
 
 
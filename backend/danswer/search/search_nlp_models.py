@@ -4,21 +4,32 @@ import time
 from typing import Optional
 from typing import TYPE_CHECKING
 
+import httpx
+import numpy as np
 import requests
 from transformers import logging as transformer_logging  # type:ignore
 
 from danswer.configs.model_configs import DOC_EMBEDDING_CONTEXT_SIZE
 from danswer.configs.model_configs import DOCUMENT_ENCODER_MODEL
-from danswer.search.enums import EmbedTextType
+from danswer.configs.model_configs import MODEL_SERVER_CONNECT_TIMEOUT
+from danswer.configs.model_configs import MODEL_SERVER_MAX_RETRIES
+from danswer.configs.model_configs import MODEL_SERVER_READ_TIMEOUT
+from danswer.utils.http_client import AsyncPooledHttpClient
+from danswer.utils.http_client import PooledHttpClient
 from danswer.utils.logger import setup_logger
 from shared_configs.configs import MODEL_SERVER_HOST
 from shared_configs.configs import MODEL_SERVER_PORT
+from shared_configs.configs import MODEL_SERVER_WIRE_FORMAT
+from shared_configs.enums import EmbedTextType
 from shared_configs.model_server_models import EmbedRequest
 from shared_configs.model_server_models import EmbedResponse
 from shared_configs.model_server_models import IntentRequest
 from shared_configs.model_server_models import IntentResponse
 from shared_configs.model_server_models import RerankRequest
 from shared_configs.model_server_models import RerankResponse
+from shared_configs.wire_format import build_ndarray_accept_header
+from shared_configs.wire_format import decode_ndarray
+from shared_configs.wire_format import NDARRAY_MEDIA_TYPE
 
 transformer_logging.set_verbosity_error()
 
@@ -33,6 +44,7 @@ if TYPE_CHECKING:
 
 
 _TOKENIZER: tuple[Optional["AutoTokenizer"], str | None] = (None, None)
+_MODEL_TOKENIZERS: dict[str, "AutoTokenizer"] = {}
 
 
 def clean_model_name(model_str: str) -> str:
@@ -66,6 +78,24 @@ def get_default_tokenizer(model_name: str | None = None) -> "AutoTokenizer":
     return _TOKENIZER[0]
 
 
+def get_model_tokenizer(model_name: str) -> "AutoTokenizer":
+    """Tokenizer of a specific model. Kept per model, unlike `get_default_tokenizer` which
+    reloads whenever a different model is asked for. Falls back to the default tokenizer if
+    the model has none that can be loaded."""
+    from transformers import AutoTokenizer  # type: ignore
+
+    if model_name not in _MODEL_TOKENIZERS:
+        try:
+            _MODEL_TOKENIZERS[model_name] = AutoTokenizer.from_pretrained(model_name)
+        except Exception:
+            logger.warning(
+                f"Could not load the tokenizer of {model_name}, using the default one"
+            )
+            _MODEL_TOKENIZERS[model_name] = get_default_tokenizer()
+
+    return _MODEL_TOKENIZERS[model_name]
+
+
 def build_model_server_url(
     model_server_host: str,
     model_server_port: int,
@@ -80,6 +110,51 @@ def build_model_server_url(
     return f"http://{model_server_url}"
 
 
+_MODEL_SERVER_CLIENT: PooledHttpClient | None = None
+_ASYNC_MODEL_SERVER_CLIENT: AsyncPooledHttpClient | None = None
+
+
+def get_model_server_client() -> PooledHttpClient:
+    """Shared by every model server call in the process so connections are reused"""
+    global _MODEL_SERVER_CLIENT
+    if _MODEL_SERVER_CLIENT is None:
+        _MODEL_SERVER_CLIENT = PooledHttpClient(
+            connect_timeout=MODEL_SERVER_CONNECT_TIMEOUT,
+            read_timeout=MODEL_SERVER_READ_TIMEOUT,
+            max_retries=MODEL_SERVER_MAX_RETRIES,
+            metric_prefix="model_server",
+        )
+    return _MODEL_SERVER_CLIENT
+
+
+def get_async_model_server_client() -> AsyncPooledHttpClient:
+    global _ASYNC_MODEL_SERVER_CLIENT
+    if _ASYNC_MODEL_SERVER_CLIENT is None:
+        _ASYNC_MODEL_SERVER_CLIENT = AsyncPooledHttpClient(
+            connect_timeout=MODEL_SERVER_CONNECT_TIMEOUT,
+            read_timeout=MODEL_SERVER_READ_TIMEOUT,
+            max_retries=MODEL_SERVER_MAX_RETRIES,
+            metric_prefix="model_server",
+        )
+    return _ASYNC_MODEL_SERVER_CLIENT
+
+
+def _model_server_headers(wire_format: str) -> dict[str, str]:
+    """Asks for the binary ndarray encoding unless configured to use JSON"""
+    if wire_format == "json":
+        return {}
+    return {"Accept": build_ndarray_accept_header(dtype=wire_format)}
+
+
+def _decode_if_ndarray(
+    response: requests.Response | httpx.Response,
+) -> np.ndarray | None:
+    """Returns None if the server responded with JSON, then the caller parses the body"""
+    if response.headers.get("Content-Type", "").startswith(NDARRAY_MEDIA_TYPE):
+        return decode_ndarray(response.content)
+    return None
+
+
 class EmbeddingModel:
     def __init__(
         self,
@@ -91,17 +166,21 @@ class EmbeddingModel:
         server_port: int,
         # The following are globals are currently not configurable
         max_seq_length: int = DOC_EMBEDDING_CONTEXT_SIZE,
+        wire_format: str = MODEL_SERVER_WIRE_FORMAT,
     ) -> None:
         self.model_name = model_name
         self.max_seq_length = max_seq_length
         self.query_prefix = query_prefix
         self.passage_prefix = passage_prefix
         self.normalize = normalize
+        self.wire_format = wire_format
 
         model_server_url = build_model_server_url(server_host, server_port)
         self.embed_server_endpoint = f"{model_server_url}/encoder/bi-encoder-embed"
 
-    def encode(self, texts: list[str], text_type: EmbedTextType) -> list[list[float]]:
+    def _build_embed_request(
+        self, texts: list[str], text_type: EmbedTextType
+    ) -> EmbedRequest:
         if text_type == EmbedTextType.QUERY and self.query_prefix:
             prefixed_texts = [self.query_prefix + text for text in texts]
         elif text_type == EmbedTextType.PASSAGE and self.passage_prefix:
@@ -109,17 +188,48 @@ class EmbeddingModel:
         else:
             prefixed_texts = texts
 
-        embed_request = EmbedRequest(
+        return EmbedRequest(
             texts=prefixed_texts,
             model_name=self.model_name,
             max_context_length=self.max_seq_length,
             normalize_embeddings=self.normalize,
+            text_type=text_type,
         )
 
-        response = requests.post(self.embed_server_endpoint, json=embed_request.dict())
+    @staticmethod
+    def _parse_embed_response(
+        response: requests.Response | httpx.Response,
+    ) -> np.ndarray:
         response.raise_for_status()
+        embeddings = _decode_if_ndarray(response)
+        if embeddings is None:
+            embeddings = np.asarray(
+                EmbedResponse(**response.json()).embeddings, dtype=np.float32
+            )
+        return embeddings
 
-        return EmbedResponse(**response.json()).embeddings
+    def encode(self, texts: list[str], text_type: EmbedTextType) -> list[list[float]]:
+        return self.encode_array(texts, text_type).tolist()
+
+    def encode_array(self, texts: list[str], text_type: EmbedTextType) -> np.ndarray:
+        """Returns a float32 array with one row per text, avoids materializing every value
+        as a Python float"""
+        response = get_model_server_client().post(
+            self.embed_server_endpoint,
+            json=self._build_embed_request(texts, text_type).dict(),
+            headers=_model_server_headers(self.wire_format),
+        )
+        return self._parse_embed_response(response)
+
+    async def async_encode(
+        self, texts: list[str], text_type: EmbedTextType
+    ) -> list[list[float]]:
+        response = await get_async_model_server_client().post(
+            self.embed_server_endpoint,
+            json=self._build_embed_request(texts, text_type).dict(),
+            headers=_model_server_headers(self.wire_format),
+        )
+        return self._parse_embed_response(response).tolist()
 
 
 class CrossEncoderEnsembleModel:
@@ -130,16 +240,48 @@ class CrossEncoderEnsembleModel:
     ) -> None:
         model_server_url = build_model_server_url(model_server_host, model_server_port)
         self.rerank_server_endpoint = model_server_url + "/encoder/cross-encoder-scores"
+        # Scores are few, no point in trading away precision for them
+        self.headers = _model_server_headers(
+            "json" if MODEL_SERVER_WIRE_FORMAT == "json" else "float32"
+        )
 
-    def predict(self, query: str, passages: list[str]) -> list[list[float]]:
-        rerank_request = RerankRequest(query=query, documents=passages)
+    @staticmethod
+    def _parse_rerank_response(
+        response: requests.Response | httpx.Response,
+    ) -> np.ndarray:
+        response.raise_for_status()
+        scores = _decode_if_ndarray(response)
+        if scores is None:
+            scores = np.asarray(RerankResponse(**response.json()).scores)
+        return scores
 
-        response = requests.post(
-            self.rerank_server_endpoint, json=rerank_request.dict()
+    def predict(
+        self, query: str, passages: list[str], model_names: list[str] | None = None
+    ) -> np.ndarray:
+        """Returns the scores with one row per model of the ensemble, or per model of
+        `model_names` if given"""
+        rerank_request = RerankRequest(
+            query=query, documents=passages, model_names=model_names
         )
-        response.raise_for_status()
+        response = get_model_server_client().post(
+            self.rerank_server_endpoint,
+            json=rerank_request.dict(),
+            headers=self.headers,
+        )
+        return self._parse_rerank_response(response)
 
-        return RerankResponse(**response.json()).scores
+    async def async_predict(
+        self, query: str, passages: list[str], model_names: list[str] | None = None
+    ) -> np.ndarray:
+        rerank_request = RerankRequest(
+            query=query, documents=passages, model_names=model_names
+        )
+        response = await get_async_model_server_client().post(
+            self.rerank_server_endpoint,
+            json=rerank_request.dict(),
+            headers=self.headers,
+        )
+        return self._parse_rerank_response(response)
 
 
 class IntentModel:
@@ -157,7 +299,17 @@ class IntentModel:
     ) -> list[float]:
         intent_request = IntentRequest(query=query)
 
-        response = requests.post(
+        response = get_model_server_client().post(
+            self.intent_server_endpoint, json=intent_request.dict()
+        )
+        response.raise_for_status()
+
+        return IntentResponse(**response.json()).class_probs
+
+    async def async_predict(self, query: str) -> list[float]:
+        intent_request = IntentRequest(query=query)
+
+        response = await get_async_model_server_client().post(
             self.intent_server_endpoint, json=intent_request.dict()
         )
         response.raise_for_status()
@@ -0,0 +1,209 @@
+import hashlib
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from dataclasses import replace
+from typing import Any
+from typing import cast
+
+from danswer.configs.app_configs import SEARCH_RESULT_CACHE_SIZE
+from danswer.configs.app_configs import SEARCH_RESULT_CACHE_TTL
+from danswer.dynamic_configs.factory import get_dynamic_config_store
+from danswer.dynamic_configs.interface import ConfigNotFoundError
+from danswer.search.enums import QueryFlow
+from danswer.search.enums import SearchType
+from danswer.search.models import InferenceChunk
+from danswer.search.models import SearchQuery
+from danswer.search.models import SearchRequest
+from danswer.utils.logger import setup_logger
+
+logger = setup_logger()
+
+_INDEX_GENERATION_KEY = "search_index_generation"
+
+
+def get_index_generation() -> str:
+    """Changes whenever something that searches can see is written to the index. Empty if
+    nothing was ever written since the cache was introduced"""
+    try:
+        return cast(str, get_dynamic_config_store().load(_INDEX_GENERATION_KEY))
+    except ConfigNotFoundError:
+        return ""
+
+
+def bump_index_generation() -> None:
+    """Invalidates every cached search result, in all processes. Must be called after the
+    change is visible to searches. A random token rather than a counter, so that concurrent
+    bumps need no coordination and a bump is never lost. Never raises, a failure only means
+    results may be served until their TTL runs out. Bumps even where the cache is disabled,
+    the processes writing to the index are not the ones serving searches."""
+    try:
+        get_dynamic_config_store().store(_INDEX_GENERATION_KEY, uuid.uuid4().hex)
+    except Exception:
+        logger.exception("Failed to bump the search index generation")
+
+
+def build_search_cache_key(
+    search_request: SearchRequest,
+    access_control_list: list[str] | None,
+    index_name: str,
+    multilingual_expansion: str | None,
+) -> str:
+    """Fingerprint of everything that determines the results of a search. Persona settings
+    are part of it rather than the persona id alone, so that editing a persona takes effect
+    right away. `access_control_list` is None for searches bypassing ACLs."""
+    persona = search_request.persona
+    fingerprint = {
+        "request": search_request.dict(exclude={"persona"}),
+        "persona": None
+        if persona is None
+        else {
+            "id": persona.id,
+            "document_sets": sorted(
+                document_set.name for document_set in persona.document_sets
+            ),
+            "search_type": persona.search_type,
+            "num_chunks": persona.num_chunks,
+            "llm_relevance_filter": persona.llm_relevance_filter,
+            "llm_filter_extraction": persona.llm_filter_extraction,
+            "recency_bias": persona.recency_bias,
+        },
+        "acl": None if access_control_list is None else sorted(access_control_list),
+        "index_name": index_name,
+        "multilingual_expansion": multilingual_expansion,
+    }
+    return hashlib.sha256(
+        json.dumps(fingerprint, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+@dataclass(frozen=True)
+class CachedSearchResult:
+    search_query: SearchQuery
+    # None until the query intent of the search that cached the result resolved, retrieval
+    # does not wait on it
+    predicted_search_type: SearchType | None
+    predicted_flow: QueryFlow | None
+    retrieved_chunks: list[InferenceChunk]
+    # None until the search that cached the result reranked its chunks
+    reranked_chunks: list[InferenceChunk] | None = None
+
+
+def _copy_result(result: CachedSearchResult) -> CachedSearchResult:
+    # Postprocessing sets the scores and match highlights of the chunks it is given
+    return CachedSearchResult(
+        search_query=result.search_query,
+        predicted_search_type=result.predicted_search_type,
+        predicted_flow=result.predicted_flow,
+        retrieved_chunks=[chunk.copy() for chunk in result.retrieved_chunks],
+        reranked_chunks=None
+        if result.reranked_chunks is None
+        else [chunk.copy() for chunk in result.reranked_chunks],
+    )
+
+
+class SearchResultCache:
+    """Thread safe LRU of search results. Entries expire after `ttl` seconds and are only
+    served while the index generation they were computed at is still the current one."""
+
+    def __init__(self, max_entries: int, ttl: float) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        # Least recently used first, values are (expiry time, index generation, result)
+        self._entries: OrderedDict[
+            str, tuple[float, str, CachedSearchResult]
+        ] = OrderedDict()
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get(self, key: str, index_generation: str) -> CachedSearchResult | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, entry_generation, result = entry
+                if (
+                    expires_at > time.monotonic()
+                    and entry_generation == index_generation
+                ):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return _copy_result(result)
+                del self._entries[key]
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, index_generation: str, result: CachedSearchResult) -> None:
+        """`index_generation` must have been read before the search started, so that a
+        write to the index during the search invalidates its result"""
+        result = _copy_result(result)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, index_generation, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _update(self, key: str, index_generation: str, **changes: Any) -> None:
+        """Sets fields of a result cached at the same index generation, the expiry is left
+        as is"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] != index_generation:
+                return
+            expires_at, _, result = entry
+            self._entries[key] = (
+                expires_at,
+                index_generation,
+                replace(result, **changes),
+            )
+
+    def update_reranked_chunks(
+        self, key: str, index_generation: str, reranked_chunks: list[InferenceChunk]
+    ) -> None:
+        self._update(
+            key,
+            index_generation,
+            reranked_chunks=[chunk.copy() for chunk in reranked_chunks],
+        )
+
+    def update_query_intent(
+        self,
+        key: str,
+        index_generation: str,
+        predicted_search_type: SearchType,
+        predicted_flow: QueryFlow,
+    ) -> None:
+        self._update(
+            key,
+            index_generation,
+            predicted_search_type=predicted_search_type,
+            predicted_flow=predicted_flow,
+        )
+
+
+_SEARCH_RESULT_CACHE: SearchResultCache | None = None
+
+
+def get_search_result_cache() -> SearchResultCache | None:
+    """Returns the process wide search result cache, or None if it is disabled"""
+    global _SEARCH_RESULT_CACHE
+
+    if (
+        _SEARCH_RESULT_CACHE is None
+        and SEARCH_RESULT_CACHE_TTL > 0
+        and SEARCH_RESULT_CACHE_SIZE > 0
+    ):
+        _SEARCH_RESULT_CACHE = SearchResultCache(
+            max_entries=SEARCH_RESULT_CACHE_SIZE, ttl=SEARCH_RESULT_CACHE_TTL
+        )
+    return _SEARCH_RESULT_CACHE
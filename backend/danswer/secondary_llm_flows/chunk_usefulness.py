@@ -7,6 +7,7 @@ from danswer.llm.utils import message_to_string
 from danswer.prompts.llm_chunk_filter import CHUNK_FILTER_PROMPT
 from danswer.prompts.llm_chunk_filter import NONUSEFUL_PAT
 from danswer.utils.logger import setup_logger
+from danswer.utils.threadpool_concurrency import LLM_EXECUTOR
 from danswer.utils.threadpool_concurrency import run_functions_tuples_in_parallel
 
 logger = setup_logger()
@@ -63,7 +64,7 @@ def llm_batch_eval_chunks(
             "Running LLM usefulness eval in parallel (following logging may be out of order)"
         )
         parallel_results = run_functions_tuples_in_parallel(
-            functions_with_args, allow_failures=True
+            functions_with_args, allow_failures=True, executor_name=LLM_EXECUTOR
         )
 
         # In case of failure/timeout, don't throw out the chunk
@@ -14,6 +14,7 @@ from danswer.prompts.chat_prompts import HISTORY_QUERY_REPHRASE
 from danswer.prompts.miscellaneous_prompts import LANGUAGE_REPHRASE_PROMPT
 from danswer.utils.logger import setup_logger
 from danswer.utils.text_processing import count_punctuation
+from danswer.utils.threadpool_concurrency import LLM_EXECUTOR
 from danswer.utils.threadpool_concurrency import run_functions_tuples_in_parallel
 
 logger = setup_logger()
@@ -61,7 +62,9 @@ def multilingual_query_expansion(
             for language in languages
         ]
 
-        query_rephrases = run_functions_tuples_in_parallel(functions_with_args)
+        query_rephrases = run_functions_tuples_in_parallel(
+            functions_with_args, executor_name=LLM_EXECUTOR
+        )
         return query_rephrases
 
     else:
@@ -177,6 +177,7 @@ def upsert_ingestion_doc(
             embedder=new_index_embedding_model,
             document_index=sec_doc_index,
             ignore_time_skip=True,
+            record_chunk_counts=False,
             db_session=db_session,
         )
 
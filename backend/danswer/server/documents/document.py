@@ -5,6 +5,7 @@ from fastapi import Query
 from sqlalchemy.orm import Session
 
 from danswer.auth.users import current_user
+from danswer.db.document import get_document_chunk_counts
 from danswer.db.embedding_model import get_current_db_embedding_model
 from danswer.db.engine import get_session
 from danswer.db.models import User
@@ -39,6 +40,9 @@ def get_document_info(
         min_chunk_ind=None,
         max_chunk_ind=None,
         user_access_control_list=user_acl_filters,
+        chunk_count=get_document_chunk_counts(
+            document_ids=[document_id], db_session=db_session
+        ).get(document_id),
     )
 
     if not inference_chunks:
@@ -85,6 +89,9 @@ def get_chunk_info(
         min_chunk_ind=chunk_id,
         max_chunk_ind=chunk_id,
         user_access_control_list=user_acl_filters,
+        chunk_count=get_document_chunk_counts(
+            document_ids=[document_id], db_session=db_session
+        ).get(document_id),
     )
 
     if not inference_chunks:
@@ -6,11 +6,13 @@ from fastapi import Depends
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
+from danswer.db.embedding_model import get_current_db_embedding_model
 from danswer.db.engine import get_session
 from danswer.search.models import SearchRequest
-from danswer.search.pipeline import SearchPipeline
+from danswer.search.pipeline import AsyncSearchPipeline
 from danswer.server.danswer_api.ingestion import api_key_dep
 from danswer.utils.logger import setup_logger
+from danswer.utils.threadpool_concurrency import run_in_executor
 
 
 logger = setup_logger()
@@ -61,18 +63,26 @@ class GptSearchResponse(BaseModel):
 
 
 @router.post("/gpt-document-search")
-def gpt_search(
+async def gpt_search(
     search_request: GptSearchRequest,
     _: str | None = Depends(api_key_dep),
     db_session: Session = Depends(get_session),
 ) -> GptSearchResponse:
-    top_chunks = SearchPipeline(
+    search_pipeline = AsyncSearchPipeline(
         search_request=SearchRequest(
             query=search_request.query,
         ),
         user=None,
         db_session=db_session,
-    ).reranked_chunks
+        embedding_model=await run_in_executor(
+            get_current_db_embedding_model, db_session
+        ),
+    )
+    try:
+        top_chunks = await search_pipeline.reranked_chunks()
+    finally:
+        # The LLM chunk filter result is not used here
+        await search_pipeline.aclose()
 
     return GptSearchResponse(
         matching_document_chunks=[
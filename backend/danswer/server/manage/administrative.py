@@ -37,7 +37,10 @@ from danswer.server.documents.models import ConnectorCredentialPairIdentifier
 from danswer.server.manage.models import BoostDoc
 from danswer.server.manage.models import BoostUpdateRequest
 from danswer.server.manage.models import HiddenUpdateRequest
+from danswer.server.manage.models import RuntimeStatsResponse
 from danswer.utils.logger import setup_logger
+from danswer.utils.metrics import get_latency_snapshots
+from danswer.utils.threadpool_concurrency import get_executor_stats
 
 router = APIRouter(prefix="/manage")
 logger = setup_logger()
@@ -229,3 +232,15 @@ def update_token_budget_settings(
     # Store the settings in the dynamic config store
     get_dynamic_config_store().store(TOKEN_BUDGET_SETTINGS, settings_json)
     return {"message": "Token budget settings updated successfully."}
+
+
+@router.get("/admin/runtime-stats")
+def get_runtime_stats(
+    _: User | None = Depends(current_admin_user),
+) -> RuntimeStatsResponse:
+    """Queue depth, active workers and task wait times of the shared thread pools, along with
+    the latency of the requests to the model server (embedding, intent and reranking)"""
+    return RuntimeStatsResponse(
+        executors=get_executor_stats(),
+        model_server_latencies=get_latency_snapshots(prefix="model_server"),
+    )
@@ -23,6 +23,7 @@ from danswer.server.manage.llm.models import LLMProviderDescriptor
 from danswer.server.manage.llm.models import LLMProviderUpsertRequest
 from danswer.server.manage.llm.models import TestLLMRequest
 from danswer.utils.logger import setup_logger
+from danswer.utils.threadpool_concurrency import LLM_EXECUTOR
 from danswer.utils.threadpool_concurrency import run_functions_tuples_in_parallel
 
 logger = setup_logger()
@@ -70,7 +71,7 @@ def test_llm_configuration(
         functions_with_args.append((test_llm, (fast_llm,)))
 
     parallel_results = run_functions_tuples_in_parallel(
-        functions_with_args, allow_failures=False
+        functions_with_args, allow_failures=False, executor_name=LLM_EXECUTOR
     )
     error = parallel_results[0] or (
         parallel_results[1] if len(parallel_results) > 1 else None
@@ -96,7 +97,7 @@ def test_default_provider(
         (test_llm, (fast_llm,)),
     ]
     parallel_results = run_functions_tuples_in_parallel(
-        functions_with_args, allow_failures=False
+        functions_with_args, allow_failures=False, executor_name=LLM_EXECUTOR
     )
     error = parallel_results[0] or (
         parallel_results[1] if len(parallel_results) > 1 else None
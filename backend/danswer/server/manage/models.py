@@ -26,6 +26,13 @@ class AuthTypeResponse(BaseModel):
     requires_verification: bool
 
 
+class RuntimeStatsResponse(BaseModel):
+    # Of the API server process that answered, each worker process has its own pools
+    executors: dict[str, dict[str, Any]]
+    # Keyed by endpoint, in seconds
+    model_server_latencies: dict[str, dict[str, float]]
+
+
 class UserInfo(BaseModel):
     id: str
     email: str
@@ -31,6 +31,7 @@ from danswer.server.query_and_chat.models import SourceTag
 from danswer.server.query_and_chat.models import TagResponse
 from danswer.server.query_and_chat.token_budget import check_token_budget
 from danswer.utils.logger import setup_logger
+from danswer.utils.threadpool_concurrency import run_in_executor
 
 logger = setup_logger()
 
@@ -39,7 +40,7 @@ basic_router = APIRouter(prefix="/query")
 
 
 @admin_router.post("/search")
-def admin_search(
+async def admin_search(
     question: AdminSearchRequest,
     user: User | None = Depends(current_admin_user),
     db_session: Session = Depends(get_session),
@@ -47,7 +48,9 @@ def admin_search(
     query = question.query
     logger.info(f"Received admin search query: {query}")
 
-    user_acl_filters = build_access_filters_for_user(user, db_session)
+    user_acl_filters = await run_in_executor(
+        build_access_filters_for_user, user, db_session
+    )
     final_filters = IndexFilters(
         source_type=question.filters.source_type,
         document_set=question.filters.document_set,
@@ -55,7 +58,8 @@ def admin_search(
         access_control_list=user_acl_filters,
     )
 
-    embedding_model = get_current_db_embedding_model(db_session)
+    # Blocking db query, kept off the event loop
+    embedding_model = await run_in_executor(get_current_db_embedding_model, db_session)
 
     document_index = get_default_document_index(
         primary_index_name=embedding_model.index_name, secondary_index_name=None
@@ -67,7 +71,9 @@ def admin_search(
             detail="Cannot use admin-search when using a non-Vespa document index",
         )
 
-    matching_chunks = document_index.admin_retrieval(query=query, filters=final_filters)
+    matching_chunks = await document_index.async_admin_retrieval(
+        query=query, filters=final_filters
+    )
 
     documents = chunks_or_sections_to_search_docs(matching_chunks)
 
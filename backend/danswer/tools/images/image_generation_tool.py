@@ -16,6 +16,7 @@ from danswer.prompts.constants import GENERAL_SEP_PAT
 from danswer.tools.tool import Tool
 from danswer.tools.tool import ToolResponse
 from danswer.utils.logger import setup_logger
+from danswer.utils.threadpool_concurrency import LLM_EXECUTOR
 from danswer.utils.threadpool_concurrency import run_functions_tuples_in_parallel
 
 logger = setup_logger()
@@ -155,7 +156,8 @@ class ImageGenerationTool(Tool):
         results = cast(
             list[ImageGenerationResponse],
             run_functions_tuples_in_parallel(
-                [(self._generate_image, (prompt,)) for _ in range(self.num_imgs)]
+                [(self._generate_image, (prompt,)) for _ in range(self.num_imgs)],
+                executor_name=LLM_EXECUTOR,
             ),
         )
         yield ToolResponse(
@@ -8,6 +8,7 @@ from sqlalchemy.orm import Session
 
 from danswer.chat.chat_utils import llm_doc_from_inference_section
 from danswer.chat.models import LlmDoc
+from danswer.configs.chat_configs import STREAM_PROVISIONAL_SEARCH_RESULTS
 from danswer.db.models import Persona
 from danswer.db.models import User
 from danswer.llm.answering.doc_pruning import prune_documents
@@ -23,12 +24,14 @@ from danswer.search.models import InferenceSection
 from danswer.search.models import RetrievalDetails
 from danswer.search.models import SearchRequest
 from danswer.search.pipeline import SearchPipeline
+from danswer.search.postprocessing.postprocessing import should_rerank
 from danswer.secondary_llm_flows.choose_search import check_if_need_search
 from danswer.secondary_llm_flows.query_expansion import history_based_query_rephrase
 from danswer.tools.search.search_utils import llm_doc_to_dict
 from danswer.tools.tool import Tool
 from danswer.tools.tool import ToolResponse
 
+SEARCH_PROVISIONAL_RESULTS_ID = "search_provisional_results"
 SEARCH_RESPONSE_SUMMARY_ID = "search_response_summary"
 SECTION_RELEVANCE_LIST_ID = "section_relevance_list"
 FINAL_CONTEXT_DOCUMENTS = "final_context_documents"
@@ -71,6 +74,8 @@ class SearchTool(Tool):
         chunks_above: int = 0,
         chunks_below: int = 0,
         full_doc: bool = False,
+        # if set, the retrieved chunks are sent before being reranked
+        stream_provisional_results: bool = STREAM_PROVISIONAL_SEARCH_RESULTS,
     ) -> None:
         self.user = user
         self.persona = persona
@@ -84,6 +89,7 @@ class SearchTool(Tool):
         self.chunks_above = chunks_above
         self.chunks_below = chunks_below
         self.full_doc = full_doc
+        self.stream_provisional_results = stream_provisional_results
         self.db_session = db_session
 
     @classmethod
@@ -115,7 +121,9 @@ class SearchTool(Tool):
     def build_tool_message_content(
         self, *args: ToolResponse
     ) -> str | list[str | dict[str, Any]]:
-        final_context_docs_response = args[2]
+        final_context_docs_response = next(
+            response for response in args if response.id == FINAL_CONTEXT_DOCUMENTS
+        )
         final_context_docs = cast(list[LlmDoc], final_context_docs_response.response)
 
         return json.dumps(
@@ -206,6 +214,14 @@ class SearchTool(Tool):
             user=self.user,
             db_session=self.db_session,
         )
+        if self.stream_provisional_results and should_rerank(
+            search_pipeline.search_query
+        ):
+            # Lets the results be shown while they are reranked
+            yield ToolResponse(
+                id=SEARCH_PROVISIONAL_RESULTS_ID,
+                response=search_pipeline.retrieved_chunks,
+            )
         yield ToolResponse(
             id=SEARCH_RESPONSE_SUMMARY_ID,
             response=SearchResponseSummary(
@@ -13,6 +13,7 @@ from danswer.document_index.interfaces import UpdateRequest
 from danswer.document_index.vespa.index import VespaIndex
 from danswer.dynamic_configs.factory import get_dynamic_config_store
 from danswer.dynamic_configs.interface import ConfigNotFoundError
+from danswer.search.search_result_cache import bump_index_generation
 from danswer.utils.logger import setup_logger
 
 logger = setup_logger()
@@ -58,6 +59,7 @@ def set_acl_for_vespa(should_check_if_already_done: bool = False) -> None:
         ]
         vespa_index.update(update_requests=update_requests)
 
+    bump_index_generation()
     dynamic_config_store.store(_COMPLETED_ACL_UPDATE_KEY, True)
 
 
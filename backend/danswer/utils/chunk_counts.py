@@ -0,0 +1,107 @@
+from threading import Thread
+
+import httpx
+from sqlalchemy.orm import Session
+
+from danswer.configs.constants import CHUNK_ID
+from danswer.configs.constants import DOCUMENT_ID
+from danswer.db.document import backfill_docs_chunk_count
+from danswer.db.embedding_model import get_current_db_embedding_model
+from danswer.db.engine import get_sqlalchemy_engine
+from danswer.document_index.vespa.index import DOCUMENT_ID_ENDPOINT
+from danswer.dynamic_configs.factory import get_dynamic_config_store
+from danswer.dynamic_configs.interface import ConfigNotFoundError
+from danswer.utils.batching import batch_generator
+from danswer.utils.logger import setup_logger
+
+logger = setup_logger()
+
+
+# Holds the name of the last index whose chunk counts were backfilled
+_COMPLETED_CHUNK_COUNT_BACKFILL_KEY = "completed_chunk_count_backfill"
+# How long Vespa visits before answering with a page, the client waits a bit longer
+_VISIT_TIME_CHUNK = "30s"
+_VISIT_TIMEOUT = 60
+_UPDATE_BATCH_SIZE = 1000
+
+
+def _get_current_index_name() -> str:
+    with Session(get_sqlalchemy_engine()) as db_session:
+        return get_current_db_embedding_model(db_session).index_name
+
+
+def _visit_chunk_counts(index_name: str) -> dict[str, int]:
+    url = DOCUMENT_ID_ENDPOINT.format(index_name=index_name)
+    params: dict[str, str | int] = {
+        "selection": index_name,
+        "fieldSet": f"{index_name}:{DOCUMENT_ID},{index_name}:{CHUNK_ID}",
+        "wantedDocumentCount": 1_000,
+        "timeChunk": _VISIT_TIME_CHUNK,
+    }
+
+    doc_id_to_chunk_count: dict[str, int] = {}
+    with httpx.Client(http2=True) as http_client:
+        while True:
+            response = http_client.get(url, params=params, timeout=_VISIT_TIMEOUT)
+            response.raise_for_status()
+            response_data = response.json()
+
+            for chunk in response_data.get("documents", []):
+                document_id = chunk["fields"][DOCUMENT_ID]
+                doc_id_to_chunk_count[document_id] = max(
+                    doc_id_to_chunk_count.get(document_id, 0),
+                    chunk["fields"][CHUNK_ID] + 1,
+                )
+
+            if not response_data.get("continuation"):
+                break
+            params["continuation"] = response_data["continuation"]
+
+    return doc_id_to_chunk_count
+
+
+def backfill_chunk_counts(should_check_if_already_done: bool = False) -> None:
+    """Records the chunk count of every document of the current index that has none, read from
+    a visit of the whole index. Needed for documents indexed before the counts were tracked and
+    after an index swap, until then their chunks are found with visits."""
+    dynamic_config_store = get_dynamic_config_store()
+    index_name = _get_current_index_name()
+    if should_check_if_already_done:
+        try:
+            backfilled_index_name = dynamic_config_store.load(
+                _COMPLETED_CHUNK_COUNT_BACKFILL_KEY
+            )
+            if backfilled_index_name == index_name:
+                return
+        except ConfigNotFoundError:
+            pass
+
+    logger.info(f"Backfilling document chunk counts from index '{index_name}'")
+    doc_id_to_chunk_count = _visit_chunk_counts(index_name)
+
+    with Session(get_sqlalchemy_engine()) as db_session:
+        for batch in batch_generator(
+            list(doc_id_to_chunk_count.items()), _UPDATE_BATCH_SIZE
+        ):
+            # The counts of a swapped out index must not be written over the cleared ones
+            if get_current_db_embedding_model(db_session).index_name != index_name:
+                logger.info("Index was swapped, stopping the chunk count backfill")
+                return
+            backfill_docs_chunk_count(
+                ids_to_chunk_count=dict(batch), db_session=db_session
+            )
+
+    dynamic_config_store.store(_COMPLETED_CHUNK_COUNT_BACKFILL_KEY, index_name)
+    logger.info(
+        f"Backfilled the chunk counts of {len(doc_id_to_chunk_count)} documents"
+    )
+
+
+def backfill_chunk_counts_nonblocking(
+    should_check_if_already_done: bool = False,
+) -> None:
+    """Kick off the backfill in a separate thread, visiting the whole index takes a while."""
+    Thread(
+        target=backfill_chunk_counts,
+        args=[should_check_if_already_done],
+    ).start()
@@ -0,0 +1,475 @@
+import asyncio
+import concurrent.futures
+import os
+import random
+import threading
+import time
+from typing import Any
+from urllib.parse import urlparse
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from danswer.utils.logger import setup_logger
+from danswer.utils.metrics import get_latency_histogram
+from danswer.utils.metrics import LatencyHistogram
+
+logger = setup_logger()
+
+_RETRYABLE_STATUS_CODES = {502, 503, 504}
+# The httpx counterparts of requests.ConnectionError, which includes connect timeouts
+_RETRYABLE_HTTPX_ERRORS = (
+    httpx.NetworkError,
+    httpx.RemoteProtocolError,
+    httpx.ConnectTimeout,
+)
+# Below this many recorded requests the latency percentiles are too noisy to hedge on
+_MIN_HEDGE_SAMPLES = 20
+
+
+def full_jitter_backoff(attempt: int, base: float, cap: float) -> float:
+    # "Full jitter", avoids retry storms when many callers fail at once
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a service whose circuit is open"""
+
+
+class CircuitBreaker:
+    """Fails requests fast once a service looks down, rather than having every caller wait
+    out its timeouts. Opens after `failure_threshold` consecutive failed requests, then after
+    `reset_timeout` seconds lets a single trial request through which closes it again if it
+    succeeds. Thread safe, meant to be shared by all the clients of a service."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 10.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self._lock = threading.Lock()
+        self._consecutive_failures = 0
+        self._opened_at: float | None = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def before_request(self) -> None:
+        with self._lock:
+            if self._opened_at is None:
+                return
+            now = time.monotonic()
+            if now - self._opened_at < self.reset_timeout:
+                raise CircuitOpenError(
+                    f"Circuit open after {self._consecutive_failures} failed requests"
+                )
+            # Let this request through as the trial, the others keep failing fast until
+            # it succeeds or another `reset_timeout` has passed
+            self._opened_at = now
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._consecutive_failures = 0
+            self._opened_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._consecutive_failures += 1
+            if self._consecutive_failures < self.failure_threshold:
+                return
+            if self._opened_at is None:
+                logger.warning(
+                    f"Opening circuit after {self._consecutive_failures} failed "
+                    "requests"
+                )
+            self._opened_at = time.monotonic()
+
+
+def _hedge_delay(
+    histogram: LatencyHistogram, percentile: float | None, min_delay: float
+) -> float | None:
+    if percentile is None or histogram.count < _MIN_HEDGE_SAMPLES:
+        return None
+    return max(min_delay, histogram.percentile(percentile))
+
+
+def _remaining(deadline_at: float | None) -> float | None:
+    return None if deadline_at is None else deadline_at - time.monotonic()
+
+
+def _bound_timeout(
+    timeout: float | tuple[float, float],
+    connect_timeout: float,
+    remaining: float | None,
+) -> float | tuple[float, float]:
+    """Caps the read timeout of an attempt to what is left of the request's deadline"""
+    if remaining is None:
+        return timeout
+    read_timeout = timeout if isinstance(timeout, (int, float)) else timeout[1]
+    return (connect_timeout, max(min(read_timeout, remaining), 0.001))
+
+
+def _can_retry(
+    attempt: int, max_retries: int, deadline_at: float | None, backoff: float
+) -> bool:
+    remaining = _remaining(deadline_at)
+    return attempt < max_retries and (remaining is None or remaining > backoff)
+
+
+def _record_outcome(circuit_breaker: CircuitBreaker | None, success: bool) -> None:
+    if circuit_breaker is None:
+        return
+    if success:
+        circuit_breaker.record_success()
+    else:
+        circuit_breaker.record_failure()
+
+
+class PooledHttpClient:
+    """A keep-alive connection pool meant to be shared by everything in a process that talks
+    to the same services.
+
+    Fork safe: connections must never be shared between processes, so a child process
+    transparently builds its own session on first use. Latency of every request is recorded
+    in a histogram per `<metric_prefix>:<endpoint path>`.
+
+    With `hedge_percentile` set, an idempotent request that is still running once it is
+    slower than that percentile of the endpoint's recent requests is sent a second time, the
+    first response wins. With a `circuit_breaker`, requests fail with `CircuitOpenError`
+    while the service is down, errors and 5xx responses count as failures."""
+
+    def __init__(
+        self,
+        connect_timeout: float,
+        read_timeout: float,
+        max_retries: int,
+        pool_size: int = 32,
+        backoff_base: float = 0.25,
+        backoff_max: float = 4.0,
+        metric_prefix: str = "http",
+        hedge_percentile: float | None = None,
+        hedge_min_delay: float = 0.05,
+        circuit_breaker: CircuitBreaker | None = None,
+    ) -> None:
+        self.connect_timeout = connect_timeout
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.pool_size = pool_size
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.metric_prefix = metric_prefix
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.circuit_breaker = circuit_breaker
+
+        self._lock = threading.Lock()
+        self._session: requests.Session | None = None
+        self._hedge_executor: concurrent.futures.ThreadPoolExecutor | None = None
+        self._pid: int | None = None
+
+    def _get_session(self) -> requests.Session:
+        pid = os.getpid()
+        if self._session is not None and self._pid == pid:
+            return self._session
+
+        with self._lock:
+            if self._session is None or self._pid != pid:
+                # The parent's sockets are left alone, closing them here would also close
+                # them for the parent
+                session = requests.Session()
+                # Retries are handled below so that they can be jittered and logged
+                adapter = HTTPAdapter(
+                    pool_connections=self.pool_size,
+                    pool_maxsize=self.pool_size,
+                    max_retries=0,
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._session = session
+                # Threads do not survive a fork either
+                self._hedge_executor = None
+                self._pid = pid
+        return self._session
+
+    def _get_hedge_executor(self) -> concurrent.futures.ThreadPoolExecutor:
+        self._get_session()
+        with self._lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.pool_size,
+                    thread_name_prefix=f"{self.metric_prefix}_hedge",
+                )
+            return self._hedge_executor
+
+    def _send(
+        self,
+        method: str,
+        url: str,
+        timeout: float | tuple[float, float],
+        hedge_delay: float | None,
+        **kwargs: Any,
+    ) -> requests.Response:
+        session = self._get_session()
+        if hedge_delay is None:
+            return session.request(method, url, timeout=timeout, **kwargs)
+
+        executor = self._get_hedge_executor()
+        primary = executor.submit(
+            session.request, method, url, timeout=timeout, **kwargs
+        )
+        try:
+            return primary.result(timeout=hedge_delay)
+        except concurrent.futures.TimeoutError:
+            pass
+
+        logger.debug(f"Request to {url} slower than {hedge_delay:.3f}s, hedging")
+        hedged = executor.submit(
+            session.request, method, url, timeout=timeout, **kwargs
+        )
+        # The first success wins, the slower request is left to finish in the background
+        pending = {primary, hedged}
+        while pending:
+            done, pending = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+        return primary.result()
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        timeout: float | tuple[float, float] | None = None,
+        metric_path: str | None = None,
+        deadline: float | None = None,
+        hedge: bool = False,
+        **kwargs: Any,
+    ) -> requests.Response:
+        """Raises the last error once retries are exhausted, the status code of the final
+        response is not checked. Pass `metric_path` for URLs whose path contains an id, to
+        record their latency under a single histogram.
+
+        `deadline` bounds the seconds spent on the request including retries, no retry is
+        attempted once it has passed. `hedge` only for requests safe to send twice."""
+        histogram = get_latency_histogram(
+            f"{self.metric_prefix}:{metric_path or urlparse(url).path}"
+        )
+        if self.circuit_breaker:
+            self.circuit_breaker.before_request()
+        deadline_at = None if deadline is None else time.monotonic() + deadline
+
+        attempt = 0
+        while True:
+            attempt_timeout = _bound_timeout(
+                timeout or self.timeout, self.connect_timeout, _remaining(deadline_at)
+            )
+            hedge_delay = (
+                _hedge_delay(histogram, self.hedge_percentile, self.hedge_min_delay)
+                if hedge
+                else None
+            )
+            backoff = full_jitter_backoff(attempt, self.backoff_base, self.backoff_max)
+
+            start = time.monotonic()
+            try:
+                response = self._send(
+                    method, url, attempt_timeout, hedge_delay, **kwargs
+                )
+            except requests.RequestException as e:
+                histogram.record(time.monotonic() - start)
+                # Includes connect timeouts. A read timeout means the server may still be
+                # working on the request, sending it again would only pile up more work
+                if not isinstance(e, requests.ConnectionError) or not _can_retry(
+                    attempt, self.max_retries, deadline_at, backoff
+                ):
+                    _record_outcome(self.circuit_breaker, success=False)
+                    raise
+                logger.warning(f"Request to {url} failed, retrying: {e}")
+            else:
+                histogram.record(time.monotonic() - start)
+                failed = response.status_code >= 500
+                if (
+                    response.status_code not in _RETRYABLE_STATUS_CODES
+                    or not _can_retry(attempt, self.max_retries, deadline_at, backoff)
+                ):
+                    _record_outcome(self.circuit_breaker, success=not failed)
+                    return response
+                logger.warning(
+                    f"Request to {url} returned {response.status_code}, retrying"
+                )
+
+            time.sleep(backoff)
+            attempt += 1
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+
+class AsyncPooledHttpClient:
+    """asyncio counterpart of `PooledHttpClient` with the same timeout, retry, hedging,
+    circuit breaking and latency histogram behavior. The losing request of a hedge is
+    cancelled. An httpx.AsyncClient is bound to the event loop it was first used on, so a
+    new one is built per process and per event loop."""
+
+    def __init__(
+        self,
+        connect_timeout: float,
+        read_timeout: float,
+        max_retries: int,
+        pool_size: int = 32,
+        backoff_base: float = 0.25,
+        backoff_max: float = 4.0,
+        metric_prefix: str = "http",
+        http2: bool = False,
+        hedge_percentile: float | None = None,
+        hedge_min_delay: float = 0.05,
+        circuit_breaker: CircuitBreaker | None = None,
+    ) -> None:
+        self.connect_timeout = connect_timeout
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.max_retries = max_retries
+        self.pool_size = pool_size
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.metric_prefix = metric_prefix
+        self.http2 = http2
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.circuit_breaker = circuit_breaker
+
+        self._client: httpx.AsyncClient | None = None
+        self._owner: tuple[int, asyncio.AbstractEventLoop] | None = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        owner = (os.getpid(), asyncio.get_running_loop())
+        if self._client is None or self._owner != owner:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                http2=self.http2,
+                limits=httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.pool_size,
+                ),
+            )
+            self._owner = owner
+        return self._client
+
+    async def _send(
+        self,
+        method: str,
+        url: str,
+        timeout: float | httpx.Timeout,
+        hedge_delay: float | None,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        client = self._get_client()
+        if hedge_delay is None:
+            return await client.request(method, url, timeout=timeout, **kwargs)
+
+        primary = asyncio.ensure_future(
+            client.request(method, url, timeout=timeout, **kwargs)
+        )
+        pending: set[asyncio.Future[httpx.Response]] = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=hedge_delay)
+            if done:
+                return primary.result()
+
+            logger.debug(f"Request to {url} slower than {hedge_delay:.3f}s, hedging")
+            pending.add(
+                asyncio.ensure_future(
+                    client.request(method, url, timeout=timeout, **kwargs)
+                )
+            )
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+            return primary.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        timeout: float | httpx.Timeout | None = None,
+        metric_path: str | None = None,
+        deadline: float | None = None,
+        hedge: bool = False,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """Raises the last error once retries are exhausted, the status code of the final
+        response is not checked. See `PooledHttpClient.request` for other arguments"""
+        histogram = get_latency_histogram(
+            f"{self.metric_prefix}:{metric_path or urlparse(url).path}"
+        )
+        if self.circuit_breaker:
+            self.circuit_breaker.before_request()
+        deadline_at = None if deadline is None else time.monotonic() + deadline
+
+        attempt = 0
+        while True:
+            attempt_timeout = timeout or self.timeout
+            remaining = _remaining(deadline_at)
+            if remaining is not None:
+                read_timeout = (
+                    attempt_timeout.read
+                    if isinstance(attempt_timeout, httpx.Timeout)
+                    else attempt_timeout
+                )
+                attempt_timeout = httpx.Timeout(
+                    max(min(read_timeout or remaining, remaining), 0.001),
+                    connect=self.connect_timeout,
+                )
+            hedge_delay = (
+                _hedge_delay(histogram, self.hedge_percentile, self.hedge_min_delay)
+                if hedge
+                else None
+            )
+            backoff = full_jitter_backoff(attempt, self.backoff_base, self.backoff_max)
+
+            start = time.monotonic()
+            try:
+                response = await self._send(
+                    method, url, attempt_timeout, hedge_delay, **kwargs
+                )
+            except httpx.TransportError as e:
+                histogram.record(time.monotonic() - start)
+                if not isinstance(e, _RETRYABLE_HTTPX_ERRORS) or not _can_retry(
+                    attempt, self.max_retries, deadline_at, backoff
+                ):
+                    _record_outcome(self.circuit_breaker, success=False)
+                    raise
+                logger.warning(f"Request to {url} failed, retrying: {e}")
+            else:
+                histogram.record(time.monotonic() - start)
+                failed = response.status_code >= 500
+                if (
+                    response.status_code not in _RETRYABLE_STATUS_CODES
+                    or not _can_retry(attempt, self.max_retries, deadline_at, backoff)
+                ):
+                    _record_outcome(self.circuit_breaker, success=not failed)
+                    return response
+                logger.warning(
+                    f"Request to {url} returned {response.status_code}, retrying"
+                )
+
+            await asyncio.sleep(backoff)
+            attempt += 1
+
+    async def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
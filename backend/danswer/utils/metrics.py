@@ -0,0 +1,110 @@
+import bisect
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+# Upper bounds of the histogram buckets in seconds, roughly exponential from 1ms to 2min
+_DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+)
+
+
+class LatencyHistogram:
+    """Fixed bucket histogram, cheap enough to record every call. Percentiles are estimated
+    as the upper bound of the bucket they fall into."""
+
+    def __init__(self, buckets: tuple[float, ...] = _DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        # Last slot counts everything above the largest bucket
+        self._counts = [0] * (len(buckets) + 1)
+        self._total = 0.0
+        self._count = 0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        bucket_ind = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self._counts[bucket_ind] += 1
+            self._total += seconds
+            self._count += 1
+            self._max = max(self._max, seconds)
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def percentile(self, percent: float) -> float:
+        with self._lock:
+            if not self._count:
+                return 0.0
+
+            threshold = self._count * percent / 100
+            cumulative = 0
+            for bucket_ind, bucket_count in enumerate(self._counts):
+                cumulative += bucket_count
+                if cumulative >= threshold:
+                    if bucket_ind < len(self.buckets):
+                        return min(self.buckets[bucket_ind], self._max)
+                    return self._max
+            return self._max
+
+    def snapshot(self) -> dict[str, float]:
+        with self._lock:
+            count, total, max_seconds = self._count, self._total, self._max
+        return {
+            "count": count,
+            "mean": total / count if count else 0.0,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": max_seconds,
+        }
+
+
+_HISTOGRAMS: dict[str, LatencyHistogram] = {}
+_HISTOGRAMS_LOCK = threading.Lock()
+
+
+def get_latency_histogram(name: str) -> LatencyHistogram:
+    """Process wide histogram registry, keyed by an arbitrary metric name"""
+    histogram = _HISTOGRAMS.get(name)
+    if histogram is None:
+        with _HISTOGRAMS_LOCK:
+            histogram = _HISTOGRAMS.setdefault(name, LatencyHistogram())
+    return histogram
+
+
+def get_latency_snapshots(prefix: str = "") -> dict[str, dict[str, float]]:
+    with _HISTOGRAMS_LOCK:
+        histograms = dict(_HISTOGRAMS)
+    return {
+        name: histogram.snapshot()
+        for name, histogram in sorted(histograms.items())
+        if name.startswith(prefix)
+    }
+
+
+@contextmanager
+def record_latency(name: str) -> Iterator[None]:
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        get_latency_histogram(name).record(time.monotonic() - start)
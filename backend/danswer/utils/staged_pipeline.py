@@ -0,0 +1,267 @@
+import queue
+import threading
+import time
+from collections.abc import Callable
+from collections.abc import Generator
+from collections.abc import Iterator
+from dataclasses import dataclass
+from typing import Any
+
+from danswer.utils.metrics import get_latency_histogram
+
+# How often blocked threads wake up to check whether the pipeline was stopped
+_POLL_INTERVAL = 0.1
+_SOURCE_STAGE = "fetch"
+
+
+class _Done:
+    """Queue marker, no more items will follow"""
+
+
+_DONE = _Done()
+
+
+@dataclass
+class Stage:
+    name: str
+    func: Callable[[Any], Any]
+    num_workers: int = 1
+
+
+@dataclass
+class StageStats:
+    name: str
+    num_workers: int
+    items: int = 0
+    # Arbitrary unit of work given by `count_units`, e.g. documents for indexing batches
+    units: int = 0
+    # Time spent in the stage function, waiting for input and waiting for room in the next queue
+    busy_seconds: float = 0.0
+    idle_seconds: float = 0.0
+    blocked_seconds: float = 0.0
+
+    def summary(self, elapsed_seconds: float) -> dict[str, float]:
+        worker_seconds = elapsed_seconds * self.num_workers
+        return {
+            "items": self.items,
+            "units": self.units,
+            "units_per_second": (
+                self.units / elapsed_seconds if elapsed_seconds else 0.0
+            ),
+            # What the stage could sustain if it never had to wait on its neighbours
+            "units_per_busy_second": (
+                self.units * self.num_workers / self.busy_seconds
+                if self.busy_seconds
+                else 0.0
+            ),
+            # The stage closest to 1 is the bottleneck
+            "utilization": (
+                self.busy_seconds / worker_seconds if worker_seconds else 0.0
+            ),
+            "idle_seconds": self.idle_seconds,
+            "blocked_seconds": self.blocked_seconds,
+        }
+
+
+class StagedPipeline:
+    """Runs items pulled from a source iterator through a chain of stages, each stage on its
+    own worker threads so that all stages work at the same time on different items. Stages are
+    connected by queues of at most `queue_size` items, a slow stage holds back the ones before
+    it instead of letting items pile up in memory.
+
+    Items may leave a stage with more than one worker in a different order than they entered.
+    The first exception raised by the source or by any stage stops the pipeline and is raised
+    to the consumer of `run`."""
+
+    def __init__(
+        self,
+        stages: list[Stage],
+        queue_size: int = 2,
+        count_units: Callable[[Any], int] = lambda _: 1,
+        metric_prefix: str = "pipeline",
+    ) -> None:
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage")
+
+        self.stages = stages
+        self.queue_size = queue_size
+        self.count_units = count_units
+        self.metric_prefix = metric_prefix
+        self.stats = {
+            stage.name: StageStats(name=stage.name, num_workers=stage.num_workers)
+            for stage in [Stage(name=_SOURCE_STAGE, func=lambda item: item)] + stages
+        }
+
+        self._stop = threading.Event()
+        self._error: BaseException | None = None
+        self._stats_lock = threading.Lock()
+        self._start_time: float | None = None
+        self._end_time: float | None = None
+
+    @property
+    def elapsed_seconds(self) -> float:
+        if self._start_time is None:
+            return 0.0
+        return (self._end_time or time.monotonic()) - self._start_time
+
+    @property
+    def is_stopped(self) -> bool:
+        """Once the pipeline failed, its consumer closed it or it ran out of items"""
+        return self._stop.is_set()
+
+    def stats_summary(self) -> dict[str, dict[str, float]]:
+        elapsed_seconds = self.elapsed_seconds
+        return {
+            name: stage_stats.summary(elapsed_seconds)
+            for name, stage_stats in self.stats.items()
+        }
+
+    def _fail(self, error: BaseException) -> None:
+        with self._stats_lock:
+            if self._error is None:
+                self._error = error
+        self._stop.set()
+
+    def _put(self, out_queue: queue.Queue, item: Any) -> bool:
+        """False if the pipeline was stopped before there was room for the item"""
+        while not self._stop.is_set():
+            try:
+                out_queue.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, in_queue: queue.Queue) -> Any:
+        """The next item, `_DONE` if the pipeline was stopped"""
+        while not self._stop.is_set():
+            try:
+                return in_queue.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _record(
+        self,
+        stage_name: str,
+        units: int,
+        busy_seconds: float = 0.0,
+        idle_seconds: float = 0.0,
+        blocked_seconds: float = 0.0,
+    ) -> None:
+        with self._stats_lock:
+            stage_stats = self.stats[stage_name]
+            stage_stats.items += 1
+            stage_stats.units += units
+            stage_stats.busy_seconds += busy_seconds
+            stage_stats.idle_seconds += idle_seconds
+            stage_stats.blocked_seconds += blocked_seconds
+        get_latency_histogram(f"{self.metric_prefix}:{stage_name}").record(busy_seconds)
+
+    def _run_source(self, source: Iterator[Any], out_queue: queue.Queue) -> None:
+        try:
+            while not self._stop.is_set():
+                start = time.monotonic()
+                item = next(source, _DONE)
+                fetched = time.monotonic()
+                if item is _DONE:
+                    break
+                if not self._put(out_queue, item):
+                    return
+                self._record(
+                    _SOURCE_STAGE,
+                    units=self.count_units(item),
+                    busy_seconds=fetched - start,
+                    blocked_seconds=time.monotonic() - fetched,
+                )
+            self._put(out_queue, _DONE)
+        except BaseException as e:
+            self._fail(e)
+
+    def _run_worker(
+        self,
+        stage: Stage,
+        in_queue: queue.Queue,
+        out_queue: queue.Queue,
+        remaining_workers: list[int],
+    ) -> None:
+        try:
+            while not self._stop.is_set():
+                start = time.monotonic()
+                item = self._get(in_queue)
+                received = time.monotonic()
+                if item is _DONE:
+                    # Let the other workers of this stage see it as well
+                    self._put(in_queue, _DONE)
+                    break
+
+                result = stage.func(item)
+                processed = time.monotonic()
+                if not self._put(out_queue, result):
+                    return
+                self._record(
+                    stage.name,
+                    units=self.count_units(result),
+                    busy_seconds=processed - received,
+                    idle_seconds=received - start,
+                    blocked_seconds=time.monotonic() - processed,
+                )
+        except BaseException as e:
+            self._fail(e)
+            return
+
+        with self._stats_lock:
+            remaining_workers[0] -= 1
+            is_last_worker = remaining_workers[0] == 0
+        if is_last_worker:
+            self._put(out_queue, _DONE)
+
+    def run(self, source: Iterator[Any]) -> Generator[Any, None, None]:
+        """Yields the output of the last stage for every item of `source`. Closing the
+        returned generator early stops the pipeline."""
+        queues: list[queue.Queue] = [
+            queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)
+        ]
+        # The source can block for a long time on I/O that cannot be interrupted, so its
+        # thread is not waited on once the pipeline stops
+        threading.Thread(
+            target=self._run_source,
+            args=(source, queues[0]),
+            name=f"{self.metric_prefix}-{_SOURCE_STAGE}",
+            daemon=True,
+        ).start()
+        workers: list[threading.Thread] = []
+        for stage_ind, stage in enumerate(self.stages):
+            remaining_workers = [stage.num_workers]
+            for worker_ind in range(stage.num_workers):
+                workers.append(
+                    threading.Thread(
+                        target=self._run_worker,
+                        args=(
+                            stage,
+                            queues[stage_ind],
+                            queues[stage_ind + 1],
+                            remaining_workers,
+                        ),
+                        name=f"{self.metric_prefix}-{stage.name}-{worker_ind}",
+                        daemon=True,
+                    )
+                )
+        self._start_time = time.monotonic()
+        for worker in workers:
+            worker.start()
+
+        try:
+            while True:
+                item = self._get(queues[-1])
+                if item is _DONE:
+                    break
+                yield item
+        finally:
+            self._stop.set()
+            for worker in workers:
+                worker.join()
+            self._end_time = time.monotonic()
+
+        if self._error is not None:
+            raise self._error
@@ -1,22 +1,215 @@
+import asyncio
+import os
+import threading
+import time
 import uuid
 from collections.abc import Callable
-from concurrent.futures import as_completed
+from concurrent.futures import Future
 from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 from typing import Generic
 from typing import TypeVar
 
+from danswer.configs.app_configs import EXECUTOR_MAX_QUEUE_SIZE
+from danswer.configs.app_configs import LLM_EXECUTOR_THREADS
+from danswer.configs.app_configs import QUERY_EXECUTOR_THREADS
+from danswer.configs.app_configs import VESPA_IO_EXECUTOR_THREADS
 from danswer.utils.logger import setup_logger
+from danswer.utils.metrics import get_latency_histogram
 
 logger = setup_logger()
 
 R = TypeVar("R")
 
+# Names of the process wide pools
+QUERY_EXECUTOR = "query"
+VESPA_IO_EXECUTOR = "vespa-io"
+LLM_EXECUTOR = "llm"
+
+_EXECUTOR_SIZES = {
+    QUERY_EXECUTOR: QUERY_EXECUTOR_THREADS,
+    VESPA_IO_EXECUTOR: VESPA_IO_EXECUTOR_THREADS,
+    LLM_EXECUTOR: LLM_EXECUTOR_THREADS,
+}
+
+
+class TaskFuture(Future, Generic[R]):
+    """A Future whose task is run by whichever thread claims it first, either a worker of the
+    pool or the thread waiting on it. This is what lets a pool task fan out into the same pool
+    without deadlocking once every worker is busy waiting."""
+
+    def __init__(
+        self,
+        executor: "BoundedExecutor",
+        func: Callable[..., R],
+        args: tuple,
+        kwargs: dict[str, Any],
+    ) -> None:
+        super().__init__()
+        self._executor = executor
+        self._func = func
+        self._args = args
+        self._kwargs = kwargs
+        self._submitted_at = time.monotonic()
+        self._claimed = False
+        self._claim_lock = threading.Lock()
+
+    def _claim(self) -> bool:
+        with self._claim_lock:
+            if self._claimed:
+                return False
+            self._claimed = True
+        return self.set_running_or_notify_cancel()
+
+    def run_if_unclaimed(self) -> None:
+        if not self._claim():
+            return
+
+        self._executor._on_task_start(self._submitted_at)
+        try:
+            self.set_result(self._func(*self._args, **self._kwargs))
+        except BaseException as e:
+            self.set_exception(e)
+        finally:
+            self._executor._on_task_end()
+
+    def cancel(self) -> bool:
+        with self._claim_lock:
+            if self._claimed:
+                return False
+            self._claimed = True
+        self._executor._on_task_cancelled()
+        return super().cancel()
+
+    def wait_result(self) -> R:
+        """Runs the task in the calling thread if no worker picked it up yet"""
+        self.run_if_unclaimed()
+        return self.result()
+
+
+class BoundedExecutor:
+    """Thread pool shared by everything in a process that does the same kind of blocking work.
+
+    Back-pressure: once more than `max_queue_size` tasks are waiting for a worker, `submit`
+    runs the task in the calling thread instead of queueing it. Queue depth, number of active
+    workers and the time tasks wait for a worker are tracked."""
+
+    def __init__(self, name: str, max_workers: int, max_queue_size: int) -> None:
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+
+        self.pid = os.getpid()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=f"danswer-{name}"
+        )
+        self._wait_histogram = get_latency_histogram(f"executor:{name}:wait")
+        self._queue_depth = 0
+        self._active = 0
+        self._lock = threading.Lock()
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue_depth
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    def _on_task_start(self, submitted_at: float) -> None:
+        self._wait_histogram.record(time.monotonic() - submitted_at)
+        with self._lock:
+            self._queue_depth -= 1
+            self._active += 1
+
+    def _on_task_end(self) -> None:
+        with self._lock:
+            self._active -= 1
+
+    def _on_task_cancelled(self) -> None:
+        with self._lock:
+            self._queue_depth -= 1
+
+    def _enqueue(self, future: TaskFuture, caller_runs_when_saturated: bool) -> None:
+        with self._lock:
+            self._queue_depth += 1
+            saturated = self._queue_depth > self.max_queue_size
+
+        if saturated and caller_runs_when_saturated:
+            future.run_if_unclaimed()
+        else:
+            self._executor.submit(future.run_if_unclaimed)
+
+    def submit(
+        self, func: Callable[..., R], *args: Any, **kwargs: Any
+    ) -> TaskFuture[R]:
+        future: TaskFuture[R] = TaskFuture(self, func, args, kwargs)
+        self._enqueue(future, caller_runs_when_saturated=True)
+        return future
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "max_workers": self.max_workers,
+            "queue_depth": self._queue_depth,
+            "active": self._active,
+            "wait": self._wait_histogram.snapshot(),
+        }
+
+
+_EXECUTORS: dict[str, BoundedExecutor] = {}
+_EXECUTORS_LOCK = threading.Lock()
+
+
+def get_executor(name: str = QUERY_EXECUTOR) -> BoundedExecutor:
+    """Process wide executor registry. Worker threads do not survive a fork, so a forked
+    process builds its own pools on first use."""
+    pid = os.getpid()
+    executor = _EXECUTORS.get(name)
+    if executor is None or executor.pid != pid:
+        with _EXECUTORS_LOCK:
+            executor = _EXECUTORS.get(name)
+            if executor is None or executor.pid != pid:
+                executor = BoundedExecutor(
+                    name=name,
+                    max_workers=_EXECUTOR_SIZES[name],
+                    max_queue_size=EXECUTOR_MAX_QUEUE_SIZE,
+                )
+                _EXECUTORS[name] = executor
+    return executor
+
+
+def get_executor_stats() -> dict[str, dict[str, Any]]:
+    with _EXECUTORS_LOCK:
+        executors = dict(_EXECUTORS)
+    return {name: executor.stats() for name, executor in sorted(executors.items())}
+
+
+def _cancel_pending(futures: list[TaskFuture]) -> None:
+    for future in futures:
+        future.cancel()
+
+
+async def run_in_executor(
+    func: Callable[..., R], *args: Any, executor_name: str = QUERY_EXECUTOR
+) -> R:
+    """Awaitable version of a blocking call on one of the shared pools. If the awaiting task
+    is cancelled, e.g. the client disconnected, the call is dropped if it did not start yet.
+    Always queued, running the call in the calling thread would block the event loop."""
+    executor = get_executor(executor_name)
+    future: TaskFuture[R] = TaskFuture(executor, func, args, {})
+    executor._enqueue(future, caller_runs_when_saturated=False)
+    try:
+        return await asyncio.wrap_future(future)
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+
 
 def run_functions_tuples_in_parallel(
     functions_with_args: list[tuple[Callable, tuple]],
     allow_failures: bool = False,
     max_workers: int | None = None,
+    executor_name: str = QUERY_EXECUTOR,
 ) -> list[Any]:
     """
     Executes multiple functions in parallel and returns a list of the results for each function.
@@ -24,40 +217,45 @@ def run_functions_tuples_in_parallel(
     Args:
         functions_with_args: List of tuples each containing the function callable and a tuple of arguments.
         allow_failures: if set to True, then the function result will just be None
-        max_workers: Max number of worker threads
+        max_workers: Max number of functions of this call running at once
+        executor_name: Which of the shared pools to run the functions on
 
     Returns:
-        dict: A dictionary mapping function names to their results or error messages.
+        list: The results in the same order as the functions
     """
-    workers = (
-        min(max_workers, len(functions_with_args))
-        if max_workers is not None
-        else len(functions_with_args)
-    )
-
-    if workers <= 0:
+    if not functions_with_args:
         return []
 
-    results = []
-    with ThreadPoolExecutor(max_workers=workers) as executor:
-        future_to_index = {
-            executor.submit(func, *args): i
-            for i, (func, args) in enumerate(functions_with_args)
-        }
+    executor = get_executor(executor_name)
+    if max_workers is not None:
+        call_slots = threading.BoundedSemaphore(max_workers)
+
+        def _with_call_slot(func: Callable, args: tuple) -> Any:
+            with call_slots:
+                return func(*args)
+
+        functions_with_args = [
+            (_with_call_slot, (func, args)) for func, args in functions_with_args
+        ]
+
+    futures = [executor.submit(func, *args) for func, args in functions_with_args]
 
-        for future in as_completed(future_to_index):
-            index = future_to_index[future]
+    results = []
+    try:
+        for index, future in enumerate(futures):
             try:
-                results.append((index, future.result()))
+                results.append(future.wait_result())
             except Exception as e:
                 logger.exception(f"Function at index {index} failed due to {e}")
-                results.append((index, None))
+                results.append(None)
 
                 if not allow_failures:
                     raise
+    finally:
+        # Nothing is waiting on these anymore
+        _cancel_pending(futures)
 
-    results.sort(key=lambda x: x[0])
-    return [result for index, result in results]
+    return results
 
 
 class FunctionCall(Generic[R]):
@@ -81,27 +279,30 @@ class FunctionCall(Generic[R]):
 def run_functions_in_parallel(
     function_calls: list[FunctionCall],
     allow_failures: bool = False,
+    executor_name: str = QUERY_EXECUTOR,
 ) -> dict[str, Any]:
     """
     Executes a list of FunctionCalls in parallel and stores the results in a dictionary where the keys
     are the result_id of the FunctionCall and the values are the results of the call.
     """
-    results = {}
-    with ThreadPoolExecutor(max_workers=len(function_calls)) as executor:
-        future_to_id = {
-            executor.submit(func_call.execute): func_call.result_id
-            for func_call in function_calls
-        }
+    executor = get_executor(executor_name)
+    future_to_id = {
+        executor.submit(func_call.execute): func_call.result_id
+        for func_call in function_calls
+    }
 
-        for future in as_completed(future_to_id):
-            result_id = future_to_id[future]
+    results = {}
+    try:
+        for future, result_id in future_to_id.items():
             try:
-                results[result_id] = future.result()
+                results[result_id] = future.wait_result()
             except Exception as e:
                 logger.exception(f"Function with ID {result_id} failed due to {e}")
                 results[result_id] = None
 
                 if not allow_failures:
                     raise
+    finally:
+        _cancel_pending(list(future_to_id))
 
     return results
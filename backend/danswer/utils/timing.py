@@ -1,4 +1,5 @@
 import time
+from collections.abc import Awaitable
 from collections.abc import Callable
 from collections.abc import Generator
 from collections.abc import Iterator
@@ -15,6 +16,7 @@ logger = setup_logger()
 
 F = TypeVar("F", bound=Callable)
 FG = TypeVar("FG", bound=Callable[..., Generator | Iterator])
+FA = TypeVar("FA", bound=Callable[..., Awaitable])
 
 
 def log_function_time(
@@ -82,3 +84,29 @@ def log_generator_function_time(
         return cast(FG, wrapped_func)
 
     return decorator
+
+
+def log_async_function_time(
+    func_name: str | None = None, print_only: bool = False
+) -> Callable[[FA], FA]:
+    def decorator(func: FA) -> FA:
+        @wraps(func)
+        async def wrapped_func(*args: Any, **kwargs: Any) -> Any:
+            start_time = time.time()
+            user = kwargs.get("user")
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                elapsed_time_str = str(time.time() - start_time)
+                log_name = func_name or func.__name__
+                logger.info(f"{log_name} took {elapsed_time_str} seconds")
+                if not print_only:
+                    optional_telemetry(
+                        record_type=RecordType.LATENCY,
+                        data={"function": log_name, "latency": str(elapsed_time_str)},
+                        user_id=str(user.id) if user else "Unknown",
+                    )
+
+        return cast(FA, wrapped_func)
+
+    return decorator
@@ -0,0 +1,213 @@
+"""Dynamic micro-batching for the bi-encoder endpoint.
+
+Concurrent embedding requests that share the same model settings are merged into a single
+forward pass. Requests are split into work items of at most `max_batch_size` texts so that a
+large indexing batch cannot monopolize the model, and queries are always served before
+passages. Inference runs on a dedicated thread pool so the event loop stays responsive."""
+import asyncio
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+from shared_configs.enums import EmbedTextType
+
+# Takes (texts, model_name, max_context_length, normalize_embeddings), returns one row per
+# text, usually as a 2D numpy array
+EmbedFunc = Callable[[list[str], str, int, bool], np.ndarray | list[list[float]]]
+
+# Lower index is served first
+_PRIORITY_ORDER = [EmbedTextType.QUERY, EmbedTextType.PASSAGE]
+
+
+@dataclass(frozen=True)
+class EmbedBatchKey:
+    """Only requests with identical keys can share a forward pass"""
+
+    model_name: str
+    max_context_length: int
+    normalize_embeddings: bool
+
+
+@dataclass
+class _WorkItem:
+    key: EmbedBatchKey
+    texts: list[str]
+    future: asyncio.Future
+
+
+class EmbeddingBatchScheduler:
+    def __init__(
+        self,
+        embed_func: EmbedFunc,
+        max_batch_size: int,
+        max_wait_seconds: float,
+        num_workers: int = 1,
+    ) -> None:
+        self.embed_func = embed_func
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_seconds = max_wait_seconds
+        self.num_workers = max(1, num_workers)
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.num_workers, thread_name_prefix="embedding_inference"
+        )
+        self._pending: dict[EmbedTextType, deque[_WorkItem]] = {
+            text_type: deque() for text_type in _PRIORITY_ORDER
+        }
+
+        # asyncio primitives must be created inside of the running event loop
+        self._work_available: asyncio.Event | None = None
+        self._free_workers: asyncio.Semaphore | None = None
+        self._dispatcher: asyncio.Task | None = None
+
+    def _ensure_started(self) -> None:
+        if self._dispatcher is not None and not self._dispatcher.done():
+            return
+
+        self._work_available = asyncio.Event()
+        self._free_workers = asyncio.Semaphore(self.num_workers)
+        self._dispatcher = asyncio.create_task(self._dispatch_loop())
+
+    async def embed(
+        self,
+        texts: list[str],
+        key: EmbedBatchKey,
+        text_type: EmbedTextType = EmbedTextType.PASSAGE,
+    ) -> list[np.ndarray | list[float]]:
+        if not texts:
+            return []
+
+        self._ensure_started()
+        loop = asyncio.get_running_loop()
+
+        futures: list[asyncio.Future] = []
+        for start in range(0, len(texts), self.max_batch_size):
+            future = loop.create_future()
+            self._pending[text_type].append(
+                _WorkItem(
+                    key=key,
+                    texts=texts[start : start + self.max_batch_size],
+                    future=future,
+                )
+            )
+            futures.append(future)
+
+        if self._work_available is not None:
+            self._work_available.set()
+
+        results = await asyncio.gather(*futures)
+        return [embedding for result in results for embedding in result]
+
+    def _drop_cancelled(self) -> None:
+        for text_type in _PRIORITY_ORDER:
+            queue = self._pending[text_type]
+            while queue and queue[0].future.done():
+                queue.popleft()
+
+    def _head_key(self) -> EmbedBatchKey | None:
+        self._drop_cancelled()
+        for text_type in _PRIORITY_ORDER:
+            if self._pending[text_type]:
+                return self._pending[text_type][0].key
+        return None
+
+    def _pending_text_count(self, key: EmbedBatchKey) -> int:
+        return sum(
+            len(item.texts)
+            for text_type in _PRIORITY_ORDER
+            for item in self._pending[text_type]
+            if item.key == key and not item.future.done()
+        )
+
+    def _take_batch(self) -> list[_WorkItem]:
+        """Takes the highest priority work item and fills the rest of the batch with other
+        items that can share its forward pass, again in priority order"""
+        key = self._head_key()
+        if key is None:
+            return []
+
+        batch: list[_WorkItem] = []
+        batch_size = 0
+        for text_type in _PRIORITY_ORDER:
+            remaining: deque[_WorkItem] = deque()
+            queue = self._pending[text_type]
+            while queue:
+                item = queue.popleft()
+                if item.future.done():
+                    continue
+                if (
+                    item.key == key
+                    and batch_size + len(item.texts) <= self.max_batch_size
+                ):
+                    batch.append(item)
+                    batch_size += len(item.texts)
+                else:
+                    remaining.append(item)
+            self._pending[text_type] = remaining
+
+        return batch
+
+    async def _dispatch_loop(self) -> None:
+        assert self._work_available is not None and self._free_workers is not None
+
+        while True:
+            await self._work_available.wait()
+            # Only build a batch once a worker can take it, anything arriving in the
+            # meantime gets coalesced into the next forward pass
+            await self._free_workers.acquire()
+
+            key = self._head_key()
+            if (
+                key is not None
+                and self.max_wait_seconds > 0
+                and self._pending_text_count(key) < self.max_batch_size
+            ):
+                await asyncio.sleep(self.max_wait_seconds)
+
+            batch = self._take_batch()
+            if self._head_key() is None:
+                self._work_available.clear()
+
+            if not batch:
+                self._free_workers.release()
+                continue
+
+            asyncio.create_task(self._run_batch(batch))
+
+    async def _run_batch(self, batch: list[_WorkItem]) -> None:
+        assert self._free_workers is not None
+
+        key = batch[0].key
+        texts = [text for item in batch for text in item.texts]
+        loop = asyncio.get_running_loop()
+        try:
+            embeddings = await loop.run_in_executor(
+                self._executor,
+                self.embed_func,
+                texts,
+                key.model_name,
+                key.max_context_length,
+                key.normalize_embeddings,
+            )
+        except Exception as e:
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+        else:
+            start = 0
+            for item in batch:
+                end = start + len(item.texts)
+                if not item.future.done():
+                    item.future.set_result(embeddings[start:end])
+                start = end
+        finally:
+            self._free_workers.release()
+
+    def shutdown(self) -> None:
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            self._dispatcher = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,21 +1,33 @@
 import gc
 from typing import Optional
 
+import numpy as np
 from fastapi import APIRouter
+from fastapi import Header
 from fastapi import HTTPException
+from fastapi import Response
 from sentence_transformers import CrossEncoder  # type: ignore
 from sentence_transformers import SentenceTransformer  # type: ignore
 
 from danswer.utils.logger import setup_logger
 from model_server.constants import MODEL_WARM_UP_STRING
+from model_server.embedding_scheduler import EmbedBatchKey
+from model_server.embedding_scheduler import EmbeddingBatchScheduler
 from model_server.utils import simple_log_function_time
 from shared_configs.configs import CROSS_EMBED_CONTEXT_SIZE
 from shared_configs.configs import CROSS_ENCODER_MODEL_ENSEMBLE
+from shared_configs.configs import EMBEDDING_BATCH_MAX_SIZE
+from shared_configs.configs import EMBEDDING_BATCH_MAX_WAIT_MS
+from shared_configs.configs import EMBEDDING_INFERENCE_WORKERS
 from shared_configs.configs import INDEXING_ONLY
+from shared_configs.configs import RERANK_CASCADE_MODEL
 from shared_configs.model_server_models import EmbedRequest
 from shared_configs.model_server_models import EmbedResponse
 from shared_configs.model_server_models import RerankRequest
 from shared_configs.model_server_models import RerankResponse
+from shared_configs.wire_format import encode_ndarray
+from shared_configs.wire_format import NDARRAY_MEDIA_TYPE
+from shared_configs.wire_format import parse_ndarray_accept_header
 
 logger = setup_logger()
 
@@ -23,6 +35,8 @@ router = APIRouter(prefix="/encoder")
 
 _GLOBAL_MODELS_DICT: dict[str, "SentenceTransformer"] = {}
 _RERANK_MODELS: Optional[list["CrossEncoder"]] = None
+_CASCADE_RERANK_MODEL: Optional["CrossEncoder"] = None
+_EMBEDDING_SCHEDULER: EmbeddingBatchScheduler | None = None
 
 
 def get_embedding_model(
@@ -65,10 +79,51 @@ def get_local_reranking_model_ensemble(
     return _RERANK_MODELS
 
 
+def get_local_cascade_reranking_model(
+    model_name: str,
+    max_context_length: int = CROSS_EMBED_CONTEXT_SIZE,
+) -> CrossEncoder:
+    global _CASCADE_RERANK_MODEL
+    if (
+        _CASCADE_RERANK_MODEL is None
+        or max_context_length != _CASCADE_RERANK_MODEL.max_length
+    ):
+        logger.info(f"Loading {model_name}")
+        _CASCADE_RERANK_MODEL = CrossEncoder(model_name)
+        _CASCADE_RERANK_MODEL.max_length = max_context_length
+    return _CASCADE_RERANK_MODEL
+
+
+def get_local_reranking_models(model_names: list[str] | None) -> list[CrossEncoder]:
+    """The whole ensemble if `model_names` is None. Only the models of the ensemble and the
+    cascade model can be requested, so that requests cannot load arbitrary models"""
+    if model_names is None:
+        return get_local_reranking_model_ensemble()
+
+    cross_encoders = []
+    for model_name in model_names:
+        if model_name in CROSS_ENCODER_MODEL_ENSEMBLE:
+            cross_encoders.append(
+                get_local_reranking_model_ensemble()[
+                    CROSS_ENCODER_MODEL_ENSEMBLE.index(model_name)
+                ]
+            )
+        elif model_name == RERANK_CASCADE_MODEL:
+            cross_encoders.append(get_local_cascade_reranking_model(model_name))
+        else:
+            raise ValueError(f"Reranking model {model_name} is not served")
+    return cross_encoders
+
+
 def warm_up_cross_encoders() -> None:
     logger.info(f"Warming up Cross-Encoders: {CROSS_ENCODER_MODEL_ENSEMBLE}")
 
     cross_encoders = get_local_reranking_model_ensemble()
+    if RERANK_CASCADE_MODEL:
+        logger.info(f"Warming up cascade Cross-Encoder: {RERANK_CASCADE_MODEL}")
+        cross_encoders = cross_encoders + [
+            get_local_cascade_reranking_model(RERANK_CASCADE_MODEL)
+        ]
     [
         cross_encoder.predict((MODEL_WARM_UP_STRING, MODEL_WARM_UP_STRING))
         for cross_encoder in cross_encoders
@@ -81,54 +136,102 @@ def embed_text(
     model_name: str,
     max_context_length: int,
     normalize_embeddings: bool,
-) -> list[list[float]]:
+) -> np.ndarray:
     model = get_embedding_model(
         model_name=model_name, max_context_length=max_context_length
     )
-    embeddings = model.encode(texts, normalize_embeddings=normalize_embeddings)
+    # The scheduler already sized the batch, run it as a single forward pass
+    embeddings = model.encode(
+        texts, batch_size=len(texts), normalize_embeddings=normalize_embeddings
+    )
 
-    if not isinstance(embeddings, list):
-        embeddings = embeddings.tolist()
+    return np.asarray(embeddings, dtype=np.float32)
 
-    return embeddings
+
+def get_embedding_scheduler() -> EmbeddingBatchScheduler:
+    global _EMBEDDING_SCHEDULER
+    if _EMBEDDING_SCHEDULER is None:
+        _EMBEDDING_SCHEDULER = EmbeddingBatchScheduler(
+            embed_func=embed_text,
+            max_batch_size=EMBEDDING_BATCH_MAX_SIZE,
+            max_wait_seconds=EMBEDDING_BATCH_MAX_WAIT_MS / 1000,
+            num_workers=EMBEDDING_INFERENCE_WORKERS,
+        )
+    return _EMBEDDING_SCHEDULER
+
+
+def shutdown_embedding_scheduler() -> None:
+    global _EMBEDDING_SCHEDULER
+    if _EMBEDDING_SCHEDULER is not None:
+        _EMBEDDING_SCHEDULER.shutdown()
+        _EMBEDDING_SCHEDULER = None
 
 
 @simple_log_function_time()
-def calc_sim_scores(query: str, docs: list[str]) -> list[list[float]]:
-    cross_encoders = get_local_reranking_model_ensemble()
+def calc_sim_scores(
+    query: str, docs: list[str], model_names: list[str] | None = None
+) -> np.ndarray:
+    cross_encoders = get_local_reranking_models(model_names)
     sim_scores = [
-        encoder.predict([(query, doc) for doc in docs]).tolist()  # type: ignore
+        encoder.predict([(query, doc) for doc in docs])  # type: ignore
         for encoder in cross_encoders
     ]
-    return sim_scores
+    return np.asarray(sim_scores, dtype=np.float32)
 
 
-@router.post("/bi-encoder-embed")
+@router.post("/bi-encoder-embed", response_model=EmbedResponse)
 async def process_embed_request(
     embed_request: EmbedRequest,
-) -> EmbedResponse:
+    accept: str | None = Header(default=None),
+) -> EmbedResponse | Response:
     try:
-        embeddings = embed_text(
+        embeddings = await get_embedding_scheduler().embed(
             texts=embed_request.texts,
-            model_name=embed_request.model_name,
-            max_context_length=embed_request.max_context_length,
-            normalize_embeddings=embed_request.normalize_embeddings,
+            key=EmbedBatchKey(
+                model_name=embed_request.model_name,
+                max_context_length=embed_request.max_context_length,
+                normalize_embeddings=embed_request.normalize_embeddings,
+            ),
+            text_type=embed_request.text_type,
         )
-        return EmbedResponse(embeddings=embeddings)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    # The scheduler hands back rows of the batched forward passes
+    embeddings_array = np.asarray(embeddings, dtype=np.float32)
+    wire_dtype = parse_ndarray_accept_header(accept)
+    if wire_dtype:
+        return Response(
+            content=encode_ndarray(embeddings_array, dtype=wire_dtype),
+            media_type=NDARRAY_MEDIA_TYPE,
+        )
+    return EmbedResponse(embeddings=embeddings_array.tolist())
 
-@router.post("/cross-encoder-scores")
-async def process_rerank_request(embed_request: RerankRequest) -> RerankResponse:
+
+@router.post("/cross-encoder-scores", response_model=RerankResponse)
+async def process_rerank_request(
+    embed_request: RerankRequest,
+    accept: str | None = Header(default=None),
+) -> RerankResponse | Response:
     """Cross encoders can be purely black box from the app perspective"""
     if INDEXING_ONLY:
         raise RuntimeError("Indexing model server should not call intent endpoint")
 
     try:
         sim_scores = calc_sim_scores(
-            query=embed_request.query, docs=embed_request.documents
+            query=embed_request.query,
+            docs=embed_request.documents,
+            model_names=embed_request.model_names,
         )
-        return RerankResponse(scores=sim_scores)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+    wire_dtype = parse_ndarray_accept_header(accept)
+    if wire_dtype:
+        return Response(
+            content=encode_ndarray(sim_scores, dtype=wire_dtype),
+            media_type=NDARRAY_MEDIA_TYPE,
+        )
+    return RerankResponse(scores=sim_scores.tolist())
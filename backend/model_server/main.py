@@ -12,6 +12,7 @@ from danswer.utils.logger import setup_logger
 from model_server.custom_models import router as custom_models_router
 from model_server.custom_models import warm_up_intent_model
 from model_server.encoders import router as encoders_router
+from model_server.encoders import shutdown_embedding_scheduler
 from model_server.encoders import warm_up_cross_encoders
 from model_server.management_endpoints import router as management_router
 from shared_configs.configs import ENABLE_RERANKING_ASYNC_FLOW
@@ -48,6 +49,8 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
 
     yield
 
+    shutdown_embedding_scheduler()
+
 
 def get_model_app() -> FastAPI:
     application = FastAPI(
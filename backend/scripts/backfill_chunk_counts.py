@@ -0,0 +1,9 @@
+"""Script which records the chunk count of every document of the current index that does not
+have one yet, reading the counts from Vespa.
+NOTE: this is auto-run on server startup and after index swaps, so should not be necessary in
+most cases."""
+from danswer.utils.chunk_counts import backfill_chunk_counts
+
+
+if __name__ == "__main__":
+    backfill_chunk_counts()
@@ -1,3 +1,4 @@
+import logging
 import os
 
 
@@ -27,14 +28,45 @@ ENABLE_RERANKING_REAL_TIME_FLOW = (
 # Only using one cross-encoder for now
 CROSS_ENCODER_MODEL_ENSEMBLE = ["mixedbread-ai/mxbai-rerank-xsmall-v1"]
 CROSS_EMBED_CONTEXT_SIZE = 512
+# Cascade reranking: a cheaper cross-encoder scores every candidate first, only the ones it
+# ranks in its top RERANK_CASCADE_TOP_K are then scored by the ensemble. Candidates it scores
+# below RERANK_CASCADE_MIN_SCORE (0 to 1) are never passed to the ensemble. Unset to always
+# rerank with the ensemble alone. See tests/regression/search_quality/eval_rerank_cascade.py
+# to pick the settings
+RERANK_CASCADE_MODEL = os.environ.get("RERANK_CASCADE_MODEL") or None
+RERANK_CASCADE_TOP_K = int(os.environ.get("RERANK_CASCADE_TOP_K") or 10)
+RERANK_CASCADE_MIN_SCORE = float(os.environ.get("RERANK_CASCADE_MIN_SCORE") or 0.0)
 
 # This controls the minimum number of pytorch "threads" to allocate to the embedding
 # model. If torch finds more threads on its own, this value is not used.
 MIN_THREADS_ML_MODELS = int(os.environ.get("MIN_THREADS_ML_MODELS") or 1)
 
+# Concurrent bi-encoder requests with the same model settings are coalesced into shared
+# forward passes. Max number of texts embedded together in a single pass
+EMBEDDING_BATCH_MAX_SIZE = int(os.environ.get("EMBEDDING_BATCH_MAX_SIZE") or 32)
+# How long a request may be held waiting for others to batch with (in milliseconds)
+EMBEDDING_BATCH_MAX_WAIT_MS = float(os.environ.get("EMBEDDING_BATCH_MAX_WAIT_MS") or 5)
+# Number of threads running bi-encoder inference, inference never runs on the event loop
+EMBEDDING_INFERENCE_WORKERS = int(os.environ.get("EMBEDDING_INFERENCE_WORKERS") or 1)
+
+# Encoding of embeddings sent back by the model server. "float32" and "float16" use a compact
+# binary format (float16 halves the payload at some loss of precision), "json" is the fallback
+MODEL_SERVER_WIRE_FORMAT = (
+    os.environ.get("MODEL_SERVER_WIRE_FORMAT") or "float32"
+).lower()
+
 # Model server that has indexing only set will throw exception if used for reranking
 # or intent classification
 INDEXING_ONLY = os.environ.get("INDEXING_ONLY", "").lower() == "true"
 
 # notset, debug, info, warning, error, or critical
 LOG_LEVEL = os.environ.get("LOG_LEVEL", "info")
+
+if MODEL_SERVER_WIRE_FORMAT not in ("float32", "float16", "json"):
+    # Checked once here rather than on every request. The danswer logger cannot be used,
+    # it imports this module
+    logging.getLogger(__name__).error(
+        f"Invalid MODEL_SERVER_WIRE_FORMAT {MODEL_SERVER_WIRE_FORMAT}, must be one of "
+        "float32, float16 or json. Using float32"
+    )
+    MODEL_SERVER_WIRE_FORMAT = "float32"
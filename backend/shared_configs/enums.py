@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class EmbedTextType(str, Enum):
+    QUERY = "query"
+    PASSAGE = "passage"
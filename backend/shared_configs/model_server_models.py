@@ -1,5 +1,7 @@
 from pydantic import BaseModel
 
+from shared_configs.enums import EmbedTextType
+
 
 class EmbedRequest(BaseModel):
     # This already includes any prefixes, the text is just passed directly to the model
@@ -7,6 +9,8 @@ class EmbedRequest(BaseModel):
     model_name: str
     max_context_length: int
     normalize_embeddings: bool
+    # Only used for scheduling, queries are served ahead of bulk passage embedding
+    text_type: EmbedTextType = EmbedTextType.PASSAGE
 
 
 class EmbedResponse(BaseModel):
@@ -16,6 +20,8 @@ class EmbedResponse(BaseModel):
 class RerankRequest(BaseModel):
     query: str
     documents: list[str]
+    # None for the ensemble, otherwise one of the ensemble models or the cascade model
+    model_names: list[str] | None = None
 
 
 class RerankResponse(BaseModel):
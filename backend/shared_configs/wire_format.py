@@ -0,0 +1,66 @@
+"""Compact binary encoding for model server responses.
+
+Embedding and rerank responses are dense float matrices, shipping them as raw little-endian
+floats avoids formatting and parsing every value as decimal text. The client opts in through
+the Accept header and JSON remains the default for any client that does not ask for it.
+
+Layout: magic (4 bytes) | dtype char (1 byte) | ndim (uint8) | shape (uint32 * ndim) | data
+"""
+import struct
+
+import numpy as np
+
+NDARRAY_MEDIA_TYPE = "application/x-ndarray"
+JSON_MEDIA_TYPE = "application/json"
+
+_MAGIC = b"NDA1"
+_SUPPORTED_DTYPES = {"float32": "<f4", "float16": "<f2"}
+_DTYPE_CHARS = {"float32": b"f", "float16": b"e"}
+_CHAR_DTYPES = {char: dtype for dtype, char in _DTYPE_CHARS.items()}
+
+
+def build_ndarray_accept_header(dtype: str = "float32") -> str:
+    """Prefers the binary format, servers that do not support it will respond with JSON"""
+    if dtype not in _SUPPORTED_DTYPES:
+        raise ValueError(f"Unsupported wire dtype: {dtype}")
+    return f"{NDARRAY_MEDIA_TYPE};dtype={dtype}, {JSON_MEDIA_TYPE};q=0.9"
+
+
+def parse_ndarray_accept_header(accept: str | None) -> str | None:
+    """Returns the dtype requested by the client or None if it wants JSON"""
+    if not accept:
+        return None
+
+    for media_range in accept.split(","):
+        media_type, *params = [part.strip() for part in media_range.split(";")]
+        if media_type != NDARRAY_MEDIA_TYPE:
+            continue
+
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "dtype" and value.strip() in _SUPPORTED_DTYPES:
+                return value.strip()
+        return "float32"
+
+    return None
+
+
+def encode_ndarray(array: np.ndarray, dtype: str = "float32") -> bytes:
+    data = np.ascontiguousarray(array, dtype=_SUPPORTED_DTYPES[dtype])
+    header = _MAGIC + _DTYPE_CHARS[dtype] + struct.pack("<B", data.ndim)
+    header += struct.pack(f"<{data.ndim}I", *data.shape)
+    return header + data.tobytes()
+
+
+def decode_ndarray(payload: bytes) -> np.ndarray:
+    """Always returns float32, float16 is only used to shrink the payload"""
+    if payload[:4] != _MAGIC:
+        raise ValueError("Payload is not an encoded ndarray")
+
+    dtype = _CHAR_DTYPES[payload[4:5]]
+    (ndim,) = struct.unpack_from("<B", payload, 5)
+    shape = struct.unpack_from(f"<{ndim}I", payload, 6)
+    offset = 6 + 4 * ndim
+
+    array = np.frombuffer(payload, dtype=_SUPPORTED_DTYPES[dtype], offset=offset)
+    return array.reshape(shape).astype(np.float32, copy=False)
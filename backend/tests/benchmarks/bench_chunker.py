@@ -0,0 +1,106 @@
+"""Measures how chunk_document scales with the number of sections in a document.
+
+Documents are built out of many short sections, like Slack threads, Jira comments or spreadsheet
+rows. With linear scaling the time per section stays flat as documents grow; the previous
+implementation re-tokenized the whole chunk being built for every section, so its time per
+section grew with the document. Pass --mini_chunk_size to also derive the mini-chunks, they
+come from the same sentence splits so the cost should barely change.
+
+Run from the backend directory:
+    python tests/benchmarks/bench_chunker.py --section_counts 100 200 400 800 1600 3200
+"""
+import argparse
+import random
+import time
+
+from danswer.configs.constants import DocumentSource
+from danswer.connectors.models import Document
+from danswer.connectors.models import Section
+from danswer.indexing.chunker import chunk_document
+from danswer.search.search_nlp_models import get_default_tokenizer
+
+_WORDS = (
+    "can someone take a look at the failing deploy the config for the staging cluster was "
+    "changed yesterday and since then the indexing jobs time out after a few minutes"
+).split()
+
+
+def build_document(
+    num_sections: int, words_per_section: int, seed: int = 0
+) -> Document:
+    rng = random.Random(seed)
+    return Document(
+        id=f"bench_doc_{num_sections}",
+        sections=[
+            Section(
+                text=" ".join(
+                    rng.choices(_WORDS, k=rng.randint(1, words_per_section))
+                ).capitalize(),
+                link=f"https://example.com/thread#{ind}",
+            )
+            for ind in range(num_sections)
+        ],
+        source=DocumentSource.SLACK,
+        semantic_identifier="#eng-deploys thread",
+        metadata={},
+    )
+
+
+def time_chunking(
+    document: Document, repeats: int, mini_chunk_size: int | None
+) -> tuple[float, int]:
+    best = float("inf")
+    num_chunks = 0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        num_chunks = len(chunk_document(document, mini_chunk_size=mini_chunk_size))
+        best = min(best, time.perf_counter() - start)
+    return best, num_chunks
+
+
+def main(
+    section_counts: list[int],
+    words_per_section: int,
+    repeats: int,
+    mini_chunk_size: int | None,
+) -> None:
+    # Load the tokenizer outside of the timed section
+    get_default_tokenizer()
+
+    per_section_times = []
+    for num_sections in section_counts:
+        document = build_document(num_sections, words_per_section)
+        elapsed, num_chunks = time_chunking(document, repeats, mini_chunk_size)
+        per_section_times.append(elapsed / num_sections)
+        print(
+            f"{num_sections:>6} sections, {num_chunks:>4} chunks: {elapsed * 1000:8.1f}ms, "
+            f"{elapsed / num_sections * 1e6:7.1f}us per section"
+        )
+
+    # ~1x for linear scaling, grows with the size ratio if quadratic
+    size_ratio = section_counts[-1] / section_counts[0]
+    print(
+        f"Time per section, largest vs smallest document ({size_ratio:.0f}x more sections): "
+        f"{per_section_times[-1] / per_section_times[0]:.2f}x"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--section_counts",
+        type=int,
+        nargs="+",
+        default=[100, 200, 400, 800, 1600, 3200],
+    )
+    parser.add_argument("--words_per_section", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--mini_chunk_size", type=int, default=None)
+    args = parser.parse_args()
+
+    main(
+        section_counts=args.section_counts,
+        words_per_section=args.words_per_section,
+        repeats=args.repeats,
+        mini_chunk_size=args.mini_chunk_size,
+    )
@@ -0,0 +1,185 @@
+"""Compares fixed-size vs length-aware batching in DefaultIndexingEmbedder.
+
+The model server is replaced by a simulated encoder whose cost is proportional to the padded
+size of each batch (longest text * batch size), which is how a transformer forward pass over a
+padded batch scales. Pass --model_server_host to measure against a real model server instead.
+
+Run from the backend directory:
+    python tests/benchmarks/bench_embedding_batching.py --num_docs 200 --enable_mini_chunk
+"""
+import argparse
+import random
+import time
+from typing import cast
+
+import numpy as np
+
+from danswer.configs.constants import DocumentSource
+from danswer.configs.model_configs import DOC_EMBEDDING_CONTEXT_SIZE
+from danswer.connectors.models import Document
+from danswer.connectors.models import Section
+from danswer.indexing.chunker import chunk_document
+from danswer.indexing.embedder import DefaultIndexingEmbedder
+from danswer.indexing.models import DocAwareChunk
+from danswer.search.search_nlp_models import EmbeddingModel
+from danswer.search.search_nlp_models import get_default_tokenizer
+from shared_configs.enums import EmbedTextType
+
+_WORDS = (
+    "the index attempt embeds every chunk of a document with the bi-encoder before the "
+    "chunks are written to vespa along with their access control lists document sets and "
+    "boost values so that hybrid search can find them quickly later on"
+).split()
+
+
+class SimulatedEmbeddingModel:
+    """Stands in for the model server, sleeps according to the padded batch size"""
+
+    def __init__(self, seconds_per_padded_token: float, dim: int = 768) -> None:
+        self.seconds_per_padded_token = seconds_per_padded_token
+        self.dim = dim
+        self.num_requests = 0
+        self.padded_tokens = 0
+        self.real_tokens = 0
+        self.model_seconds = 0.0
+
+    def encode_array(self, texts: list[str], text_type: EmbedTextType) -> np.ndarray:
+        input_ids = get_default_tokenizer()(texts)["input_ids"]
+        lengths = [min(len(ids), DOC_EMBEDDING_CONTEXT_SIZE) for ids in input_ids]
+        padded = max(lengths) * len(lengths)
+
+        self.num_requests += 1
+        self.padded_tokens += padded
+        self.real_tokens += sum(lengths)
+        self.model_seconds += padded * self.seconds_per_padded_token
+        time.sleep(padded * self.seconds_per_padded_token)
+        return np.zeros((len(texts), self.dim), dtype=np.float32)
+
+
+def _random_text(rng: random.Random, num_words: int) -> str:
+    sentences = []
+    while num_words > 0:
+        sentence_len = min(num_words, rng.randint(6, 25))
+        sentences.append(" ".join(rng.choices(_WORDS, k=sentence_len)).capitalize())
+        num_words -= sentence_len
+    return ". ".join(sentences) + "."
+
+
+def build_documents(num_docs: int, seed: int = 0) -> list[Document]:
+    """A mix of long pages, medium documents and short messages, all with titles"""
+    rng = random.Random(seed)
+    documents = []
+    for ind in range(num_docs):
+        kind = rng.random()
+        if kind < 0.2:
+            sections = [_random_text(rng, rng.randint(300, 900)) for _ in range(4)]
+        elif kind < 0.6:
+            sections = [_random_text(rng, rng.randint(50, 300)) for _ in range(2)]
+        else:
+            sections = [_random_text(rng, rng.randint(5, 60))]
+
+        documents.append(
+            Document(
+                id=f"bench_doc_{ind}",
+                sections=[
+                    Section(text=text, link=f"https://example.com/{ind}#{sec_ind}")
+                    for sec_ind, text in enumerate(sections)
+                ],
+                source=DocumentSource.WEB,
+                semantic_identifier=_random_text(rng, rng.randint(2, 12)),
+                metadata={},
+            )
+        )
+    return documents
+
+
+def run_benchmark(
+    chunks: list[DocAwareChunk],
+    embedder: DefaultIndexingEmbedder,
+    token_budget: int,
+    enable_mini_chunk: bool,
+) -> None:
+    model = embedder.embedding_model
+    start = time.monotonic()
+    embedder.embed_chunks(
+        chunks, enable_mini_chunk=enable_mini_chunk, token_budget=token_budget
+    )
+    elapsed = time.monotonic() - start
+
+    mode = f"token budget {token_budget}" if token_budget else "fixed batches"
+    print(f"{mode}: {elapsed:.2f}s, {len(chunks) / elapsed:.1f} chunks/s")
+    if isinstance(model, SimulatedEmbeddingModel):
+        print(
+            f"  requests: {model.num_requests}, padded tokens: {model.padded_tokens}, "
+            f"padding overhead: {model.padded_tokens / max(model.real_tokens, 1):.2f}x, "
+            f"model time: {model.model_seconds:.2f}s"
+        )
+        model.num_requests = model.padded_tokens = model.real_tokens = 0
+        model.model_seconds = 0.0
+
+
+def main(
+    num_docs: int,
+    token_budgets: list[int],
+    enable_mini_chunk: bool,
+    seconds_per_padded_token: float,
+    model_server_host: str | None,
+    model_server_port: int,
+) -> None:
+    documents = build_documents(num_docs)
+    chunks = [chunk for document in documents for chunk in chunk_document(document)]
+    print(f"{len(documents)} documents, {len(chunks)} chunks")
+
+    embedder = DefaultIndexingEmbedder(
+        model_name="intfloat/e5-base-v2",
+        normalize=True,
+        query_prefix="query: ",
+        passage_prefix="passage: ",
+    )
+    if model_server_host:
+        embedder.embedding_model = EmbeddingModel(
+            model_name="intfloat/e5-base-v2",
+            query_prefix="query: ",
+            passage_prefix="passage: ",
+            normalize=True,
+            server_host=model_server_host,
+            server_port=model_server_port,
+        )
+    else:
+        embedder.embedding_model = cast(
+            EmbeddingModel, SimulatedEmbeddingModel(seconds_per_padded_token)
+        )
+
+    for token_budget in [0] + token_budgets:
+        run_benchmark(chunks, embedder, token_budget, enable_mini_chunk)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num_docs", type=int, default=100)
+    parser.add_argument(
+        "--token_budgets",
+        type=int,
+        nargs="+",
+        default=[2048, 4096, 8192],
+        help="Token budgets to compare against fixed size batching.",
+    )
+    parser.add_argument("--enable_mini_chunk", action="store_true", default=False)
+    parser.add_argument(
+        "--seconds_per_padded_token",
+        type=float,
+        default=2e-5,
+        help="Cost of the simulated encoder, ignored with a real model server.",
+    )
+    parser.add_argument("--model_server_host", type=str, default=None)
+    parser.add_argument("--model_server_port", type=int, default=9000)
+    args = parser.parse_args()
+
+    main(
+        num_docs=args.num_docs,
+        token_budgets=args.token_budgets,
+        enable_mini_chunk=args.enable_mini_chunk,
+        seconds_per_padded_token=args.seconds_per_padded_token,
+        model_server_host=args.model_server_host,
+        model_server_port=args.model_server_port,
+    )
@@ -0,0 +1,119 @@
+"""Measures decoding a Vespa search response into InferenceChunks.
+
+The responses are shaped like those of a hybrid search: full chunk contents, highlighted
+summaries and json encoded metadata / source links. The decode step compares the standard
+library against orjson. The conversion step compares building the chunks without validation,
+as the search flow does, against validating every field, as it did before.
+
+Run from the backend directory:
+    python tests/benchmarks/bench_vespa_hits.py --num_hits 100
+"""
+import argparse
+import json
+import random
+import time
+from collections.abc import Callable
+from typing import Any
+
+import orjson
+
+from danswer.document_index.vespa.index import (
+    _vespa_search_response_to_inference_chunks,
+)
+from danswer.search.models import InferenceChunk
+
+_WORDS = (
+    "can someone take a look at the failing deploy the config for the staging cluster was "
+    "changed yesterday and since then the indexing jobs time out after a few minutes"
+).split()
+
+
+def build_response(num_hits: int, words_per_chunk: int, seed: int = 0) -> bytes:
+    rng = random.Random(seed)
+    hits = []
+    for ind in range(num_hits):
+        document_id = f"https://example.com/wiki/page-{ind // 4}"
+        content = " ".join(rng.choices(_WORDS, k=words_per_chunk))
+        summary = "<sep />".join(
+            " ".join(
+                f"<hi>{word}</hi>" if word == "deploy" else word
+                for word in rng.choices(_WORDS, k=30)
+            )
+            for _ in range(3)
+        )
+        hits.append(
+            {
+                "id": f"id:danswer_chunk:danswer_chunk::{ind}",
+                "relevance": rng.random(),
+                "fields": {
+                    "document_id": document_id,
+                    "chunk_id": ind % 4,
+                    "blurb": content[:120],
+                    "content": content,
+                    "content_summary": summary,
+                    "source_links": json.dumps(
+                        {
+                            str(offset * 400): f"{document_id}#{offset}"
+                            for offset in range(4)
+                        }
+                    ),
+                    "section_continuation": False,
+                    "source_type": "confluence",
+                    "semantic_identifier": f"Page {ind // 4}",
+                    "boost": 0,
+                    "hidden": False,
+                    "metadata": json.dumps(
+                        {"labels": ["deploy", "infra"], "space": "ENG"}
+                    ),
+                    "doc_updated_at": 1_700_000_000 + ind,
+                    "primary_owners": ["someone@example.com"],
+                    "secondary_owners": [],
+                    "matchfeatures": {"recency_bias": 0.9},
+                },
+            }
+        )
+    return json.dumps({"root": {"children": hits}}).encode()
+
+
+def best_time(func: Callable[[], Any], repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(num_hits: int, words_per_chunk: int, repeats: int) -> None:
+    response = build_response(num_hits, words_per_chunk)
+    response_json = orjson.loads(response)
+    chunks = _vespa_search_response_to_inference_chunks(response_json)
+
+    timings = {
+        "decode, json": best_time(lambda: json.loads(response), repeats),
+        "decode, orjson": best_time(lambda: orjson.loads(response), repeats),
+        "convert, validated": best_time(
+            lambda: [InferenceChunk(**chunk.dict()) for chunk in chunks], repeats
+        ),
+        "convert, unvalidated": best_time(
+            lambda: _vespa_search_response_to_inference_chunks(response_json), repeats
+        ),
+    }
+
+    print(f"{num_hits} hits, {len(response) / 1024:.0f}KiB response")
+    for name, elapsed in timings.items():
+        print(f"{name:>22}: {elapsed * 1000:7.2f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num_hits", type=int, default=100)
+    parser.add_argument("--words_per_chunk", type=int, default=350)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    main(
+        num_hits=args.num_hits,
+        words_per_chunk=args.words_per_chunk,
+        repeats=args.repeats,
+    )
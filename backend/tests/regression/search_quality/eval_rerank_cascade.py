@@ -0,0 +1,178 @@
+"""Compares the latency and quality of cascade reranking with reranking by the whole ensemble,
+to pick RERANK_CASCADE_TOP_K and RERANK_CASCADE_MIN_SCORE for an index.
+
+Takes the same questions file as eval_search.py. Each question is retrieved once, then its
+chunks are reranked by every setting. The model server must serve the cascade model, so it
+needs RERANK_CASCADE_MODEL set to the same model as --cascade_model.
+
+PYTHONPATH=. python tests/regression/search_quality/eval_rerank_cascade.py questions.json \
+    --cascade_model cross-encoder/ms-marco-MiniLM-L-6-v2 --top_k 5 10 --min_score 0 0.1
+"""
+import argparse
+import math
+import time
+from dataclasses import dataclass
+from dataclasses import field
+
+import numpy
+from sqlalchemy.orm import Session
+
+from danswer.db.engine import get_sqlalchemy_engine
+from danswer.search.models import InferenceChunk
+from danswer.search.models import SearchRequest
+from danswer.search.pipeline import SearchPipeline
+from danswer.search.postprocessing.postprocessing import semantic_reranking
+from tests.regression.search_quality.eval_search import read_json
+
+
+@dataclass
+class RerankSetting:
+    name: str
+    cascade_model: str | None = None
+    cascade_top_k: int = 0
+    cascade_min_score: float = 0.0
+    latencies: list[float] = field(default_factory=list)
+    ndcg_scores: list[float] = field(default_factory=list)
+
+
+def ndcg_at_k(document_ids: list[str], targets: list[str], k: int) -> float:
+    """Binary relevance NDCG over documents, a document only counts at its first chunk"""
+    ranked_ids = list(dict.fromkeys(document_ids))[:k]
+    dcg = sum(
+        1 / math.log2(rank + 2)
+        for rank, document_id in enumerate(ranked_ids)
+        if document_id in targets
+    )
+    ideal_dcg = sum(1 / math.log2(rank + 2) for rank in range(min(len(targets), k)))
+    return dcg / ideal_dcg if ideal_dcg else 0.0
+
+
+def get_chunks_to_rerank(query: str) -> list[InferenceChunk]:
+    with Session(get_sqlalchemy_engine()) as db_session:
+        search_pipeline = SearchPipeline(
+            search_request=SearchRequest(
+                query=query, skip_rerank=True, skip_llm_chunk_filter=True
+            ),
+            user=None,
+            db_session=db_session,
+        )
+        return search_pipeline.retrieved_chunks[
+            : search_pipeline.search_query.num_rerank
+        ]
+
+
+def main(
+    questions_json: str,
+    cascade_model: str,
+    top_ks: list[int],
+    min_scores: list[float],
+    ndcg_k: int,
+    stop_after: int,
+) -> None:
+    questions_info = read_json(questions_json)
+
+    retrieval_setting = RerankSetting(name="Retrieval only")
+    settings = [RerankSetting(name="Ensemble")] + [
+        RerankSetting(
+            name=f"Cascade top_k={top_k} min_score={min_score}",
+            cascade_model=cascade_model,
+            cascade_top_k=top_k,
+            cascade_min_score=min_score,
+        )
+        for top_k in top_ks
+        for min_score in min_scores
+    ]
+
+    for ind, (question, targets) in enumerate(questions_info.items()):
+        if ind >= stop_after:
+            break
+
+        print(f"Question {ind + 1}: {question}")
+        chunks = get_chunks_to_rerank(question)
+        if not chunks:
+            continue
+
+        retrieval_setting.latencies.append(0.0)
+        retrieval_setting.ndcg_scores.append(
+            ndcg_at_k([chunk.document_id for chunk in chunks], targets, ndcg_k)
+        )
+        for setting in settings:
+            # Reranking sets the scores of the chunks it is given
+            start_time = time.monotonic()
+            ranked_chunks, _ = semantic_reranking(
+                query=question,
+                chunks=[chunk.copy() for chunk in chunks],
+                cascade_model=setting.cascade_model,
+                cascade_top_k=setting.cascade_top_k,
+                cascade_min_score=setting.cascade_min_score,
+            )
+            setting.latencies.append(time.monotonic() - start_time)
+            setting.ndcg_scores.append(
+                ndcg_at_k(
+                    [chunk.document_id for chunk in ranked_chunks], targets, ndcg_k
+                )
+            )
+
+    print(f"\n{'Setting':<45}{'Mean ms':>10}{'P95 ms':>10}{f'NDCG@{ndcg_k}':>10}")
+    for setting in [retrieval_setting] + settings:
+        if not setting.latencies:
+            continue
+        print(
+            f"{setting.name:<45}"
+            f"{1000 * numpy.mean(setting.latencies):>10.1f}"
+            f"{1000 * numpy.percentile(setting.latencies, 95):>10.1f}"
+            f"{numpy.mean(setting.ndcg_scores):>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "regression_questions_json",
+        type=str,
+        help="Path to the Questions JSON file.",
+        default="./tests/regression/search_quality/test_questions.json",
+        nargs="?",
+    )
+    parser.add_argument(
+        "--cascade_model",
+        type=str,
+        help="First pass cross-encoder, the RERANK_CASCADE_MODEL of the model server.",
+        required=True,
+    )
+    parser.add_argument(
+        "--top_k",
+        type=int,
+        nargs="+",
+        help="Numbers of chunks passed on to the ensemble to try.",
+        default=[5, 10],
+    )
+    parser.add_argument(
+        "--min_score",
+        type=float,
+        nargs="+",
+        help="Minimum first pass scores to try.",
+        default=[0.0],
+    )
+    parser.add_argument(
+        "--ndcg_k",
+        type=int,
+        help="Number of top documents the NDCG is computed over.",
+        default=5,
+    )
+    parser.add_argument(
+        "--stop_after",
+        type=int,
+        help="Stop processing after this many iterations.",
+        default=100,
+    )
+    args = parser.parse_args()
+
+    main(
+        args.regression_questions_json,
+        args.cascade_model,
+        args.top_k,
+        args.min_score,
+        args.ndcg_k,
+        args.stop_after,
+    )
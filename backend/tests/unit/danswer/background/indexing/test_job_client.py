@@ -0,0 +1,29 @@
+import multiprocessing
+import unittest
+from multiprocessing.queues import Queue
+
+from danswer.background.indexing.job_client import SimpleJobClient
+
+
+def _report_process(queue: Queue) -> None:
+    process = multiprocessing.current_process()
+    queue.put((process.pid, process.daemon))
+
+
+class TestSimpleJobClient(unittest.TestCase):
+    def test_job_runs_in_a_non_daemonic_child_process(self) -> None:
+        queue: Queue = multiprocessing.Queue()
+        job = SimpleJobClient(n_workers=1).submit(_report_process, queue)
+        assert job is not None and job.process is not None
+
+        pid, daemon = queue.get(timeout=30)
+        job.process.join(timeout=30)
+
+        # Jobs must be able to start processes of their own, see ChunkingStage
+        self.assertNotEqual(pid, multiprocessing.current_process().pid)
+        self.assertFalse(daemon)
+        self.assertEqual(job.status, "finished")
+
+
+if __name__ == "__main__":
+    unittest.main()
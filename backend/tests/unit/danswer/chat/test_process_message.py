@@ -0,0 +1,108 @@
+import unittest
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+from danswer.chat.models import DanswerAnswerPiece
+from danswer.chat.models import LLMRelevanceFilterResponse
+from danswer.chat.models import ProvisionalQADocsResponse
+from danswer.chat.models import QADocsResponse
+from danswer.chat.process_message import stream_chat_message_objects
+from danswer.search.enums import QueryFlow
+from danswer.search.enums import SearchType
+from danswer.search.models import IndexFilters
+from danswer.search.models import RetrievalDetails
+from danswer.server.query_and_chat.models import CreateChatMessageRequest
+from danswer.tools.search.search_tool import SEARCH_PROVISIONAL_RESULTS_ID
+from danswer.tools.search.search_tool import SEARCH_RESPONSE_SUMMARY_ID
+from danswer.tools.search.search_tool import SearchResponseSummary
+from danswer.tools.search.search_tool import SECTION_RELEVANCE_LIST_ID
+from danswer.tools.tool import ToolResponse
+from tests.unit.danswer.factories import build_inference_chunk
+
+
+class TestStreamChatMessageObjects(unittest.TestCase):
+    def setUp(self) -> None:
+        self.answer = MagicMock(citations=[])
+        chat_session = MagicMock()
+        chat_session.persona.tools = []
+        # Both the new user message and the last message of the chain
+        user_message = MagicMock()
+
+        module = "danswer.chat.process_message"
+        for target, replacement in [
+            ("get_chat_session_by_id", MagicMock(return_value=chat_session)),
+            ("get_llm_for_persona", MagicMock()),
+            ("get_default_llm_tokenizer", MagicMock()),
+            ("get_current_db_embedding_model", MagicMock()),
+            ("get_default_document_index", MagicMock()),
+            ("get_or_create_root_message", MagicMock()),
+            ("create_new_chat_message", MagicMock(return_value=user_message)),
+            ("create_chat_chain", MagicMock(return_value=(user_message, []))),
+            ("load_all_chat_files", MagicMock(return_value=[])),
+            ("PromptConfig", MagicMock()),
+            ("explicit_tool_calling_supported", MagicMock(return_value=False)),
+            ("Answer", MagicMock(return_value=self.answer)),
+            ("translate_db_message_to_chat_message_detail", MagicMock()),
+        ]:
+            patcher = patch(f"{module}.{target}", new=replacement)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_provisional_documents_are_sent_before_the_reranked_ones(self) -> None:
+        self.answer.processed_streamed_output = iter(
+            [
+                ToolResponse(
+                    id=SEARCH_PROVISIONAL_RESULTS_ID,
+                    response=[build_inference_chunk("a"), build_inference_chunk("b")],
+                ),
+                ToolResponse(
+                    id=SEARCH_RESPONSE_SUMMARY_ID,
+                    response=SearchResponseSummary(
+                        top_sections=[],
+                        predicted_flow=QueryFlow.QUESTION_ANSWER,
+                        predicted_search=SearchType.HYBRID,
+                        final_filters=IndexFilters(access_control_list=None),
+                        recency_bias_multiplier=1.0,
+                    ),
+                ),
+                ToolResponse(id=SECTION_RELEVANCE_LIST_ID, response=[0]),
+                DanswerAnswerPiece(answer_piece="answer"),
+            ]
+        )
+
+        packets = list(
+            stream_chat_message_objects(
+                new_msg_req=CreateChatMessageRequest(
+                    chat_session_id=1,
+                    parent_message_id=None,
+                    message="test",
+                    file_ids=[],
+                    prompt_id=1,
+                    search_doc_ids=None,
+                    retrieval_options=RetrievalDetails(),
+                ),
+                user=None,
+                db_session=MagicMock(),
+            )
+        )
+
+        # The last packet is the details of the saved answer
+        self.assertEqual(
+            [type(packet) for packet in packets[:-1]],
+            [
+                ProvisionalQADocsResponse,
+                QADocsResponse,
+                LLMRelevanceFilterResponse,
+                DanswerAnswerPiece,
+            ],
+        )
+        provisional_response = packets[0]
+        assert isinstance(provisional_response, ProvisionalQADocsResponse)
+        self.assertEqual(
+            [doc.document_id for doc in provisional_response.provisional_documents],
+            ["a", "b"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
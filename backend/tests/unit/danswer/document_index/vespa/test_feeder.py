@@ -0,0 +1,118 @@
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler
+
+import httpx
+
+from danswer.document_index.vespa.feeder import AdaptiveConcurrencyLimit
+from danswer.document_index.vespa.feeder import VespaFeeder
+from danswer.document_index.vespa.feeder import VespaFeedOperation
+from tests.unit.danswer.utils.local_http_server import LocalHttpServerTestCase
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Status codes to respond with, in order, then 200
+    statuses: list[int] = []
+    fed_ids: list[str] = []
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        fields = json.loads(self.rfile.read(length))["fields"]
+        with _Handler.lock:
+            _Handler.in_flight += 1
+            _Handler.max_in_flight = max(_Handler.max_in_flight, _Handler.in_flight)
+            status = _Handler.statuses.pop(0) if _Handler.statuses else 200
+        time.sleep(0.01)
+        with _Handler.lock:
+            _Handler.in_flight -= 1
+            if status == 200:
+                _Handler.fed_ids.append(fields["id"])
+
+        body = b"{}"
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+class TestVespaFeeder(LocalHttpServerTestCase):
+    handler = _Handler
+    path = "/document/v1/docid"
+
+    def setUp(self) -> None:
+        _Handler.statuses = []
+        _Handler.fed_ids = []
+        _Handler.max_in_flight = 0
+
+    def _operations(self, count: int) -> list[VespaFeedOperation]:
+        return [
+            VespaFeedOperation(
+                document_id=str(ind), url=f"{self.url}/{ind}", fields={"id": str(ind)}
+            )
+            for ind in range(count)
+        ]
+
+    def _feeder(self, initial_in_flight: int) -> VespaFeeder:
+        return VespaFeeder(
+            initial_in_flight=initial_in_flight,
+            min_in_flight=1,
+            max_in_flight=initial_in_flight,
+            backoff_base=0.001,
+            timeout=5,
+        )
+
+    def test_window_bounds_in_flight_operations(self) -> None:
+        self._feeder(initial_in_flight=4).feed(self._operations(40))
+
+        self.assertEqual(
+            sorted(_Handler.fed_ids, key=int), [str(ind) for ind in range(40)]
+        )
+        self.assertLessEqual(_Handler.max_in_flight, 4)
+        self.assertGreater(_Handler.max_in_flight, 1)
+
+    def test_throttled_operations_are_retried(self) -> None:
+        _Handler.statuses = [429, 503, 429]
+        self._feeder(initial_in_flight=2).feed(self._operations(10))
+
+        self.assertEqual(
+            sorted(_Handler.fed_ids, key=int), [str(ind) for ind in range(10)]
+        )
+
+    def test_rejected_operation_fails_the_feed(self) -> None:
+        _Handler.statuses = [400]
+        with self.assertRaises(httpx.HTTPStatusError):
+            self._feeder(initial_in_flight=1).feed(self._operations(5))
+
+
+class TestAdaptiveConcurrencyLimit(unittest.TestCase):
+    def test_additive_increase_multiplicative_decrease(self) -> None:
+        limit = AdaptiveConcurrencyLimit(initial=8, min_limit=2, max_limit=10)
+        # One more operation in flight after each full window of successes
+        for _ in range(9):
+            limit.on_success()
+        self.assertEqual(limit.current, 9)
+
+        sent_at = time.monotonic()
+        limit.on_throttled(sent_at)
+        self.assertEqual(limit.current, 4)
+        # Sent before the decrease, the window already accounts for it
+        limit.on_throttled(sent_at)
+        self.assertEqual(limit.current, 4)
+
+        for _ in range(3):
+            limit.on_throttled(time.monotonic())
+        self.assertEqual(limit.current, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,221 @@
+import json
+import threading
+import unittest
+from typing import Any
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import httpx
+import requests
+
+from danswer.configs.constants import DocumentSource
+from danswer.configs.constants import TITLE_SEPARATOR
+from danswer.document_index.document_index_utils import get_uuid_from_chunk_info
+from danswer.document_index.vespa.index import _delete_vespa_docs_by_selection
+from danswer.document_index.vespa.index import _get_existing_document_ids
+from danswer.document_index.vespa.index import _iter_vespa_chunks_by_document_id
+from danswer.document_index.vespa.index import _update_vespa_docs_by_selection
+from danswer.document_index.vespa.index import _vespa_hit_to_inference_chunk
+from danswer.document_index.vespa.index import _VespaUpdateRequest
+from danswer.document_index.vespa.index import VESPA_CONTENT_CLUSTER
+from danswer.document_index.vespa.index import VespaIndex
+from danswer.document_index.vespa.utils import build_document_ids_selection
+from danswer.search.models import InferenceChunk
+from danswer.utils.threadpool_concurrency import get_executor
+from danswer.utils.threadpool_concurrency import VESPA_IO_EXECUTOR
+
+
+def _hit(chunk_id: int = 1) -> dict:
+    return {
+        "relevance": 1,
+        "fields": {
+            "document_id": "doc",
+            "chunk_id": chunk_id,
+            "blurb": "blurb",
+            "content": f"Title{TITLE_SEPARATOR}content",
+            "content_summary": "some <hi>content</hi><sep />more",
+            "source_links": json.dumps({"0": "https://example.com"}),
+            "section_continuation": False,
+            "source_type": "web",
+            "semantic_identifier": "Title",
+            "boost": 0,
+            "hidden": False,
+            "metadata": json.dumps({"tags": ["a", "b"], "owner": "me"}),
+            "doc_updated_at": 1700000000,
+            "primary_owners": ["me"],
+            "matchfeatures": {"recency_bias": 1},
+        },
+    }
+
+
+class TestVespaHitToInferenceChunk(unittest.TestCase):
+    def test_fields_have_their_validated_types(self) -> None:
+        chunk = _vespa_hit_to_inference_chunk(_hit())
+
+        # Built without validation, must still be what validation would have produced
+        self.assertEqual(chunk.dict(), InferenceChunk(**chunk.dict()).dict())
+        self.assertIs(chunk.source_type, DocumentSource.WEB)
+        self.assertIsInstance(chunk.score, float)
+        self.assertIsInstance(chunk.recency_bias, float)
+        self.assertEqual(chunk.source_links, {0: "https://example.com"})
+        self.assertEqual(chunk.match_highlights, ["some <hi>content</hi>", "more"])
+        self.assertIsNone(chunk.secondary_owners)
+
+    def test_title_removed_from_first_chunk(self) -> None:
+        chunk = _vespa_hit_to_inference_chunk(_hit(chunk_id=0))
+        self.assertEqual(chunk.content, "content")
+
+
+class TestApplyUpdatesBatched(unittest.TestCase):
+    def setUp(self) -> None:
+        self.updates = [
+            _VespaUpdateRequest(
+                document_id=f"doc{ind}",
+                url=f"http://vespa/doc{ind}",
+                update_request={"fields": {}},
+            )
+            for ind in range(4)
+        ]
+        client_patcher = patch("danswer.document_index.vespa.index.httpx.Client")
+        self.http_client = client_patcher.start().return_value.__enter__.return_value
+        self.addCleanup(client_patcher.stop)
+
+    @staticmethod
+    def _response(status_code: int) -> httpx.Response:
+        return httpx.Response(status_code, request=httpx.Request("PUT", "http://vespa"))
+
+    def test_no_deadlock_when_called_from_the_vespa_io_pool(self) -> None:
+        self.http_client.put.return_value = self._response(200)
+        executor = get_executor(VESPA_IO_EXECUTOR)
+
+        all_workers_busy = threading.Barrier(executor.max_workers)
+
+        def _fan_out() -> None:
+            # Only once no worker is left idle to pick up the updates
+            all_workers_busy.wait(timeout=10)
+            VespaIndex._apply_updates_batched(self.updates)
+
+        futures = [executor.submit(_fan_out) for _ in range(executor.max_workers)]
+        for future in futures:
+            future.result(timeout=10)
+
+        self.assertEqual(
+            self.http_client.put.call_count, len(self.updates) * len(futures)
+        )
+
+    def test_failed_update_names_the_document(self) -> None:
+        self.http_client.put.return_value = self._response(500)
+
+        with self.assertRaisesRegex(requests.HTTPError, "doc0"):
+            VespaIndex._apply_updates_batched(self.updates[:1])
+
+
+class TestDocumentRequests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.http_client = MagicMock()
+        # The request params are updated in place between pages, keep what each call sent
+        self.sent_params: list[dict[str, Any]] = []
+
+    def _pages(self, *continuations: str | None) -> Any:
+        responses = iter(
+            httpx.Response(
+                200,
+                json={"continuation": continuation} if continuation else {},
+                request=httpx.Request("PUT", "http://vespa"),
+            )
+            for continuation in continuations
+        )
+
+        def _respond(url: str, params: dict[str, Any], **kwargs: Any) -> Any:
+            self.sent_params.append(dict(params))
+            return next(responses)
+
+        return _respond
+
+    def test_existing_documents_are_looked_up_by_first_chunk_id(self) -> None:
+        existing_chunk_id = str(get_uuid_from_chunk_info("a", 0))
+
+        def _get(url: str, **kwargs: Any) -> httpx.Response:
+            status_code = 200 if url.endswith(existing_chunk_id) else 404
+            return httpx.Response(status_code, request=httpx.Request("GET", url))
+
+        self.http_client.get.side_effect = _get
+
+        existing = _get_existing_document_ids(["a", "b"], "idx", self.http_client)
+
+        self.assertEqual(existing, {"a"})
+        self.assertEqual(self.http_client.get.call_count, 2)
+        for call in self.http_client.get.call_args_list:
+            self.assertNotIn("selection", call.kwargs["params"])
+
+    def test_delete_follows_continuations(self) -> None:
+        self.http_client.delete.side_effect = self._pages("page2", None)
+
+        _delete_vespa_docs_by_selection(["a", "b"], "idx", self.http_client)
+
+        selection = build_document_ids_selection(["a", "b"], "idx")
+        self.assertEqual(len(self.sent_params), 2)
+        for params in self.sent_params:
+            self.assertEqual(params["selection"], selection)
+            self.assertEqual(params["cluster"], VESPA_CONTENT_CLUSTER)
+        self.assertNotIn("continuation", self.sent_params[0])
+        self.assertEqual(self.sent_params[1]["continuation"], "page2")
+
+    def test_update_applies_the_fields_to_the_selection(self) -> None:
+        self.http_client.put.side_effect = self._pages("page2", None)
+        fields = {"boost": {"assign": 2}}
+
+        _update_vespa_docs_by_selection(["a"], fields, "idx", self.http_client)
+
+        self.assertEqual(len(self.sent_params), 2)
+        self.assertEqual(
+            self.sent_params[0]["selection"], build_document_ids_selection(["a"], "idx")
+        )
+        self.assertEqual(self.sent_params[1]["continuation"], "page2")
+        for call in self.http_client.put.call_args_list:
+            self.assertEqual(call.kwargs["json"], {"fields": fields})
+
+
+class TestIterVespaChunksByDocumentId(unittest.TestCase):
+    def setUp(self) -> None:
+        pages = [
+            {
+                "documents": [
+                    {"id": "c0", "fields": {"access_control_list": {"user_a": 1}}},
+                    {"id": "c1", "fields": {"access_control_list": {"user_b": 1}}},
+                ],
+                "continuation": "page2",
+            },
+            {
+                # Moved between buckets during the visit, returned a second time
+                "documents": [
+                    {"id": "c0", "fields": {"access_control_list": {"user_a": 1}}},
+                    {"id": "c2", "fields": {"access_control_list": {"user_a": 1}}},
+                ],
+            },
+        ]
+        client_patcher = patch("danswer.document_index.vespa.index.get_vespa_client")
+        client_patcher.start().return_value.get.side_effect = [
+            MagicMock(content=json.dumps(page).encode()) for page in pages
+        ]
+        self.addCleanup(client_patcher.stop)
+
+    def _visited_ids(self, user_access_control_list: list[str] | None) -> list[str]:
+        return [
+            chunk["id"]
+            for chunk in _iter_vespa_chunks_by_document_id(
+                document_id="doc",
+                index_name="idx",
+                user_access_control_list=user_access_control_list,
+            )
+        ]
+
+    def test_chunks_are_deduplicated(self) -> None:
+        self.assertEqual(self._visited_ids(None), ["c0", "c1", "c2"])
+
+    def test_chunks_outside_the_acl_are_dropped(self) -> None:
+        self.assertEqual(self._visited_ids(["user_a"]), ["c0", "c2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+
+from danswer.document_index.vespa.utils import build_chunk_window_filter
+from danswer.document_index.vespa.utils import build_document_ids_selection
+
+
+class TestBuildDocumentIdsSelection(unittest.TestCase):
+    def test_matches_any_of_the_documents(self) -> None:
+        self.assertEqual(
+            build_document_ids_selection(["a", "b"], "danswer_chunk"),
+            '(danswer_chunk.document_id=="a" or danswer_chunk.document_id=="b")',
+        )
+
+    def test_escapes_document_ids(self) -> None:
+        self.assertEqual(
+            build_document_ids_selection(['say "hi"\\'], "danswer_chunk"),
+            '(danswer_chunk.document_id=="say \\"hi\\"\\\\")',
+        )
+
+    def test_requires_document_ids(self) -> None:
+        with self.assertRaises(ValueError):
+            build_document_ids_selection([], "danswer_chunk")
+
+
+class TestBuildChunkWindowFilter(unittest.TestCase):
+    def test_bounds_the_chunk_ids(self) -> None:
+        self.assertEqual(
+            build_chunk_window_filter("doc", 2, 5),
+            '(document_id contains "doc" and chunk_id >= 2 and chunk_id <= 5)',
+        )
+
+    def test_window_from_the_start_of_the_document(self) -> None:
+        self.assertEqual(
+            build_chunk_window_filter('say "hi"', None, 3),
+            '(document_id contains "say \\"hi\\"" and chunk_id <= 3)',
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import numpy as np
+
+from danswer.configs.constants import DocumentSource
+from danswer.connectors.models import Document
+from danswer.connectors.models import Section
+from danswer.indexing.models import ChunkEmbedding
+from danswer.indexing.models import DocAwareChunk
+from danswer.indexing.models import IndexChunk
+from danswer.search.models import IndexFilters
+from danswer.search.models import InferenceChunk
+from danswer.search.models import SearchQuery
+
+
+def build_document(
+    doc_id: str = "doc",
+    section_texts: list[str] | None = None,
+    title: str | None = None,
+) -> Document:
+    """Without section texts the document has a single section, section `ind` links to
+    `link_{ind}`"""
+    if section_texts is None:
+        section_texts = [f"{doc_id} content"]
+    return Document(
+        id=doc_id,
+        sections=[
+            Section(text=text, link=f"link_{ind}")
+            for ind, text in enumerate(section_texts)
+        ],
+        source=DocumentSource.WEB,
+        semantic_identifier=doc_id,
+        title=title,
+        metadata={},
+    )
+
+
+def build_doc_aware_chunk(
+    document: Document, chunk_id: int, content: str | None = None
+) -> DocAwareChunk:
+    return DocAwareChunk(
+        source_document=document,
+        chunk_id=chunk_id,
+        blurb="",
+        content=f"{document.id} {chunk_id}" if content is None else content,
+        source_links=None,
+        section_continuation=False,
+    )
+
+
+def build_index_chunk(document: Document, chunk_id: int) -> IndexChunk:
+    return IndexChunk(
+        source_document=document,
+        chunk_id=chunk_id,
+        blurb="",
+        content=f"{document.id} {chunk_id}",
+        source_links=None,
+        section_continuation=False,
+        embeddings=ChunkEmbedding(
+            full_embedding=np.array([0.1]), mini_chunk_embeddings=[]
+        ),
+        title_embedding=None,
+    )
+
+
+def build_inference_chunk(
+    document_id: str, chunk_id: int = 0, score: float = 1.0
+) -> InferenceChunk:
+    return InferenceChunk(
+        chunk_id=chunk_id,
+        blurb=f"{document_id} {chunk_id}",
+        content=f"{document_id} {chunk_id}",
+        source_links=None,
+        section_continuation=False,
+        document_id=document_id,
+        source_type=DocumentSource.WEB,
+        semantic_identifier=document_id,
+        boost=0,
+        recency_bias=1.0,
+        score=score,
+        hidden=False,
+        metadata={},
+        match_highlights=[],
+        updated_at=None,
+    )
+
+
+def build_search_query(
+    chunks_above: int = 0,
+    chunks_below: int = 0,
+    full_doc: bool = False,
+    skip_rerank: bool = True,
+    skip_llm_chunk_filter: bool = True,
+) -> SearchQuery:
+    return SearchQuery(
+        query="test",
+        filters=IndexFilters(access_control_list=None),
+        recency_bias_multiplier=1.0,
+        chunks_above=chunks_above,
+        chunks_below=chunks_below,
+        full_doc=full_doc,
+        skip_rerank=skip_rerank,
+        skip_llm_chunk_filter=skip_llm_chunk_filter,
+    )
@@ -0,0 +1,60 @@
+import unittest
+
+from danswer.document_index.interfaces import ChunkHashes
+from danswer.indexing.indexing_pipeline import split_unchanged_chunks
+from tests.unit.danswer.factories import build_doc_aware_chunk
+from tests.unit.danswer.factories import build_document
+
+
+class TestChunkContentHash(unittest.TestCase):
+    def test_hash_follows_embedded_texts(self) -> None:
+        document = build_document("doc")
+        chunk = build_doc_aware_chunk(document, 0, "some content")
+
+        moved = build_doc_aware_chunk(document, 3, "some content")
+        self.assertEqual(chunk.content_hash(), moved.content_hash())
+        edited = build_doc_aware_chunk(document, 0, "other content")
+        self.assertNotEqual(chunk.content_hash(), edited.content_hash())
+        # The title is embedded along with the content
+        titled = build_doc_aware_chunk(
+            build_document("doc", title="title"), 0, "some content"
+        )
+        self.assertNotEqual(chunk.content_hash(), titled.content_hash())
+        with_mini_chunks = build_doc_aware_chunk(document, 0, "some content")
+        with_mini_chunks.mini_chunk_texts = ["some", "content"]
+        self.assertNotEqual(chunk.content_hash(), with_mini_chunks.content_hash())
+
+
+class TestSplitUnchangedChunks(unittest.TestCase):
+    def test_only_chunks_with_the_indexed_hash_are_unchanged(self) -> None:
+        indexed_doc = build_document("indexed")
+        new_doc = build_document("new")
+        same = build_doc_aware_chunk(indexed_doc, 0, "same")
+        edited = build_doc_aware_chunk(indexed_doc, 1, "edited")
+        appended = build_doc_aware_chunk(indexed_doc, 2, "appended")
+        legacy = build_doc_aware_chunk(build_document("legacy"), 0, "same")
+        brand_new = build_doc_aware_chunk(new_doc, 0, "same")
+
+        before_edit = build_doc_aware_chunk(indexed_doc, 1, "before")
+        existing_hashes = {
+            "indexed": {
+                0: ChunkHashes(content_hash=same.content_hash(), metadata_hash="m"),
+                1: ChunkHashes(
+                    content_hash=before_edit.content_hash(),
+                    metadata_hash="m",
+                ),
+            },
+            # Indexed before hashes were stored
+            "legacy": {0: ChunkHashes(content_hash=None, metadata_hash=None)},
+        }
+
+        changed, unchanged = split_unchanged_chunks(
+            chunks=[same, edited, appended, legacy, brand_new],
+            existing_hashes=existing_hashes,
+        )
+        self.assertEqual(unchanged, [same])
+        self.assertEqual(changed, [edited, appended, legacy, brand_new])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import unittest
+from unittest.mock import patch
+
+from danswer.configs.constants import SECTION_SEPARATOR
+from danswer.indexing.chunker import chunk_document
+from danswer.indexing.chunker import extract_blurb
+from danswer.indexing.chunker import split_chunk_text_into_mini_chunks
+from danswer.utils.text_processing import shared_precompare_cleanup
+from tests.unit.danswer.factories import build_document
+
+
+class _WhitespaceTokenizer:
+    is_fast = False
+
+    def __init__(self) -> None:
+        self.tokenized_chars = 0
+
+    def tokenize(self, text: str) -> list[str]:
+        self.tokenized_chars += len(text)
+        return text.split()
+
+
+class TestChunkDocument(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tokenizer = _WhitespaceTokenizer()
+        patcher = patch(
+            "danswer.indexing.chunker.get_default_tokenizer",
+            return_value=self.tokenizer,
+        )
+        self.get_default_tokenizer = patcher.start()
+        self.addCleanup(patcher.stop)
+        # Cached segmenters hold the tokenizer they were built with
+        segmenters_patcher = patch.dict(
+            "danswer.indexing.chunker._SEGMENTERS", clear=True
+        )
+        segmenters_patcher.start()
+        self.addCleanup(segmenters_patcher.stop)
+
+    def test_sections_are_packed_into_chunks(self) -> None:
+        sections = ["a b c", "D-e. f", "g h i j", "k", "", "l m"]
+        chunks = chunk_document(
+            build_document(section_texts=sections, title=""), chunk_tok_size=8
+        )
+
+        self.assertEqual(
+            [chunk.content for chunk in chunks],
+            [
+                SECTION_SEPARATOR.join(sections[:2]),
+                SECTION_SEPARATOR.join(sections[2:]),
+            ],
+        )
+        # Link offsets are positions in the cleaned up chunk text
+        first_offset = len(shared_precompare_cleanup(sections[0]))
+        self.assertEqual(chunks[0].source_links, {0: "link_0", first_offset: "link_1"})
+        self.assertEqual(
+            chunks[1].source_links,
+            {0: "link_2", 4: "link_3", 5: "link_5"},
+        )
+
+    def test_blurbs_and_mini_chunks_share_the_sentences(self) -> None:
+        sections = [
+            "First sentence here. Second one is a bit longer. Third.",
+            "Short. Another short one.",
+        ]
+        chunks = chunk_document(
+            build_document(section_texts=sections, title=""),
+            chunk_tok_size=20,
+            blurb_size=6,
+            mini_chunk_size=7,
+        )
+
+        self.assertEqual(len(chunks), 1)
+        self.assertEqual(chunks[0].blurb, "First sentence here.")
+        self.assertEqual(
+            chunks[0].mini_chunk_texts,
+            [
+                "First sentence here.",
+                "Second one is a bit longer. Third.",
+                "Short. Another short one.",
+            ],
+        )
+
+    def test_large_section_is_split_on_sentences(self) -> None:
+        sentences = [f"Sentence number {ind} of the section." for ind in range(10)]
+        chunks = chunk_document(
+            build_document(section_texts=[" ".join(sentences)], title=""),
+            chunk_tok_size=12,
+            blurb_size=6,
+        )
+
+        self.assertEqual(
+            [chunk.content for chunk in chunks],
+            [" ".join(sentences[ind : ind + 2]) for ind in range(0, 10, 2)],
+        )
+        self.assertTrue(all(chunk.blurb == sentences[0] for chunk in chunks))
+        self.assertEqual(
+            [chunk.section_continuation for chunk in chunks],
+            [False, True, True, True, True],
+        )
+        self.assertIsNone(chunks[0].mini_chunk_texts)
+
+    def test_each_section_is_tokenized_once(self) -> None:
+        sections = [f"word{ind} other words" for ind in range(500)]
+        chunk_document(
+            build_document(section_texts=sections, title=""),
+            chunk_tok_size=30,
+            mini_chunk_size=10,
+        )
+
+        separator_chars = len(SECTION_SEPARATOR)
+        self.assertEqual(
+            self.tokenizer.tokenized_chars,
+            sum(len(text) for text in sections) + separator_chars,
+        )
+
+    def test_segmenter_is_reused(self) -> None:
+        self.assertEqual(extract_blurb("One. Two.", blurb_size=1), "One.")
+        self.assertEqual(
+            split_chunk_text_into_mini_chunks("One. Two.", mini_chunk_size=1),
+            ["One.", "Two."],
+        )
+        self.get_default_tokenizer.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
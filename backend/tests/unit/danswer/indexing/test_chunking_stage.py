@@ -0,0 +1,80 @@
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from unittest.mock import patch
+
+from danswer.connectors.models import Document
+from danswer.indexing.chunker import Chunker
+from danswer.indexing.chunking_stage import ChunkingStage
+from danswer.indexing.models import DocAwareChunk
+from tests.unit.danswer.factories import build_doc_aware_chunk
+from tests.unit.danswer.factories import build_document
+
+
+class _RecordingChunker(Chunker):
+    def __init__(self) -> None:
+        self.chunked_ids: list[str] = []
+        self._lock = threading.Lock()
+
+    def chunk(self, document: Document) -> list[DocAwareChunk]:
+        with self._lock:
+            self.chunked_ids.append(document.id)
+        return [
+            build_doc_aware_chunk(document, ind, section.text)
+            for ind, section in enumerate(document.sections)
+        ]
+
+
+def _thread_pool(
+    max_workers: int, mp_context: Any, **kwargs: Any
+) -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=max_workers, **kwargs)
+
+
+class TestChunkingStage(unittest.TestCase):
+    def setUp(self) -> None:
+        # Threads stand in for the worker processes so the chunker can be inspected
+        for target, replacement in [
+            ("ProcessPoolExecutor", _thread_pool),
+            ("get_default_tokenizer", lambda: None),
+        ]:
+            patcher = patch(
+                f"danswer.indexing.chunking_stage.{target}", new=replacement
+            )
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_pool_keeps_document_order(self) -> None:
+        documents = [
+            build_document(f"doc_{ind}", section_texts=["first", "second"])
+            for ind in range(10)
+        ]
+        in_process = ChunkingStage(_RecordingChunker(), num_processes=0).chunk(
+            documents
+        )
+        with ChunkingStage(_RecordingChunker(), num_processes=4) as stage:
+            pooled = stage.chunk(documents)
+
+        self.assertEqual(
+            [(chunk.source_document.id, chunk.content) for chunk in pooled],
+            [(chunk.source_document.id, chunk.content) for chunk in in_process],
+        )
+
+    def test_daemonic_process_chunks_in_process(self) -> None:
+        chunker = _RecordingChunker()
+        with patch(
+            "danswer.indexing.chunking_stage.multiprocessing.current_process"
+        ) as current_process:
+            current_process.return_value.daemon = True
+            stage = ChunkingStage(chunker, num_processes=2)
+
+        chunks = stage.chunk([build_document("a")])
+
+        self.assertEqual(len(chunks), 1)
+        self.assertEqual(chunker.chunked_ids, ["a"])
+        self.assertIsNone(stage._pool)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+from typing import Any
+from unittest.mock import patch
+
+from danswer.indexing.embedder import batch_indices_by_token_budget
+from danswer.indexing.embedder import get_token_lengths
+
+
+class TestBatchIndicesByTokenBudget(unittest.TestCase):
+    def test_batches_respect_budget(self) -> None:
+        token_lengths = [500, 10, 120, 12, 480, 8, 130, 9]
+        batches = batch_indices_by_token_budget(token_lengths, token_budget=1024)
+
+        self.assertEqual(
+            sorted(ind for batch in batches for ind in batch),
+            list(range(len(token_lengths))),
+        )
+        for batch in batches:
+            longest = max(token_lengths[ind] for ind in batch)
+            self.assertLessEqual(longest * len(batch), 1024)
+
+        # Short texts are grouped together instead of being padded to the long ones
+        self.assertEqual(batches[0], [5, 7, 1, 3, 2, 6])
+
+    def test_oversized_text_gets_own_batch(self) -> None:
+        batches = batch_indices_by_token_budget([2000, 5, 5], token_budget=512)
+        self.assertEqual(batches, [[1, 2], [0]])
+
+    def test_empty(self) -> None:
+        self.assertEqual(batch_indices_by_token_budget([], token_budget=512), [])
+
+
+class TestGetTokenLengths(unittest.TestCase):
+    def test_counts_with_the_model_tokenizer_and_prefix(self) -> None:
+        def _tokenizer(texts: list[str], **kwargs: Any) -> dict[str, list[list[str]]]:
+            return {"input_ids": [text.split() for text in texts]}
+
+        with patch(
+            "danswer.indexing.embedder.get_model_tokenizer", return_value=_tokenizer
+        ) as get_tokenizer:
+            token_lengths = get_token_lengths(
+                ["one two", "one two three four five six"],
+                max_length=5,
+                model_name="intfloat/e5-base-v2",
+                passage_prefix="passage: ",
+            )
+
+        get_tokenizer.assert_called_once_with("intfloat/e5-base-v2")
+        self.assertEqual(token_lengths, [3, 5])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from danswer.indexing.embedding_cache import build_embedding_cache_key
+from danswer.indexing.embedding_cache import SqliteEmbeddingCache
+
+
+class TestSqliteEmbeddingCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, "embedding_cache.db")
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_round_trip_and_counters(self) -> None:
+        cache = SqliteEmbeddingCache(db_path=self.db_path, max_entries=100)
+        cache.put({"a": np.array([0.5, -1.25]), "b": np.array([2.0, 3.0])})
+
+        found = cache.get(["a", "b", "c"])
+
+        self.assertEqual(
+            {key: emb.tolist() for key, emb in found.items()},
+            {"a": [0.5, -1.25], "b": [2.0, 3.0]},
+        )
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+    def test_persists_across_instances(self) -> None:
+        SqliteEmbeddingCache(db_path=self.db_path, max_entries=100).put(
+            {"a": np.array([1.0])}
+        )
+        cache = SqliteEmbeddingCache(db_path=self.db_path, max_entries=100)
+        self.assertEqual(cache.get(["a"])["a"].tolist(), [1.0])
+
+    def test_least_recently_used_are_evicted(self) -> None:
+        cache = SqliteEmbeddingCache(db_path=self.db_path, max_entries=2)
+        cache.put({"a": np.array([1.0])})
+        cache.put({"b": np.array([2.0])})
+        # Refreshes "a" so "b" is now the least recently used
+        cache.get(["a"])
+        cache.put({"c": np.array([3.0])})
+
+        self.assertEqual(set(cache.get(["a", "b", "c"]).keys()), {"a", "c"})
+
+    def test_key_depends_on_model_settings(self) -> None:
+        key = build_embedding_cache_key("model", True, "passage: ", "text")
+        self.assertEqual(
+            key, build_embedding_cache_key("model", True, "passage: ", "text")
+        )
+        self.assertNotEqual(key, build_embedding_cache_key("model", True, None, "text"))
+        self.assertNotEqual(
+            key, build_embedding_cache_key("model", False, "passage: ", "text")
+        )
+        self.assertNotEqual(
+            key, build_embedding_cache_key("other", True, "passage: ", "text")
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
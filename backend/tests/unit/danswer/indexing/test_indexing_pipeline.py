@@ -0,0 +1,170 @@
+import time
+import unittest
+from typing import Any
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+from danswer.access.models import DocumentAccess
+from danswer.connectors.models import Document
+from danswer.document_index.interfaces import DocumentInsertionRecord
+from danswer.dynamic_configs.interface import ConfigNotFoundError
+from danswer.indexing.chunker import Chunker
+from danswer.indexing.chunking_stage import ChunkingStage
+from danswer.indexing.indexing_pipeline import build_staged_indexing_pipeline
+from danswer.indexing.indexing_pipeline import IndexingBatch
+from danswer.indexing.indexing_pipeline import write_chunks_to_index
+from danswer.indexing.models import DocAwareChunk
+from danswer.search.search_result_cache import get_index_generation
+from tests.unit.danswer.factories import build_document
+from tests.unit.danswer.factories import build_index_chunk
+
+
+class TestWriteChunksToIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        self.document = build_document("a")
+        self.document_index = MagicMock()
+        self.document_index.index.return_value = {
+            DocumentInsertionRecord(document_id="a", already_existed=False)
+        }
+
+        module = "danswer.indexing.indexing_pipeline"
+        self.update_chunk_counts = MagicMock()
+        for target, replacement in [
+            ("prepare_to_modify_documents", MagicMock()),
+            (
+                "get_access_for_documents",
+                MagicMock(return_value={"a": DocumentAccess.build([], True)}),
+            ),
+            ("fetch_document_sets_for_documents", MagicMock(return_value=[])),
+            ("update_docs_updated_at", MagicMock()),
+            ("update_docs_chunk_count__no_commit", self.update_chunk_counts),
+        ]:
+            patcher = patch(f"{module}.{target}", new=replacement)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _write(self, record_chunk_counts: bool) -> None:
+        write_chunks_to_index(
+            document_index=self.document_index,
+            updatable_docs=[self.document],
+            chunks_with_embeddings=[
+                build_index_chunk(self.document, 0),
+                build_index_chunk(self.document, 1),
+            ],
+            id_to_boost={},
+            db_session=MagicMock(),
+            record_chunk_counts=record_chunk_counts,
+        )
+
+    def test_chunk_counts_are_recorded_for_the_current_index(self) -> None:
+        self._write(record_chunk_counts=True)
+
+        self.assertEqual(
+            self.update_chunk_counts.call_args.kwargs["ids_to_chunk_count"], {"a": 2}
+        )
+
+    def test_chunk_counts_are_not_recorded_for_the_future_index(self) -> None:
+        self._write(record_chunk_counts=False)
+
+        self.document_index.index.assert_called_once()
+        self.update_chunk_counts.assert_not_called()
+
+
+class _SingleChunker(Chunker):
+    def chunk(self, document: Document) -> list[DocAwareChunk]:
+        return [build_index_chunk(document, 0)]
+
+
+class TestStagedIndexingPipeline(unittest.TestCase):
+    def setUp(self) -> None:
+        stored: dict[str, Any] = {}
+
+        def _load(key: str) -> Any:
+            if key not in stored:
+                raise ConfigNotFoundError
+            return stored[key]
+
+        config_store = MagicMock()
+        config_store.load.side_effect = _load
+        config_store.store.side_effect = stored.__setitem__
+
+        module = "danswer.indexing.indexing_pipeline"
+        for target, replacement in [
+            (
+                "danswer.search.search_result_cache.get_dynamic_config_store",
+                MagicMock(return_value=config_store),
+            ),
+            (f"{module}.get_session_context_manager", MagicMock()),
+            (
+                f"{module}.filter_updatable_docs",
+                MagicMock(side_effect=lambda documents, **kwargs: (documents, {})),
+            ),
+            (f"{module}.get_existing_chunk_hashes", MagicMock(return_value=None)),
+            (f"{module}.upsert_documents_in_db", MagicMock()),
+            (f"{module}.write_chunks_to_index", MagicMock(return_value=1)),
+        ]:
+            patcher = patch(target, new=replacement)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_writes_invalidate_cached_search_results(self) -> None:
+        generation = get_index_generation()
+        embedder = MagicMock()
+        embedder.embed_chunks.side_effect = lambda chunks: chunks
+        pipeline = build_staged_indexing_pipeline(
+            embedder=embedder,
+            document_index=MagicMock(),
+            chunking_stage=ChunkingStage(_SingleChunker(), num_processes=0),
+            index_attempt_metadata=MagicMock(),
+        )
+
+        batch = IndexingBatch(documents=[build_document("a")])
+        indexed = list(pipeline.run(iter([batch])))
+
+        self.assertEqual([batch.new_docs for batch in indexed], [1])
+        self.assertNotEqual(get_index_generation(), generation)
+
+    def test_documents_are_diffed_after_earlier_writes(self) -> None:
+        events: list[str] = []
+        module = "danswer.indexing.indexing_pipeline"
+
+        def _get_existing_chunk_hashes(chunks: list[DocAwareChunk], **_: Any) -> None:
+            events.append(f"diff {chunks[0].source_document.id}")
+
+        def _write_chunks_to_index(updatable_docs: list[Document], **_: Any) -> int:
+            events.append(f"write {updatable_docs[0].id}")
+            return 1
+
+        def _embed_chunks(chunks: list[DocAwareChunk]) -> list[DocAwareChunk]:
+            # Holds the first batch in flight while the next ones are chunked
+            time.sleep(0.1)
+            return chunks
+
+        embedder = MagicMock()
+        embedder.embed_chunks.side_effect = _embed_chunks
+        pipeline = build_staged_indexing_pipeline(
+            embedder=embedder,
+            document_index=MagicMock(),
+            chunking_stage=ChunkingStage(_SingleChunker(), num_processes=0),
+            index_attempt_metadata=MagicMock(),
+            queue_size=4,
+        )
+        with patch(
+            f"{module}.get_existing_chunk_hashes", new=_get_existing_chunk_hashes
+        ), patch(f"{module}.write_chunks_to_index", new=_write_chunks_to_index):
+            batches = [
+                IndexingBatch(documents=[build_document(doc_id)])
+                for doc_id in ["a", "b", "a"]
+            ]
+            list(pipeline.run(iter(batches)))
+
+        self.assertEqual(
+            [event for event in events if event.endswith(" a")],
+            ["diff a", "write a", "diff a", "write a"],
+        )
+        # A batch without documents in flight does not wait
+        self.assertLess(events.index("diff b"), events.index("write a"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+from danswer.chat.models import DanswerAnswerPiece
+from danswer.chat.models import LLMRelevanceFilterResponse
+from danswer.chat.models import ProvisionalQADocsResponse
+from danswer.chat.models import QADocsResponse
+from danswer.one_shot_answer.answer_question import stream_answer_objects
+from danswer.one_shot_answer.models import DirectQARequest
+from danswer.one_shot_answer.models import QueryRephrase
+from danswer.one_shot_answer.models import ThreadMessage
+from danswer.search.enums import QueryFlow
+from danswer.search.enums import SearchType
+from danswer.search.models import IndexFilters
+from danswer.tools.search.search_tool import SEARCH_PROVISIONAL_RESULTS_ID
+from danswer.tools.search.search_tool import SEARCH_RESPONSE_SUMMARY_ID
+from danswer.tools.search.search_tool import SearchResponseSummary
+from danswer.tools.search.search_tool import SECTION_RELEVANCE_LIST_ID
+from danswer.tools.tool import ToolResponse
+from tests.unit.danswer.factories import build_inference_chunk
+
+
+class TestStreamAnswerObjects(unittest.TestCase):
+    def setUp(self) -> None:
+        self.answer = MagicMock()
+        search_tool = MagicMock()
+        search_tool.name.return_value = "run_search"
+
+        module = "danswer.one_shot_answer.answer_question"
+        for target, replacement in [
+            ("create_chat_session", MagicMock()),
+            ("get_default_llm_token_encode", MagicMock()),
+            ("get_or_create_root_message", MagicMock()),
+            ("combine_message_thread", MagicMock(return_value="")),
+            ("thread_based_query_rephrase", MagicMock(return_value="test")),
+            ("create_new_chat_message", MagicMock()),
+            ("get_llm_for_persona", MagicMock()),
+            ("PromptConfig", MagicMock()),
+            ("SearchTool", MagicMock(return_value=search_tool)),
+            ("Answer", MagicMock(return_value=self.answer)),
+            ("translate_db_message_to_chat_message_detail", MagicMock()),
+        ]:
+            patcher = patch(f"{module}.{target}", new=replacement)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_provisional_documents_are_sent_before_the_reranked_ones(self) -> None:
+        self.answer.processed_streamed_output = iter(
+            [
+                ToolResponse(
+                    id=SEARCH_PROVISIONAL_RESULTS_ID,
+                    response=[build_inference_chunk("a"), build_inference_chunk("b")],
+                ),
+                ToolResponse(
+                    id=SEARCH_RESPONSE_SUMMARY_ID,
+                    response=SearchResponseSummary(
+                        top_sections=[],
+                        predicted_flow=QueryFlow.QUESTION_ANSWER,
+                        predicted_search=SearchType.HYBRID,
+                        final_filters=IndexFilters(access_control_list=None),
+                        recency_bias_multiplier=1.0,
+                    ),
+                ),
+                ToolResponse(id=SECTION_RELEVANCE_LIST_ID, response=[0]),
+                DanswerAnswerPiece(answer_piece="answer"),
+            ]
+        )
+
+        packets = list(
+            stream_answer_objects(
+                query_req=DirectQARequest(
+                    messages=[ThreadMessage(message="test", sender=None)],
+                    prompt_id=None,
+                    persona_id=0,
+                ),
+                user=None,
+                max_document_tokens=None,
+                max_history_tokens=None,
+                db_session=MagicMock(),
+            )
+        )
+
+        # The last packet is the details of the saved answer
+        self.assertEqual(
+            [type(packet) for packet in packets[:-1]],
+            [
+                QueryRephrase,
+                ProvisionalQADocsResponse,
+                QADocsResponse,
+                LLMRelevanceFilterResponse,
+                DanswerAnswerPiece,
+            ],
+        )
+        provisional_response = packets[1]
+        assert isinstance(provisional_response, ProvisionalQADocsResponse)
+        self.assertEqual(
+            [doc.document_id for doc in provisional_response.provisional_documents],
+            ["a", "b"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from danswer.search.postprocessing.postprocessing import async_search_postprocessing
+from danswer.search.postprocessing.postprocessing import select_cascade_candidates
+from danswer.search.postprocessing.postprocessing import semantic_reranking
+from tests.unit.danswer.factories import build_inference_chunk
+from tests.unit.danswer.factories import build_search_query
+
+
+class TestAsyncPostprocessing(unittest.TestCase):
+    def test_rerank_and_llm_filter(self) -> None:
+        chunks = [build_inference_chunk(document_id) for document_id in ["a", "b", "c"]]
+
+        async def _predict(self: object, query: str, passages: list[str]) -> np.ndarray:
+            return np.array([[0.1, 0.9, 0.5]])
+
+        async def _run() -> tuple[list, list]:
+            generator = async_search_postprocessing(
+                search_query=build_search_query(
+                    skip_rerank=False, skip_llm_chunk_filter=False
+                ),
+                retrieved_chunks=chunks,
+            )
+            reranked = await generator.__anext__()
+            relevant = await generator.__anext__()
+            return reranked, relevant
+
+        with patch(
+            "danswer.search.postprocessing.postprocessing."
+            "CrossEncoderEnsembleModel.async_predict",
+            _predict,
+        ), patch(
+            "danswer.search.postprocessing.postprocessing.filter_chunks",
+            return_value=["a__0", "c__0"],
+        ):
+            reranked, relevant = asyncio.run(_run())
+
+        self.assertEqual([c.document_id for c in reranked], ["b", "c", "a"])
+        # Relevant ids are in the reranked order
+        self.assertEqual(relevant, ["c__0", "a__0"])
+
+
+class TestRerankCascade(unittest.TestCase):
+    def test_select_cascade_candidates(self) -> None:
+        scores = np.array([0.2, 0.9, 0.05, 0.6, 0.9])
+
+        self.assertEqual(select_cascade_candidates(scores, 3, 0.0), [1, 4, 3])
+        self.assertEqual(select_cascade_candidates(scores, 10, 0.5), [1, 4, 3])
+        self.assertEqual(select_cascade_candidates(scores, 10, 0.95), [])
+
+    def test_ensemble_only_rescores_the_candidates(self) -> None:
+        chunks = [
+            build_inference_chunk(document_id) for document_id in ["a", "b", "c", "d"]
+        ]
+        passages_scored: list[list[str]] = []
+
+        def _predict(
+            self: object,
+            query: str,
+            passages: list[str],
+            model_names: list[str] | None = None,
+        ) -> np.ndarray:
+            passages_scored.append(passages)
+            if model_names == ["first_pass"]:
+                return np.array([[0.3, 0.8, 0.01, 0.7]])
+            # The ensemble prefers the second best chunk of the first pass
+            return np.array([[0.4, 0.9]])
+
+        with patch(
+            "danswer.search.postprocessing.postprocessing."
+            "CrossEncoderEnsembleModel.predict",
+            _predict,
+        ):
+            ranked_chunks, ranked_indices = semantic_reranking(
+                query="test",
+                chunks=chunks,
+                cascade_model="first_pass",
+                cascade_top_k=2,
+                cascade_min_score=0.05,
+            )
+
+        self.assertEqual(passages_scored[1], ["b 0", "d 0"])
+        self.assertEqual([c.document_id for c in ranked_chunks], ["d", "b", "a", "c"])
+        self.assertEqual(ranked_indices, [3, 1, 0, 2])
+        self.assertEqual(
+            [c.score is None for c in ranked_chunks], [False, False, True, True]
+        )
+
+        # Nothing scored high enough by the first pass, the ensemble is not called
+        passages_scored.clear()
+        with patch(
+            "danswer.search.postprocessing.postprocessing."
+            "CrossEncoderEnsembleModel.predict",
+            _predict,
+        ):
+            ranked_chunks, _ = semantic_reranking(
+                query="test",
+                chunks=chunks,
+                cascade_model="first_pass",
+                cascade_top_k=2,
+                cascade_min_score=0.9,
+            )
+
+        self.assertEqual(len(passages_scored), 1)
+        self.assertEqual([c.document_id for c in ranked_chunks], ["b", "d", "a", "c"])
+
+
+if __name__ == "__main__":
+    unittest.main()
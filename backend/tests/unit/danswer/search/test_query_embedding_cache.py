@@ -0,0 +1,93 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from danswer.indexing.embedding_cache import SqliteEmbeddingCache
+from danswer.search.query_embedding_cache import build_query_embedding_cache_key
+from danswer.search.query_embedding_cache import get_query_embedding_cache
+from danswer.search.query_embedding_cache import QueryEmbeddingCache
+
+
+class TestQueryEmbeddingCache(unittest.TestCase):
+    def test_least_recently_used_are_evicted(self) -> None:
+        cache = QueryEmbeddingCache(max_entries=2, ttl=60)
+        cache.put("a", [1.0])
+        cache.put("b", [2.0])
+        # Refreshes "a" so "b" is now the least recently used
+        cache.get("a")
+        cache.put("c", [3.0])
+
+        self.assertEqual(cache.get("a"), [1.0])
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), [3.0])
+        self.assertEqual((cache.hits, cache.misses), (3, 1))
+
+    def test_entries_expire(self) -> None:
+        cache = QueryEmbeddingCache(max_entries=2, ttl=0.01)
+        cache.put("a", [1.0])
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("a"))
+
+    def test_misses_fall_back_to_the_shared_cache(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            shared_cache = SqliteEmbeddingCache(
+                db_path=os.path.join(tmp_dir, "embedding_cache.db"), max_entries=10
+            )
+            QueryEmbeddingCache(max_entries=2, ttl=60, shared_cache=shared_cache).put(
+                "a", [0.5]
+            )
+
+            # As seen from another process
+            cache = QueryEmbeddingCache(
+                max_entries=2, ttl=60, shared_cache=shared_cache
+            )
+            self.assertEqual(cache.get("a"), [0.5])
+            self.assertEqual(cache.hit_rate, 1.0)
+
+    def test_shared_entries_expire(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            shared_cache = SqliteEmbeddingCache(
+                db_path=os.path.join(tmp_dir, "embedding_cache.db"), max_entries=10
+            )
+            writer = QueryEmbeddingCache(
+                max_entries=2, ttl=0.05, shared_cache=shared_cache
+            )
+            reader = QueryEmbeddingCache(
+                max_entries=2, ttl=0.05, shared_cache=shared_cache
+            )
+            writer.put("a", [0.5])
+            self.assertEqual(reader.get("a"), [0.5])
+
+            time.sleep(0.1)
+            # Neither the shared entry nor the local copy read from it are still used
+            self.assertIsNone(reader.get("a"))
+            self.assertIsNone(
+                QueryEmbeddingCache(
+                    max_entries=2, ttl=0.05, shared_cache=shared_cache
+                ).get("a")
+            )
+
+    def test_zero_ttl_disables_the_cache(self) -> None:
+        module = "danswer.search.query_embedding_cache"
+        with patch(f"{module}._QUERY_EMBEDDING_CACHE", None), patch(
+            f"{module}.QUERY_EMBEDDING_CACHE_TTL", 0
+        ), patch(f"{module}.QUERY_EMBEDDING_SHARED_CACHE", True):
+            self.assertIsNone(get_query_embedding_cache())
+
+    def test_key_normalizes_whitespace_only(self) -> None:
+        key = build_query_embedding_cache_key("model", True, "query: ", "what is  x\n")
+        self.assertEqual(
+            key, build_query_embedding_cache_key("model", True, "query: ", "what is x")
+        )
+        self.assertNotEqual(
+            key, build_query_embedding_cache_key("model", True, "query: ", "What is x")
+        )
+        self.assertNotEqual(
+            key, build_query_embedding_cache_key("other", True, "query: ", "what is x")
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,200 @@
+import asyncio
+import threading
+import unittest
+from unittest.mock import AsyncMock
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+from danswer.document_index.interfaces import ChunkWindow
+from danswer.search.enums import QueryFlow
+from danswer.search.enums import SearchType
+from danswer.search.models import SearchRequest
+from danswer.search.pipeline import assemble_sections
+from danswer.search.pipeline import AsyncSearchPipeline
+from danswer.search.pipeline import plan_section_expansions
+from danswer.search.pipeline import SearchPipeline
+from danswer.search.pipeline import SectionExpansion
+from danswer.search.retrieval.search_runner import async_retrieve_chunks
+from danswer.search.retrieval.search_runner import retrieve_chunks
+from danswer.search.search_result_cache import SearchResultCache
+from tests.unit.danswer.factories import build_inference_chunk
+from tests.unit.danswer.factories import build_search_query
+
+
+class TestSectionExpansion(unittest.TestCase):
+    def test_no_expansion(self) -> None:
+        chunks = [build_inference_chunk("a", 0)]
+        self.assertIsNone(plan_section_expansions(build_search_query(), chunks))
+
+    def test_overlapping_ranges_are_merged(self) -> None:
+        chunks = [
+            build_inference_chunk("a", 5),
+            build_inference_chunk("b", 0),
+            build_inference_chunk("a", 6),
+            build_inference_chunk("a", 20),
+        ]
+        expansions = plan_section_expansions(
+            build_search_query(chunks_above=1, chunks_below=1), chunks
+        )
+        assert expansions is not None
+        self.assertEqual(
+            sorted(
+                (e.chunk.document_id, e.min_chunk_ind, e.max_chunk_ind)
+                for e in expansions
+            ),
+            [("a", 4, 7), ("a", 19, 21), ("b", 0, 1)],
+        )
+
+        fetched = [
+            [f"{e.chunk.document_id} {ind}" for ind in range(e.min_chunk_ind or 0, 2)]
+            for e in expansions
+        ]
+        sections = assemble_sections(chunks, expansions, fetched)
+        # The chunk merged into the section of chunk 5 is dropped, order is kept
+        self.assertEqual(
+            [(s.document_id, s.chunk_id) for s in sections],
+            [("a", 5), ("b", 0), ("a", 20)],
+        )
+        self.assertEqual(sections[1].combined_content, "b 0\nb 1")
+
+    def test_full_doc(self) -> None:
+        chunks = [
+            build_inference_chunk("a", 3),
+            build_inference_chunk("a", 1),
+            build_inference_chunk("b", 2),
+        ]
+        expansions = plan_section_expansions(build_search_query(full_doc=True), chunks)
+        assert expansions is not None
+        self.assertEqual(
+            [(e.chunk.chunk_id, e.min_chunk_ind, e.max_chunk_ind) for e in expansions],
+            [(3, None, None), (2, None, None)],
+        )
+
+
+class TestPrecomputedQueryEmbedding(unittest.TestCase):
+    def test_retrieval_does_not_embed_the_query_again(self) -> None:
+        document_index = MagicMock()
+        document_index.hybrid_retrieval.return_value = [build_inference_chunk("a", 0)]
+
+        with patch("danswer.search.retrieval.search_runner.embed_query") as embed:
+            chunks = retrieve_chunks(
+                query=build_search_query(),
+                document_index=document_index,
+                db_session=MagicMock(),
+                multilingual_expansion_str=None,
+                query_embedding=[0.1, 0.2],
+            )
+
+        embed.assert_not_called()
+        self.assertEqual(
+            document_index.hybrid_retrieval.call_args.kwargs["query_embedding"],
+            [0.1, 0.2],
+        )
+        self.assertEqual([c.document_id for c in chunks], ["a"])
+
+    def test_async_retrieval_does_not_look_up_the_embedding_model(self) -> None:
+        document_index = MagicMock()
+        document_index.async_hybrid_retrieval = AsyncMock(
+            return_value=[build_inference_chunk("a", 0)]
+        )
+        query_embedding_model = MagicMock()
+
+        with patch(
+            "danswer.search.retrieval.search_runner._get_query_embedding_model"
+        ) as get_model, patch(
+            "danswer.search.retrieval.search_runner.async_embed_query",
+            AsyncMock(return_value=[0.1, 0.2]),
+        ) as embed:
+            chunks = asyncio.run(
+                async_retrieve_chunks(
+                    query=build_search_query(),
+                    document_index=document_index,
+                    db_session=MagicMock(),
+                    multilingual_expansion_str=None,
+                    query_embedding_model=query_embedding_model,
+                )
+            )
+
+        get_model.assert_not_called()
+        embed.assert_awaited_once_with(query_embedding_model, "test")
+        self.assertEqual([c.document_id for c in chunks], ["a"])
+
+
+def _async_pipeline() -> AsyncSearchPipeline:
+    with patch("danswer.search.pipeline.build_query_embedding_model"), patch(
+        "danswer.search.pipeline.get_default_document_index"
+    ), patch("danswer.search.pipeline.get_search_result_cache", return_value=None):
+        return AsyncSearchPipeline(
+            search_request=SearchRequest(query="test"),
+            user=None,
+            db_session=MagicMock(),
+            embedding_model=MagicMock(),
+        )
+
+
+class TestAsyncSearchPipeline(unittest.TestCase):
+    def test_chunk_counts_are_looked_up_off_the_event_loop(self) -> None:
+        pipeline = _async_pipeline()
+        pipeline._search_query = build_search_query(chunks_above=1, chunks_below=1)
+        pipeline._retrieved_chunks = [build_inference_chunk("a", 5)]
+        lookup_threads: list[threading.Thread] = []
+
+        def _build_chunk_windows(
+            expansions: list[SectionExpansion], db_session: object
+        ) -> list[ChunkWindow]:
+            lookup_threads.append(threading.current_thread())
+            return []
+
+        with patch(
+            "danswer.search.pipeline.build_chunk_windows", _build_chunk_windows
+        ), patch.object(
+            pipeline.document_index,
+            "async_chunk_windows_content_retrieval",
+            AsyncMock(return_value=[["a 4", "a 5", "a 6"]]),
+        ):
+            sections = asyncio.run(pipeline.retrieved_sections())
+
+        self.assertEqual(sections[0].combined_content, "a 4\na 5\na 6")
+        self.assertEqual(len(lookup_threads), 1)
+        self.assertIsNot(lookup_threads[0], threading.main_thread())
+
+
+class TestSearchResultCaching(unittest.TestCase):
+    def test_caching_does_not_wait_on_the_query_intent(self) -> None:
+        result_cache = SearchResultCache(max_entries=10, ttl=60)
+        with patch("danswer.search.pipeline.get_current_db_embedding_model"), patch(
+            "danswer.search.pipeline.get_default_document_index"
+        ), patch(
+            "danswer.search.pipeline.get_search_result_cache",
+            return_value=result_cache,
+        ):
+            pipeline = SearchPipeline(
+                search_request=SearchRequest(query="test"),
+                user=None,
+                db_session=MagicMock(),
+            )
+        pipeline._search_query = build_search_query()
+        pipeline._retrieved_chunks = [build_inference_chunk("a", 0)]
+        pipeline._cache_key = "key"
+        pipeline._index_generation = "gen"
+        intent_future = MagicMock()
+        intent_future.wait_result.return_value = (SearchType.HYBRID, QueryFlow.SEARCH)
+        pipeline._query_intent_future = intent_future
+
+        pipeline._cache_retrieved_chunks()
+
+        intent_future.wait_result.assert_not_called()
+        cached_result = result_cache.get("key", "gen")
+        assert cached_result is not None
+        self.assertIsNone(cached_result.predicted_flow)
+
+        # The intent is added to the entry once it resolves
+        self.assertEqual(pipeline.predicted_flow, QueryFlow.SEARCH)
+        cached_result = result_cache.get("key", "gen")
+        assert cached_result is not None
+        self.assertEqual(cached_result.predicted_search_type, SearchType.HYBRID)
+        self.assertEqual(cached_result.predicted_flow, QueryFlow.SEARCH)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+import time
+import unittest
+from dataclasses import replace
+
+from danswer.db.models import DocumentSet
+from danswer.db.models import Persona
+from danswer.search.enums import QueryFlow
+from danswer.search.enums import SearchType
+from danswer.search.models import SearchRequest
+from danswer.search.search_result_cache import build_search_cache_key
+from danswer.search.search_result_cache import CachedSearchResult
+from danswer.search.search_result_cache import SearchResultCache
+from tests.unit.danswer.factories import build_inference_chunk
+from tests.unit.danswer.factories import build_search_query
+
+
+def _result(*document_ids: str) -> CachedSearchResult:
+    return CachedSearchResult(
+        search_query=build_search_query(),
+        predicted_search_type=SearchType.HYBRID,
+        predicted_flow=QueryFlow.QUESTION_ANSWER,
+        retrieved_chunks=[
+            build_inference_chunk(document_id) for document_id in document_ids
+        ],
+    )
+
+
+def _key(
+    search_request: SearchRequest, access_control_list: list[str] | None = None
+) -> str:
+    return build_search_cache_key(
+        search_request=search_request,
+        access_control_list=access_control_list,
+        index_name="danswer_chunk",
+        multilingual_expansion=None,
+    )
+
+
+class TestBuildSearchCacheKey(unittest.TestCase):
+    def test_key_covers_request_acl_and_persona(self) -> None:
+        request = SearchRequest(query="test")
+        key = _key(request, ["PUBLIC", "user_id:1"])
+
+        self.assertEqual(
+            key, _key(SearchRequest(query="test"), ["user_id:1", "PUBLIC"])
+        )
+        self.assertNotEqual(key, _key(request, ["PUBLIC", "user_id:2"]))
+        self.assertNotEqual(key, _key(request, None))
+        self.assertNotEqual(
+            key, _key(SearchRequest(query="test", skip_rerank=True), ["PUBLIC"])
+        )
+
+        def persona(document_set_name: str) -> Persona:
+            return Persona(
+                id=1,
+                name="persona",
+                num_chunks=10,
+                llm_relevance_filter=True,
+                llm_filter_extraction=True,
+                recency_bias="auto",
+                search_type=SearchType.HYBRID,
+                document_sets=[DocumentSet(name=document_set_name)],
+            )
+
+        self.assertEqual(
+            _key(SearchRequest(query="test", persona=persona("a"))),
+            _key(SearchRequest(query="test", persona=persona("a"))),
+        )
+        self.assertNotEqual(
+            _key(SearchRequest(query="test", persona=persona("a"))),
+            _key(SearchRequest(query="test", persona=persona("b"))),
+        )
+
+
+class TestSearchResultCache(unittest.TestCase):
+    def test_least_recently_used_are_evicted(self) -> None:
+        cache = SearchResultCache(max_entries=2, ttl=60)
+        cache.put("a", "gen", _result("a"))
+        cache.put("b", "gen", _result("b"))
+        self.assertIsNotNone(cache.get("a", "gen"))
+        cache.put("c", "gen", _result("c"))
+
+        self.assertIsNone(cache.get("b", "gen"))
+        self.assertIsNotNone(cache.get("a", "gen"))
+        self.assertIsNotNone(cache.get("c", "gen"))
+        self.assertEqual(cache.hits, 3)
+        self.assertEqual(cache.misses, 1)
+
+    def test_entries_expire_and_follow_the_index_generation(self) -> None:
+        cache = SearchResultCache(max_entries=10, ttl=0.05)
+        cache.put("a", "gen", _result("a"))
+        self.assertIsNone(cache.get("a", "new_gen"))
+        # Stale entries are dropped on lookup
+        self.assertIsNone(cache.get("a", "gen"))
+
+        cache.put("a", "gen", _result("a"))
+        time.sleep(0.1)
+        self.assertIsNone(cache.get("a", "gen"))
+
+    def test_reranked_chunks_and_isolation(self) -> None:
+        cache = SearchResultCache(max_entries=10, ttl=60)
+        result = _result("a", "b")
+        cache.put("a", "gen", result)
+        # Postprocessing scoring the chunks of the search must not change the entry
+        result.retrieved_chunks[0].score = 0.0
+
+        cached_result = cache.get("a", "gen")
+        assert cached_result is not None
+        self.assertIsNone(cached_result.reranked_chunks)
+        self.assertEqual(cached_result.retrieved_chunks[0].score, 1.0)
+
+        reranked_chunks = [
+            build_inference_chunk("b", score=0.9),
+            build_inference_chunk("a", score=0.1),
+        ]
+        cache.update_reranked_chunks("a", "new_gen", reranked_chunks)
+        cached_result = cache.get("a", "gen")
+        assert cached_result is not None
+        self.assertIsNone(cached_result.reranked_chunks)
+
+        cache.update_reranked_chunks("a", "gen", reranked_chunks)
+        cached_result = cache.get("a", "gen")
+        assert cached_result is not None
+        assert cached_result.reranked_chunks is not None
+        self.assertEqual(
+            [chunk.document_id for chunk in cached_result.reranked_chunks], ["b", "a"]
+        )
+        self.assertEqual(
+            [chunk.document_id for chunk in cached_result.retrieved_chunks], ["a", "b"]
+        )
+
+    def test_query_intent_is_filled_in(self) -> None:
+        cache = SearchResultCache(max_entries=10, ttl=60)
+        cache.put(
+            "a",
+            "gen",
+            replace(_result("a"), predicted_search_type=None, predicted_flow=None),
+        )
+
+        cache.update_query_intent("a", "new_gen", SearchType.KEYWORD, QueryFlow.SEARCH)
+        cached_result = cache.get("a", "gen")
+        assert cached_result is not None
+        self.assertIsNone(cached_result.predicted_flow)
+
+        cache.update_query_intent("a", "gen", SearchType.KEYWORD, QueryFlow.SEARCH)
+        cached_result = cache.get("a", "gen")
+        assert cached_result is not None
+        self.assertEqual(cached_result.predicted_search_type, SearchType.KEYWORD)
+        self.assertEqual(cached_result.predicted_flow, QueryFlow.SEARCH)
+
+
+if __name__ == "__main__":
+    unittest.main()
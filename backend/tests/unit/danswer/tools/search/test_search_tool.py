@@ -0,0 +1,107 @@
+import json
+import unittest
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+from danswer.chat.models import LlmDoc
+from danswer.configs.constants import DocumentSource
+from danswer.db.models import Persona
+from danswer.search.enums import QueryFlow
+from danswer.search.enums import SearchType
+from danswer.tools.search.search_tool import FINAL_CONTEXT_DOCUMENTS
+from danswer.tools.search.search_tool import SEARCH_PROVISIONAL_RESULTS_ID
+from danswer.tools.search.search_tool import SEARCH_RESPONSE_SUMMARY_ID
+from danswer.tools.search.search_tool import SearchTool
+from danswer.tools.search.search_tool import SECTION_RELEVANCE_LIST_ID
+from danswer.tools.tool import ToolResponse
+from tests.unit.danswer.factories import build_inference_chunk
+from tests.unit.danswer.factories import build_search_query
+
+
+def _llm_doc(document_id: str) -> LlmDoc:
+    return LlmDoc(
+        document_id=document_id,
+        content=f"{document_id} content",
+        blurb=document_id,
+        semantic_identifier=document_id,
+        source_type=DocumentSource.WEB,
+        metadata={},
+        updated_at=None,
+        link=None,
+        source_links=None,
+    )
+
+
+def _search_tool(stream_provisional_results: bool) -> SearchTool:
+    return SearchTool(
+        db_session=MagicMock(),
+        user=None,
+        persona=Persona(),
+        retrieval_options=None,
+        prompt_config=MagicMock(),
+        llm_config=MagicMock(),
+        pruning_config=MagicMock(),
+        stream_provisional_results=stream_provisional_results,
+    )
+
+
+class TestSearchTool(unittest.TestCase):
+    def _run(
+        self, stream_provisional_results: bool, reranked: bool
+    ) -> list[ToolResponse]:
+        search_pipeline = MagicMock()
+        search_pipeline.search_query = build_search_query()
+        search_pipeline.predicted_flow = QueryFlow.QUESTION_ANSWER
+        search_pipeline.predicted_search_type = SearchType.HYBRID
+        search_pipeline.retrieved_chunks = [
+            build_inference_chunk("a"),
+            build_inference_chunk("b"),
+        ]
+        search_pipeline.reranked_sections = []
+        search_pipeline.relevant_chunk_indices = []
+
+        module = "danswer.tools.search.search_tool"
+        with patch(f"{module}.SearchPipeline", return_value=search_pipeline), patch(
+            f"{module}.should_rerank", return_value=reranked
+        ), patch(f"{module}.prune_documents", return_value=[]):
+            return list(_search_tool(stream_provisional_results).run(query="test"))
+
+    def test_provisional_results_come_first(self) -> None:
+        responses = self._run(stream_provisional_results=True, reranked=True)
+
+        self.assertEqual(
+            [response.id for response in responses],
+            [
+                SEARCH_PROVISIONAL_RESULTS_ID,
+                SEARCH_RESPONSE_SUMMARY_ID,
+                SECTION_RELEVANCE_LIST_ID,
+                FINAL_CONTEXT_DOCUMENTS,
+            ],
+        )
+        self.assertEqual(
+            [chunk.document_id for chunk in responses[0].response], ["a", "b"]
+        )
+
+    def test_no_provisional_results_without_reranking(self) -> None:
+        for stream_provisional_results, reranked in [(True, False), (False, True)]:
+            responses = self._run(stream_provisional_results, reranked)
+            self.assertNotIn(
+                SEARCH_PROVISIONAL_RESULTS_ID, [response.id for response in responses]
+            )
+
+    def test_tool_message_content_is_looked_up_by_id(self) -> None:
+        search_tool = _search_tool(stream_provisional_results=True)
+        content = search_tool.build_tool_message_content(
+            ToolResponse(
+                id=SEARCH_PROVISIONAL_RESULTS_ID, response=[build_inference_chunk("a")]
+            ),
+            ToolResponse(id=FINAL_CONTEXT_DOCUMENTS, response=[_llm_doc("b")]),
+            ToolResponse(id=SEARCH_RESPONSE_SUMMARY_ID, response=None),
+        )
+
+        search_results = json.loads(str(content))["search_results"]
+        self.assertEqual([result["title"] for result in search_results], ["b"])
+
+
+if __name__ == "__main__":
+    unittest.main()
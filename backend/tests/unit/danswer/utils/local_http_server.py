@@ -0,0 +1,24 @@
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+
+class LocalHttpServerTestCase(unittest.TestCase):
+    """Serves `handler` on a free local port for as long as the tests of the class run,
+    requests go to `url` which ends with `path`"""
+
+    handler: type[BaseHTTPRequestHandler]
+    path: str = ""
+    server: ThreadingHTTPServer
+    url: str
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), cls.handler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}{cls.path}"
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.server.shutdown()
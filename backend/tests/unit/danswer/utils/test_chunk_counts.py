@@ -0,0 +1,60 @@
+import unittest
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+from danswer.utils.chunk_counts import backfill_chunk_counts
+
+
+class TestBackfillChunkCounts(unittest.TestCase):
+    def setUp(self) -> None:
+        module = "danswer.utils.chunk_counts"
+        self.config_store = MagicMock()
+        self.current_model = MagicMock(index_name="index_a")
+        self.visit = MagicMock(return_value={"a": 3, "b": 1})
+        self.backfill = MagicMock()
+        for target, replacement in [
+            ("get_dynamic_config_store", MagicMock(return_value=self.config_store)),
+            ("get_sqlalchemy_engine", MagicMock()),
+            ("Session", MagicMock()),
+            (
+                "get_current_db_embedding_model",
+                MagicMock(side_effect=lambda db_session: self.current_model),
+            ),
+            ("_visit_chunk_counts", self.visit),
+            ("backfill_docs_chunk_count", self.backfill),
+        ]:
+            patcher = patch(f"{module}.{target}", new=replacement)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_counts_are_backfilled_once_per_index(self) -> None:
+        self.config_store.load.return_value = "index_a"
+        backfill_chunk_counts(should_check_if_already_done=True)
+        self.visit.assert_not_called()
+
+        # Swapped to a new index since the last backfill
+        self.current_model.index_name = "index_b"
+        backfill_chunk_counts(should_check_if_already_done=True)
+
+        self.visit.assert_called_once_with("index_b")
+        self.assertEqual(
+            self.backfill.call_args.kwargs["ids_to_chunk_count"], {"a": 3, "b": 1}
+        )
+        self.config_store.store.assert_called_once_with(
+            "completed_chunk_count_backfill", "index_b"
+        )
+
+    def test_backfill_stops_when_the_index_is_swapped(self) -> None:
+        def _visit(index_name: str) -> dict[str, int]:
+            self.current_model = MagicMock(index_name="index_b")
+            return {"a": 3}
+
+        self.visit.side_effect = _visit
+        backfill_chunk_counts()
+
+        self.backfill.assert_not_called()
+        self.config_store.store.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,302 @@
+import asyncio
+import os
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler
+
+import httpx
+import requests
+
+from danswer.utils.http_client import AsyncPooledHttpClient
+from danswer.utils.http_client import CircuitBreaker
+from danswer.utils.http_client import CircuitOpenError
+from danswer.utils.http_client import PooledHttpClient
+from danswer.utils.metrics import get_latency_histogram
+from danswer.utils.metrics import LatencyHistogram
+from tests.unit.danswer.utils.local_http_server import LocalHttpServerTestCase
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Status codes to respond with, in order, then 200
+    statuses: list[int] = []
+    # Seconds to wait before responding, in order, then none
+    delays: list[float] = []
+    ports_seen: set[int] = set()
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        _Handler.ports_seen.add(self.client_address[1])
+        if _Handler.delays:
+            time.sleep(_Handler.delays.pop(0))
+
+        status = _Handler.statuses.pop(0) if _Handler.statuses else 200
+        body = b'{"ok": true}'
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except BrokenPipeError:
+            # The client cancelled the losing request of a hedge
+            pass
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+class TestPooledHttpClient(LocalHttpServerTestCase):
+    handler = _Handler
+    path = "/encoder/test"
+
+    def setUp(self) -> None:
+        _Handler.statuses = []
+        _Handler.delays = []
+        _Handler.ports_seen = set()
+
+    def _client(self, max_retries: int = 2) -> PooledHttpClient:
+        return PooledHttpClient(
+            connect_timeout=1,
+            read_timeout=1,
+            max_retries=max_retries,
+            backoff_base=0.001,
+            metric_prefix="test_client",
+        )
+
+    def test_connections_are_reused(self) -> None:
+        client = self._client()
+        for _ in range(5):
+            self.assertEqual(client.post(self.url, json={}).status_code, 200)
+
+        self.assertEqual(len(_Handler.ports_seen), 1)
+        self.assertGreaterEqual(
+            get_latency_histogram("test_client:/encoder/test").count, 5
+        )
+
+    def test_retries_unavailable(self) -> None:
+        _Handler.statuses = [503, 502]
+        response = self._client(max_retries=2).post(self.url, json={})
+        self.assertEqual(response.status_code, 200)
+
+    def test_gives_up_after_max_retries(self) -> None:
+        _Handler.statuses = [503, 503, 503]
+        response = self._client(max_retries=1).post(self.url, json={})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(_Handler.statuses, [503])
+
+    def test_read_timeouts_are_not_retried(self) -> None:
+        _Handler.delays = [0.5, 0.5, 0.5]
+        client = PooledHttpClient(
+            connect_timeout=1,
+            read_timeout=0.1,
+            max_retries=2,
+            backoff_base=0.001,
+            metric_prefix="test_read_timeout",
+        )
+        with self.assertRaises(requests.ReadTimeout):
+            client.post(self.url, json={})
+        self.assertEqual(_Handler.delays, [0.5, 0.5])
+
+        async_client = AsyncPooledHttpClient(
+            connect_timeout=1,
+            read_timeout=0.1,
+            max_retries=2,
+            backoff_base=0.001,
+            metric_prefix="test_async_read_timeout",
+        )
+        with self.assertRaises(httpx.ReadTimeout):
+            asyncio.run(async_client.post(self.url, json={}))
+        self.assertEqual(_Handler.delays, [0.5])
+
+    def test_deadline_stops_retries(self) -> None:
+        _Handler.statuses = [503, 503, 503]
+        client = PooledHttpClient(
+            connect_timeout=1,
+            read_timeout=1,
+            max_retries=5,
+            backoff_base=10,
+            backoff_max=10,
+            metric_prefix="test_deadline",
+        )
+        start = time.monotonic()
+        response = client.post(self.url, json={}, deadline=0.5)
+        self.assertEqual(response.status_code, 503)
+        self.assertLess(time.monotonic() - start, 0.5)
+
+    def test_hedges_slow_requests(self) -> None:
+        client = PooledHttpClient(
+            connect_timeout=1,
+            read_timeout=5,
+            max_retries=0,
+            metric_prefix="test_hedge",
+            hedge_percentile=95,
+        )
+        # Establishes what a normal latency looks like for the endpoint
+        for _ in range(20):
+            client.post(self.url, json={}, hedge=True)
+
+        _Handler.delays = [2]
+        start = time.monotonic()
+        self.assertEqual(client.post(self.url, json={}, hedge=True).status_code, 200)
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_async_hedges_slow_requests(self) -> None:
+        client = AsyncPooledHttpClient(
+            connect_timeout=1,
+            read_timeout=5,
+            max_retries=0,
+            metric_prefix="test_async_hedge",
+            hedge_percentile=95,
+        )
+
+        async def _run() -> float:
+            for _ in range(20):
+                await client.post(self.url, json={}, hedge=True)
+            _Handler.delays = [2]
+            start = time.monotonic()
+            await client.post(self.url, json={}, hedge=True)
+            return time.monotonic() - start
+
+        self.assertLess(asyncio.run(_run()), 1)
+
+    def test_open_circuit_fails_fast(self) -> None:
+        _Handler.statuses = [503, 503]
+        client = PooledHttpClient(
+            connect_timeout=1,
+            read_timeout=1,
+            max_retries=0,
+            metric_prefix="test_circuit",
+            circuit_breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60),
+        )
+        for _ in range(2):
+            self.assertEqual(client.post(self.url, json={}).status_code, 503)
+
+        with self.assertRaises(CircuitOpenError):
+            client.post(self.url, json={})
+
+    def test_server_errors_open_circuit(self) -> None:
+        _Handler.statuses = [500, 500]
+        client = PooledHttpClient(
+            connect_timeout=1,
+            read_timeout=1,
+            max_retries=2,
+            metric_prefix="test_circuit_500",
+            circuit_breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60),
+        )
+        # Not retried, but still a failure
+        for _ in range(2):
+            self.assertEqual(client.post(self.url, json={}).status_code, 500)
+
+        with self.assertRaises(CircuitOpenError):
+            client.post(self.url, json={})
+
+    def test_read_timeouts_open_circuit(self) -> None:
+        _Handler.delays = [0.5, 0.5]
+        client = PooledHttpClient(
+            connect_timeout=1,
+            read_timeout=0.1,
+            max_retries=2,
+            metric_prefix="test_circuit_read_timeout",
+            circuit_breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60),
+        )
+        for _ in range(2):
+            with self.assertRaises(requests.ReadTimeout):
+                client.post(self.url, json={})
+
+        with self.assertRaises(CircuitOpenError):
+            client.post(self.url, json={})
+
+    def test_async_read_timeouts_and_server_errors_open_circuit(self) -> None:
+        _Handler.delays = [0.5]
+        # Whichever of the two requests the server gets to first
+        _Handler.statuses = [500, 500]
+        client = AsyncPooledHttpClient(
+            connect_timeout=1,
+            read_timeout=0.1,
+            max_retries=2,
+            metric_prefix="test_async_circuit",
+            circuit_breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60),
+        )
+
+        async def _run() -> None:
+            with self.assertRaises(httpx.ReadTimeout):
+                await client.post(self.url, json={})
+            response = await client.post(self.url, json={})
+            self.assertEqual(response.status_code, 500)
+            with self.assertRaises(CircuitOpenError):
+                await client.post(self.url, json={})
+
+        asyncio.run(_run())
+
+    def test_new_session_after_fork(self) -> None:
+        client = self._client()
+        parent_session = client._get_session()
+
+        # Simulates running in a forked child process
+        client._pid = os.getpid() + 1
+        self.assertIsNot(client._get_session(), parent_session)
+
+    def test_async_client_retries_and_reuses_connections(self) -> None:
+        _Handler.statuses = [503]
+        client = AsyncPooledHttpClient(
+            connect_timeout=1,
+            read_timeout=1,
+            max_retries=2,
+            backoff_base=0.001,
+            metric_prefix="test_async_client",
+        )
+
+        async def _run() -> list[int]:
+            statuses = []
+            for _ in range(3):
+                response = await client.post(self.url, json={})
+                statuses.append(response.status_code)
+            return statuses
+
+        self.assertEqual(asyncio.run(_run()), [200, 200, 200])
+        self.assertEqual(len(_Handler.ports_seen), 1)
+        self.assertEqual(
+            get_latency_histogram("test_async_client:/encoder/test").count, 4
+        )
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_trial_request_after_reset_timeout(self) -> None:
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+        breaker.record_failure()
+        breaker.before_request()
+        breaker.record_failure()
+        self.assertTrue(breaker.is_open)
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_request()
+
+        time.sleep(0.05)
+        breaker.before_request()
+        # Only the one trial goes through
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_request()
+        breaker.record_success()
+        self.assertFalse(breaker.is_open)
+        breaker.before_request()
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    def test_percentiles(self) -> None:
+        histogram = LatencyHistogram()
+        for _ in range(90):
+            histogram.record(0.004)
+        for _ in range(10):
+            histogram.record(0.8)
+
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot["count"], 100)
+        # Estimated as the upper bound of the bucket
+        self.assertEqual(snapshot["p50"], 0.005)
+        self.assertEqual(snapshot["p99"], 0.8)
+        self.assertAlmostEqual(snapshot["mean"], 0.0836)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import threading
+import time
+import unittest
+from collections.abc import Callable
+from collections.abc import Iterator
+
+from danswer.utils.staged_pipeline import Stage
+from danswer.utils.staged_pipeline import StagedPipeline
+
+
+def _sleep_then(func: Callable[[int], int], seconds: float) -> Callable[[int], int]:
+    def _stage(item: int) -> int:
+        time.sleep(seconds)
+        return func(item)
+
+    return _stage
+
+
+class TestStagedPipeline(unittest.TestCase):
+    def test_stages_overlap(self) -> None:
+        pipeline = StagedPipeline(
+            stages=[
+                Stage(name="add", func=_sleep_then(lambda x: x + 1, 0.05)),
+                Stage(name="double", func=_sleep_then(lambda x: x * 2, 0.05)),
+                Stage(name="square", func=_sleep_then(lambda x: x * x, 0.05)),
+            ]
+        )
+
+        start = time.monotonic()
+        results = list(pipeline.run(iter(range(8))))
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(results, [((x + 1) * 2) ** 2 for x in range(8)])
+        # One stage after the other would take 8 * 3 * 0.05 = 1.2s
+        self.assertLess(elapsed, 0.9)
+        stats = pipeline.stats_summary()
+        self.assertEqual(list(stats), ["fetch", "add", "double", "square"])
+        self.assertTrue(
+            all(stage_stats["items"] == 8 for stage_stats in stats.values())
+        )
+
+    def test_queues_are_bounded(self) -> None:
+        pulled: list[int] = []
+        num_results: list[int] = []
+        release = threading.Event()
+
+        def _source() -> Iterator[int]:
+            for item in range(100):
+                pulled.append(item)
+                yield item
+
+        def _blocked(item: int) -> int:
+            release.wait(timeout=5)
+            return item
+
+        pipeline = StagedPipeline(
+            stages=[Stage(name="blocked", func=_blocked)], queue_size=2
+        )
+        results = pipeline.run(_source())
+        consumer = threading.Thread(
+            target=lambda: num_results.append(len(list(results)))
+        )
+        consumer.start()
+        time.sleep(0.2)
+        # One item in the stage, two waiting in its queue, one held by the fetch thread
+        self.assertLessEqual(len(pulled), 4)
+        release.set()
+        consumer.join(timeout=5)
+        self.assertEqual(num_results, [100])
+
+    def test_failure_stops_the_pipeline(self) -> None:
+        processed: list[int] = []
+
+        def _fail_on_three(item: int) -> int:
+            if item == 3:
+                raise ValueError("failed")
+            processed.append(item)
+            return item
+
+        pipeline = StagedPipeline(
+            stages=[
+                Stage(name="fail", func=_fail_on_three, num_workers=2),
+                Stage(name="identity", func=lambda item: item),
+            ]
+        )
+        with self.assertRaises(ValueError):
+            list(pipeline.run(iter(range(1000))))
+        self.assertLess(len(processed), 1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from danswer.utils.threadpool_concurrency import BoundedExecutor
+from danswer.utils.threadpool_concurrency import get_executor
+from danswer.utils.threadpool_concurrency import run_functions_tuples_in_parallel
+from danswer.utils.threadpool_concurrency import run_in_executor
+
+
+class TestBoundedExecutor(unittest.TestCase):
+    def test_results_keep_order(self) -> None:
+        def _slow_identity(value: int) -> int:
+            time.sleep(0.01 * (5 - value))
+            return value
+
+        self.assertEqual(
+            run_functions_tuples_in_parallel(
+                [(_slow_identity, (value,)) for value in range(5)]
+            ),
+            list(range(5)),
+        )
+
+    def test_nested_fan_out_does_not_deadlock(self) -> None:
+        executor = BoundedExecutor(name="test-nested", max_workers=2, max_queue_size=64)
+
+        def _inner(value: int) -> int:
+            return value * 2
+
+        def _outer(value: int) -> int:
+            futures = [executor.submit(_inner, value) for _ in range(3)]
+            return sum(future.wait_result() for future in futures)
+
+        # Every worker is taken by an outer task waiting on inner tasks
+        futures = [executor.submit(_outer, value) for value in range(4)]
+        self.assertEqual([future.wait_result() for future in futures], [0, 6, 12, 18])
+        self.assertEqual(executor.queue_depth, 0)
+        self.assertEqual(executor.active, 0)
+
+    def test_saturated_queue_runs_in_caller(self) -> None:
+        executor = BoundedExecutor(
+            name="test-saturated", max_workers=1, max_queue_size=1
+        )
+        release = threading.Event()
+        executor.submit(release.wait)
+        # The worker is busy, this one waits in the queue
+        queued = executor.submit(threading.get_ident)
+        # The queue is full, this one runs right away in this thread
+        saturated = executor.submit(threading.get_ident)
+
+        self.assertTrue(saturated.done())
+        self.assertEqual(saturated.result(), threading.get_ident())
+        release.set()
+        self.assertNotEqual(queued.result(timeout=5), threading.get_ident())
+
+    def test_failure_cancels_pending(self) -> None:
+        executor = get_executor()
+        ran = []
+
+        def _fail() -> None:
+            raise ValueError("failed")
+
+        def _record(value: int) -> None:
+            time.sleep(0.05)
+            ran.append(value)
+
+        with self.assertRaises(ValueError):
+            run_functions_tuples_in_parallel(
+                [(_fail, ())]
+                + [(_record, (value,)) for value in range(executor.max_workers * 4)]
+            )
+        time.sleep(0.2)
+        # The functions that did not start by the time of the failure never ran
+        self.assertLess(len(ran), executor.max_workers * 4)
+
+    def test_run_in_executor_cancellation(self) -> None:
+        executor = get_executor()
+        started = threading.Event()
+        release = threading.Event()
+
+        def _blocking() -> str:
+            started.set()
+            release.wait(timeout=5)
+            return "done"
+
+        async def _run() -> str:
+            self.assertEqual(await run_in_executor(lambda: "ok"), "ok")
+
+            task = asyncio.create_task(run_in_executor(_blocking))
+            await asyncio.to_thread(started.wait, 5)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                return "cancelled"
+            finally:
+                release.set()
+            return "not cancelled"
+
+        self.assertEqual(asyncio.run(_run()), "cancelled")
+        self.assertEqual(executor.queue_depth, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
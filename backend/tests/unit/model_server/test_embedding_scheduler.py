@@ -0,0 +1,103 @@
+import asyncio
+import threading
+import unittest
+
+import numpy as np
+
+from model_server.embedding_scheduler import EmbedBatchKey
+from model_server.embedding_scheduler import EmbeddingBatchScheduler
+from shared_configs.enums import EmbedTextType
+
+_Embeddings = list[np.ndarray | list[float]]
+
+_KEY = EmbedBatchKey(
+    model_name="test-model", max_context_length=512, normalize_embeddings=True
+)
+
+
+class TestEmbeddingBatchScheduler(unittest.TestCase):
+    def setUp(self) -> None:
+        self.batches: list[list[str]] = []
+        self.release_first_batch = threading.Event()
+
+    def _fake_embed(
+        self, texts: list[str], model_name: str, max_len: int, normalize: bool
+    ) -> list[list[float]]:
+        self.batches.append(texts)
+        if texts and texts[0] == "slow":
+            self.release_first_batch.wait(timeout=5)
+        return [[float(len(text))] for text in texts]
+
+    def test_concurrent_requests_are_coalesced(self) -> None:
+        scheduler = EmbeddingBatchScheduler(
+            embed_func=self._fake_embed, max_batch_size=8, max_wait_seconds=0.05
+        )
+
+        async def run() -> tuple[_Embeddings, _Embeddings, _Embeddings]:
+            return await asyncio.gather(
+                scheduler.embed(["a", "bb"], _KEY, EmbedTextType.PASSAGE),
+                scheduler.embed(["ccc"], _KEY, EmbedTextType.QUERY),
+                scheduler.embed(["dddd", "eeeee"], _KEY, EmbedTextType.PASSAGE),
+            )
+
+        results = asyncio.run(run())
+        scheduler.shutdown()
+
+        self.assertEqual(len(self.batches), 1)
+        self.assertEqual(results[0], [[1.0], [2.0]])
+        self.assertEqual(results[1], [[3.0]])
+        self.assertEqual(results[2], [[4.0], [5.0]])
+
+    def test_large_requests_are_split(self) -> None:
+        scheduler = EmbeddingBatchScheduler(
+            embed_func=self._fake_embed, max_batch_size=2, max_wait_seconds=0
+        )
+        texts = ["x" * i for i in range(1, 6)]
+
+        results = asyncio.run(scheduler.embed(texts, _KEY))
+        scheduler.shutdown()
+
+        self.assertTrue(all(len(batch) <= 2 for batch in self.batches))
+        self.assertEqual(results, [[float(i)] for i in range(1, 6)])
+
+    def test_queries_are_served_before_passages(self) -> None:
+        scheduler = EmbeddingBatchScheduler(
+            embed_func=self._fake_embed, max_batch_size=1, max_wait_seconds=0
+        )
+
+        async def run() -> None:
+            # Occupies the only worker until released
+            slow = asyncio.create_task(scheduler.embed(["slow"], _KEY))
+            await asyncio.sleep(0.05)
+            passages = asyncio.create_task(
+                scheduler.embed(["p1", "p2"], _KEY, EmbedTextType.PASSAGE)
+            )
+            await asyncio.sleep(0)
+            query = asyncio.create_task(
+                scheduler.embed(["q"], _KEY, EmbedTextType.QUERY)
+            )
+            await asyncio.sleep(0.05)
+            self.release_first_batch.set()
+            await asyncio.gather(slow, passages, query)
+
+        asyncio.run(run())
+        scheduler.shutdown()
+
+        self.assertEqual(self.batches, [["slow"], ["q"], ["p1"], ["p2"]])
+
+    def test_failures_propagate(self) -> None:
+        def failing_embed(
+            texts: list[str], model_name: str, max_len: int, normalize: bool
+        ) -> list[list[float]]:
+            raise RuntimeError("model failure")
+
+        scheduler = EmbeddingBatchScheduler(
+            embed_func=failing_embed, max_batch_size=4, max_wait_seconds=0
+        )
+        with self.assertRaises(RuntimeError):
+            asyncio.run(scheduler.embed(["a"], _KEY))
+        scheduler.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
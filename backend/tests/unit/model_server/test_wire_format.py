@@ -0,0 +1,46 @@
+import unittest
+
+import numpy as np
+
+from shared_configs.wire_format import build_ndarray_accept_header
+from shared_configs.wire_format import decode_ndarray
+from shared_configs.wire_format import encode_ndarray
+from shared_configs.wire_format import parse_ndarray_accept_header
+
+
+class TestWireFormat(unittest.TestCase):
+    def test_float32_round_trip(self) -> None:
+        array = np.random.default_rng(0).standard_normal((4, 768)).astype(np.float32)
+        decoded = decode_ndarray(encode_ndarray(array, dtype="float32"))
+
+        self.assertEqual(decoded.dtype, np.float32)
+        np.testing.assert_array_equal(decoded, array)
+
+    def test_float16_round_trip(self) -> None:
+        array = np.random.default_rng(0).standard_normal((3, 16)).astype(np.float32)
+        payload = encode_ndarray(array, dtype="float16")
+        decoded = decode_ndarray(payload)
+
+        self.assertLess(len(payload), array.nbytes)
+        self.assertEqual(decoded.shape, (3, 16))
+        np.testing.assert_allclose(decoded, array, rtol=1e-3, atol=1e-3)
+
+    def test_empty_array(self) -> None:
+        decoded = decode_ndarray(encode_ndarray(np.zeros((0, 8))))
+        self.assertEqual(decoded.shape, (0, 8))
+
+    def test_accept_negotiation(self) -> None:
+        self.assertEqual(
+            parse_ndarray_accept_header(build_ndarray_accept_header("float16")),
+            "float16",
+        )
+        self.assertEqual(
+            parse_ndarray_accept_header("application/x-ndarray"), "float32"
+        )
+        self.assertIsNone(parse_ndarray_accept_header("application/json"))
+        self.assertIsNone(parse_ndarray_accept_header(None))
+        self.assertIsNone(parse_ndarray_accept_header("*/*"))
+
+
+if __name__ == "__main__":
+    unittest.main()